@@ -3,14 +3,14 @@ Markdown Documentation Viewer
 A Flask-based web application that presents Markdown files from a folder as well-formatted HTML sections.
 """
 
-from flask import Flask, render_template, send_from_directory, request, jsonify, redirect, url_for, abort, Response, session, send_file
+from flask import Flask, render_template, send_from_directory, request, jsonify, redirect, url_for, abort, Response, session, send_file, g, has_request_context
 import os
 import sys
-import markdown
 from pathlib import Path
 from datetime import datetime
 import io
 import re
+import copy
 import html as html_module
 import json
 import shutil
@@ -20,7 +20,6 @@ import zipfile
 import urllib.request
 import subprocess
 import tempfile
-from bs4 import BeautifulSoup
 
 # Legacy imports removed (pdfkit, htmldocx, mammoth) as part of Plugin Architecture Refactor
 
@@ -40,21 +39,20 @@ except Exception:
     from docnexus.features import smart_convert as smart
     from docnexus.features.standard import normalize_headings, sanitize_attr_tokens, build_toc, annotate_blocks
 
-from docnexus.core.loader import load_plugins
+from docnexus.core.activation import RouteActivationMiddleware
+from docnexus.core.loader import DEFAULT_PLUGIN_BUDGET_MS, get_plugin_timings, load_plugins
+from docnexus.core.export_cache import ExportCache, normalize_html
+from docnexus.core.export_images import IMAGE_CACHE
+from docnexus.core.render_cache import RenderCache, file_dependencies, snippet_includes
+from docnexus.core.export_jobs import ExportJobService
+from docnexus.core.json_store import JsonFileStore
+from docnexus.core.request_encoding import RequestDecompressionMiddleware
+from docnexus.core.runtime import RuntimeSnapshot, RuntimeState
+from docnexus.core.startup import PROFILE, module_available
 from docnexus.features.registry import PluginRegistry
 
-# Input Support Configuration
-try:
-    import mammoth
-    WORD_INPUT_AVAILABLE = True
-    def convert_docx_to_html(start_path):
-        with open(start_path, "rb") as docx_file:
-            result = mammoth.convert_to_html(docx_file)
-            return result.value
-except ImportError:
-    WORD_INPUT_AVAILABLE = False
-    def convert_docx_to_html(start_path):
-        raise ImportError("mammoth library not installed")
+# Input Support Configuration (mammoth is imported on the first Word document)
+WORD_INPUT_AVAILABLE = module_available('mammoth')
 
 import os
 
@@ -125,8 +123,8 @@ def get_plugins():
     Return list of available plugins using Metadata and Config state.
     """
     from docnexus.core.loader import get_plugin_paths
+    from docnexus.core.manifest import get_manifest_index
     from docnexus.core.state import PluginState
-    import ast
     
     logger.debug("API: Fetching plugin list (New Architecture)...")
     plugins = []
@@ -136,89 +134,55 @@ def get_plugins():
     state = PluginState.get_instance()
     installed_ids = state.get_installed_plugins()
     
-    paths = get_plugin_paths()
-    for base_path in paths:
-        if not base_path.exists():
+    # Metadata from the manifest index: no plugin code is read or run unless it changed
+    for manifest in get_manifest_index().discover(get_plugin_paths()):
+        plugin_id = manifest.id
+        if plugin_id in seen_ids:
             continue
-            
+        seen_ids.add(plugin_id)
+        
+        base_path = manifest.base
         is_bundled = 'docnexus' in str(base_path).lower() and ('plugins' in base_path.name or 'plugins_dev' in base_path.name)
         origin_label = 'bundled' if is_bundled else 'user'
         
-        for item in base_path.iterdir():
-            if item.is_dir() and (item / 'plugin.py').exists():
-                plugin_id = item.name
-                if plugin_id in seen_ids:
-                    continue
-                seen_ids.add(plugin_id)
-                
-                # Default Metadata
-                display_name = plugin_id.title()
-                desc = "No description."
-                category = "tool"
-                icon = "fa-plug"
-                preinstalled = False
-                
-                # Robust Regex Metadata Extraction
-                try:
-                    import re
-                    import ast
-                    
-                    plugin_file_path = item / 'plugin.py'
-                    with open(plugin_file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        
-                    # Regex to find PLUGIN_METADATA = { ... }
-                    # Matches keys and values broadly, expecting valid python dict syntax
-                    match = re.search(r'PLUGIN_METADATA\s*=\s*({[^}]+})', content, re.DOTALL)
-                    
-                    if match:
-                        dict_str = match.group(1)
-                        # clean up any potential trailing commas or comments if simple regex captured them?
-                        # actually ast.literal_eval is strict.
-                        # If regex is too greedy, it might fail.
-                        # Let's try to parse the match.
-                        meta = ast.literal_eval(dict_str)
-                        
-                        display_name = meta.get('name', display_name)
-                        desc = meta.get('description', desc)
-                        category = meta.get('category', category)
-                        icon = meta.get('icon', icon)
-                        preinstalled = meta.get('preinstalled', False)
-                    else:
-                        logger.warning(f"No PLUGIN_METADATA found in {plugin_id}")
-                        
-                except Exception as e:
-                    logger.warning(f"Failed to regex-parse metadata for {plugin_id}: {e}")
-                
-                # Determine Installed Status
-                if preinstalled:
-                     is_installed = True
-                     has_installer = False # Preinstalled cannot be removed
-                else:
-                    is_installed = plugin_id in installed_ids
-                    has_installer = True # Can be managed
-
-                if plugin_id == 'pdf_export':
-                     logger.info(f"API: get_plugins found pdf_export. State says installed={is_installed} (Instance {id(state)})")
-                # Priority (Config read)
-                priority_list = CONFIG.get('plugin_priority', [])
-                is_priority = plugin_id in priority_list
-
-                plugins.append({
-                    'id': plugin_id,
-                    'name': display_name,
-                    'author': 'DocNexus Core' if is_bundled else 'User',
-                    'downloads': '-',
-                    'category': category,
-                    'tags': [origin_label, category],
-                    'description': desc,
-                    'icon': icon,
-                    'installed': is_installed,
-                    'can_install': has_installer,
-                    'type': origin_label,
-                    'is_priority': is_priority
-                })
-                
+        meta = manifest.metadata
+        if not meta:
+            logger.warning(f"No PLUGIN_METADATA found in {plugin_id}")
+        display_name = meta.get('name', plugin_id.title())
+        desc = meta.get('description', "No description.")
+        category = meta.get('category', "tool")
+        icon = meta.get('icon', "fa-plug")
+        preinstalled = meta.get('preinstalled', False)
+        
+        # Determine Installed Status
+        if preinstalled:
+             is_installed = True
+             has_installer = False # Preinstalled cannot be removed
+        else:
+            is_installed = plugin_id in installed_ids
+            has_installer = True # Can be managed
+
+        if plugin_id == 'pdf_export':
+             logger.info(f"API: get_plugins found pdf_export. State says installed={is_installed} (Instance {id(state)})")
+        # Priority (Config read)
+        priority_list = CONFIG.get('plugin_priority', [])
+        is_priority = plugin_id in priority_list
+
+        plugins.append({
+            'id': plugin_id,
+            'name': display_name,
+            'author': 'DocNexus Core' if is_bundled else 'User',
+            'downloads': '-',
+            'category': category,
+            'tags': [origin_label, category],
+            'description': desc,
+            'icon': icon,
+            'installed': is_installed,
+            'can_install': has_installer,
+            'type': origin_label,
+            'is_priority': is_priority
+        })
+        
     return jsonify(plugins)
 
 @app.route('/api/plugins/install/<plugin_id>', methods=['POST'])
@@ -232,24 +196,10 @@ def install_plugin_api(plugin_id):
         if state.set_plugin_installed(plugin_id, True):
             logger.info(f"API: Successfully enabled {plugin_id}")
             
-            # 2. Reload Plugin & Refresh Features
+            # 2. Reload Plugin & Update its Features
             try:
-                from docnexus.core.loader import load_single_plugin, get_plugin_paths
-                from docnexus.features.registry import PluginRegistry
-                
-                # Retrieve path for this plugin
-                # We need to find where it is.
-                found_path = None
-                for base in get_plugin_paths():
-                    candidate = base / plugin_id / 'plugin.py'
-                    if candidate.exists():
-                        found_path = candidate
-                        break
-                
-                if found_path:
-                    load_single_plugin(plugin_id, found_path, PluginRegistry())
-                    FEATURES.refresh()
-                    logger.info(f"API: Reloaded plugin {plugin_id} and refreshed features.")
+                if reload_plugin(plugin_id):
+                    logger.info(f"API: Reloaded plugin {plugin_id} and updated its features.")
                 else:
                     logger.warning(f"API: Could not find path for {plugin_id} to reload.")
                     
@@ -275,12 +225,12 @@ def uninstall_plugin_api(plugin_id):
         if state.set_plugin_installed(plugin_id, False):
             logger.info(f"API: Successfully disabled {plugin_id}")
             
-            # 2. Refresh Features (Refresh will see State=False and disable feature)
+            # 2. Disable its Features (the rest of the table is untouched)
             try:
-                FEATURES.refresh()
-                logger.info(f"API: Refreshed features (Plugin {plugin_id} should be disabled).")
+                FEATURES.set_plugin_installed(plugin_id, False)
+                logger.info(f"API: Disabled features of plugin {plugin_id}.")
             except Exception as ref_err:
-                logger.error(f"API: Refresh failed: {ref_err}")
+                logger.error(f"API: Disabling features failed: {ref_err}")
                 
             return jsonify({'message': f'Plugin {plugin_id} disabled successfully.'})
         else:
@@ -301,11 +251,12 @@ def manage_priority():
             if not isinstance(priority_list, list):
                 return jsonify({'error': 'Invalid format, expected list'}), 400
             
-            CONFIG['plugin_priority'] = priority_list
+            global CONFIG
+            CONFIG = dict(CONFIG, plugin_priority=priority_list)  # Replaced, see RUNTIME
             save_config(CONFIG)
             
-            # Refresh features to apply new priority
-            FEATURES.refresh(priority_list=priority_list)
+            # Re-resolve the features several plugins provide
+            FEATURES.set_priority(priority_list)
             
             return jsonify({'success': True, 'priority': priority_list})
         except Exception as e:
@@ -321,12 +272,12 @@ def manage_priority():
 
 import webbrowser
 import logging
+import threading
 from threading import Timer
 from pathlib import Path
+from typing import Optional
 from docnexus.core.logging_config import setup_logging
 
-# Initialize Logging (Standardized)
-# Initialize Logging (Standardized)
 DEBUG_MODE = os.environ.get('FLASK_ENV') == 'development'
 
 if getattr(sys, 'frozen', False):
@@ -337,70 +288,8 @@ else:
     BASE_DIR = Path(__file__).resolve().parent.parent
 
 LOG_DIR = BASE_DIR / 'logs'
-setup_logging(LOG_DIR, DEBUG_MODE)
 
 logger = logging.getLogger(__name__)
-logger = logging.getLogger(__name__)
-logger.info(f"Application starting - Version {VERSION} | Debug Mode: {DEBUG_MODE}")
-
-# Initialize Plugins
-try:
-    import time
-    logger.info(f"Initializing Plugin System... (Startup Time: {time.time()})")
-    
-    # Force loader logging to ensure we see plugin discovery
-    logging.getLogger('docnexus.core.loader').setLevel(logging.DEBUG)
-    
-    # Initialize Registry
-    registry = PluginRegistry()
-    logger.info(f"App sees PluginRegistry ID: {id(registry)}")
-    
-    # Load Plugins
-    from docnexus.core.loader import load_plugins
-    load_plugins(registry)
-    logger.info(f"App sees PluginRegistry ID: {id(registry)}")
-    registry.initialize_all()
-    
-    if hasattr(registry, 'register_blueprints'):
-        registry.register_blueprints(app)
-        
-        # Fallback: Explicitly register editor if missing (fixes loader discovery issues)
-        try:
-            from docnexus.plugins.editor.plugin import blueprint as editor_bp
-            if 'editor' not in [bp.name for bp in app.blueprints.values()]:
-                app.register_blueprint(editor_bp)
-                logger.info("Registered editor blueprint (fallback)")
-            else:
-                 logger.info("Editor blueprint already registered via registry.")
-        except Exception as e:
-            logger.warning(f"Fallback registration skipped: {e}")
-            
-    else:
-        logger.error("Registry missing register_blueprints method!")
-    
-    # Initialize FeatureManager and load plugins we just found
-    # global FEATURES  <-- Removed
-    try:
-        from docnexus.features.registry import FeatureManager
-        if FEATURES is None:
-            FEATURES = FeatureManager(registry)
-        
-        logger.info("Refreshing global FEATURES manager...")
-        FEATURES.refresh()
-    except Exception as fm_err:
-        logger.error(f"Failed to initialize FeatureManager: {fm_err}", exc_info=True)
-
-    logger.info(f"Registry initialized. Plugin count: {len(registry.get_all_plugins())}")
-    logger.debug(f"Registry contents: {registry.get_all_plugins()}")
-    
-    # DEBUG: Verify Registry Health
-    if hasattr(registry, 'get_slots'):
-        logger.info("Registry Health Check: get_slots() available")
-    else:
-        logger.error("Registry Health Check: get_slots() MISSING!")
-        
-except Exception as e:
-    logger.error(f"Plugin system initialization failed: {e}", exc_info=True)
 
 @app.errorhandler(500)
 def internal_error(error):
@@ -411,14 +300,8 @@ def internal_error(error):
 # Workspace Configuration
 CONFIG_FILE = PROJECT_ROOT / 'config.json'
 
-def load_config():
-    """Load workspace configuration."""
-    if CONFIG_FILE.exists():
-        try:
-            with open(CONFIG_FILE, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            logger.error(f"Failed to load config: {e}")
+def default_config():
+    """Configuration used while config.json is missing or unreadable."""
     # Determine default workspace
     default_workspace = PROJECT_ROOT / 'workspace'
     if not default_workspace.exists() and (PROJECT_ROOT / 'examples').exists():
@@ -430,24 +313,39 @@ def load_config():
         'recent_workspaces': []
     }
 
+# config.json kept in memory and re-read only when the file changes (see core.json_store).
+# Read-modify-write updates go through `with CONFIG_STORE.batch() as config:`.
+CONFIG_STORE = JsonFileStore(CONFIG_FILE, default=default_config)
+
+def load_config():
+    """Load workspace configuration (a copy the caller may change and save)."""
+    return copy.deepcopy(CONFIG_STORE.read())
+
 def save_config(config):
     """Save workspace configuration."""
     try:
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(config, f, indent=2)
+        CONFIG_STORE.write(config)
         logger.info("Configuration saved successfully")
     except Exception as e:
         logger.error(f"Failed to save config: {e}")
 
-# Load configuration
-CONFIG = load_config()
-MD_FOLDER = Path(CONFIG['active_workspace'])  # Folder containing documents
+# Configuration-dependent state, set up by create_app() (see _init_config)
+CONFIG = {}
+MD_FOLDER = None  # Folder containing documents
 DOCS_FOLDER = PROJECT_ROOT / 'docs'  # Documentation folder
 ALLOWED_EXTENSIONS = {'.md', '.markdown', '.txt', '.docx'}
 
 # File size limits (in bytes)
 MAX_FILE_SIZE = 20 * 1024 * 1024  # 20 MB for actual file content
 MAX_EXPORT_HTML_SIZE = 50 * 1024 * 1024  # 50 MB for export HTML content
+EXPORT_SPOOL_MEMORY = 8 * 1024 * 1024  # Streamed export results above this spill to a temp file
+MAX_DECODED_REQUEST_SIZE = 64 * 1024 * 1024  # Ceiling for gzip/br request bodies once decompressed
+
+EXPORT_CACHE = None
+EXPORT_OPTIONS = {}
+RENDER_CACHE = None
+EXPORT_JOBS_CONFIG = {}
+EXPORT_JOBS = None
 
 # Feature registry: keep smart/experimental separate from baseline rendering
 FEATURES = FeatureManager()
@@ -462,13 +360,212 @@ FEATURES.register(Feature("SMART_TABLES", smart.convert_ascii_tables_to_markdown
 FEATURES.register(Feature("SMART_SIP", smart.convert_sip_signaling_to_mermaid, FeatureState.EXPERIMENTAL))
 FEATURES.register(Feature("SMART_TOPOLOGY", smart.convert_topology_to_mermaid, FeatureState.EXPERIMENTAL))
 
-# Connect FeatureManager to Registry (Facade Pattern)
-# This allows FeatureManager to pull "Algorithm" features from plugins
-FEATURES._registry = PluginRegistry()
-# Force debug print to console
-logger.debug(f"DEBUG_STARTUP: Plugins in Registry: {FEATURES._registry.get_all_plugins()}")
-FEATURES.refresh(priority_list=CONFIG.get('plugin_priority', []))
-logger.debug(f"DEBUG_STARTUP: Features in Manager: {[f.name for f in FEATURES._features]}")
+# Workspace folder, config, features and pipelines as one immutable snapshot (see
+# core.runtime). MD_FOLDER and CONFIG are replaced, never changed in place, so the next
+# snapshot picks the change up.
+RUNTIME = RuntimeState(lambda: (MD_FOLDER, CONFIG, FEATURES))
+
+def current_runtime() -> RuntimeSnapshot:
+    """The snapshot of the current request (taken on first use), else the latest one."""
+    if has_request_context():
+        snapshot = g.get('runtime')
+        if snapshot is None:
+            snapshot = g.runtime = RUNTIME.get()
+        return snapshot
+    return RUNTIME.get()
+
+
+# -------------------------------------------------------------------------
+# Application factory
+# -------------------------------------------------------------------------
+# Importing this module only defines the app, its routes and the core features.
+# create_app() runs the startup phases - logging, configuration, plugin discovery,
+# feature wiring, blueprint registration - each exactly once per process; later calls
+# return the already initialized app. Launchers (run.py, the CLI), tests and worker
+# processes call it before using the app.
+
+_INIT_LOCK = threading.RLock()
+_PHASES_DONE = set()
+
+
+def _phase(func):
+    """
+    Run a startup phase once per process (timed in the startup profile). A phase that
+    raises is not done: the next create_app() call runs it again.
+    """
+    def run(*args, **kwargs):
+        if func.__name__ in _PHASES_DONE:
+            return
+        with PROFILE.phase(f"create_app: {func.__name__.lstrip('_')}"):
+            func(*args, **kwargs)
+        _PHASES_DONE.add(func.__name__)
+    run.__name__ = func.__name__
+    run.__doc__ = func.__doc__
+    return run
+
+
+@_phase
+def _init_logging():
+    """Log to logs/docnexus.log and the console."""
+    setup_logging(LOG_DIR, DEBUG_MODE)
+    logger.info(f"Application starting - Version {VERSION} | Debug Mode: {DEBUG_MODE}")
+
+
+@_phase
+def _init_config(config: Optional[dict] = None):
+    """Workspace configuration (config.json unless given) and the state derived from it."""
+    global CONFIG, MD_FOLDER, EXPORT_CACHE, EXPORT_OPTIONS, RENDER_CACHE, EXPORT_JOBS_CONFIG, EXPORT_JOBS
+
+    CONFIG = dict(config) if config is not None else load_config()
+    if 'active_workspace' not in CONFIG:
+        defaults = load_config() if config is not None else {}
+        CONFIG.setdefault('active_workspace', defaults.get('active_workspace', str(PROJECT_ROOT / 'workspace')))
+    MD_FOLDER = Path(CONFIG['active_workspace'])
+
+    # Export result cache (on disk, size-bounded LRU). Set 'export_cache_mb' to 0 to disable.
+    EXPORT_CACHE = ExportCache(
+        PROJECT_ROOT / 'cache' / 'exports',
+        max_bytes=int(CONFIG.get('export_cache_mb', 256)) * 1024 * 1024
+    )
+
+    # Export options handed to format handlers via ExportDocument.options
+    # (e.g. {"code_blocks": "auto", "code_max_spans": 4000} for print code simplification)
+    EXPORT_OPTIONS = CONFIG.get('export_options', {})
+
+    # Rendered documents (html, toc) keyed by file identity and render variant, shared by
+    # the viewer and server-side exports. Set 'render_cache_entries' to 0 to disable.
+    RENDER_CACHE = RenderCache(int(CONFIG.get('render_cache_entries', 64)))
+
+    # Background export jobs (POST /api/export/jobs) on pre-warmed worker processes, e.g.
+    # "export_jobs": {"workers": 2, "format_limits": {"pdf": 1}, "prewarm": true}
+    EXPORT_JOBS_CONFIG = CONFIG.get('export_jobs', {})
+    EXPORT_JOBS = ExportJobService(
+        PROJECT_ROOT / 'cache' / 'export_jobs',
+        workers=int(EXPORT_JOBS_CONFIG.get('workers', min(2, os.cpu_count() or 1))),
+        format_limits=EXPORT_JOBS_CONFIG.get('format_limits', {}),
+        result_cache=EXPORT_CACHE,
+        options=EXPORT_OPTIONS,
+        warm=bool(EXPORT_JOBS_CONFIG.get('prewarm', True))
+    )
+
+
+@_phase
+def _discover_plugins():
+    """Load (execute) the installed plugins into the registry."""
+    logger.info("Initializing Plugin System...")
+
+    # Plugin files are executed on a thread pool; plugins slower to load than the budget
+    # are logged, e.g. "plugin_loading": {"workers": 4, "budget_ms": 500}
+    loading = CONFIG.get('plugin_loading', {})
+    registry = PluginRegistry()
+    load_plugins(registry, max_workers=loading.get('workers'),
+                 budget_ms=float(loading.get('budget_ms', DEFAULT_PLUGIN_BUDGET_MS)))
+    registry.initialize_all()
+    logger.info(f"Registry initialized. Plugin count: {len(registry.get_all_plugins())}")
+    logger.debug(f"Registry contents: {registry.get_all_plugins()}")
+
+
+@_phase
+def _wire_features():
+    """Connect the FeatureManager to the plugin registry and build the feature table once."""
+    # Connect FeatureManager to Registry (Facade Pattern)
+    # This allows FeatureManager to pull "Algorithm" features from plugins
+    FEATURES._registry = PluginRegistry()
+    FEATURES.refresh(priority_list=CONFIG.get('plugin_priority', []))
+    logger.debug(f"Features in Manager: {[f.name for f in FEATURES._features]}")
+
+
+@_phase
+def _register_blueprints():
+    """Plugin blueprints and WSGI middleware."""
+    registry = PluginRegistry()
+    registry.register_blueprints(app)
+
+    # Fallback: Explicitly register editor if missing (fixes loader discovery issues)
+    try:
+        from docnexus.plugins.editor.plugin import blueprint as editor_bp
+        if 'editor' not in [bp.name for bp in app.blueprints.values()]:
+            app.register_blueprint(editor_bp)
+            logger.info("Registered editor blueprint (fallback)")
+    except Exception as e:
+        logger.warning(f"Fallback registration skipped: {e}")
+
+    # Plugins deferred to an onRoute activation event are loaded by the first request for
+    # their route, before Flask matches it against the (then complete) URL map.
+    app.wsgi_app = RouteActivationMiddleware(app.wsgi_app, registry, _activate_plugins)
+
+    # Large export/preview uploads may be sent with Content-Encoding: gzip (or br); they are
+    # decoded in a streaming fashion before reaching the views.
+    app.wsgi_app = RequestDecompressionMiddleware(
+        app.wsgi_app, max_size=MAX_DECODED_REQUEST_SIZE, spool_memory=EXPORT_SPOOL_MEMORY
+    )
+
+
+def _register_plugin_blueprints():
+    """Add the blueprints of plugins loaded (or reloaded) after startup to the running app."""
+    with _INIT_LOCK:
+        # Requests may be in flight: new routes arrive with a new URL map, swapped in whole
+        PluginRegistry().register_blueprints(app, running=True)
+
+
+def _activate_plugins(event: str) -> bool:
+    """
+    Fire a plugin activation event (core.activation) and register the blueprints of the
+    plugins it loaded. True if it loaded a plugin.
+    """
+    if not FEATURES.activate(event):
+        return False
+    _register_plugin_blueprints()
+    if has_request_context():
+        g.pop('runtime', None)  # This request goes on with the plugin's features
+    return True
+
+
+def reload_plugin(plugin_id: str) -> bool:
+    """
+    (Re)load one plugin into the running app: its previous features are replaced in the
+    feature table and its blueprint views swapped, without rebuilding anything else.
+    False if no plugin folder has that id.
+    """
+    from docnexus.core.loader import get_plugin_paths, load_single_plugin
+
+    found_path = next((base / plugin_id / 'plugin.py' for base in get_plugin_paths()
+                       if (base / plugin_id / 'plugin.py').exists()), None)
+    if not found_path:
+        return False
+    registry = PluginRegistry()
+    registry.unregister_plugin(plugin_id)
+    load_single_plugin(plugin_id, found_path, registry)
+    FEATURES.sync_plugin(plugin_id)
+    FEATURES.set_plugin_installed(plugin_id, True)
+    _register_plugin_blueprints()
+    return True
+
+
+def create_app(config: Optional[dict] = None) -> Flask:
+    """
+    Initialize and return the DocNexus app.
+
+    `config` replaces config.json for this process (tests, embedding); it only applies to
+    the first call, later calls return the app initialized by it.
+    """
+    with _INIT_LOCK:
+        _init_logging()
+        _init_config(config)
+        try:
+            _discover_plugins()
+        except Exception as e:
+            logger.error(f"Plugin system initialization failed: {e}", exc_info=True)
+        _wire_features()
+        _register_blueprints()
+    return app
+
+
+@app.before_request
+def block_uninstalled_plugin_routes():
+    """Flask cannot remove a blueprint: routes of plugins uninstalled at runtime answer 404."""
+    if request.blueprint and not PluginRegistry().is_blueprint_enabled(request.blueprint):
+        abort(404)
 
 
 # Context Processor for Debugging (moved here after all config is loaded)
@@ -483,7 +580,7 @@ def inject_debug_info():
         return {
             'debug_info': {
                 'project_root': str(PROJECT_ROOT),
-                'md_folder': str(MD_FOLDER),
+                'md_folder': str(current_runtime().md_folder),
                 'template_folder': str(template_path),
                 'frozen': getattr(sys, 'frozen', False),
                 'python_path': str(sys.executable),
@@ -538,12 +635,13 @@ def get_markdown_files(subdir=None, recursive=True):
     If recursive=True, returns flat list of all files (legacy behavior).
     If recursive=False, returns list of files and directories in subdir.
     """
-    md_path = Path(MD_FOLDER)
+    md_folder = current_runtime().md_folder
+    md_path = md_folder
     if subdir:
         md_path = md_path / subdir
         # Security check: ensure we haven't traversed out of MD_FOLDER
         try:
-            md_path.resolve().relative_to(Path(MD_FOLDER).resolve())
+            md_path.resolve().relative_to(md_folder.resolve())
         except ValueError:
             logger.warning(f"Attempted path traversal: {subdir}")
             return []
@@ -562,7 +660,7 @@ def get_markdown_files(subdir=None, recursive=True):
         iterator = md_path.iterdir()
 
     for file_path in iterator:
-        rel_path_obj = file_path.relative_to(Path(MD_FOLDER)) 
+        rel_path_obj = file_path.relative_to(md_folder) 
         rel_path = str(rel_path_obj).replace('\\', '/')
         
         # Handle Directories (Only in non-recursive mode)
@@ -957,6 +1055,7 @@ def convert_docx_to_html(docx_path: Path) -> str:
     
     logger.info(f"Converting Word document: {docx_path}")
     try:
+        import mammoth
         with open(docx_path, "rb") as docx_file:
             result = mammoth.convert_to_html(docx_file)
             html_content = result.value
@@ -972,13 +1071,16 @@ def convert_docx_to_html(docx_path: Path) -> str:
         logger.error(f"Failed to convert Word document: {e}", exc_info=True)
         raise
 
-def process_links_in_html(html_content: str, base_path: Path = None, is_preview: bool = False) -> str:
+def process_links_in_html(html_content: str, base_path: Path = None, is_preview: bool = False,
+                          link_targets: dict = None) -> str:
     """
     Process all links in HTML to ensure they are clickable and properly resolved.
     - External links open in new tab
     - Relative links resolved based on document location
+    `link_targets`, if given, receives {resolved path: existed} for every relative link.
     """
     try:
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(html_content, 'html.parser')
         
         for a_tag in soup.find_all('a'):
@@ -1013,8 +1115,12 @@ def process_links_in_html(html_content: str, base_path: Path = None, is_preview:
                         resolved = (base_path / href).resolve()
                         
                         # Check if it exists and is within MD_FOLDER
-                        if resolved.exists() and resolved.is_relative_to(MD_FOLDER):
-                            rel_path = resolved.relative_to(MD_FOLDER)
+                        md_folder = current_runtime().md_folder
+                        exists = resolved.exists()
+                        if link_targets is not None:
+                            link_targets[str(resolved)] = exists
+                        if exists and resolved.is_relative_to(md_folder):
+                            rel_path = resolved.relative_to(md_folder)
                             a_tag['href'] = f'/file/{rel_path}'
                             logger.debug(f"Resolved relative link {href} -> /file/{rel_path}")
                         else:
@@ -1144,8 +1250,28 @@ def install_wkhtmltopdf_portable() -> str:
 # END HELPER FUNCTIONS
 # ============================================================================
 
+def _render_variant(pipeline, enable_experimental: bool) -> str:
+    """Render cache variant: the pipeline steps (plugins can be toggled/reloaded) and flags."""
+    steps = ",".join(f"{getattr(step, '__qualname__', step)}@{id(step):x}" for step in pipeline)
+    return f"{VERSION}|{int(enable_experimental)}|{steps}"
+
+def _link_dependencies(link_targets: dict) -> list:
+    """Render cache dependencies: the rendering is stale once a link target appears or disappears."""
+    return [('exists', path, exists) for path, exists in link_targets.items()]
+
 def render_document_from_file(md_file_path: Path, enable_experimental: bool = False) -> str:
     """Read a document file (markdown or Word), apply feature pipeline, then render HTML."""
+    _activate_plugins(f"onFileType:{md_file_path.suffix.lower()}")
+    runtime = current_runtime()
+    pipeline = runtime.pipeline(enable_experimental)
+    # Links are rewritten relative to the workspace: part of the variant
+    variant = f"{_render_variant(pipeline, enable_experimental)}|{runtime.md_folder}"
+    cache_key = RenderCache.make_key(md_file_path, variant)
+    cached = RENDER_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+    link_targets = {}
+
     try:
         # Check file size before reading
         file_size = md_file_path.stat().st_size
@@ -1172,8 +1298,10 @@ def render_document_from_file(md_file_path: Path, enable_experimental: bool = Fa
             try:
                 html_content = convert_docx_to_html(md_file_path)
                 # Process links in the HTML
-                html_content = process_links_in_html(html_content, base_path=md_file_path.parent)
+                html_content = process_links_in_html(html_content, base_path=md_file_path.parent,
+                                                     link_targets=link_targets)
                 logger.info(f"Successfully rendered Word document: {md_file_path}")
+                RENDER_CACHE.put(cache_key, (html_content, ""), _link_dependencies(link_targets))
                 return html_content, ""
             except Exception as e:
                 logger.error(f"Failed to render Word document {md_file_path}: {e}", exc_info=True)
@@ -1189,16 +1317,47 @@ def render_document_from_file(md_file_path: Path, enable_experimental: bool = Fa
         logger.error(f"Error reading file {md_file_path}: {e}", exc_info=True)
         return f"<p>Error reading file: {str(e)}</p>", ""
 
+    # Included files, as they are before rendering (pymdownx.snippets resolves them
+    # against the working directory)
+    dependencies = file_dependencies(Path(name).resolve() for name in snippet_includes(md_text))
+
     # Apply markdown processing pipeline
-    pipeline = FEATURES.build_pipeline(enable_experimental=enable_experimental)
     processed = run_pipeline(md_text, pipeline)
     html_content, toc_content = render_baseline(processed)
     
     # Process links in the rendered HTML
-    html_content = process_links_in_html(html_content, base_path=md_file_path.parent)
+    html_content = process_links_in_html(html_content, base_path=md_file_path.parent, link_targets=link_targets)
     
+    RENDER_CACHE.put(cache_key, (html_content, toc_content), dependencies + _link_dependencies(link_targets))
     return html_content, toc_content
 
+def resolve_document_path(filename: str):
+    """
+    Workspace document for a /file/ style path: exact relative path, then with .md added,
+    then a recursive match on stem/name. Returns None if not found or outside the workspace.
+    """
+    md_path = current_runtime().md_folder
+    try:
+        root = md_path.resolve()
+    except OSError:
+        return None
+
+    def inside_workspace(candidate: Path) -> bool:
+        try:
+            return candidate.resolve().is_relative_to(root)
+        except (OSError, ValueError):
+            return False
+
+    for potential_path in (md_path / filename, md_path / f"{filename}.md"):
+        if potential_path.exists() and potential_path.is_file():
+            return potential_path if inside_workspace(potential_path) else None
+
+    # Search recursively for matching file
+    for f in md_path.rglob('*'):
+        if f.is_file() and (f.stem == filename or f.name == filename or str(f.relative_to(md_path)) == filename):
+            return f
+    return None
+
 @app.route('/')
 def index():
     """Main page displaying list ofmarkdown files and folders."""
@@ -1208,53 +1367,36 @@ def index():
     items = get_markdown_files(subdir=folder, recursive=False)
     
     logger.info(f"Index route (folder='{folder}'): Found {len(items)} items")
-    return render_template('index.html', files=items, md_folder=str(MD_FOLDER), current_folder=folder, version=VERSION)
+    return render_template('index.html', files=items, md_folder=str(current_runtime().md_folder), current_folder=folder, version=VERSION)
 
 @app.route('/debug/info')
 def debug_info():
     """Debug endpoint to show configuration and file discovery."""
     import os
+    runtime = current_runtime()
     md_files = get_markdown_files()
     return jsonify({
         'project_root': str(PROJECT_ROOT),
-        'md_folder': str(MD_FOLDER),
-        'md_folder_exists': MD_FOLDER.exists(),
+        'md_folder': str(runtime.md_folder),
+        'md_folder_exists': runtime.md_folder.exists(),
         'frozen': getattr(sys, 'frozen', False),
         'executable_path': sys.executable,
         'cwd': os.getcwd(),
         'version': VERSION,
         'file_count': len(md_files),
         'files': [{'name': f['name'], 'path': str(f.get('path', 'N/A'))} for f in md_files],
-        'config': CONFIG
+        'config': dict(runtime.config)
     })
 
 @app.route('/file/<path:filename>')
 def view_file(filename):
     """View a specific markdown file."""
-    md_path = Path(MD_FOLDER)
-    
     # Smart features temporarily disabled - coming in v1.1/1.2
     # See doc/FUTURE_FEATURES.md for details
     enable_experimental = False  # TODO: Re-enable with proper UI in future release
     
     # Handle both direct filename and relative path
-    file_path = None
-    
-    # Try as relative path first
-    potential_path = md_path / filename
-    if potential_path.exists() and potential_path.is_file():
-        file_path = potential_path
-    else:
-        # Try adding .md extension
-        potential_path = md_path / f"{filename}.md"
-        if potential_path.exists():
-            file_path = potential_path
-        else:
-            # Search recursively for matching file
-            for f in md_path.rglob('*'):
-                if f.is_file() and (f.stem == filename or f.name == filename or str(f.relative_to(md_path)) == filename):
-                    file_path = f
-                    break
+    file_path = resolve_document_path(filename)
     
     if not file_path or not file_path.exists():
         abort(404)
@@ -1266,7 +1408,7 @@ def view_file(filename):
     file_info = {
         'name': file_path.stem,
         'filename': file_path.name,
-        'relative_path': str(file_path.relative_to(MD_FOLDER)),
+        'relative_path': str(file_path.relative_to(current_runtime().md_folder)),
         'content': html_content,
         'toc': toc_content,
         'modified': datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
@@ -1339,6 +1481,7 @@ def preview_file():
         
         filename = file.filename
         file_ext = Path(filename).suffix.lower()
+        _activate_plugins(f"onFileType:{file_ext}")
         
         # Handle Word documents
         if file_ext == '.docx':
@@ -1417,10 +1560,11 @@ def preview_file():
     enable_experimental = False
     
     # Use same feature pipeline as file view
-    pipeline = FEATURES.build_pipeline(enable_experimental=enable_experimental)
+    runtime = current_runtime()
+    pipeline = runtime.pipeline(enable_experimental)
     processed = run_pipeline(content, pipeline)
     html_content, toc_content = render_baseline(processed)
-    html_content = process_links_in_html(html_content, base_path=MD_FOLDER, is_preview=True)
+    html_content = process_links_in_html(html_content, base_path=runtime.md_folder, is_preview=True)
     
     file_info = {
         'name': Path(filename).stem,
@@ -1434,6 +1578,136 @@ def preview_file():
     
     return render_template('view.html', file=file_info, version=VERSION)
 
+def _export_mimetype(format_ext):
+    if format_ext == 'pdf':
+        return "application/pdf"
+    elif format_ext == 'docx':
+        return "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+    return "application/octet-stream"
+
+def _run_export_handler(feature, payload):
+    """
+    Run an export handler and return a readable file object positioned at 0.
+
+    Handler contracts:
+      - (content) -> bytes                   legacy, wrapped in a BytesIO (no extra copy)
+      - (content, sink) -> None              meta['output'] == 'stream': writes into `sink`,
+                                             a spooled temp file that moves to disk when large
+    """
+    if feature.meta.get('output') == 'stream':
+        sink = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MEMORY)
+        try:
+            feature.handler(payload, sink)
+        except Exception:
+            sink.close()
+            raise
+        sink.seek(0)
+        return sink
+
+    output_data = feature.handler(payload)
+    return io.BytesIO(output_data) if output_data else None
+
+def _stream_size(fileobj):
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(0)
+    return size
+
+def _send_export(fileobj, format_ext, size, download_name=None):
+    """Stream an export result with Content-Length and HTTP range support."""
+    response = send_file(
+        fileobj,
+        mimetype=_export_mimetype(format_ext),
+        as_attachment=True,
+        download_name=download_name or f"export.{format_ext}",
+        conditional=False
+    )
+    response.content_length = size
+    # Ranges only apply to GET/HEAD; POST exports still get an exact Content-Length
+    return response.make_conditional(request, accept_ranges=True, complete_length=size)
+
+def _export_handler_version(feature):
+    """
+    Version component of export cache keys: DocNexus version, plugin version, the
+    handler's source mtime (so editing a plugin in development invalidates old results)
+    and the export options.
+    """
+    code = getattr(feature.handler, '__code__', None)
+    try:
+        source_mtime = os.stat(code.co_filename).st_mtime_ns if code else 0
+    except OSError:
+        source_mtime = 0
+    options = json.dumps(EXPORT_OPTIONS, sort_keys=True)
+    return f"{VERSION}/{feature.name}/{feature.meta.get('version', '0')}/{source_mtime}/{options}"
+
+def _export_generation(feature, enable_experimental: bool) -> str:
+    """
+    Stable identity (across processes and restarts) of how documents are exported with
+    `feature`: pipeline step names, experimental flag and handler version. Batch export
+    manifests compare it to decide what to re-export.
+    """
+    pipeline = current_runtime().pipeline(enable_experimental)
+    steps = ",".join(getattr(step, '__qualname__', str(step)) for step in pipeline)
+    return f"{int(enable_experimental)}|{steps}|{_export_handler_version(feature)}"
+
+def _missing_plugin_response(format_ext):
+    # Specific error for frontend "Upsell" logic
+    return jsonify({
+        "error": "Export plugin not installed", 
+        "code": "MISSING_PLUGIN",
+        "plugin_name": f"docnexus-plugin-{format_ext}",
+        "message": f" The {format_ext.upper()} export plugin is not installed."
+    }), 404
+
+def _export_response(format_ext, feature, key_html, make_input, download_name=None, namespace=''):
+    """
+    Serve an export from the result cache, or run the handler and cache its output.
+    The cache key is computed from `key_html` (the request's HTML, as it came in) and
+    looked up before `make_input()` builds the handler input (parsing it into an
+    ExportDocument for handlers declaring meta['input'] == 'document'), so a hit costs
+    a hash and no parse.
+    """
+    download_name = download_name or f"export.{format_ext}"
+
+    # Serve identical exports from the cache (HTML + format + plugin version)
+    plugin_version = namespace + _export_handler_version(feature)
+    cache_key = None
+    if EXPORT_CACHE.enabled:
+        cache_key = ExportCache.make_key(normalize_html(key_html), format_ext, plugin_version)
+        cached_path = EXPORT_CACHE.lookup(cache_key)
+        if cached_path:
+            logger.info(f"Export cache hit for {format_ext} ({cache_key[:12]})")
+            response = send_file(
+                cached_path,
+                mimetype=_export_mimetype(format_ext),
+                as_attachment=True,
+                download_name=download_name,
+                conditional=True
+            )
+            response.headers['X-Export-Key'] = cache_key
+            return response
+
+    # Execute Handler
+    try:
+        output = _run_export_handler(feature, make_input())
+    except Exception as e:
+        logger.error(f"Plugin handler failed: {e}", exc_info=True)
+        return jsonify({"error": f"Plugin Execution Failed: {str(e)}"}), 500
+
+    size = _stream_size(output) if output else 0
+    if not size:
+         return jsonify({"error": "Export handler returned no data"}), 500
+
+    if cache_key:
+        EXPORT_CACHE.put_stream(cache_key, output)
+        output.seek(0)
+
+    response = _send_export(output, format_ext, size, download_name)
+    if cache_key:
+        # Resumable (range) downloads of the same result via GET /api/export/result/<key>.<fmt>
+        response.headers['X-Export-Key'] = cache_key
+    return response
+
 @app.route('/api/export/<format_ext>', methods=['POST'])
 def handle_export_request(format_ext):
     """
@@ -1445,48 +1719,204 @@ def handle_export_request(format_ext):
         # filename = data.get('filename') # handled by frontend download logic or Content-Disposition
         
         # Resolve Handler
-        handler = FEATURES.get_export_handler(format_ext)
+        feature = FEATURES.get_export_feature(format_ext)
+        handler = feature.handler if feature else None
         logger.debug(f"Handle Export Request: Resolved handler for {format_ext} -> {handler}")
         
         if not handler:
-            # Return specific error for frontend "Upsell" logic
-            return jsonify({
-                "error": "Export plugin not installed", 
-                "code": "MISSING_PLUGIN",
-                "plugin_name": f"docnexus-plugin-{format_ext}",
-                "message": f" The {format_ext.upper()} export plugin is not installed."
-            }), 404
-            
-        # Execute Handler
-        # Handler signature: (html_content: str) -> bytes
-        try:
-            output_data = handler(html_content)
-        except Exception as e:
-            logger.error(f"Plugin handler failed: {e}", exc_info=True)
-            return jsonify({"error": f"Plugin Execution Failed: {str(e)}"}), 500
-        
-        if not output_data:
-             return jsonify({"error": "Export handler returned no data"}), 500
-
-        # Determine Mime Type
-        mime_type = "application/octet-stream"
-        if format_ext == 'pdf':
-            mime_type = "application/pdf"
-        elif format_ext == 'docx':
-            mime_type = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+            return _missing_plugin_response(format_ext)
             
-        from io import BytesIO
-        return send_file(
-            BytesIO(output_data),
-            mimetype=mime_type,
-            as_attachment=True,
-            download_name=f"export.{format_ext}"
-        )
+        # Parse once, on a cache miss, for handlers that take the tree (meta['input'] == 'document')
+        if feature.meta.get('input') == 'document':
+            from docnexus.core.export_dom import ExportDocument
+            return _export_response(format_ext, feature, html_content,
+                                    lambda: ExportDocument.from_html(html_content, options=EXPORT_OPTIONS))
+        return _export_response(format_ext, feature, html_content, lambda: html_content)
 
     except Exception as e:
         logger.error(f"Export failed: {e}", exc_info=True)
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/export/<format_ext>/file/<path:filename>', methods=['GET'])
+def export_document_file(format_ext, filename):
+    """
+    Server-side export of a workspace document.
+    Renders from the source (through the render cache) instead of receiving the page:
+    no upload, no JSON decoding and no screen chrome to strip. Responses are the same
+    as for POST /api/export/<format_ext>.
+    """
+    try:
+        feature = FEATURES.get_export_feature(format_ext)
+        if not feature or not feature.handler:
+            return _missing_plugin_response(format_ext)
+
+        file_path = resolve_document_path(filename)
+        if not file_path:
+            return jsonify({"error": "Document not found"}), 404
+        if file_path.stat().st_size > MAX_FILE_SIZE:
+            return jsonify({"error": f"Document too large (max {MAX_FILE_SIZE // (1024 * 1024)} MB)"}), 413
+
+        # Export-specific render options (the viewer keeps experimental features off)
+        enable_experimental = bool(EXPORT_OPTIONS.get('experimental', False))
+        html_content, toc_content = render_document_from_file(file_path, enable_experimental=enable_experimental)
+        download_name = f"{file_path.stem}.{format_ext}"
+
+        from docnexus.core.export_dom import ExportDocument, render_page
+        page = render_page(html_content, toc_content)
+        if feature.meta.get('input') == 'document':
+            make_input = lambda: ExportDocument.from_render(html_content, toc_content, options=EXPORT_OPTIONS)
+        else:
+            make_input = lambda: page
+        # Keyed on the rendered page, apart from pages posted by the viewer
+        return _export_response(format_ext, feature, page, make_input, download_name=download_name,
+                                namespace='source/')
+
+    except Exception as e:
+        logger.error(f"Export of {filename} failed: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+
+
+@app.route('/api/export/result/<export_key>.<format_ext>', methods=['GET'])
+def download_export_result(export_key, format_ext):
+    """
+    Download a previously generated export (see X-Export-Key) from the export cache.
+    Supports HTTP range requests, so large downloads can be resumed.
+    """
+    if not re.fullmatch(r'[0-9a-f]{64}', export_key):
+        abort(404)
+    cached_path = EXPORT_CACHE.lookup(export_key)
+    if not cached_path:
+        return jsonify({"error": "Export result expired or not found"}), 404
+    return send_file(
+        cached_path,
+        mimetype=_export_mimetype(format_ext),
+        as_attachment=True,
+        download_name=f"export.{format_ext}",
+        conditional=True
+    )
+
+
+def _export_job_spec(feature, format_ext):
+    """
+    (format, plugin id, plugin file) for loading the handler in a worker process,
+    or None for handlers that do not come from a plugin file.
+    """
+    plugin_id = feature.meta.get('plugin_id')
+    # Set by the loader; activation stubs have it before their plugin is imported
+    plugin_file = feature.meta.get('plugin_file')
+    if not plugin_file:
+        code = getattr(feature.handler, '__code__', None)
+        plugin_file = code.co_filename if code else None
+    if not plugin_id or not plugin_file or not os.path.isfile(plugin_file):
+        return None
+    return (format_ext, plugin_id, plugin_file)
+
+def start_export_workers():
+    """Start and warm the export worker pool (launchers call this before serving)."""
+    try:
+        specs = []
+        for feature in FEATURES.get_export_features():
+            spec = _export_job_spec(feature, feature.meta.get('extension'))
+            if spec and spec[0]:
+                specs.append(spec)
+        EXPORT_JOBS.start(specs)
+    except Exception as e:
+        logger.error(f"Failed to start export workers: {e}", exc_info=True)
+
+def _job_status(job):
+    status = job.to_dict()
+    status['queue_position'] = EXPORT_JOBS.queue_position(job)
+    if job.state == 'done':
+        status['download_url'] = url_for('download_export_job', job_id=job.id)
+    return status
+
+@app.route('/api/export/jobs', methods=['POST'])
+def submit_export_job():
+    """
+    Queue a background export: {"format": "pdf", "path": "<workspace document>"} renders
+    the document from its source, {"format": "pdf", "html": "<page>", "filename": ...}
+    exports posted page HTML. Returns 202 with the job status; identical submissions
+    share one job.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        format_ext = str(data.get('format', '')).lower()
+        feature = FEATURES.get_export_feature(format_ext)
+        if not feature or not feature.handler:
+            return _missing_plugin_response(format_ext)
+        spec = _export_job_spec(feature, format_ext)
+        if not spec:
+            return jsonify({"error": f"The {format_ext.upper()} exporter does not support background jobs"}), 501
+
+        if data.get('path'):
+            file_path = resolve_document_path(data['path'])
+            if not file_path:
+                return jsonify({"error": "Document not found"}), 404
+            if file_path.stat().st_size > MAX_FILE_SIZE:
+                return jsonify({"error": f"Document too large (max {MAX_FILE_SIZE // (1024 * 1024)} MB)"}), 413
+            enable_experimental = bool(EXPORT_OPTIONS.get('experimental', False))
+            html_content, toc_content = render_document_from_file(file_path, enable_experimental=enable_experimental)
+            payload = {'html': html_content, 'toc': toc_content}
+            download_name = f"{file_path.stem}.{format_ext}"
+            from docnexus.core.export_dom import render_page
+            normalized = normalize_html(render_page(html_content, toc_content))
+        else:
+            html_content = data.get('html', '')
+            if not html_content:
+                return jsonify({"error": "No content provided"}), 400
+            if len(html_content) > MAX_EXPORT_HTML_SIZE:
+                return jsonify({"error": f"Content too large (max {MAX_EXPORT_HTML_SIZE // (1024 * 1024)} MB)"}), 413
+            payload = {'html': html_content, 'toc': None}
+            download_name = Path(data.get('filename') or f"export.{format_ext}").with_suffix(f".{format_ext}").name
+            normalized = normalize_html(html_content)
+
+        # Keyed on the job input (page or rendered HTML), in a namespace of its own
+        key = ExportCache.make_key(normalized, format_ext, f"job/{'source' if data.get('path') else 'page'}/"
+                                   + _export_handler_version(feature))
+        job, created = EXPORT_JOBS.submit(format_ext, spec, payload, key, download_name)
+        logger.info(f"Export job {job.id} ({format_ext}) {'queued' if created else 'reused'}: {job.state}")
+
+        response = jsonify(_job_status(job))
+        response.status_code = 202
+        response.headers['Location'] = url_for('get_export_job', job_id=job.id)
+        return response
+
+    except Exception as e:
+        logger.error(f"Export job submission failed: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/export/jobs/<job_id>', methods=['GET'])
+def get_export_job(job_id):
+    """Status and progress of an export job."""
+    job = EXPORT_JOBS.get(job_id)
+    if not job:
+        return jsonify({"error": "Export job not found or expired"}), 404
+    return jsonify(_job_status(job))
+
+@app.route('/api/export/jobs/<job_id>/download', methods=['GET'])
+def download_export_job(job_id):
+    """Result of a finished export job (HTTP range requests supported)."""
+    job = EXPORT_JOBS.get(job_id)
+    if not job:
+        return jsonify({"error": "Export job not found or expired"}), 404
+    if job.state == 'failed':
+        return jsonify({"error": f"Plugin Execution Failed: {job.error}"}), 500
+    if job.state != 'done':
+        return jsonify({"error": "Export job not finished", "state": job.state, "progress": job.progress}), 409
+    result_path = EXPORT_JOBS.result_path(job)
+    if not result_path:
+        return jsonify({"error": "Export result expired or not found"}), 404
+    response = send_file(
+        result_path,
+        mimetype=_export_mimetype(job.format_ext),
+        as_attachment=True,
+        download_name=job.download_name,
+        conditional=True
+    )
+    if EXPORT_CACHE.enabled:
+        response.headers['X-Export-Key'] = job.key
+    return response
 
 @app.route('/search')
 def search():
@@ -1590,13 +2020,12 @@ def add_workspace():
             return jsonify({'error': 'Access to this directory is not allowed for security reasons'}), 403
         
         # Add to config
-        config = load_config()
         workspace_str = str(path_obj.resolve())
         
-        if workspace_str not in config['workspaces']:
-            config['workspaces'].append(workspace_str)
-            save_config(config)
-            logger.info(f"Workspace added: {workspace_str}")
+        with CONFIG_STORE.batch() as config:
+            if workspace_str not in config['workspaces']:
+                config['workspaces'].append(workspace_str)
+                logger.info(f"Workspace added: {workspace_str}")
         
         return jsonify({'success': True, 'workspace': workspace_str})
     
@@ -1618,27 +2047,27 @@ def set_active_workspace():
         path_obj = Path(workspace_path).resolve()
         workspace_str = str(path_obj)
         
-        config = load_config()
-        
-        if workspace_str not in config['workspaces']:
-            return jsonify({'error': f'Workspace not configured: {workspace_str}'}), 400
-        
-        config['active_workspace'] = workspace_str
-        
-        # Update recent list
-        if 'recent_workspaces' not in config:
-            config['recent_workspaces'] = []
-        
-        if workspace_path in config['recent_workspaces']:
-            config['recent_workspaces'].remove(workspace_path)
-        
-        config['recent_workspaces'].insert(0, workspace_path)
-        config['recent_workspaces'] = config['recent_workspaces'][:5]  # Keep last 5
-        
-        save_config(config)
+        # One write for the active and recent workspaces
+        with CONFIG_STORE.batch() as config:
+            if workspace_str not in config['workspaces']:
+                return jsonify({'error': f'Workspace not configured: {workspace_str}'}), 400
+            
+            config['active_workspace'] = workspace_str
+            
+            # Update recent list
+            if 'recent_workspaces' not in config:
+                config['recent_workspaces'] = []
+            
+            if workspace_path in config['recent_workspaces']:
+                config['recent_workspaces'].remove(workspace_path)
+            
+            config['recent_workspaces'].insert(0, workspace_path)
+            config['recent_workspaces'] = config['recent_workspaces'][:5]  # Keep last 5
         
-        # Update global MD_FOLDER
-        global MD_FOLDER
+        # Update global MD_FOLDER (and CONFIG): new objects, so the next runtime snapshot
+        # uses them while requests in flight keep the previous workspace
+        global MD_FOLDER, CONFIG
+        CONFIG = dict(CONFIG, active_workspace=workspace_str)
         MD_FOLDER = Path(workspace_path)
         
         logger.info(f"Active workspace changed to: {workspace_path}")
@@ -1652,17 +2081,15 @@ def set_active_workspace():
 def delete_workspace(workspace_path):
     """Remove workspace from configuration."""
     try:
-        config = load_config()
-        
-        if workspace_path in config['workspaces']:
-            # Prevent deleting active workspace
-            if workspace_path == config['active_workspace']:
-                return jsonify({'error': 'Cannot delete active workspace'}), 400
-            
-            config['workspaces'].remove(workspace_path)
-            save_config(config)
-            logger.info(f"Workspace removed: {workspace_path}")
-            return jsonify({'success': True})
+        with CONFIG_STORE.batch() as config:
+            if workspace_path in config['workspaces']:
+                # Prevent deleting active workspace
+                if workspace_path == config['active_workspace']:
+                    return jsonify({'error': 'Cannot delete active workspace'}), 400
+                
+                config['workspaces'].remove(workspace_path)
+                logger.info(f"Workspace removed: {workspace_path}")
+                return jsonify({'success': True})
         
         return jsonify({'error': 'Workspace not found'}), 404
     
@@ -1773,18 +2200,27 @@ def search_files():
 @app.route('/api/debug/features', methods=['GET'])
 def debug_features():
     features_list = []
-    if FEATURES and FEATURES._features:
-        for f in FEATURES._features:
-            features_list.append({
-                "name": f.name,
-                "type": str(f.type),
-                "state": str(f.state)
-            })
+    for f in current_runtime().features:
+        features_list.append({
+            "name": f.name,
+            "type": str(f.type),
+            "state": str(f.state)
+        })
     return jsonify({
         "count": len(features_list),
         "features": features_list,
+        "export_cache": EXPORT_CACHE.stats(),
+        "export_image_cache": IMAGE_CACHE.stats(),
+        "render_cache": RENDER_CACHE.stats(),
+        "export_jobs": EXPORT_JOBS.stats(),
+        "plugin_load_budget_ms": float(CONFIG.get('plugin_loading', {}).get('budget_ms', DEFAULT_PLUGIN_BUDGET_MS)),
+        "plugin_load_times": [
+            {"plugin": t.name, "import_ms": round(t.import_ms, 1), "initialize_ms": round(t.initialize_ms, 1),
+             "total_ms": round(t.total_ms, 1), "error": t.error}
+            for t in get_plugin_timings()
+        ],
         "registry_plugins": [str(p) for p in PluginRegistry().get_all_plugins()] if PluginRegistry() else []
     })
 
 if __name__ == '__main__':
-    app.run(debug=True, host='localhost', port=8000)
+    create_app().run(debug=True, host='localhost', port=8000)
@@ -4,6 +4,7 @@ Command-line interface for Markdown Documentation Viewer
 """
 
 import argparse
+import os
 import sys
 from pathlib import Path
 
@@ -23,9 +24,12 @@ def print_version():
 
 def start_server(args):
     """Start the Flask server."""
-    from docnexus.app import app
-    
-    
+    if (args.workers or args.threads) and not args.debug:
+        return serve_production(args)
+
+    from docnexus.app import create_app, start_export_workers
+
+    app = create_app()
     host = args.host
     port = args.port or 8000
     debug = args.debug
@@ -35,10 +39,216 @@ def start_server(args):
     print(f"Documentation: http://{host}:{port}/docs")
     print("Press Ctrl+C to stop")
     print()
-    
+
+    # Pre-warm export workers (in the reloader child only when debugging)
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_export_workers()
+
     app.run(host=host, port=port, debug=debug)
 
 
+def serve_production(args):
+    """Serve with pre-forked worker processes (docnexus.core.server)."""
+    from docnexus.core.server import DEFAULT_THREADS, PreforkServer
+
+    def load_app():
+        from docnexus import app as app_module
+        from docnexus.core.renderer import render_baseline
+
+        app = app_module.create_app()
+        # Import the markdown extensions and lexers now, once, instead of in every worker
+        render_baseline("# Warm up\n\n```python\nprint('ok')\n```\n\n| a | b |\n|---|---|\n| 1 | 2 |\n")
+        # Export job status may be polled through any worker
+        app_module.EXPORT_JOBS.share_state = True
+        return app
+
+    def post_fork():
+        from docnexus.app import start_export_workers
+        start_export_workers()
+
+    def pre_exit():
+        from docnexus.app import EXPORT_JOBS
+        from docnexus.core import pdf_chunks
+        EXPORT_JOBS.shutdown()
+        pdf_chunks.shutdown_pool()
+
+    server = PreforkServer(load_app, args.host, args.port or 8000, workers=args.workers or 1,
+                           threads=args.threads or DEFAULT_THREADS, max_requests=args.max_requests,
+                           max_requests_jitter=args.max_requests_jitter, post_fork=post_fork,
+                           pre_exit=pre_exit)
+    server.preload()
+    print(f"Starting DocNexus v{__version__}")
+    print(f"Server: http://{args.host}:{server.port} ({server.workers} workers x {server.threads} threads)")
+    print("Press Ctrl+C to stop")
+    print()
+    server.run()
+
+
+def export_documents(args):
+    """Export workspace documents to an output directory (incremental, parallel)."""
+    import shutil
+    import time
+    from docnexus import app as app_module
+    from docnexus.core.batch_export import (
+        STATUS_FAILED, STATUS_SKIPPED, WORK_DIR_NAME, BatchExporter, ExportTarget, collect_documents,
+        format_report
+    )
+    from docnexus.core.export_jobs import ExportJobService
+    from docnexus.core.render_cache import RenderCache
+
+    app_module.create_app()
+    workspace = Path(args.workspace or app_module.MD_FOLDER).resolve()
+    output_dir = Path(args.output).resolve()
+    if not workspace.is_dir():
+        print(f"Workspace not found: {workspace}", file=sys.stderr)
+        return 1
+
+    # Links are resolved against the exported workspace; every document is rendered once
+    app_module.MD_FOLDER = workspace
+    app_module.RENDER_CACHE = RenderCache(0)
+    enable_experimental = bool(app_module.EXPORT_OPTIONS.get('experimental', False))
+
+    targets = {}
+    for format_ext in [f.strip().lower() for f in args.format.split(',') if f.strip()]:
+        feature = app_module.FEATURES.get_export_feature(format_ext)
+        spec = app_module._export_job_spec(feature, format_ext) if feature else None
+        if not spec:
+            print(f"No installed export plugin for '{format_ext}'", file=sys.stderr)
+            return 1
+        targets[format_ext] = ExportTarget(spec, app_module._export_generation(feature, enable_experimental))
+
+    documents = collect_documents(workspace, args.patterns, app_module.ALLOWED_EXTENSIONS, exclude=output_dir)
+    if not documents:
+        print("No documents matched.")
+        return 0
+
+    workers = args.jobs or os.cpu_count() or 1
+    print(f"Exporting {len(documents)} documents from {workspace} to {output_dir} "
+          f"({', '.join(targets)}; {workers} workers)")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    work_dir = output_dir / WORK_DIR_NAME
+    service = ExportJobService(work_dir, workers=workers, options=app_module.EXPORT_OPTIONS)
+    service.start([target.spec for target in targets.values()], wait=True)
+
+    done = [0]
+    total = len(documents) * len(targets)
+
+    def on_result(result):
+        done[0] += 1
+        if result.status != STATUS_SKIPPED or done[0] == total:
+            print(f"[{done[0]}/{total}] {result.status:<8} {result.path} ({result.format_ext})", flush=True)
+
+    started = time.perf_counter()
+    exporter = BatchExporter(
+        workspace, output_dir, targets,
+        render=lambda path: app_module.render_document_from_file(path, enable_experimental=enable_experimental),
+        service=service, force=args.force, max_size=app_module.MAX_FILE_SIZE, on_result=on_result)
+    try:
+        results = exporter.run(documents)
+    finally:
+        service.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print()
+    print(format_report(results, time.perf_counter() - started))
+    return 1 if any(r.status == STATUS_FAILED for r in results) else 0
+
+
+def build_site(args):
+    """Render the workspace to a static HTML site (incremental, parallel)."""
+    from docnexus import app as app_module
+    from docnexus.core.static_site import SiteBuilder, format_build_report
+
+    app_module.create_app()
+    workspace = Path(args.workspace or app_module.MD_FOLDER).resolve()
+    output_dir = Path(args.output).resolve()
+    if not workspace.is_dir():
+        print(f"Workspace not found: {workspace}", file=sys.stderr)
+        return 1
+
+    builder = SiteBuilder(
+        app_module, workspace, output_dir, workers=args.jobs, force=args.force,
+        enable_experimental=bool(app_module.EXPORT_OPTIONS.get('experimental', False)),
+        on_page=lambda document, error: print(f"{'failed' if error else 'rendered':<8} {document}", flush=True))
+    print(f"Building {workspace} into {output_dir} ({builder.workers} workers)")
+    result = builder.build()
+
+    print()
+    print(format_build_report(result))
+    return 1 if result.failed else 0
+
+
+def startup_profile(args):
+    """Time a server startup (create_app phases, imports, first render) and print the timeline."""
+    from docnexus.core.startup import PROFILE
+
+    PROFILE.trace_imports()
+    try:
+        with PROFILE.phase("import docnexus.app"):
+            from docnexus import app as app_module
+        app_module.create_app()
+        # Deferred imports (Markdown extensions, lexers) are paid by the first render
+        with PROFILE.phase("first render"):
+            app_module.render_baseline("# Profile\n\n```python\nprint('ok')\n```\n\n| a | b |\n|---|---|\n| 1 | 2 |\n")
+    finally:
+        PROFILE.stop_tracing()
+
+    print(PROFILE.report(title=f"DocNexus v{__version__} startup profile"))
+    return 0
+
+
+def add_server_arguments(parser, suppress_defaults=False):
+    """Server options (top level, and repeated on "start")."""
+    def default(value):
+        return argparse.SUPPRESS if suppress_defaults else value
+
+    # Always default to 0.0.0.0 to support both Localhost and Public IP access
+    default_host = '0.0.0.0'
+
+    parser.add_argument(
+        '--host',
+        type=str,
+        default=default(default_host),
+        help=f'Host to bind to (default: {default_host})'
+    )
+    parser.add_argument(
+        '--port', '-p',
+        type=int,
+        default=default(8000),
+        help='Port to bind to (default: 8000)'
+    )
+    parser.add_argument(
+        '--debug', '-d',
+        action='store_true',
+        default=default(False),
+        help='Run in debug mode'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=default(0),
+        help='Production mode: number of worker processes (default: development server)'
+    )
+    parser.add_argument(
+        '--threads', '-t',
+        type=int,
+        default=default(0),
+        help='Production mode: request threads per worker (default: 8)'
+    )
+    parser.add_argument(
+        '--max-requests',
+        type=int,
+        default=default(0),
+        help='Production mode: recycle a worker after this many requests (default: never)'
+    )
+    parser.add_argument(
+        '--max-requests-jitter',
+        type=int,
+        default=default(0),
+        help='Production mode: random extra requests before recycling, spreads restarts'
+    )
+
+
 def main():
     """Main CLI entry point."""
     parser = argparse.ArgumentParser(
@@ -50,6 +260,12 @@ Examples:
   docnexus start                  Start server on localhost:8000
   docnexus start --port 8080      Start server on port 8080
   docnexus start --debug          Start server in debug mode
+  docnexus start --workers 4      Production server: 4 worker processes
+  docnexus start --workers 4 -t 16 --max-requests 5000
+  docnexus export -o out          Export the workspace to PDF and DOCX in ./out
+  docnexus export -o out -f pdf "guides/*.md"
+  docnexus build -o site          Render the workspace to static HTML in ./site
+  docnexus --startup-profile      Show where startup time goes
         """
     )
     
@@ -59,44 +275,71 @@ Examples:
         help='Show version information'
     )
     
-    # Determine default host based on build type
-    # Always default to 0.0.0.0 to support both Localhost and Public IP access
-    default_host = '0.0.0.0'
-    
-    # Global server arguments
     parser.add_argument(
-        '--host',
-        type=str,
-        default=default_host,
-        help=f'Host to bind to (default: {default_host})'
-    )
-    parser.add_argument(
-        '--port', '-p',
-        type=int,
-        default=8000,
-        help='Port to bind to (default: 8000)'
-    )
-    parser.add_argument(
-        '--debug', '-d',
+        '--startup-profile',
         action='store_true',
-        help='Run in debug mode'
+        help='Print a timeline of the startup phases and imports, then exit'
     )
-    
+
+    # Global server arguments
+    add_server_arguments(parser)
+
     # Optional subcommands (keep start for backward compatibility if needed, but make it optional)
     subparsers = parser.add_subparsers(dest='command', help='Available commands')
     
     # Start command (optional alias)
     start_parser = subparsers.add_parser('start', help='Start the documentation server')
-    # Note: we don't strictly need to add args to start_parser if we handle it at top level,
-    # but for strict correctness if user types "start --port", we might need them there too.
-    # Simpler: Just rely on top-level args.
-    
+    # Accept the server arguments after "start" too ("docnexus start --workers 4");
+    # suppressed defaults keep the top-level values when they are not repeated
+    add_server_arguments(start_parser, suppress_defaults=True)
+
+    # Batch export
+    export_parser = subparsers.add_parser(
+        'export', help='Export workspace documents (skips documents unchanged since the last run)')
+    export_parser.add_argument('patterns', nargs='*',
+                               help='Glob patterns relative to the workspace (default: all documents)')
+    export_parser.add_argument('--output', '-o', required=True, help='Output directory')
+    export_parser.add_argument('--workspace', '-w', help='Workspace folder (default: the active workspace)')
+    export_parser.add_argument('--format', '-f', default='pdf,docx',
+                               help='Comma-separated export formats (default: pdf,docx)')
+    export_parser.add_argument('--jobs', '-j', type=int, default=0,
+                               help='Worker processes (default: CPU count)')
+    export_parser.add_argument('--force', action='store_true',
+                               help='Re-export documents even if unchanged')
+
+    # Static site build
+    build_parser = subparsers.add_parser(
+        'build', help='Render the workspace to static HTML (re-renders only changed documents)')
+    build_parser.add_argument('--output', '-o', required=True, help='Output directory')
+    build_parser.add_argument('--workspace', '-w', help='Workspace folder (default: the active workspace)')
+    build_parser.add_argument('--jobs', '-j', type=int, default=0,
+                              help='Worker processes (default: CPU count)')
+    build_parser.add_argument('--force', action='store_true',
+                              help='Re-render every document')
+
     args = parser.parse_args()
     
     if args.version:
         print_version()
         return 0
+
+    if args.startup_profile:
+        return startup_profile(args)
     
+    if args.command == 'export':
+        try:
+            return export_documents(args)
+        except KeyboardInterrupt:
+            print("\nExport interrupted.")
+            return 130
+
+    if args.command == 'build':
+        try:
+            return build_site(args)
+        except KeyboardInterrupt:
+            print("\nBuild interrupted.")
+            return 130
+
     # Default behavior: Start Server
     # Whether command is 'start' or None
     if args.command == 'start' or args.command is None:
@@ -0,0 +1,125 @@
+"""
+Activation events: plugins imported when they are first needed, not at startup.
+
+A plugin lists the events that need it in its metadata (PLUGIN_METADATA or manifest.json,
+read through the manifest index without running the plugin):
+
+    'activation_events': ['onExport:pdf']
+
+    onExport:<ext>       an export to <ext> is requested
+    onRoute:<path>       a request for <path> or below it arrives (e.g. /api/get-source)
+    onFileType:<.ext>    a document with that extension is rendered
+    *                    at startup (same as declaring no events)
+
+At startup the loader registers a PluginActivation instead of importing the plugin: an
+export stub Feature per onExport event (so the format is listed and its export workers
+can be warmed from the plugin file) and an activation callback per event. The first
+event imports the plugin and registers its real features and blueprints; the stubs are
+then dropped. FeatureManager.activate() fires events for exports and file types,
+RouteActivationMiddleware for routes.
+"""
+import logging
+import threading
+from pathlib import Path
+from typing import Callable, List
+
+logger = logging.getLogger(__name__)
+
+EVENT_EXPORT = 'onExport'
+EVENT_ROUTE = 'onRoute'
+EVENT_FILE_TYPE = 'onFileType'
+EVENT_STARTUP = '*'
+KNOWN_EVENTS = (EVENT_EXPORT, EVENT_ROUTE, EVENT_FILE_TYPE)
+
+
+def parse_activation_events(events) -> List[str]:
+    """
+    Valid lazy activation events of a plugin; [] means "load at startup" (no events,
+    '*', or nothing recognizable).
+    """
+    if not events or not isinstance(events, (list, tuple)):
+        return []
+    parsed = []
+    for event in events:
+        if event == EVENT_STARTUP:
+            return []
+        kind, _, argument = str(event).partition(':')
+        if kind in KNOWN_EVENTS and argument:
+            parsed.append(f"{kind}:{argument.lower() if kind != EVENT_ROUTE else argument}")
+        else:
+            logger.warning(f"Activation: ignoring unknown event '{event}'")
+    return parsed
+
+
+def route_matches(prefix: str, path: str) -> bool:
+    prefix = prefix.rstrip('/')
+    return path == prefix or path.startswith(prefix + '/')
+
+
+class PluginActivation:
+    """A plugin waiting for its first activation event."""
+
+    def __init__(self, name: str, path: Path, events: List[str], registry, load: Callable[[], None]):
+        self.name = name
+        self.path = Path(path)
+        self.events = events
+        self.registry = registry
+        self._load = load  # Imports the plugin and registers its features
+        self.stubs = []
+        self.loaded = False
+        self._lock = threading.Lock()
+
+    def register(self):
+        from docnexus.features.registry import Feature, FeatureState, FeatureType
+
+        for event in self.events:
+            kind, _, argument = event.partition(':')
+            if kind == EVENT_EXPORT:
+                stub = Feature(f"{self.name}:{event}", self._export_stub(argument), FeatureState.STANDARD,
+                               feature_type=FeatureType.EXPORT_HANDLER,
+                               meta={'extension': argument, 'plugin_id': self.name,
+                                     'plugin_file': str(self.path), 'activation_event': event})
+                self.registry.register(stub)
+                self.stubs.append(stub)
+            self.registry.register_activation(event, self.activate, plugin_id=self.name)
+        logger.info(f"Activation: plugin '{self.name}' deferred until {', '.join(self.events)}")
+
+    def activate(self) -> bool:
+        """Import the plugin (first call only). True if this call loaded it."""
+        with self._lock:
+            if self.loaded:
+                return False
+            self.loaded = True
+            for stub in self.stubs:
+                self.registry.unregister(stub)
+            logger.info(f"Activation: loading plugin '{self.name}'")
+            self._load()
+            return True
+
+    def _export_stub(self, format_ext: str):
+        def export_stub(*args, **kwargs):
+            # Normally unreachable: FeatureManager.get_export_feature() activates first
+            self.activate()
+            for feature in self.registry.get_all_plugins():
+                meta = getattr(feature, 'meta', {})
+                if meta.get('extension') == format_ext and 'activation_event' not in meta \
+                        and meta.get('plugin_id') == self.name:
+                    return feature.handler(*args, **kwargs)
+            raise RuntimeError(f"Plugin {self.name} did not register an export handler for {format_ext}")
+        return export_stub
+
+
+class RouteActivationMiddleware:
+    """WSGI middleware firing onRoute events before the request reaches Flask."""
+
+    def __init__(self, wsgi_app, registry, on_event: Callable[[str], None]):
+        self.wsgi_app = wsgi_app
+        self.registry = registry
+        self.on_event = on_event
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        for event in self.registry.pending_activations(EVENT_ROUTE):
+            if route_matches(event.partition(':')[2], path):
+                self.on_event(event)
+        return self.wsgi_app(environ, start_response)
@@ -0,0 +1,273 @@
+"""
+Batch export of workspace documents (`docnexus export`).
+
+Documents are rendered in the calling process and exported by the export worker pool
+(core.export_jobs), so rendering the next document overlaps with exporting the previous
+ones. A manifest in the output directory records, per document and format, the source
+digest and the pipeline generation (DocNexus version, pipeline steps, export plugin
+version/source and export options) of the last successful export: unchanged documents
+are skipped on the next run, and a new plugin or option set re-exports everything.
+"""
+import fnmatch
+import hashlib
+import json
+import logging
+import os
+import posixpath
+import shutil
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = '.docnexus-export.json'
+MANIFEST_VERSION = 1
+WORK_DIR_NAME = '.docnexus-export-tmp'
+SAVE_EVERY = 50  # Results recorded between manifest writes (a killed run keeps its progress)
+
+STATUS_EXPORTED = 'exported'
+STATUS_SKIPPED = 'unchanged'
+STATUS_FAILED = 'failed'
+
+
+class ExportTarget(NamedTuple):
+    spec: Tuple[str, str, str]  # Worker handler spec, see export_jobs.HandlerSpec
+    generation: str
+
+
+class DocumentResult(NamedTuple):
+    path: str
+    format_ext: str
+    status: str
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+
+def collect_documents(root: Path, patterns: Iterable[str], extensions: Iterable[str],
+                      exclude: Optional[Path] = None) -> List[str]:
+    """
+    Workspace-relative paths (posix) of documents matching any glob (all if none), sorted.
+    Hidden entries and `exclude` (an output directory inside the workspace) are skipped.
+    """
+    patterns = list(patterns)
+    extensions = {ext.lower() for ext in extensions}
+    exclude = exclude.resolve() if exclude else None
+    documents = []
+    for path in root.rglob('*'):
+        if exclude and path.resolve().is_relative_to(exclude):
+            continue
+        rel = path.relative_to(root)
+        if any(part.startswith('.') for part in rel.parts) or path.suffix.lower() not in extensions:
+            continue
+        rel_posix = rel.as_posix()
+        if patterns and not any(fnmatch.fnmatch(rel_posix, pattern) for pattern in patterns):
+            continue
+        if path.is_file():
+            documents.append(rel_posix)
+    return sorted(documents)
+
+
+def output_stems(documents: Iterable[str]) -> Dict[str, str]:
+    """
+    document -> output path without the format extension. Documents differing only by
+    extension (notes.md, notes.txt) would share it: the .md one keeps '<name>', the others
+    get '<name><ext>' (as static_site.build_page_map).
+    """
+    stems, used = {}, set()
+    for document in sorted(documents, key=lambda d: (not d.lower().endswith('.md'), d)):
+        stem = posixpath.splitext(document)[0]
+        if stem in used:
+            stem = document
+        stems[document] = stem
+        used.add(stem)
+    return stems
+
+
+def source_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExportManifest:
+    """{document: {format: {source, generation, output, seconds}}} stored as JSON."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.documents: Dict[str, Dict[str, dict]] = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION:
+                self.documents = data.get('documents', {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable export manifest {self.path}: {e}")
+
+    def is_current(self, document: str, format_ext: str, digest: str, generation: str, output: Path,
+                   output_name: str) -> bool:
+        entry = self.documents.get(document, {}).get(format_ext)
+        return bool(entry) and entry.get('source') == digest and entry.get('generation') == generation \
+            and entry.get('output') == output_name and output.is_file()
+
+    def record(self, document: str, format_ext: str, digest: str, generation: str, output: str, seconds: float):
+        self.documents.setdefault(document, {})[format_ext] = {
+            'source': digest, 'generation': generation, 'output': output, 'seconds': round(seconds, 3),
+        }
+
+    def forget(self, document: str, format_ext: str):
+        self.documents.get(document, {}).pop(format_ext, None)
+
+    def save(self):
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'documents': self.documents}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+class BatchExporter:
+    """
+    Export `documents` (relative to `root`) to `output_dir`/<path>.<format> for every target
+    (see output_stems() for documents differing only by extension).
+    `render(path)` returns (html, toc) for a source file; `service` is an ExportJobService
+    whose result directory is inside `output_dir` (results are moved, not copied).
+    """
+
+    def __init__(self, root: Path, output_dir: Path, targets: Dict[str, ExportTarget],
+                 render: Callable[[Path], Tuple[str, str]], service, force: bool = False,
+                 max_size: Optional[int] = None, max_in_flight: Optional[int] = None,
+                 on_result: Optional[Callable[[DocumentResult], None]] = None):
+        self.root = Path(root)
+        self.output_dir = Path(output_dir)
+        self.targets = targets
+        self.render = render
+        self.service = service
+        self.force = force
+        self.max_size = max_size
+        self.max_in_flight = max_in_flight or service.workers * 2
+        self.on_result = on_result
+        self.manifest = ExportManifest(self.output_dir / MANIFEST_NAME)
+        self.results: List[DocumentResult] = []
+        self._unsaved = 0
+        self._stems: Dict[str, str] = {}
+
+    def output_path(self, document: str, format_ext: str) -> Path:
+        stem = self._stems.get(document) or posixpath.splitext(document)[0]
+        return self.output_dir / f'{stem}.{format_ext}'
+
+    def run(self, documents: Iterable[str]) -> List[DocumentResult]:
+        documents = list(documents)
+        self._stems = output_stems(documents)
+        in_flight = deque()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            for document in documents:
+                for item in self._submit(document):
+                    in_flight.append(item)
+                    while len(in_flight) >= self.max_in_flight:
+                        self._collect(*in_flight.popleft())
+            while in_flight:
+                self._collect(*in_flight.popleft())
+        finally:
+            self.manifest.save()
+        return self.results
+
+    def _add(self, result: DocumentResult):
+        self.results.append(result)
+        if self.on_result:
+            self.on_result(result)
+
+    def _submit(self, document: str):
+        source = self.root / document
+        try:
+            digest = source_digest(source)
+            if self.max_size and source.stat().st_size > self.max_size:
+                raise ValueError(f"File too large ({source.stat().st_size / (1024 * 1024):.1f} MB)")
+        except (OSError, ValueError) as e:
+            for format_ext in self.targets:
+                self._add(DocumentResult(document, format_ext, STATUS_FAILED, error=str(e)))
+            return
+
+        pending = []
+        for format_ext, target in self.targets.items():
+            output = self.output_path(document, format_ext)
+            if not self.force and self.manifest.is_current(document, format_ext, digest, target.generation, output,
+                                                           output.relative_to(self.output_dir).as_posix()):
+                self._add(DocumentResult(document, format_ext, STATUS_SKIPPED))
+            else:
+                pending.append(format_ext)
+        if not pending:
+            return
+
+        started = time.perf_counter()
+        try:
+            html_content, toc_content = self.render(source)
+        except Exception as e:
+            logger.error(f"Batch export: rendering {document} failed: {e}", exc_info=True)
+            for format_ext in pending:
+                self._add(DocumentResult(document, format_ext, STATUS_FAILED, error=f"Render failed: {e}"))
+            return
+        render_seconds = time.perf_counter() - started
+
+        for format_ext in pending:
+            target = self.targets[format_ext]
+            output = self.output_path(document, format_ext)
+            key = f"{document}\0{format_ext}\0{digest}\0{target.generation}"
+            job, _ = self.service.submit(format_ext, target.spec, {'html': html_content, 'toc': toc_content},
+                                         key, output.name)
+            yield job, document, format_ext, digest, render_seconds
+
+    def _collect(self, job, document: str, format_ext: str, digest: str, render_seconds: float):
+        job.wait()
+        seconds = render_seconds + ((job.finished or 0) - (job.started or job.finished or 0))
+        result_path = self.service.result_path(job)
+        if result_path is None:
+            self.manifest.forget(document, format_ext)
+            self._add(DocumentResult(document, format_ext, STATUS_FAILED, seconds, job.error or "No result"))
+            return
+
+        output = self.output_path(document, format_ext)
+        try:
+            output.parent.mkdir(parents=True, exist_ok=True)
+            shutil.move(str(result_path), str(output))
+        except OSError as e:
+            self._add(DocumentResult(document, format_ext, STATUS_FAILED, seconds, f"Cannot write {output}: {e}"))
+            return
+
+        self.manifest.record(document, format_ext, digest, self.targets[format_ext].generation,
+                             output.relative_to(self.output_dir).as_posix(), seconds)
+        self._add(DocumentResult(document, format_ext, STATUS_EXPORTED, seconds))
+        self._unsaved += 1
+        if self._unsaved >= SAVE_EVERY:
+            self.manifest.save()
+            self._unsaved = 0
+
+
+def format_report(results: List[DocumentResult], elapsed: float) -> str:
+    """Per-document timings, then failures and totals."""
+    lines = []
+    width = max((len(r.path) for r in results), default=10)
+    for result in sorted(results, key=lambda r: (r.path, r.format_ext)):
+        timing = f"{result.seconds:8.2f}s" if result.status == STATUS_EXPORTED else " " * 9
+        lines.append(f"  {result.path:<{width}}  {result.format_ext:<5} {result.status:<8} {timing}")
+
+    failures = [r for r in results if r.status == STATUS_FAILED]
+    if failures:
+        lines.append("")
+        lines.append(f"Failures ({len(failures)}):")
+        for result in failures:
+            lines.append(f"  {result.path} [{result.format_ext}]: {result.error}")
+
+    counts = {status: sum(1 for r in results if r.status == status)
+              for status in (STATUS_EXPORTED, STATUS_SKIPPED, STATUS_FAILED)}
+    exported = [r.seconds for r in results if r.status == STATUS_EXPORTED]
+    lines.append("")
+    lines.append(f"{counts[STATUS_EXPORTED]} exported, {counts[STATUS_SKIPPED]} unchanged, "
+                 f"{counts[STATUS_FAILED]} failed in {elapsed:.1f}s"
+                 + (f" (slowest {max(exported):.2f}s, mean {sum(exported) / len(exported):.2f}s)" if exported else ""))
+    return "\n".join(lines)
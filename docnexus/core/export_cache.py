@@ -0,0 +1,189 @@
+"""
+On-disk cache for export results.
+
+Exports are deterministic for a given (HTML, format, plugin version), and
+users tend to export the same document several times in a row (PDF, then again after
+fixing a typo in another file, then DOCX...). Results are stored as one file per key
+under the cache directory; the total size is bounded and the least recently used
+entries are evicted first.
+"""
+import hashlib
+import io
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024  # 256 MB
+
+
+def normalize_html(html: str) -> str:
+    """
+    Cache key form of an export's HTML: only changes no renderer can see (surrounding
+    whitespace, CRLF line endings, which HTML parsers turn into LF). Whitespace inside
+    the document is kept as is: it is significant in <pre>/<code> and between inline tags.
+    """
+    return html.strip().replace('\r\n', '\n')
+
+
+class ExportCache:
+    """
+    Size-bounded, LRU-evicted export result store.
+
+    Entries are written atomically (temp file + rename) so a crash never leaves a
+    truncated export behind. Access time is tracked via the file mtime, which keeps
+    the LRU order across restarts without an index file.
+    """
+
+    SUFFIX = '.bin'
+
+    def __init__(self, cache_dir: Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._sizes: Dict[str, int] = {}
+        self._total = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.errors = 0
+
+        if self.enabled:
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                for entry in self.cache_dir.glob(f'*{self.SUFFIX}'):
+                    size = entry.stat().st_size
+                    self._sizes[entry.stem] = size
+                    self._total += size
+                logger.info(f"ExportCache: {len(self._sizes)} entries ({self._total} bytes) in {self.cache_dir}")
+            except OSError as e:
+                logger.warning(f"ExportCache: Disabled, cannot use {self.cache_dir}: {e}")
+                self.max_bytes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def make_key(normalized_html: str, format_ext: str, version: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(format_ext.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(str(version).encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(normalized_html.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{self.SUFFIX}"
+
+    def lookup(self, key: str) -> Optional[Path]:
+        """Path of a cached result (for streaming it with send_file), or None on a miss."""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            with self._lock:
+                self.misses += 1
+                # Entry vanished (manual cleanup, other process)
+                if key in self._sizes:
+                    self._total -= self._sizes.pop(key)
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self.lookup(key)
+        if path is None:
+            return None
+        try:
+            return path.read_bytes()
+        except OSError:
+            return None
+
+    def put(self, key: str, data: bytes):
+        if data:
+            self.put_stream(key, io.BytesIO(data))
+
+    def put_stream(self, key: str, source: BinaryIO):
+        """Copy a file-like result into the cache, from its current position to the end."""
+        if not self.enabled:
+            return
+        path = self._path(key)
+        tmp_name = None
+        try:
+            fd, tmp_name = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                shutil.copyfileobj(source, f)
+                size = f.tell()
+            if not size or size > self.max_bytes:
+                os.unlink(tmp_name)
+                return
+            os.replace(tmp_name, path)
+        except OSError as e:
+            logger.warning(f"ExportCache: Failed to store {key[:12]}: {e}")
+            with self._lock:
+                self.errors += 1
+            if tmp_name and os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            return
+
+        with self._lock:
+            self._total += size - self._sizes.get(key, 0)
+            self._sizes[key] = size
+            self.stores += 1
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until under the size limit. Caller holds the lock."""
+        entries = []
+        for key in self._sizes:
+            try:
+                entries.append((self._path(key).stat().st_mtime, key))
+            except OSError:
+                entries.append((0, key))
+        entries.sort()
+
+        for _, key in entries:
+            if self._total <= self.max_bytes:
+                break
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+            self._total -= self._sizes.pop(key)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._sizes):
+                try:
+                    self._path(key).unlink()
+                except OSError:
+                    pass
+            self._sizes.clear()
+            self._total = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "errors": self.errors,
+                "entries": len(self._sizes),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,134 @@
+"""
+Print simplification of highlighted code blocks.
+
+Pygments wraps every token in its own <span class="...">, so a 500 line listing easily
+becomes 5000+ inline boxes. xhtml2pdf lays out each of them individually (style lookup,
+font metrics, fragment merging), which makes code-heavy documents the slowest part of a
+PDF export while most of those spans end up in the same handful of colors.
+
+simplify_code_blocks() rewrites code blocks for print:
+
+- "segments": adjacent tokens that render identically (same CSS declarations, or plain
+  whitespace) are merged into one span, leaving a few color segments per line.
+- "plain":    the block becomes monochrome pre-formatted text.
+- "auto":     segments, or plain for blocks with more than `max_spans` token spans.
+- "full":     leave the markup untouched.
+"""
+import logging
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from bs4 import NavigableString, Tag
+
+logger = logging.getLogger(__name__)
+
+CODE_MODES = ('full', 'segments', 'plain', 'auto')
+DEFAULT_CODE_MODE = 'auto'
+DEFAULT_MAX_SPANS = 4000  # Token spans in a single block before "auto" goes monochrome
+
+CODE_BLOCK_SELECTOR = 'div.highlight pre, div.codehilite pre, pre.highlight'
+
+# ".highlight .k { color: #d73a49 } /* Keyword */"
+_TOKEN_RULE = re.compile(r'\.highlight\s+\.([\w-]+)\s*\{([^}]*)\}')
+
+
+@lru_cache(maxsize=8)
+def token_styles(css: str) -> Dict[str, str]:
+    """
+    Map each Pygments token class in `css` to a representative class with the same
+    declarations, e.g. {'k': 'k', 'kd': 'k', 'ow': 'k', 'c1': 'c', ...}.
+    Classes without a rule render like plain text and are not listed.
+    """
+    representative: Dict[str, str] = {}
+    styles: Dict[str, str] = {}
+    for cls, body in _TOKEN_RULE.findall(css):
+        declarations = ";".join(sorted(d.strip().lower() for d in body.split(';') if d.strip()))
+        if not declarations or cls in styles:
+            continue
+        styles[cls] = representative.setdefault(declarations, cls)
+    return styles
+
+
+def _token_style(span: Tag, styles: Dict[str, str]) -> Optional[str]:
+    for cls in span.get('class') or []:
+        if cls in styles:
+            return styles[cls]
+    return None
+
+
+def _collapse(container: Tag, styles: Dict[str, str]):
+    """Merge the token spans directly inside `container` into style runs."""
+    runs: List = []  # [style or None, [text, ...]] or a structured Tag kept as is
+    for child in list(container.contents):
+        if isinstance(child, Tag) and (child.name != 'span' or child.find(True) is not None):
+            # Structured content (<code>, highlighted line wrappers...): collapse inside it
+            _collapse(child, styles)
+            runs.append(child.extract())
+            continue
+
+        if isinstance(child, Tag):
+            text, style = child.get_text(), _token_style(child, styles)
+        else:
+            text, style = str(child), None
+        if not text:
+            continue
+
+        last = runs[-1] if runs and isinstance(runs[-1], list) else None
+        if last is not None and (last[0] == style or not text.strip()):
+            last[1].append(text)
+        elif last is not None and not "".join(last[1]).strip():
+            # Leading whitespace takes the style of the token after it
+            last[0] = style
+            last[1].append(text)
+        else:
+            runs.append([style, [text]])
+
+    container.clear()
+    for run in runs:
+        if isinstance(run, Tag):
+            container.append(run)
+        elif run[0] is None:
+            container.append(NavigableString("".join(run[1])))
+        else:
+            span = Tag(name='span', attrs={'class': [run[0]]})
+            span.append(NavigableString("".join(run[1])))
+            container.append(span)
+
+
+def simplify_code_blocks(root: Tag, styles: Dict[str, str], mode: str = DEFAULT_CODE_MODE,
+                         max_spans: int = DEFAULT_MAX_SPANS) -> Dict[str, int]:
+    """
+    Simplify highlighted code blocks under `root` in place (see module docstring).
+    `styles` comes from token_styles() over the stylesheet the exporter renders with.
+    Returns counters for logging/benchmarks.
+    """
+    stats = {'blocks': 0, 'plain_blocks': 0, 'spans_before': 0, 'spans_after': 0}
+    if mode not in CODE_MODES:
+        logger.warning(f"ExportCode: Unknown code block mode '{mode}', using '{DEFAULT_CODE_MODE}'")
+        mode = DEFAULT_CODE_MODE
+    if mode == 'full':
+        return stats
+
+    for pre in root.select(CODE_BLOCK_SELECTOR):
+        spans = len(pre.find_all('span'))
+        stats['blocks'] += 1
+        stats['spans_before'] += spans
+
+        if mode == 'plain' or (mode == 'auto' and spans > max_spans):
+            code = pre.find('code')
+            text = pre.get_text()
+            pre.clear()
+            if code is not None:
+                code.clear()
+                code.append(NavigableString(text))
+                pre.append(code)
+            else:
+                pre.append(NavigableString(text))
+            stats['plain_blocks'] += 1
+            continue
+
+        _collapse(pre, styles)
+        stats['spans_after'] += len(pre.find_all('span'))
+
+    return stats
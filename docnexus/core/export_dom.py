@@ -0,0 +1,245 @@
+"""
+Shared export preprocessing.
+
+Every export format used to parse the posted HTML on its own, run its own copy of the
+"strip scripts / nav / buttons" cleanup and its own math extraction, and then serialize
+the result back to a string just to parse it again a few lines later.
+
+ExportDocument parses the payload ONCE (lxml), runs the cleanup that is common to all
+formats and normalizes math into a single canonical form. Format handlers receive the
+tree and only apply their format-specific transformations on top of it.
+"""
+import logging
+import re
+from typing import Any, Dict, List, Optional, Union
+
+from bs4 import BeautifulSoup, Tag
+from bs4.element import Script
+
+logger = logging.getLogger(__name__)
+
+# Elements that only make sense on screen (based on view.html)
+SCREEN_ONLY_TAGS = ['script', 'button', 'nav']
+SCREEN_ONLY_CLASSES = ['top-nav', 'toc-sidebar', 'edit-actions', 'btn', 'no-print']
+
+# Renderer artifacts around math that no export format wants
+MATH_JUNK_CLASSES = ['MathJax_Preview', 'katex-html']
+
+# Canonical math form handed to the format stages:
+#   <span class="arithmatex"><script type="math/tex[; mode=display]">TeX</script></span>
+MATH_SCRIPT_TYPE = re.compile(r'math/tex')
+
+PAGE_SKELETON = '<html><head><meta charset="utf-8"></head><body></body></html>'
+
+
+def render_page(content_html: str, toc_html: str = '') -> str:
+    """
+    Export page for renderer output: the same #documentContent / .toc-container /
+    .markdown-content structure as view.html, without any of the screen chrome.
+    """
+    toc = ''
+    if toc_html and toc_html.strip():
+        toc = ('<div class="toc-container"><div class="toc-header">Table of Contents</div>'
+               f'<div class="toc-content">{toc_html}</div></div>')
+    return ('<html><head><meta charset="utf-8"></head><body><div id="documentContent">'
+            f'{toc}<div class="markdown-content">{content_html}</div></div></body></html>')
+
+
+def _parse(html: str) -> BeautifulSoup:
+    try:
+        return BeautifulSoup(html, 'lxml')
+    except Exception:
+        # lxml is a hard dependency, but keep exports alive on broken installs
+        return BeautifulSoup(html, 'html.parser')
+
+
+def _class_list(tag: Tag) -> List[str]:
+    classes = tag.get('class') or []
+    return classes if isinstance(classes, list) else classes.split()
+
+
+class MathFormula:
+    """A single TeX formula found in the document."""
+
+    def __init__(self, tex: str, display: bool, node: Tag):
+        self.tex = tex
+        self.display = display
+        self.node = node  # The canonical <span class="arithmatex"> wrapper
+
+    @property
+    def in_list(self) -> bool:
+        return self.node.find_parent('li') is not None
+
+    def __repr__(self):
+        return f"<MathFormula display={self.display} tex={self.tex[:20]!r}>"
+
+
+class ExportDocument:
+    """
+    Parsed and pre-cleaned export input.
+
+    Attributes:
+        soup:      The full lxml tree (mutable, format stages transform it in place).
+        container: #documentContent, .markdown-content or .content-area (None if absent).
+        toc:       The .toc-container inside the container, if any.
+        content:   The .markdown-content element (falls back to the container).
+        formulas:  Math formulas, already normalized to the canonical script form.
+        source_size: Size of the original payload in bytes.
+        options:   Export options from the server config (e.g. 'code_blocks').
+                   Format stages fall back to their own defaults for missing keys.
+    """
+
+    def __init__(self, soup: BeautifulSoup, source_size: int = 0, options: Optional[Dict[str, Any]] = None,
+                 strip_screen_only: bool = True):
+        self.soup = soup
+        self.source_size = source_size
+        self.options: Dict[str, Any] = dict(options or {})
+        self.formulas: List[MathFormula] = []
+
+        if strip_screen_only:
+            self._strip_screen_only()
+        self.formulas = self._extract_math()
+        self._select_content()
+
+    @classmethod
+    def from_html(cls, html: str, options: Optional[Dict[str, Any]] = None) -> 'ExportDocument':
+        return cls(_parse(html), source_size=len(html.encode('utf-8')), options=options)
+
+    @classmethod
+    def from_render(cls, content_html: str, toc_html: str = '',
+                    options: Optional[Dict[str, Any]] = None) -> 'ExportDocument':
+        """Build from renderer output (server-side export): there is no page chrome to strip."""
+        html = render_page(content_html, toc_html)
+        return cls(_parse(html), source_size=len(html.encode('utf-8')), options=options, strip_screen_only=False)
+
+    @classmethod
+    def coerce(cls, content: Union[str, 'ExportDocument']) -> 'ExportDocument':
+        """Accept either raw HTML (legacy handler contract) or an already parsed document."""
+        if isinstance(content, ExportDocument):
+            return content
+        return cls.from_html(content)
+
+    # ------------------------------------------------------------------
+    # Shared cleanup
+    # ------------------------------------------------------------------
+    def _strip_screen_only(self):
+        removed = 0
+        for tag in self.soup.find_all(SCREEN_ONLY_TAGS):
+            # Math scripts are kept, they are the source for math extraction
+            if tag.name == 'script' and MATH_SCRIPT_TYPE.search(tag.get('type') or ''):
+                continue
+            tag.decompose()
+            removed += 1
+        for tag in self.soup.find_all(class_=SCREEN_ONLY_CLASSES):
+            if tag.parent is not None:
+                tag.decompose()
+                removed += 1
+        logger.debug(f"ExportDOM: Removed {removed} screen-only elements.")
+
+    def _extract_math(self) -> List[MathFormula]:
+        formulas = []
+
+        # 1. MathJax scripts (most reliable source)
+        for script in self.soup.find_all('script', type=MATH_SCRIPT_TYPE):
+            display = 'mode=display' in script.get('type', '')
+            formulas.append(self._canonicalize(script, script.get_text(), display))
+
+        # 2. KaTeX output (TeX lives in the MathML annotation)
+        for katex in self.soup.find_all(class_='katex'):
+            if katex.parent is None or katex.find_parent(class_='katex'):
+                continue
+            annotation = katex.find('annotation', attrs={'encoding': 'application/x-tex'}) or katex.find('annotation')
+            if not annotation:
+                continue
+            display = (katex.name == 'div') or \
+                ('display' in _class_list(katex)) or \
+                (katex.find_parent(class_='katex-display') is not None)
+            target = katex.find_parent(class_='arithmatex') or katex.find_parent(class_='katex-display') or katex
+            formulas.append(self._canonicalize(target, annotation.get_text(), display))
+
+        # 3. Generic arithmatex containers holding raw delimited TeX
+        for node in self.soup.find_all(class_='arithmatex'):
+            if node.find('script', type=MATH_SCRIPT_TYPE):
+                continue
+            tex, display = self._split_delimiters(node.get_text().strip())
+            if tex is None:
+                # Unknown structure, leave it to the format-specific fallbacks
+                continue
+            formulas.append(self._canonicalize(node, tex, display))
+
+        for junk in self.soup.find_all(class_=MATH_JUNK_CLASSES):
+            if junk.parent is not None:
+                junk.decompose()
+
+        formulas = [f for f in formulas if f is not None]
+        if formulas:
+            logger.debug(f"ExportDOM: Extracted {len(formulas)} math formulas.")
+        return formulas
+
+    @staticmethod
+    def _split_delimiters(text: str):
+        if text.startswith('\\[') and text.endswith('\\]'):
+            return text[2:-2].strip(), True
+        if text.startswith('$$') and text.endswith('$$') and len(text) > 3:
+            return text[2:-2].strip(), True
+        if text.startswith('\\(') and text.endswith('\\)'):
+            return text[2:-2].strip(), False
+        if text.startswith('$') and text.endswith('$') and len(text) > 1:
+            return text[1:-1].strip(), False
+        return None, False
+
+    def _canonicalize(self, target: Tag, tex: str, display: bool) -> Optional[MathFormula]:
+        tex = (tex or '').strip()
+        if not tex:
+            if target.name == 'script':
+                target.decompose()
+            return None
+
+        wrapper = target.parent if target.name == 'script' else target
+        if wrapper is None or 'arithmatex' not in _class_list(wrapper):
+            wrapper = self.soup.new_tag('div' if display else 'span')
+            wrapper['class'] = 'arithmatex'
+            target.replace_with(wrapper)
+        else:
+            wrapper.clear()
+
+        script = self.soup.new_tag('script')
+        script['type'] = 'math/tex; mode=display' if display else 'math/tex'
+        # Script (not NavigableString) so get_text() on the script keeps returning the TeX
+        script.append(Script(tex))
+        wrapper.append(script)
+        return MathFormula(tex, display, wrapper)
+
+    def _select_content(self):
+        self.container = self.soup.find(id='documentContent') \
+            or self.soup.find(class_='markdown-content') \
+            or self.soup.find(class_='content-area')
+
+        self.toc = None
+        self.content = None
+        if self.container is not None:
+            self.toc = self.container.find(class_='toc-container')
+            if 'markdown-content' in _class_list(self.container):
+                self.content = self.container
+            else:
+                self.content = self.container.find(class_='markdown-content') or self.container
+
+    # ------------------------------------------------------------------
+    # Helpers for format stages
+    # ------------------------------------------------------------------
+    def isolate(self, parts: List[Tag]) -> BeautifulSoup:
+        """
+        Move the given elements into a fresh <html><head/><body/></html> tree.
+        No serialization round-trip: the nodes themselves are re-parented.
+        """
+        page = BeautifulSoup(PAGE_SKELETON, 'lxml')
+        for part in parts:
+            page.body.append(part.extract())
+        return page
+
+    def serialize(self) -> str:
+        """The cleaned tree as HTML (e.g. for cache keys). Call before format stages mutate it."""
+        return str(self.soup)
+
+    def __repr__(self):
+        return f"<ExportDocument size={self.source_size} formulas={len(self.formulas)}>"
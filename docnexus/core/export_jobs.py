@@ -0,0 +1,549 @@
+"""
+Background export jobs on a pool of pre-warmed worker processes.
+
+Synchronous exports run xhtml2pdf / htmldocx in the request thread: a few concurrent
+exports starve page views (GIL + CPU), and long ones run into proxy timeouts. Jobs move
+that work to worker processes:
+
+- submit -> job id (202), poll status/progress, download the result when done;
+- workers import the export stacks (xhtml2pdf, reportlab, htmldocx, python-docx, PIL...)
+  and the export plugins once, in the pool initializer, and run a tiny export through
+  each handler so fonts, templates and style caches are loaded before the first job;
+- identical submissions (same input, format and handler version) while a job is queued,
+  running or its result is still available share that job;
+- concurrency is capped per format (e.g. one PDF at a time, two DOCX), on top of the
+  pool size.
+
+Handlers are plugin functions (exec-loaded, not importable by name), so a job names the
+plugin file and format; the worker loads the plugin with core.loader.import_plugin_module
+and reloads it when the file changes. Results are written by the worker straight to disk
+and, when the export cache is enabled, moved into it (downloadable through
+/api/export/result/<key>.<ext> as well).
+
+If worker processes cannot be started (sandbox, frozen build without freeze_support)
+jobs run on threads in-process instead.
+
+With `share_state` (multi-process server, core.server) every job state change is also
+written to <result_dir>/state/<id>.json, so a status or download request reaching another
+server process than the one that accepted the job still finds it.
+"""
+import importlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+DEFAULT_WORKERS = 2
+DEFAULT_JOB_TTL = 60 * 60  # Finished jobs (and their results) are kept for an hour
+STATE_DIR_NAME = 'state'
+JOB_ID_RE = re.compile(r'[0-9a-f]{32}')
+
+# Heavy modules imported by every worker at startup (missing ones are skipped)
+WARM_MODULES = (
+    'bs4', 'lxml.etree',
+    'xhtml2pdf.pisa', 'reportlab.pdfgen.canvas', 'reportlab.platypus', 'pypdf',
+    'htmldocx', 'docx', 'PIL.Image',
+)
+
+WARM_DOCUMENT = (
+    '<div id="documentContent"><div class="markdown-content">'
+    '<h1 id="warm-up">Warm up</h1><p>Text with <strong>bold</strong> and <code>code</code>.</p>'
+    '<table><thead><tr><th>A</th><th>B</th></tr></thead><tbody><tr><td>1</td><td>2</td></tr></tbody></table>'
+    '</div></div>'
+)
+
+# (format_ext, plugin_id, plugin file) identifying the handler a worker should load
+HandlerSpec = Tuple[str, str, str]
+
+
+# -------------------------------------------------------------------------
+# Worker side (runs in the pool processes)
+# -------------------------------------------------------------------------
+
+_worker_handlers: Dict[str, Tuple[str, int, Any]] = {}  # format -> (path, mtime_ns, feature)
+_progress_queue = None
+
+
+def _report(job_id: str, progress: int):
+    if _progress_queue is not None:
+        try:
+            _progress_queue.put((job_id, progress))
+        except Exception:
+            pass
+
+
+def _load_handler(spec: HandlerSpec):
+    """Export feature for `spec`, (re)loading its plugin when the file changed."""
+    format_ext, plugin_id, path = spec
+    mtime = os.stat(path).st_mtime_ns
+    cached = _worker_handlers.get(format_ext)
+    if cached and cached[0] == path and cached[1] == mtime:
+        return cached[2]
+
+    from docnexus.core.loader import import_plugin_module
+    from docnexus.features.registry import PluginRegistry
+
+    module = import_plugin_module(plugin_id, Path(path), PluginRegistry())
+    for feature in (module.get_features() if hasattr(module, 'get_features') else []):
+        if 'EXPORT_HANDLER' in str(feature.type) and feature.meta.get('extension') == format_ext:
+            _worker_handlers[format_ext] = (path, mtime, feature)
+            return feature
+    raise LookupError(f"Plugin {plugin_id} has no {format_ext} export handler")
+
+
+def _export_input(feature, payload: Dict[str, Any], options):
+    from docnexus.core.export_dom import ExportDocument, render_page
+
+    html, toc = payload['html'], payload.get('toc')
+    if feature.meta.get('input') == 'document':
+        if toc is not None:
+            return ExportDocument.from_render(html, toc, options=options)
+        return ExportDocument.from_html(html, options=options)
+    return render_page(html, toc) if toc is not None else html
+
+
+def _write_export(feature, content, sink) -> int:
+    if feature.meta.get('output') == 'stream':
+        feature.handler(content, sink)
+    else:
+        data = feature.handler(content)
+        if data:
+            sink.write(data)
+    return sink.tell()
+
+
+def _warm_worker(specs: List[HandlerSpec], options):
+    started = time.perf_counter()
+    for name in WARM_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass
+    for spec in specs:
+        try:
+            feature = _load_handler(spec)
+            _write_export(feature, _export_input(feature, {'html': WARM_DOCUMENT}, options), io.BytesIO())
+        except Exception as e:
+            logger.warning(f"Export worker: warm-up of {spec[0]} failed: {e}")
+    logger.info(f"Export worker {os.getpid()} ready in {time.perf_counter() - started:.2f}s")
+
+
+def _init_worker(specs: List[HandlerSpec], options, progress_queue, warm: bool):
+    global _progress_queue
+    _progress_queue = progress_queue
+    if warm:
+        _warm_worker(specs, options)
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def run_export_job(job_id: str, spec: HandlerSpec, payload: Dict[str, Any], options, result_path: str) -> int:
+    """Run one export into `result_path` (written atomically). Returns the result size."""
+    _report(job_id, 5)
+    feature = _load_handler(spec)
+    content = _export_input(feature, payload, options)
+    _report(job_id, 20)
+
+    tmp_path = f"{result_path}.part"
+    try:
+        with open(tmp_path, 'wb') as sink:
+            size = _write_export(feature, content, sink)
+        if not size:
+            raise RuntimeError("Export handler returned no data")
+        os.replace(tmp_path, result_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    _report(job_id, 95)
+    return size
+
+
+# -------------------------------------------------------------------------
+# Service side (runs in the web server process)
+# -------------------------------------------------------------------------
+
+class ExportJob:
+    """State of one export job, as reported by the status endpoint."""
+
+    def __init__(self, job_id: str, key: str, format_ext: str, download_name: str):
+        self.id = job_id
+        self.key = key
+        self.format_ext = format_ext
+        self.download_name = download_name
+        self.state = JOB_QUEUED
+        self.progress = 0
+        self.error: Optional[str] = None
+        self.result_path: Optional[Path] = None
+        self.size = 0
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.spec: Optional[HandlerSpec] = None
+        self.payload: Optional[Dict[str, Any]] = None
+        self._done = threading.Event()
+
+    @property
+    def is_finished(self) -> bool:
+        return self.state in (JOB_DONE, JOB_FAILED)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job is done or failed; False on timeout."""
+        return self._done.wait(timeout)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ExportJob':
+        """Read-only copy of a job published by another process (see share_state)."""
+        job = cls(data['id'], data['export_key'], data['format'], data['download_name'])
+        for name in ('state', 'progress', 'error', 'size', 'created', 'started', 'finished'):
+            setattr(job, name, data.get(name))
+        job.result_path = Path(data['result_path']) if data.get('result_path') else None
+        if job.is_finished:
+            job._done.set()
+        return job
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "format": self.format_ext,
+            "state": self.state,
+            "progress": self.progress,
+            "error": self.error,
+            "size": self.size,
+            "download_name": self.download_name,
+            "export_key": self.key,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class ExportJobService:
+    """
+    Job queue in front of the export worker pool.
+
+    `format_limits` maps a format to its maximum number of concurrently running jobs
+    (default: the pool size). `result_cache` is the ExportCache finished results are
+    moved into, if enabled.
+    """
+
+    def __init__(self, result_dir: Path, workers: int = DEFAULT_WORKERS,
+                 format_limits: Optional[Dict[str, int]] = None, result_cache=None,
+                 options: Optional[Dict[str, Any]] = None, job_ttl: int = DEFAULT_JOB_TTL,
+                 warm: bool = True, share_state: bool = False):
+        self.result_dir = Path(result_dir)
+        self.workers = max(1, int(workers))
+        self.format_limits = dict(format_limits or {})
+        self.result_cache = result_cache
+        self.options = options or {}
+        self.job_ttl = job_ttl
+        self.warm = warm
+        self.share_state = share_state
+
+        self._lock = threading.RLock()
+        self._jobs: Dict[str, ExportJob] = {}
+        self._by_key: Dict[str, ExportJob] = {}
+        self._pending: Dict[str, deque] = {}
+        self._running: Dict[str, int] = {}
+        self._pool = None
+        self._in_process = False
+        self._progress_queue = None
+        self._specs: List[HandlerSpec] = []
+        self.submitted = 0
+        self.deduplicated = 0
+        self.completed = 0
+        self.failed = 0
+
+    # -- pool ---------------------------------------------------------------
+
+    def start(self, specs: Optional[List[HandlerSpec]] = None, wait: bool = False):
+        """
+        Start (and warm) the worker pool now instead of on the first job.
+        With `wait`, return only once every worker is ready.
+        """
+        with self._lock:
+            if specs is not None:
+                self._specs = list(specs)
+            self._ensure_pool()
+            pings = []
+            if not self._in_process:
+                # Process pools spawn on first use: make every worker start (and warm) now
+                pings = [self._pool.submit(_ping) for _ in range(self.workers)]
+        if wait:
+            for ping in pings:
+                try:
+                    ping.result()
+                except Exception as e:
+                    logger.warning(f"ExportJobs: Worker failed to start: {e}")
+
+    def _ensure_pool(self):
+        """Create the pool if needed. Caller holds the lock."""
+        if self._pool is not None:
+            return
+        self.result_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            context = multiprocessing.get_context('spawn')
+            self._progress_queue = context.Queue()
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=context, initializer=_init_worker,
+                initargs=(self._specs, self.options, self._progress_queue, self.warm))
+            self._in_process = False
+        except (OSError, ImportError, NotImplementedError) as e:
+            logger.warning(f"ExportJobs: Worker processes unavailable ({e}), running jobs on threads")
+            global _progress_queue
+            self._progress_queue = _progress_queue = queue.Queue()
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='export-job')
+            self._in_process = True
+        threading.Thread(target=self._drain_progress, args=(self._progress_queue,),
+                         name='export-job-progress', daemon=True).start()
+        logger.info(f"ExportJobs: Started {self.workers} {'threads' if self._in_process else 'worker processes'}")
+
+    def _drain_progress(self, progress_queue):
+        while True:
+            try:
+                item = progress_queue.get()
+            except (EOFError, OSError):
+                return
+            if item is None:
+                return
+            job_id, progress = item
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job and job.state == JOB_RUNNING:
+                    job.progress = max(job.progress, progress)
+                    self._publish(job)
+
+    def _reset_pool(self, wait: bool = False):
+        """Drop the current pool (broken or shutting down). Caller holds the lock."""
+        pool, self._pool = self._pool, None
+        progress_queue, self._progress_queue = self._progress_queue, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+        if progress_queue is not None:
+            progress_queue.put(None)
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            self._reset_pool(wait=wait)
+
+    # -- jobs ---------------------------------------------------------------
+
+    def limit_for(self, format_ext: str) -> int:
+        return max(1, int(self.format_limits.get(format_ext, self.workers)))
+
+    def submit(self, format_ext: str, spec: HandlerSpec, payload: Dict[str, Any], key: str,
+               download_name: str) -> Tuple[ExportJob, bool]:
+        """
+        Queue an export. `payload` is {'html': page or rendered HTML, 'toc': TOC HTML or
+        None (page HTML)}. Returns (job, created); created is False when an identical job
+        was reused.
+        """
+        with self._lock:
+            self._expire()
+            existing = self._by_key.get(key)
+            if existing and self._reusable(existing):
+                self.deduplicated += 1
+                return existing, False
+
+            job = ExportJob(uuid.uuid4().hex, key, format_ext, download_name)
+            self._jobs[job.id] = job
+            self._by_key[key] = job
+            self.submitted += 1
+
+            cached_path = self.result_cache.lookup(key) if self._cache_enabled else None
+            if cached_path:
+                self._complete(job, cached_path, cached_path.stat().st_size)
+                return job, True
+
+            job.spec, job.payload = spec, payload
+            self._pending.setdefault(format_ext, deque()).append(job)
+            self._publish(job)
+            self._dispatch(format_ext)
+            return job, True
+
+    def get(self, job_id: str) -> Optional[ExportJob]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self.share_state and JOB_ID_RE.fullmatch(job_id):
+            job = self._load_published(job_id)
+        return job
+
+    # -- shared state (multi-process server) -----------------------------------
+
+    def _state_path(self, job_id: str) -> Path:
+        return self.result_dir / STATE_DIR_NAME / f"{job_id}.json"
+
+    def _publish(self, job: ExportJob):
+        """Write the job state for the other server processes. Caller holds the lock."""
+        if not self.share_state:
+            return
+        data = job.to_dict()
+        data['result_path'] = str(job.result_path) if job.result_path else None
+        path = self._state_path(job.id)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"ExportJobs: Cannot publish state of job {job.id}: {e}")
+
+    def _load_published(self, job_id: str) -> Optional[ExportJob]:
+        try:
+            with open(self._state_path(job_id), 'r', encoding='utf-8') as f:
+                job = ExportJob.from_dict(json.load(f))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"ExportJobs: Unreadable state of job {job_id}: {e}")
+            return None
+        return job if not job.is_finished or job.finished >= time.time() - self.job_ttl else None
+
+    def queue_position(self, job: ExportJob) -> int:
+        with self._lock:
+            pending = self._pending.get(job.format_ext, ())
+            return next((i + 1 for i, queued in enumerate(pending) if queued is job), 0)
+
+    def result_path(self, job: ExportJob) -> Optional[Path]:
+        """Result file of a finished job, None if it failed or the result was evicted."""
+        if job.state != JOB_DONE or not job.result_path:
+            return None
+        if self._cache_enabled and job.result_path.parent == self.result_cache.cache_dir:
+            return self.result_cache.lookup(job.key)
+        return job.result_path if job.result_path.exists() else None
+
+    @property
+    def _cache_enabled(self) -> bool:
+        return self.result_cache is not None and self.result_cache.enabled
+
+    def _reusable(self, job: ExportJob) -> bool:
+        if job.state in (JOB_QUEUED, JOB_RUNNING):
+            return True
+        return job.state == JOB_DONE and self.result_path(job) is not None
+
+    def _dispatch(self, format_ext: str):
+        """Start queued jobs of a format up to its concurrency limit. Caller holds the lock."""
+        pending = self._pending.get(format_ext)
+        while pending and self._running.get(format_ext, 0) < self.limit_for(format_ext):
+            job = pending.popleft()
+            self._ensure_pool()
+            self.result_dir.mkdir(parents=True, exist_ok=True)
+            result_path = self.result_dir / f"{job.id}.{format_ext}"
+            try:
+                future = self._pool.submit(run_export_job, job.id, job.spec, job.payload,
+                                           self.options, str(result_path))
+            except (RuntimeError, BrokenProcessPool) as e:
+                self._fail(job, f"Export workers unavailable: {e}")
+                self._reset_pool()
+                continue
+            job.state = JOB_RUNNING
+            job.started = time.time()
+            job.payload = None  # The pool has its own copy, do not keep large inputs around
+            self._running[format_ext] = self._running.get(format_ext, 0) + 1
+            self._publish(job)
+            future.add_done_callback(lambda f, job=job, path=result_path: self._finished(job, path, f))
+
+    def _finished(self, job: ExportJob, result_path: Path, future):
+        error = None
+        path, size = result_path, 0
+        try:
+            size = future.result()
+        except BrokenProcessPool as e:
+            # A worker died (crash, OOM kill): the pool is unusable, the next job starts a new one
+            logger.error(f"ExportJobs: Worker pool broken during job {job.id}: {e}")
+            error = "Export worker crashed"
+        except Exception as e:
+            logger.error(f"ExportJobs: Job {job.id} ({job.format_ext}) failed: {e}")
+            error = str(e)
+        else:
+            if self._cache_enabled:
+                with open(result_path, 'rb') as f:
+                    self.result_cache.put_stream(job.key, f)
+                cached_path = self.result_cache.lookup(job.key)
+                if cached_path:
+                    result_path.unlink()
+                    path = cached_path
+
+        with self._lock:
+            self._running[job.format_ext] -= 1
+            if error:
+                if getattr(self._pool, '_broken', False):
+                    self._reset_pool()
+                self._fail(job, error)
+            else:
+                self._complete(job, path, size)
+            self._dispatch(job.format_ext)
+
+    def _complete(self, job: ExportJob, path: Path, size: int):
+        job.state = JOB_DONE
+        job.progress = 100
+        job.result_path = path
+        job.size = size
+        job.finished = time.time()
+        self.completed += 1
+        self._publish(job)
+        job._done.set()
+
+    def _fail(self, job: ExportJob, error: str):
+        job.state = JOB_FAILED
+        job.error = error
+        job.finished = time.time()
+        self.failed += 1
+        self._publish(job)
+        job._done.set()
+
+    def _expire(self):
+        """Forget finished jobs older than the TTL and delete their own result files."""
+        cutoff = time.time() - self.job_ttl
+        for job in [j for j in self._jobs.values() if j.is_finished and j.finished < cutoff]:
+            del self._jobs[job.id]
+            if self._by_key.get(job.key) is job:
+                del self._by_key[job.key]
+            if self.share_state:
+                try:
+                    self._state_path(job.id).unlink()
+                except OSError:
+                    pass
+            if job.result_path and job.result_path.parent == self.result_dir:
+                try:
+                    job.result_path.unlink()
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            states: Dict[str, int] = {}
+            for job in self._jobs.values():
+                states[job.state] = states.get(job.state, 0) + 1
+            return {
+                "workers": self.workers,
+                "mode": "off" if self._pool is None else ("threads" if self._in_process else "processes"),
+                "format_limits": {fmt: self.limit_for(fmt) for fmt in self.format_limits},
+                "running": dict(self._running),
+                "queued": {fmt: len(pending) for fmt, pending in self._pending.items()},
+                "jobs": states,
+                "submitted": self.submitted,
+                "deduplicated": self.deduplicated,
+                "completed": self.completed,
+                "failed": self.failed,
+            }
@@ -0,0 +1,144 @@
+"""
+JSON files kept in memory: plugins.json (PluginState) and config.json (load_config()).
+
+Both were opened and parsed on every read, and plugin state is read once per feature on
+each feature table rebuild. A JsonFileStore parses its file once and afterwards only
+stat()s it: the cached data is reused while the file's mtime, size and inode are
+unchanged, so edits by hand or by another process are still picked up.
+
+Writes go to a temp file that replaces the target (readers never see a partial file),
+one writer at a time: a lock within the process and, where fcntl exists, a lock file
+(in the temp folder) across processes. batch() groups several updates into one
+read-modify-write:
+
+    with store.batch() as data:
+        data['installed'].append('pdf_export')
+        data['installed'].remove('legacy')
+"""
+import copy
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from docnexus.core.startup import optional_import
+
+logger = logging.getLogger(__name__)
+
+
+class JsonFileStore:
+    """A JSON file cached in memory and revalidated with stat()."""
+
+    def __init__(self, path: Path, default: Optional[Callable[[], Any]] = None, indent: int = 2):
+        self.path = Path(path)
+        self._default = default or dict
+        self._indent = indent
+        self._data = None
+        self._signature = None  # (mtime_ns, size, inode) of the file the data came from
+        self._lock = threading.RLock()
+        self._batch = None      # Data being modified by the current batch()
+        self._depth = 0
+        self.loads = 0          # File parses (not served from memory)
+
+    def _stat_signature(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def read(self) -> Any:
+        """
+        The file's data (the default when it is missing or unreadable). Shared: treat it
+        as read-only and change it through batch(), update() or write().
+        """
+        signature = self._stat_signature()
+        data = self._data
+        if data is not None and signature == self._signature:
+            return data
+        with self._lock:
+            if self._data is not None and signature == self._signature:
+                return self._data
+            self._data, self._signature = self._load(), signature
+            return self._data
+
+    def _load(self) -> Any:
+        self.loads += 1
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return self._default()
+        except (OSError, ValueError) as e:
+            logger.error(f"JsonFileStore: could not read {self.path}: {e}")
+            return self._default()
+
+    @contextmanager
+    def _file_lock(self):
+        fcntl = optional_import('fcntl')
+        if fcntl is None:
+            # No lock file (Windows): writes are still atomic, concurrent processes last-writer-wins
+            yield
+            return
+        # Next to other temp files rather than in the (possibly source) folder of the file
+        digest = hashlib.sha1(str(self.path.resolve()).encode('utf-8')).hexdigest()[:16]
+        lock_path = Path(tempfile.gettempdir()) / f"docnexus-{digest}.lock"
+        with open(lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_file(self, data: Any) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=self._indent)
+            os.replace(tmp, self.path)  # Atomic: readers see the old or the new file
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+        self._data, self._signature = data, self._stat_signature()
+
+    @contextmanager
+    def batch(self):
+        """
+        Read-modify-write: yields a private copy of the current data and writes it once
+        on exit, if it changed (nothing is written when the block raises). Nested batches
+        share the outer one's data and write.
+        """
+        with self._lock:
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield self._batch
+                finally:
+                    self._depth -= 1
+                return
+            with self._file_lock():
+                current = self.read()  # Revalidated under the lock: another process may just have written
+                self._batch, self._depth = copy.deepcopy(current), 1
+                try:
+                    yield self._batch
+                    if self._batch != current:
+                        self._write_file(self._batch)
+                finally:
+                    self._batch, self._depth = None, 0
+
+    def update(self, func: Callable[[Any], None]) -> Any:
+        """Apply `func` to the data in a batch(); returns the data written."""
+        with self.batch() as data:
+            func(data)
+        return data
+
+    def write(self, data: Any) -> None:
+        """Replace the whole file."""
+        with self._lock, self._file_lock():
+            self._write_file(copy.deepcopy(data))
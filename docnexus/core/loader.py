@@ -2,8 +2,15 @@ import sys
 import os
 import importlib.util
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from docnexus.core.activation import PluginActivation, parse_activation_events
+from docnexus.core.manifest import get_manifest_index
+from docnexus.core.startup import PROFILE
 
 logger = logging.getLogger(__name__)
 
@@ -11,6 +18,8 @@ logger = logging.getLogger(__name__)
 PLUGIN_FILE_NAME = "plugin.py"
 DEV_PLUGIN_DIR_NAME = "plugins_dev"
 PROD_PLUGIN_DIR_NAME = "plugins"
+DEFAULT_LOAD_WORKERS = min(8, (os.cpu_count() or 1) + 2)  # Plugin imports are mostly I/O and C code
+DEFAULT_PLUGIN_BUDGET_MS = 500.0  # Plugins taking longer to load are reported
 
 def get_base_path() -> Path:
     """
@@ -65,7 +74,18 @@ def get_plugin_paths() -> List[Path]:
     logger.debug(f"Plugin scan paths: {[str(p) for p in paths]}")
     return paths
 
-def load_plugins_from_path(plugin_dir: Path, registry_instance=None) -> None:
+def discover_plugins(plugin_dir: Path) -> List[Tuple[str, Path]]:
+    """(name, plugin.py) of every plugin in `plugin_dir`, in name order."""
+    found = []
+    for item in sorted(plugin_dir.iterdir(), key=lambda p: p.name):
+        plugin_path = item / PLUGIN_FILE_NAME
+        if item.is_dir() and plugin_path.exists():
+            logger.debug(f"Found plugin at {plugin_path}")
+            found.append((item.name, plugin_path))
+    return found
+
+def load_plugins_from_path(plugin_dir: Path, registry_instance=None, max_workers: Optional[int] = None,
+                           budget_ms: Optional[float] = DEFAULT_PLUGIN_BUDGET_MS) -> None:
     """
     Scan a specific directory for plugins and load them.
     Expects structure: plugin_dir/my_plugin/plugin.py
@@ -75,148 +95,253 @@ def load_plugins_from_path(plugin_dir: Path, registry_instance=None) -> None:
         return
 
     logger.info(f"Scanning for plugins in: {plugin_dir}")
+    plugins = discover_plugins(plugin_dir)
+    load_plugin_set(plugins, registry_instance, max_workers, budget_ms)
+    logger.debug(f"Scanned {plugin_dir}, found {len(plugins)} plugins.")
+
+def import_plugin_module(name: str, path: Path, registry_instance):
+    """
+    Execute a plugin file as module `docnexus_plugin_<name>` with the core classes and
+    `registry_instance` injected. Returns the module (None if no loader). Also used by
+    export worker processes, which need the handlers without the enable/registration logic.
+    """
+    # Use a unique name for the module based on file path to avoid conflicts
+    module_name = f"docnexus_plugin_{name}"
+    spec = importlib.util.spec_from_file_location(module_name, str(path))
+    if not spec or not spec.loader:
+        return None
+
+    module = importlib.util.module_from_spec(spec)
+
+    # --------------------------------------------------------------------
+    # DEPENDENCY INJECTION TO FIX SPLIT-BRAIN & IMPORT ERRORS
+    # --------------------------------------------------------------------
+    from docnexus.features.registry import Feature, FeatureType, FeatureState
+
+    # Inject classes directly into module namespace
+    module.Feature = Feature
+    module.FeatureType = FeatureType
+    module.FeatureState = FeatureState
+
+    # Mock PluginRegistry constructor to return our instance
+    module.PluginRegistry = lambda: registry_instance
+    # --------------------------------------------------------------------
+
+    # Execute module
+    spec.loader.exec_module(module)
+    return module
+
+
+class PluginTiming(NamedTuple):
+    name: str
+    path: str
+    import_ms: float      # Executing plugin.py
+    initialize_ms: float  # get_features() and registering features and blueprint
+    error: Optional[str]
+
+    @property
+    def total_ms(self) -> float:
+        return self.import_ms + self.initialize_ms
+
+
+# Latest load of each plugin, for /api/debug/features
+PLUGIN_TIMINGS: Dict[str, PluginTiming] = {}
+_TIMINGS_LOCK = threading.Lock()
+
+def get_plugin_timings() -> List[PluginTiming]:
+    """Per-plugin load durations, slowest first."""
+    with _TIMINGS_LOCK:
+        return sorted(PLUGIN_TIMINGS.values(), key=lambda t: t.total_ms, reverse=True)
 
-    # Iterate over subdirectories
-    count = 0
-    for item in plugin_dir.iterdir():
-        # debug_log(f"Scanning item: {item}")
-        if item.is_dir():
-            plugin_path = item / PLUGIN_FILE_NAME
-            # debug_log(f"Checking for {plugin_path}")
-            if plugin_path.exists():
-                logger.debug(f"Found plugin at {plugin_path}")
-                load_single_plugin(item.name, plugin_path, registry_instance)
-                count += 1
-            else:
-                 pass
-    logger.debug(f"Scanned {plugin_dir}, found {count} plugins.")
-
-def load_single_plugin(name: str, path: Path, registry_instance=None) -> None:
+def _record_timing(timing: PluginTiming, budget_ms: Optional[float]) -> None:
+    with _TIMINGS_LOCK:
+        PLUGIN_TIMINGS[timing.name] = timing
+    if budget_ms and timing.total_ms > budget_ms:
+        logger.warning(f"Loader: plugin '{timing.name}' took {timing.total_ms:.0f} ms to load "
+                       f"(import {timing.import_ms:.0f} ms, initialize {timing.initialize_ms:.0f} ms; "
+                       f"budget {budget_ms:.0f} ms). Consider activation_events or deferred imports.")
+
+def _resolve_registry(registry_instance):
+    from docnexus.features.registry import PluginRegistry
+    # Determine correct registry instance
+    # If injected from app, use it. Otherwise fall back to Singleton (riskier but supported).
+    return registry_instance if registry_instance else PluginRegistry()
+
+def _plugin_activation_events(name: str, path: Path) -> Optional[List[str]]:
+    """
+    None if the plugin is disabled, else its activation events ([] = load at startup).
+    Metadata comes from the manifest index (manifest.json or PLUGIN_METADATA parsed with
+    ast): plugins that stay disabled or inactive are never executed.
+    """
+    from docnexus.core.state import PluginState
+    state = PluginState.get_instance()
+
+    meta = get_manifest_index().get(path.parent)
+    is_enabled = False
+
+    # Determine if already tracked
+    if state.is_plugin_in_registry(name):
+         is_enabled = state.is_plugin_installed(name)
+    else:
+         # Plugins without a state record default to their 'preinstalled' metadata
+         is_preinstalled = bool(meta.get('preinstalled', False))
+         if is_preinstalled:
+             # Register default state
+             state.set_plugin_installed(name, True)
+         is_enabled = is_preinstalled
+
+    if not is_enabled:
+         logger.info(f"Skipping disabled plugin: {name}")
+         return None
+    return parse_activation_events(meta.get('activation_events'))
+
+def load_single_plugin(name: str, path: Path, registry_instance=None, activate: bool = False) -> None:
     """
     Loads a single plugin from a path, injecting dependencies to ensure
     it shares the same registry and class definitions as the core app.
+    Plugins declaring activation events are only imported when one fires
+    (core.activation), unless `activate` is set.
     """
     try:
-        from docnexus.core.state import PluginState
-        state = PluginState.get_instance()
-        
-        # 1. Peek at metadata to determine 'preinstalled' status (Cheap/Fast scan needed?)
-        # For now, we load proper metadata via import.
-        # But we must be careful not to execute heavy code.
-        # We rely on 'plugin.py' defining PLUGIN_METADATA at top level.
-        
-        # We create a dummy spec to check metadata BEFORE fully "registering" via loader?
-        # Actually, if we just import it to read metadata, we might trigger side effects.
-        # Safest way: READ status from state.
-        # If State has NO RECORD of this plugin, we need to default it.
-        # How do we know default? We MUST read the file.
-        # We use AST or importlib for metadata.
-        
-        is_enabled = False
-        
-        # Determine if already tracked
-        if state.is_plugin_in_registry(name):
-             is_enabled = state.is_plugin_installed(name)
+        events = _plugin_activation_events(name, path)
+        if events is None:
+            return
+        actual_registry = _resolve_registry(registry_instance)
+        if events and not activate:
+            _defer_plugin(name, path, events, actual_registry)
+            return
+        _load_plugin_module(name, path, actual_registry)
+    except Exception as e:
+        logger.error(f"Failed to load plugin '{name}': {e}", exc_info=True)
+
+def _defer_plugin(name: str, path: Path, events: List[str], actual_registry,
+                  budget_ms: Optional[float] = DEFAULT_PLUGIN_BUDGET_MS) -> None:
+    PluginActivation(name, path, events, actual_registry,
+                     load=lambda: _load_plugin_module(name, path, actual_registry, budget_ms)).register()
+
+def _load_plugin_module(name: str, path: Path, actual_registry,
+                        budget_ms: Optional[float] = DEFAULT_PLUGIN_BUDGET_MS) -> None:
+    """Execute an enabled plugin and register its features and blueprint."""
+    module, import_ms, error = _import_plugin_timed(name, path, actual_registry)
+    _register_plugin_module(name, path, module, import_ms, error, actual_registry, budget_ms)
+
+def _import_plugin_timed(name: str, path: Path, actual_registry):
+    """(module or None, import duration in ms, error). Safe to run in a worker thread."""
+    logger.info(f"Loading plugin '{name}' from {path}")
+    start = time.perf_counter()
+    try:
+        # Also a phase of the startup timeline (`docnexus --startup-profile`)
+        with PROFILE.phase(f"plugin import: {name}"):
+            module, error = import_plugin_module(name, path, actual_registry), None
+    except Exception as e:
+        logger.error(f"Failed to load plugin '{name}': {e}", exc_info=True)
+        module, error = None, str(e)
+    return module, (time.perf_counter() - start) * 1000, error
+
+def _register_plugin_module(name: str, path: Path, module, import_ms: float, error: Optional[str],
+                            actual_registry, budget_ms: Optional[float]) -> None:
+    """Register an imported plugin's features and blueprint (in the loading thread)."""
+    start = time.perf_counter()
+    try:
+        if module is not None:
+            with PROFILE.phase(f"plugin initialize: {name}"):
+                _register_plugin_features(name, path, module, actual_registry)
+    except Exception as e:
+        logger.error(f"Failed to load plugin '{name}': {e}", exc_info=True)
+        error = error or str(e)
+    initialize_ms = (time.perf_counter() - start) * 1000
+    _record_timing(PluginTiming(name, str(path), import_ms, initialize_ms, error), budget_ms)
+
+def _register_plugin_features(name: str, path: Path, module, actual_registry) -> None:
+    """Register the features and blueprint of an executed plugin module."""
+    logger.info(f"Successfully executed module: {name}")
+
+    # Verify and Register Features
+    if hasattr(module, 'get_features'):
+        features = module.get_features()
+        if not features:
+            logger.warning(f"Plugin {name} returned no features.")
         else:
-             # Not in registry. Determine default via import.
-             try:
-                 # Minimal import for metadata
-                 # import importlib.util  <-- REMOVE (Uses global)
-                 temp_spec = importlib.util.spec_from_file_location(f"temp_meta_{name}", str(path))
-                 if temp_spec and temp_spec.loader:
-                     temp_mod = importlib.util.module_from_spec(temp_spec)
-                     temp_spec.loader.exec_module(temp_mod)
-                     meta = getattr(temp_mod, 'PLUGIN_METADATA', {})
-                     is_preinstalled = meta.get('preinstalled', False)
-                     
-                     # Register default state
-                     state.set_plugin_installed(name, is_preinstalled)
-                     is_enabled = is_preinstalled
-             except Exception as meta_err:
-                 logger.warning(f"Metadata scan failed for {name}: {meta_err}. Defaulting to DISABLED.")
-                 state.set_plugin_installed(name, False)
-                 is_enabled = False
-        
-        if not is_enabled:
-             logger.info(f"Skipping disabled plugin: {name}")
-             return
+            count = 0
+            for f in features:
+                try:
+                    # Inject Plugin ID for State tracking, and the file export workers load
+                    f.meta['plugin_id'] = name
+                    f.meta['plugin_file'] = str(path)
+                    
+                    actual_registry.register(f)
+                    logger.debug(f"Loader: Registered feature '{f.name}' (Type: {f.type}) from {name}. Meta: {f.meta}")
+                    count += 1
+                except Exception as reg_err:
+                    logger.error(f"Loader: Failed to register feature {f.name} from {name}: {reg_err}")
+            
+            if count > 0:
+                logger.info(f"Loader: Successfully registered {count} features from {name}")
 
-        logger.info(f"Loading plugin '{name}' from {path}")
-        
-        # Use a unique name for the module based on file path to avoid conflicts
-        module_name = f"docnexus_plugin_{name}"
-        spec = importlib.util.spec_from_file_location(module_name, str(path))
+    # Check for Blueprint
+    if hasattr(module, 'blueprint'):
+        try:
+            actual_registry.register_blueprint(module.blueprint, plugin_id=name)
+            logger.info(f"Loader: Registered blueprint from {name}")
+        except Exception as bp_err:
+            logger.error(f"Loader: Failed to register blueprint from {name}: {bp_err}")
+    else:
+        logger.debug(f"Loader: No blueprint found in {name}")
         
-        if spec and spec.loader:
-            module = importlib.util.module_from_spec(spec)
-            
-            # --------------------------------------------------------------------
-            # DEPENDENCY INJECTION TO FIX SPLIT-BRAIN & IMPORT ERRORS
-            # --------------------------------------------------------------------
-            from docnexus.features.registry import Feature, FeatureType, FeatureState, PluginRegistry
-            
-            # Determine correct registry instance
-            # If injected from app, use it. Otherwise fall back to Singleton (riskier but supported).
-            actual_registry = registry_instance if registry_instance else PluginRegistry()
-            
-            # Inject classes directly into module namespace
-            module.Feature = Feature
-            module.FeatureType = FeatureType
-            module.FeatureState = FeatureState
-            
-            # Mock PluginRegistry constructor to return our instance
-            module.PluginRegistry = lambda: actual_registry
-            # --------------------------------------------------------------------
-            
-            # Execute module
-            spec.loader.exec_module(module)
-            logger.info(f"Successfully executed module: {name}")
-
-            # Verify and Register Features
-            if hasattr(module, 'get_features'):
-                features = module.get_features()
-                if not features:
-                    logger.warning(f"Plugin {name} returned no features.")
-                else:
-                    count = 0
-                    for f in features:
-                        try:
-                            # Inject Plugin ID for State tracking
-                            f.meta['plugin_id'] = name
-                            
-                            actual_registry.register(f)
-                            logger.info(f"Loader: Registered feature '{f.name}' (Type: {f.type}) from {name}. Meta: {f.meta}")
-                            count += 1
-                        except Exception as reg_err:
-                            logger.error(f"Loader: Failed to register feature {f.name} from {name}: {reg_err}")
-                    
-                    if count > 0:
-                        logger.info(f"Loader: Successfully registered {count} features from {name}")
 
-            # Check for Blueprint
-            if hasattr(module, 'blueprint'):
+def load_plugin_set(plugins: List[Tuple[str, Path]], registry_instance=None, max_workers: Optional[int] = None,
+                    budget_ms: Optional[float] = DEFAULT_PLUGIN_BUDGET_MS) -> None:
+    """
+    Load `plugins` ((name, plugin.py) pairs): the plugin files are executed concurrently
+    on a thread pool, then their features and blueprints are registered one plugin at a
+    time in the given order, so the registry looks the same whatever finishes first.
+    """
+    from docnexus.core.state import PluginState
+
+    actual_registry = _resolve_registry(registry_instance)
+    eager = []
+    # Enabled state and activation events first, in order: this may write plugin state,
+    # once for all the newly found preinstalled plugins
+    try:
+        with PluginState.get_instance().batch():
+            for name, path in plugins:
                 try:
-                    actual_registry.register_blueprint(module.blueprint)
-                    logger.info(f"Loader: Registered blueprint from {name}")
-                except Exception as bp_err:
-                    logger.error(f"Loader: Failed to register blueprint from {name}: {bp_err}")
-            else:
-                pass
-                logger.info(f"Loader: No get_features() found in {name}")
-                
-    except Exception as e:
-        logger.error(f"Failed to load plugin '{name}': {e}", exc_info=True)
+                    events = _plugin_activation_events(name, path)
+                    if events:
+                        _defer_plugin(name, path, events, actual_registry, budget_ms)
+                    elif events is not None:
+                        eager.append((name, path))
+                except Exception as e:
+                    logger.error(f"Failed to load plugin '{name}': {e}", exc_info=True)
+    except OSError as e:
+        logger.error(f"Loader: could not save plugin state: {e}")
+    if not eager:
+        return
+
+    workers = max(1, min(len(eager), max_workers or DEFAULT_LOAD_WORKERS))
+    if workers == 1:
+        for name, path in eager:
+            _load_plugin_module(name, path, actual_registry, budget_ms)
+        return
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="plugin-loader") as pool:
+        imports = [pool.submit(_import_plugin_timed, name, path, actual_registry) for name, path in eager]
+        for (name, path), future in zip(eager, imports):
+            module, import_ms, error = future.result()
+            _register_plugin_module(name, path, module, import_ms, error, actual_registry, budget_ms)
 
-def load_plugins(registry_instance=None) -> None:
+def load_plugins(registry_instance=None, max_workers: Optional[int] = None,
+                 budget_ms: Optional[float] = DEFAULT_PLUGIN_BUDGET_MS) -> None:
     """
     Main entry point to discover and load all available plugins.
     """
     search_paths = get_plugin_paths()
     logger.debug(f"Loader search paths: {[str(p) for p in search_paths]}")
     
+    plugins = []
     for path in search_paths:
         logger.info(f"Loader: Scanning path: {path}")
         if path.exists():
-            load_plugins_from_path(path, registry_instance)
+            plugins.extend(discover_plugins(path))
         else:
             logger.error(f"Loader: Search path does not exist: {path}")
+    load_plugin_set(plugins, registry_instance, max_workers, budget_ms)
@@ -0,0 +1,172 @@
+"""
+Plugin manifest index: plugin metadata without executing plugin code.
+
+The loader needs a plugin's PLUGIN_METADATA to decide whether a plugin it has no state
+for is enabled by default, and /api/plugins lists the metadata of every plugin found.
+Both used to get it by running or regex-parsing plugin.py, every time.
+
+Metadata now comes from the plugin folder's manifest.json when there is one, otherwise
+from the PLUGIN_METADATA literal found by parsing (not executing) plugin.py with ast.
+Results are kept in <base>/cache/plugin_index.json, keyed by each file's mtime and size
+with a content hash behind them: an unchanged plugin costs one stat() per file, a
+touched but identical one a hash, and only an edited one is parsed again.
+"""
+import ast
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+PLUGIN_FILE_NAME = "plugin.py"
+MANIFEST_FILE_NAME = "manifest.json"
+METADATA_NAME = "PLUGIN_METADATA"
+INDEX_FILE_NAME = "plugin_index.json"
+INDEX_VERSION = 1
+
+
+class PluginManifest(NamedTuple):
+    id: str
+    path: Path        # Plugin folder
+    base: Path        # Plugin directory it was found in
+    metadata: dict
+
+
+def parse_plugin_metadata(source: str, filename: str = PLUGIN_FILE_NAME) -> dict:
+    """The module-level PLUGIN_METADATA dict literal of a plugin source ({} if none)."""
+    metadata = {}
+    for node in ast.parse(source, filename).body:
+        if isinstance(node, ast.Assign):
+            targets, value = node.targets, node.value
+        elif isinstance(node, ast.AnnAssign) and node.value is not None:
+            targets, value = [node.target], node.value
+        else:
+            continue
+        if any(isinstance(target, ast.Name) and target.id == METADATA_NAME for target in targets):
+            metadata = ast.literal_eval(value)  # Last assignment wins, as when executed
+            if not isinstance(metadata, dict):
+                raise ValueError(f"{METADATA_NAME} is not a dict")
+    return metadata
+
+
+def read_plugin_metadata(plugin_dir: Path) -> dict:
+    """Metadata of a plugin folder: manifest.json, else PLUGIN_METADATA from plugin.py."""
+    manifest = plugin_dir / MANIFEST_FILE_NAME
+    if manifest.is_file():
+        metadata = json.loads(manifest.read_text(encoding='utf-8'))
+        if not isinstance(metadata, dict):
+            raise ValueError(f"{manifest} does not hold an object")
+        return metadata
+    plugin_file = plugin_dir / PLUGIN_FILE_NAME
+    return parse_plugin_metadata(plugin_file.read_text(encoding='utf-8'), str(plugin_file))
+
+
+class ManifestIndex:
+    """Plugin metadata cached on disk (`index_path`, None for memory only)."""
+
+    def __init__(self, index_path: Optional[Path] = None):
+        self.index_path = Path(index_path) if index_path else None
+        self._entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self.parsed = 0  # Metadata reads that were not served from the index
+        self._load()
+
+    def _load(self):
+        if not self.index_path or not self.index_path.is_file():
+            return
+        try:
+            data = json.loads(self.index_path.read_text(encoding='utf-8'))
+            if data.get('version') == INDEX_VERSION:
+                self._entries = data.get('plugins', {})
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"PluginIndex: ignoring unreadable index {self.index_path}: {e}")
+
+    def _save(self):
+        if not self.index_path:
+            return
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.index_path.with_name(f"{self.index_path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps({'version': INDEX_VERSION, 'plugins': self._entries}, indent=1),
+                           encoding='utf-8')
+            os.replace(tmp, self.index_path)  # Atomic: other processes read a whole index
+        except OSError as e:
+            logger.warning(f"PluginIndex: could not write {self.index_path}: {e}")
+
+    @staticmethod
+    def _source_files(plugin_dir: Path) -> List[Path]:
+        return [plugin_dir / name for name in (MANIFEST_FILE_NAME, PLUGIN_FILE_NAME)
+                if (plugin_dir / name).is_file()]
+
+    @staticmethod
+    def _stats(files: List[Path]) -> list:
+        stats = []
+        for path in files:
+            st = path.stat()
+            stats.append([path.name, st.st_mtime_ns, st.st_size])
+        return stats
+
+    @staticmethod
+    def _digest(files: List[Path]) -> str:
+        digest = hashlib.sha256()
+        for path in files:
+            digest.update(path.name.encode('utf-8') + b'\0' + path.read_bytes() + b'\0')
+        return digest.hexdigest()
+
+    def get(self, plugin_dir: Path) -> dict:
+        """Metadata of the plugin in `plugin_dir` ({} if it has none or it is unreadable)."""
+        key = str(Path(plugin_dir).resolve())
+        with self._lock:
+            try:
+                files = self._source_files(plugin_dir)
+                stats = self._stats(files)
+            except OSError as e:
+                logger.warning(f"PluginIndex: cannot read plugin {plugin_dir}: {e}")
+                return {}
+            entry = self._entries.get(key)
+            if entry and entry.get('stats') == stats:
+                return dict(entry['metadata'])
+
+            digest = self._digest(files)
+            if not (entry and entry.get('sha256') == digest):
+                self.parsed += 1
+                try:
+                    metadata = read_plugin_metadata(plugin_dir)
+                    error = None
+                except Exception as e:
+                    # Cached too: a broken plugin is not re-parsed until it changes
+                    logger.warning(f"PluginIndex: no metadata for {plugin_dir.name}: {e}")
+                    metadata, error = {}, str(e)
+                entry = {'metadata': metadata, 'sha256': digest, 'error': error}
+            self._entries[key] = dict(entry, stats=stats)
+            self._save()
+            return dict(entry['metadata'])
+
+    def discover(self, search_paths: Iterable[Path]) -> List[PluginManifest]:
+        """Every plugin folder (containing plugin.py) under `search_paths`, in name order."""
+        found = []
+        for base in search_paths:
+            if not base.is_dir():
+                continue
+            for item in sorted(base.iterdir(), key=lambda p: p.name):
+                if item.is_dir() and (item / PLUGIN_FILE_NAME).is_file():
+                    found.append(PluginManifest(item.name, item, base, self.get(item)))
+        return found
+
+
+_INDEX: Optional[ManifestIndex] = None
+_INDEX_LOCK = threading.Lock()
+
+
+def get_manifest_index() -> ManifestIndex:
+    """The process-wide index, stored under <base>/cache (see core.loader.get_base_path)."""
+    global _INDEX
+    with _INDEX_LOCK:
+        if _INDEX is None:
+            from docnexus.core.loader import get_base_path
+            _INDEX = ManifestIndex(get_base_path() / "cache" / INDEX_FILE_NAME)
+        return _INDEX
@@ -0,0 +1,340 @@
+"""
+Chunked, parallel PDF rendering for long documents.
+
+xhtml2pdf lays out the whole document in a single thread and keeps every page in memory
+until the end, so a 300 page manual takes minutes and several GB of RSS. For large
+documents the cleaned DOM is split at top-level section boundaries, each chunk is
+rendered in a worker process and the resulting PDFs are merged with pypdf:
+
+- Bookmarks are rebuilt from the headings of every chunk, with page offsets applied.
+- Internal links that cross a chunk boundary are rewritten to a placeholder URI before
+  rendering and resolved to the right page after merging.
+
+Peak memory per process is bounded by the largest chunk instead of the whole document.
+The worker function lives here (not in the plugin) because plugin modules are loaded
+from file paths and cannot be imported by name inside pool processes.
+
+The pool is started once (with the 'spawn' method: forking the multithreaded server
+could copy held locks into the children) and shared by all chunked exports.
+"""
+import copy
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+from bs4 import Tag
+
+from docnexus.core.startup import module_available
+
+logger = logging.getLogger(__name__)
+
+HEADING_TAGS = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+
+# Placeholder for links whose target ends up in another chunk
+CROSS_CHUNK_PREFIX = 'https://docnexus.invalid/anchor/'
+
+
+def is_available() -> bool:
+    return module_available('pypdf')
+
+
+class PdfChunk:
+    """One slice of the document: its HTML and the anchors/headings it contains, in DOM order."""
+
+    def __init__(self, html: str, headings: List[Tuple[int, Optional[str], str]], anchors: List[Tuple[str, int]]):
+        self.html = html
+        self.headings = headings  # [(level, id, text)]
+        self.anchors = anchors    # [(id, index of the preceding heading, -1 if none)]
+
+
+# -------------------------------------------------------------------------
+# Splitting
+# -------------------------------------------------------------------------
+def _find_section_root(root: Tag) -> Optional[Tag]:
+    first = root.find(HEADING_TAGS)
+    return first.parent if first is not None else None
+
+
+def _split_level(section_root: Tag) -> Optional[str]:
+    """The top-level heading used as section boundary (a single title h1 is skipped)."""
+    direct = [child.name for child in section_root.find_all(HEADING_TAGS, recursive=False)]
+    for name in HEADING_TAGS:
+        if direct.count(name) >= 2:
+            return name
+    return direct[0] if direct else None
+
+
+def _normalize_title(text: str) -> str:
+    return " ".join(text.split())
+
+
+def _shell(node: Tag) -> Tag:
+    """Copy of a tag without its children."""
+    clone = copy.copy(node)
+    clone.clear()
+    return clone
+
+
+def split_into_chunks(root: Tag, chunk_bytes: int) -> List[List[Tag]]:
+    """
+    Split `root` (the printable body) into chunks of roughly `chunk_bytes` serialized HTML.
+
+    Returns a list of top-level node lists. The first chunk is `root` itself (keeping
+    everything outside the section container, e.g. the TOC); later chunks are copies of
+    the section container's ancestor chain holding a run of sections, so they keep the
+    same classes/CSS context.
+    """
+    section_root = _find_section_root(root)
+    level = _split_level(section_root) if section_root is not None else None
+    if level is None:
+        return [[root]]
+
+    # 1. Group direct children into sections
+    sections: List[List] = [[]]
+    for child in list(section_root.children):
+        if isinstance(child, Tag) and child.name == level and sections[-1]:
+            sections.append([])
+        sections[-1].append(child)
+
+    # 2. Pack consecutive sections into chunks
+    groups: List[List] = [[]]
+    size = 0
+    for section in sections:
+        section_size = sum(len(str(node)) for node in section)
+        if groups[-1] and size + section_size > chunk_bytes:
+            groups.append([])
+            size = 0
+        groups[-1].extend(section)
+        size += section_size
+
+    if len(groups) == 1:
+        return [[root]]
+
+    # 3. Move later groups out into copies of the ancestor chain
+    chain = []
+    node = section_root
+    while node is not None and node is not root:
+        chain.append(node)
+        node = node.parent
+    chain.reverse()
+
+    chunks = [[root]]
+    for group in groups[1:]:
+        if not chain:
+            # Sections are direct children of the body
+            chunks.append([item.extract() for item in group])
+            continue
+        top = inner = None
+        for ancestor in chain:
+            shell = _shell(ancestor)
+            # ids must stay unique in the merged document
+            if shell.has_attr('id'):
+                del shell['id']
+            if inner is None:
+                top = shell
+            else:
+                inner.append(shell)
+            inner = shell
+        for item in group:
+            inner.append(item.extract())
+        chunks.append([top])
+    return chunks
+
+
+def prepare_chunks(groups: List[List[Tag]]) -> List[PdfChunk]:
+    """Record headings/anchors per chunk and rewrite links that cross chunk boundaries."""
+    owner: Dict[str, int] = {}
+    for index, nodes in enumerate(groups):
+        for node in nodes:
+            if not isinstance(node, Tag):
+                continue
+            for el in node.find_all(id=True):
+                owner.setdefault(el['id'], index)
+
+    chunks = []
+    for index, nodes in enumerate(groups):
+        headings = []
+        anchors = []
+        for node in nodes:
+            if not isinstance(node, Tag):
+                continue
+            for el in node.find_all(True):
+                if el.name in HEADING_TAGS:
+                    headings.append((int(el.name[1]), el.get('id'), _normalize_title(el.get_text())))
+                if el.get('id'):
+                    anchors.append((el['id'], len(headings) - 1))
+                href = el.get('href') if el.name == 'a' else None
+                if href and href.startswith('#') and owner.get(href[1:], index) != index:
+                    el['href'] = CROSS_CHUNK_PREFIX + href[1:]
+        html = "".join(
+            node.decode_contents() if isinstance(node, Tag) and node.name in ('body', '[document]') else str(node)
+            for node in nodes
+        )
+        chunks.append(PdfChunk(html, headings, anchors))
+    return chunks
+
+
+# -------------------------------------------------------------------------
+# Rendering (runs in worker processes)
+# -------------------------------------------------------------------------
+def render_html_to_pdf(full_html: str) -> bytes:
+    from xhtml2pdf import pisa
+
+    result = io.BytesIO()
+    status = pisa.CreatePDF(full_html, dest=result)
+    if status.err:
+        raise RuntimeError(f"PDF generation error: {status.err}")
+    return result.getvalue()
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """The shared render pool, replaced by a larger one if `workers` exceeds its size."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or workers > _pool_workers:
+            previous = _pool
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _pool_workers = workers
+            if previous is not None:
+                previous.shutdown(wait=False)  # Exports still using it finish first
+            logger.info(f"PDFChunks: Started {workers} render processes.")
+        return _pool
+
+
+def _discard_pool(pool: Optional[ProcessPoolExecutor]):
+    """Drop a broken pool; the next chunked export starts a new one."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if pool is not None and pool is _pool:
+            _pool, _pool_workers = None, 0
+    if pool is not None:
+        pool.shutdown(wait=False)
+
+
+def shutdown_pool(wait: bool = True):
+    """Stop the render processes (a new pool starts on the next chunked export)."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        pool, _pool, _pool_workers = _pool, None, 0
+    if pool is not None:
+        pool.shutdown(wait=wait, cancel_futures=True)
+
+
+def render_all(documents: List[str], max_workers: int) -> List[bytes]:
+    """Render complete HTML documents to PDF in the shared process pool (sequential fallback)."""
+    workers = max(1, min(max_workers, len(documents), os.cpu_count() or 1))
+    if workers > 1:
+        pool = None
+        try:
+            pool = _get_pool(workers)
+            return list(pool.map(render_html_to_pdf, documents))
+        except (OSError, BrokenProcessPool) as e:
+            # Pool unavailable (sandbox, frozen build without freeze_support...) or worker crash
+            logger.warning(f"PDFChunks: Process pool failed ({e}), rendering sequentially.")
+            _discard_pool(pool)
+    return [render_html_to_pdf(html) for html in documents]
+
+
+# -------------------------------------------------------------------------
+# Merging
+# -------------------------------------------------------------------------
+def _flatten_outline(reader, items, depth=0, out=None):
+    out = [] if out is None else out
+    for item in items:
+        if isinstance(item, list):
+            _flatten_outline(reader, item, depth + 1, out)
+        else:
+            out.append((depth, item.title, reader.get_destination_page_number(item)))
+    return out
+
+
+def merge_pdfs(chunks: List[PdfChunk], pdfs: List[bytes], dest: BinaryIO):
+    """Merge rendered chunks into `dest` with bookmark and cross-chunk link fix-up."""
+    import pypdf  # Imported on the first chunked export, see core.startup
+    from pypdf.generic import ArrayObject, NameObject
+
+    writer = pypdf.PdfWriter()
+    outline_entries = []  # (level, title, absolute page)
+    anchor_pages: Dict[str, int] = {}
+
+    for chunk, data in zip(chunks, pdfs):
+        reader = pypdf.PdfReader(io.BytesIO(data))
+        offset = len(writer.pages)
+        writer.append(reader, import_outline=False)
+
+        flat = _flatten_outline(reader, reader.outline)
+
+        # xhtml2pdf outlines every heading, but when a chunk starts below level 1 it also
+        # inserts placeholder parents. Align entries with the chunk's headings by title.
+        heading_pages = []
+        aligned = []
+        for depth, title, page in flat:
+            index = len(heading_pages)
+            if index < len(chunk.headings) and _normalize_title(title) == chunk.headings[index][2]:
+                heading_pages.append(offset + page)
+                aligned.append((chunk.headings[index][0], title, offset + page))
+
+        if len(heading_pages) == len(chunk.headings):
+            outline_entries.extend(aligned)
+        else:
+            # Unexpected outline shape: keep the chunk's own structure, relative to its first heading
+            base_level = chunk.headings[0][0] if chunk.headings else 1
+            outline_entries.extend((base_level + depth, title, offset + page) for depth, title, page in flat)
+            heading_pages = []
+
+        for anchor_id, heading_index in chunk.anchors:
+            if 0 <= heading_index < len(heading_pages):
+                anchor_pages.setdefault(anchor_id, heading_pages[heading_index])
+            else:
+                anchor_pages.setdefault(anchor_id, offset)
+
+    # Bookmarks: rebuild a single tree across chunks
+    parents = []  # stack of (level, outline item)
+    for level, title, page in outline_entries:
+        while parents and parents[-1][0] >= level:
+            parents.pop()
+        item = writer.add_outline_item(title, page, parent=parents[-1][1] if parents else None, is_open=False)
+        parents.append((level, item))
+
+    # Cross-chunk links: placeholder URI -> page destination
+    for page in writer.pages:
+        for annot_ref in page.get('/Annots') or []:
+            annot = annot_ref.get_object()
+            action = annot.get('/A')
+            uri = action.get_object().get('/URI') if action is not None else None
+            if not uri or not str(uri).startswith(CROSS_CHUNK_PREFIX):
+                continue
+            target = anchor_pages.get(str(uri)[len(CROSS_CHUNK_PREFIX):])
+            del annot[NameObject('/A')]
+            if target is not None:
+                annot[NameObject('/Dest')] = ArrayObject([
+                    writer.pages[target].indirect_reference, NameObject('/Fit')
+                ])
+
+    writer.write(dest)
+
+
+def render_chunked(root: Tag, wrap, chunk_bytes: int, max_workers: int, dest: BinaryIO) -> bool:
+    """
+    Split, render in parallel and merge into `dest`. `wrap(body_html) -> full_html`
+    applies the exporter's template/CSS to each chunk.
+    Returns False (nothing written) if the document does not split.
+    """
+    groups = split_into_chunks(root, chunk_bytes)
+    if len(groups) < 2:
+        return False
+    chunks = prepare_chunks(groups)
+    logger.info(f"PDFChunks: Rendering {len(chunks)} chunks with up to {max_workers} workers.")
+    pdfs = render_all([wrap(chunk.html) for chunk in chunks], max_workers)
+    merge_pdfs(chunks, pdfs, dest)
+    return True
@@ -0,0 +1,129 @@
+"""
+In-memory cache of rendered documents.
+
+Rendering a workspace document (feature pipeline + python-markdown with ~30 extensions
++ link rewriting) is the expensive part of both viewing and exporting it. The result
+is cached per (path, mtime, size, variant): viewing a document and then exporting it,
+or exporting it to several formats, renders it once.
+
+The variant string identifies the rendering configuration (pipeline steps, experimental
+features, export options); callers build it, see app._render_variant().
+
+A rendering also depends on other files, recorded with the entry and checked on every
+hit (the same dependencies static_site keeps in its build manifest):
+- the files it includes (`--8<--` snippets): stale once their mtime or size changes,
+- its relative link targets: stale once one appears or disappears (broken-link marks).
+"""
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 64
+
+RenderResult = Tuple[str, str]  # (html, toc)
+Dependency = Tuple[str, str, object]  # (kind, path, state when rendered), see dependency_state()
+
+_SNIPPET_RE = re.compile(r'^\s*-{1,}8<-{1,}\s+(["\'])(.+?)\1', re.MULTILINE)
+_SNIPPET_BLOCK_RE = re.compile(r'^\s*-{1,}8<-{1,}\s*$\n(.*?)^\s*-{1,}8<-{1,}\s*$', re.MULTILINE | re.DOTALL)
+
+
+def snippet_includes(source: str) -> List[str]:
+    """Files included with pymdownx.snippets (`--8<-- "file"` lines and blocks)."""
+    includes = [m.group(2) for m in _SNIPPET_RE.finditer(source)]
+    for block in _SNIPPET_BLOCK_RE.findall(source):
+        includes.extend(line.strip() for line in block.splitlines()
+                        if line.strip() and not line.strip().startswith(';'))
+    return includes
+
+
+def dependency_state(kind: str, path: str) -> object:
+    """'file': (mtime, size) or None if missing; 'exists': whether the path exists."""
+    if kind == 'exists':
+        return os.path.exists(path)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def file_dependencies(paths: Iterable) -> List[Dependency]:
+    return [('file', str(path), dependency_state('file', str(path))) for path in paths]
+
+
+class RenderCache:
+    """Thread-safe LRU of rendered (html, toc) keyed by file identity and render variant."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[tuple, Tuple[RenderResult, Tuple[Dependency, ...]]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0  # Entries dropped because a dependency changed
+
+    @staticmethod
+    def make_key(path: Path, variant: str) -> Optional[tuple]:
+        """Key for the current state of `path`; None if the file cannot be stat'ed."""
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        return (str(path.resolve()), stat.st_mtime_ns, stat.st_size, variant)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: Optional[tuple]) -> Optional[RenderResult]:
+        if key is None or not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            result, dependencies = entry
+            # Checked outside the lock: stat() calls
+            if all(dependency_state(kind, path) == state for kind, path, state in dependencies):
+                with self._lock:
+                    if key in self._entries:
+                        self._entries.move_to_end(key)
+                    self.hits += 1
+                return result
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+                self.invalidations += 1
+                logger.debug(f"RenderCache: {key[0]} is stale (an include or link target changed)")
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: Optional[tuple], result: RenderResult, dependencies: Iterable[Dependency] = ()):
+        """Store `result`, valid while every dependency keeps the state recorded in it."""
+        if key is None or not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (result, tuple(dependencies))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
@@ -1,25 +1,11 @@
 from typing import List, Callable
-import markdown
 import re
-import pymdownx.superfences
-import pymdownx.emoji
-import pymdownx.saneheaders
-# pymdownx.smarty removed (deprecated in v10)
-import pymdownx.critic
-import pymdownx.magiclink
-import pymdownx.tasklist
-import markdown.extensions.meta
-import markdown.extensions.wikilinks
 import logging
-# Explicit imports to force PyInstaller detection and runtime availability
-import markdown.extensions.wikilinks
-import markdown.extensions.smarty
-import markdown.extensions.admonition
-import markdown.extensions.meta
-import markdown.extensions.toc
-import markdown.extensions.fenced_code
-import markdown.extensions.tables
-import markdown.extensions.codehilite
+from functools import lru_cache
+
+# Python-Markdown and the pymdownx extensions are imported on the first render, not at
+# import time (see core.startup). Markdown loads the extensions named in render_baseline();
+# frozen builds bundle them through scripts/build.py.
 
 logger = logging.getLogger(__name__)
 
@@ -95,19 +81,32 @@ def render_github_alerts(md_text: str) -> str:
 
 
 
-# Patch standard WikiLinkExtension to allow dots in filenames (e.g. [[v1.2.6]])
-from markdown.extensions.wikilinks import WikiLinkExtension, WikiLinksInlineProcessor
+@lru_cache(maxsize=None)
+def _wikilink_extension_class():
+    """EnhancedWikiLinkExtension, defined on first use (it subclasses a Markdown class)."""
+    # Patch standard WikiLinkExtension to allow dots in filenames (e.g. [[v1.2.6]])
+    from markdown.extensions.wikilinks import WikiLinkExtension, WikiLinksInlineProcessor
+
+    class EnhancedWikiLinkExtension(WikiLinkExtension):
+        def extendMarkdown(self, md):
+            self.md = md
+            # Regex to match [[WikiLink]] including dots and standard chars
+            # Original: \[\[([\w0-9_ -]+)\]\]
+            WIKILINK_RE = r'\[\[([\w0-9_ \-\.]+)\]\]'
+            config = self.getConfigs()
+            wikilinkPattern = WikiLinksInlineProcessor(WIKILINK_RE, config)
+            wikilinkPattern.md = md
+            md.inlinePatterns.register(wikilinkPattern, 'wikilink', 75)
+
+    return EnhancedWikiLinkExtension
+
+
+def __getattr__(name):
+    # Kept importable by name, without importing Markdown up front
+    if name == 'EnhancedWikiLinkExtension':
+        return _wikilink_extension_class()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-class EnhancedWikiLinkExtension(WikiLinkExtension):
-    def extendMarkdown(self, md):
-        self.md = md
-        # Regex to match [[WikiLink]] including dots and standard chars
-        # Original: \[\[([\w0-9_ -]+)\]\]
-        WIKILINK_RE = r'\[\[([\w0-9_ \-\.]+)\]\]'
-        config = self.getConfigs()
-        wikilinkPattern = WikiLinksInlineProcessor(WIKILINK_RE, config)
-        wikilinkPattern.md = md
-        md.inlinePatterns.register(wikilinkPattern, 'wikilink', 75)
 
 def render_baseline(md_text: str) -> str:
     # 1. Remove [TOC] marker
@@ -119,6 +118,11 @@ def render_baseline(md_text: str) -> str:
     # 3. Pre-process GitHub Alerts
     md_text = render_github_alerts(md_text)
     
+    import markdown
+    import pymdownx.emoji
+    import pymdownx.superfences
+    EnhancedWikiLinkExtension = _wikilink_extension_class()
+
     # Render markdown to HTML
     md_instance = markdown.Markdown(
         extensions=[
@@ -0,0 +1,174 @@
+"""
+Compressed request bodies (Content-Encoding: gzip / br).
+
+Exports and previews post whole documents (page HTML as a JSON string, or markdown in a
+form) and those compress 5-10x. RequestDecompressionMiddleware decodes such bodies before
+Flask sees them, so views keep using request.json / request.form unchanged:
+
+- the body is decompressed chunk by chunk into a spooled temp file (memory up to
+  `spool_memory`, then disk), never as one in-memory blob;
+- the decompressed size is capped at `max_size`: decoding stops as soon as the ceiling is
+  crossed (413), so a small "zip bomb" cannot expand without bound;
+- corrupt or truncated bodies are rejected with 400, unknown encodings with 415.
+
+Brotli needs the optional `brotli` package, version 1.2 or later: older bindings cannot
+bound the output of a decode step. Without it 'br' bodies get 415 and clients fall back to
+gzip (the bundled front-end only sends gzip, see static/js/compression.js).
+"""
+import json
+import logging
+import tempfile
+import zlib
+from typing import Iterator
+
+from werkzeug.wsgi import ClosingIterator, get_input_stream
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# process(..., output_buffer_limit=) and can_accept_more_data() (brotli >= 1.2)
+BROTLI_BOUNDED = brotli is not None and hasattr(brotli.Decompressor, 'can_accept_more_data')
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK = 64 * 1024
+DEFAULT_SPOOL_MEMORY = 8 * 1024 * 1024
+
+
+class BodyTooLarge(ValueError):
+    """Decompressed body exceeds the configured ceiling."""
+
+
+class BodyDecodeError(ValueError):
+    """Body is not valid data for its Content-Encoding."""
+
+
+def supported_encodings():
+    """Content-Encodings accepted on requests."""
+    return ('gzip', 'br') if BROTLI_BOUNDED else ('gzip',)
+
+
+def _read_chunks(stream) -> Iterator[bytes]:
+    while True:
+        chunk = stream.read(READ_CHUNK)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _iter_gzip(stream, limit: int) -> Iterator[bytes]:
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    try:
+        for chunk in _read_chunks(stream):
+            # max_length bounds every step, highly compressible input is expanded
+            # piecewise through unconsumed_tail instead of all at once
+            data = chunk
+            while data and not decoder.eof:
+                yield decoder.decompress(data, limit)
+                data = decoder.unconsumed_tail
+            if decoder.eof:
+                break
+        yield decoder.flush()
+    except zlib.error as e:
+        raise BodyDecodeError(f"Invalid gzip body: {e}")
+    if not decoder.eof:
+        raise BodyDecodeError("Truncated gzip body")
+
+
+def _iter_brotli(stream, limit: int) -> Iterator[bytes]:
+    decoder = brotli.Decompressor()
+    try:
+        for chunk in _read_chunks(stream):
+            # As gzip: every step stops growing its output once `limit` is reached (it can
+            # exceed it by one internal block, ~32 KB) and the rest is drained with empty
+            # input before the next chunk is fed
+            data = chunk
+            while True:
+                output = decoder.process(data, output_buffer_limit=limit)
+                data = b''
+                yield output
+                if decoder.is_finished() or (not output and decoder.can_accept_more_data()):
+                    break
+            if decoder.is_finished():
+                break
+        finished = decoder.is_finished()
+    except brotli.error as e:
+        raise BodyDecodeError(f"Invalid brotli body: {e}")
+    if not finished:
+        raise BodyDecodeError("Truncated brotli body")
+
+
+def decode_body(stream, encoding: str, max_size: int, spool_memory: int = DEFAULT_SPOOL_MEMORY):
+    """
+    Decompress `stream` into a spooled temp file positioned at 0.
+    Returns (file, size). Raises BodyTooLarge / BodyDecodeError, or LookupError for an
+    unsupported encoding.
+    """
+    if encoding in ('gzip', 'x-gzip'):
+        chunks = _iter_gzip(stream, READ_CHUNK)
+    elif encoding == 'br' and BROTLI_BOUNDED:
+        chunks = _iter_brotli(stream, READ_CHUNK)
+    else:
+        raise LookupError(encoding)
+
+    body = tempfile.SpooledTemporaryFile(max_size=spool_memory)
+    size = 0
+    try:
+        for data in chunks:
+            size += len(data)
+            if size > max_size:
+                raise BodyTooLarge(f"Decompressed body exceeds {max_size} bytes")
+            body.write(data)
+    except Exception:
+        body.close()
+        raise
+    body.seek(0)
+    return body, size
+
+
+def _error_response(start_response, status, error, message):
+    payload = json.dumps({"error": error, "message": message}).encode('utf-8')
+    start_response(status, [
+        ('Content-Type', 'application/json'),
+        ('Content-Length', str(len(payload))),
+    ])
+    return [payload]
+
+
+class RequestDecompressionMiddleware:
+    """WSGI middleware: replaces a gzip/br request body by its decoded form."""
+
+    def __init__(self, wsgi_app, max_size: int, spool_memory: int = DEFAULT_SPOOL_MEMORY):
+        self.wsgi_app = wsgi_app
+        self.max_size = max_size
+        self.spool_memory = spool_memory
+
+    def __call__(self, environ, start_response):
+        encoding = environ.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+        if not encoding or encoding == 'identity':
+            return self.wsgi_app(environ, start_response)
+
+        try:
+            body, size = decode_body(get_input_stream(environ), encoding, self.max_size, self.spool_memory)
+        except LookupError:
+            return _error_response(
+                start_response, '415 UNSUPPORTED MEDIA TYPE', "Unsupported Content-Encoding",
+                f"'{encoding}' is not supported; use one of: {', '.join(supported_encodings())}.")
+        except BodyTooLarge:
+            max_mb = self.max_size / (1024 * 1024)
+            logger.warning(f"Rejected {encoding} request to {environ.get('PATH_INFO')}: "
+                           f"decompressed body exceeds {max_mb:.0f} MB")
+            return _error_response(
+                start_response, '413 REQUEST ENTITY TOO LARGE', "Request Too Large",
+                f"The decompressed request body exceeds the maximum of {max_mb:.0f} MB.")
+        except BodyDecodeError as e:
+            logger.warning(f"Rejected {encoding} request to {environ.get('PATH_INFO')}: {e}")
+            return _error_response(start_response, '400 BAD REQUEST', "Invalid Request Body", str(e))
+
+        environ['wsgi.input'] = body
+        environ['CONTENT_LENGTH'] = str(size)
+        environ.pop('HTTP_CONTENT_ENCODING', None)
+        environ.pop('wsgi.input_terminated', None)
+        return ClosingIterator(self.wsgi_app(environ, start_response), body.close)
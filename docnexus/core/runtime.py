@@ -0,0 +1,80 @@
+"""
+Runtime snapshot: what a request reads, bundled and immutable.
+
+Request handlers used to read the workspace root (MD_FOLDER, reassigned when the active
+workspace changes), CONFIG and the feature table (changed by the plugin APIs) as module
+globals, each at a different moment. A RuntimeSnapshot freezes them together with the
+pipelines built from that feature table; a request takes one and uses it throughout.
+
+Updates never touch a published snapshot: the sources (the MD_FOLDER and CONFIG globals,
+FeatureManager's copy-on-write table) are replaced and RuntimeState.get() builds a new
+snapshot when it sees that one of them is no longer the object it was built from. That
+check is three identity comparisons, so reads take no lock; building is serialized.
+"""
+import copy
+import logging
+import threading
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Callable, Mapping, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class RuntimeSnapshot(NamedTuple):
+    generation: int
+    md_folder: Optional[Path]
+    config: Mapping[str, Any]       # Read-only view of a private copy
+    features: Tuple[Any, ...]
+    pipelines: Mapping[bool, Any]   # Pipeline by enable_experimental
+
+    def pipeline(self, enable_experimental: bool = False):
+        return self.pipelines[bool(enable_experimental)]
+
+
+class RuntimeState:
+    """
+    The current RuntimeSnapshot of the objects `sources()` returns: (workspace folder,
+    config dict, FeatureManager).
+    """
+
+    def __init__(self, sources: Callable[[], tuple]):
+        self._sources = sources
+        self._current: tuple = (None, ())  # (snapshot, the sources it was built from), swapped as one
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def _current_sources(self) -> tuple:
+        md_folder, config, features = self._sources()
+        return md_folder, config, features, features._features
+
+    def _is_current(self, built_from: tuple, sources: tuple) -> bool:
+        return len(built_from) == len(sources) and all(a is b for a, b in zip(built_from, sources))
+
+    def get(self) -> RuntimeSnapshot:
+        snapshot, built_from = self._current
+        sources = self._current_sources()
+        if snapshot is not None and self._is_current(built_from, sources):
+            return snapshot
+        with self._lock:
+            snapshot, built_from = self._current
+            sources = self._current_sources()
+            if snapshot is None or not self._is_current(built_from, sources):
+                snapshot = self._publish(sources)
+            return snapshot
+
+    def _publish(self, sources: tuple) -> RuntimeSnapshot:
+        md_folder, config, features, table = sources
+        self._generation += 1
+        snapshot = RuntimeSnapshot(
+            generation=self._generation,
+            md_folder=Path(md_folder) if md_folder is not None else None,
+            config=MappingProxyType(copy.deepcopy(dict(config or {}))),
+            features=tuple(table),
+            pipelines=MappingProxyType({flag: features.build_pipeline(enable_experimental=flag, features=table)
+                                        for flag in (False, True)}),
+        )
+        self._current = (snapshot, sources)
+        logger.debug(f"Runtime: published snapshot {snapshot.generation} ({len(table)} features, "
+                     f"workspace {snapshot.md_folder})")
+        return snapshot
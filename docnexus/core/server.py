@@ -0,0 +1,286 @@
+"""
+Production server mode (`docnexus start --workers N --threads M`).
+
+Pre-fork model on top of Werkzeug's WSGI server (no extra dependency):
+
+- The supervisor imports the app (config, plugins, features), warms the renderer, then
+  `gc.freeze()`s everything before forking, so workers share those pages copy-on-write
+  instead of each paying the startup and holding its own copy.
+- The supervisor binds the listening socket; every worker accepts on it with a bounded
+  pool of `threads` request threads. A busy worker stops accepting, so new connections
+  go to idle workers.
+- A worker retires after `max_requests` (+ random jitter, so workers do not all recycle
+  at once): it stops accepting, finishes its in-flight requests and exits; the supervisor
+  forks a fresh one. This bounds memory growth from caches and fragmentation.
+- SIGTERM/SIGINT stop the workers gracefully; SIGHUP recycles all of them.
+
+Where fork() is unavailable (Windows) a single process serves with the thread pool.
+"""
+import gc
+import logging
+import logging.handlers
+import os
+import random
+import signal
+import socket
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THREADS = 8
+DEFAULT_MAX_REQUESTS = 0  # Never recycle
+DEFAULT_GRACEFUL_TIMEOUT = 30
+LISTEN_BACKLOG = 2048
+
+
+class _RequestHandler(WSGIRequestHandler):
+    # One request per connection: an idle keep-alive client must not pin a pool thread
+    protocol_version = "HTTP/1.0"
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """WSGI server handling requests on at most `threads` threads at a time."""
+
+    multithread = True
+
+    def __init__(self, host: str, port: int, app, threads: int = DEFAULT_THREADS, fd: Optional[int] = None):
+        super().__init__(host, port, app, handler=_RequestHandler, fd=fd)
+        self._slots = threading.BoundedSemaphore(max(1, threads))
+        self._active: set = set()
+        self._active_lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        # Blocks the accept loop while all threads are busy (back-pressure to the other workers)
+        self._slots.acquire()
+        thread = threading.Thread(target=self._process, args=(request, client_address), daemon=True)
+        with self._active_lock:
+            self._active.add(thread)
+        thread.start()
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            with self._active_lock:
+                self._active.discard(threading.current_thread())
+            self._slots.release()
+
+    def wait_idle(self, timeout: float):
+        """Wait for in-flight requests to finish (graceful stop)."""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._active_lock:
+                active = list(self._active)
+            if not active or time.monotonic() >= deadline:
+                return not active
+            active[0].join(max(0.0, min(0.5, deadline - time.monotonic())))
+
+
+class RequestCounter:
+    """WSGI middleware calling `on_limit` once after `limit` requests."""
+
+    def __init__(self, app, limit: int, on_limit: Callable[[], None]):
+        self.app = app
+        self.limit = limit
+        self.on_limit = on_limit
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        with self._lock:
+            self.count += 1
+            reached = self.count == self.limit
+        if reached:
+            self.on_limit()
+        return self.app(environ, start_response)
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.create_server((host, port), family=family, backlog=LISTEN_BACKLOG)
+    sock.set_inheritable(True)
+    return sock
+
+
+def share_log_files():
+    """
+    Swap rotating file handlers for watched ones in a worker: with several processes
+    appending to one log, only the supervisor rotates it and workers reopen it after.
+    """
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, logging.handlers.RotatingFileHandler):
+            watched = logging.handlers.WatchedFileHandler(handler.baseFilename, encoding=handler.encoding)
+            watched.setFormatter(handler.formatter)
+            watched.setLevel(handler.level)
+            root.removeHandler(handler)
+            handler.close()
+            root.addHandler(watched)
+
+
+class PreforkServer:
+    """
+    Supervisor of `workers` forked server processes.
+
+    `load_app()` runs once in the supervisor and returns the WSGI app. `post_fork()` runs
+    in each worker before it serves (start per-process resources: threads, pools) and
+    `pre_exit()` after it stopped serving (stop them: workers leave with os._exit()).
+    """
+
+    def __init__(self, load_app: Callable, host: str, port: int, workers: int = 1,
+                 threads: int = DEFAULT_THREADS, max_requests: int = DEFAULT_MAX_REQUESTS,
+                 max_requests_jitter: int = 0, graceful_timeout: int = DEFAULT_GRACEFUL_TIMEOUT,
+                 post_fork: Optional[Callable[[], None]] = None,
+                 pre_exit: Optional[Callable[[], None]] = None):
+        self.load_app = load_app
+        self.host = host
+        self.port = port
+        self.workers = max(1, int(workers))
+        self.threads = max(1, int(threads))
+        self.max_requests = max(0, int(max_requests))
+        self.max_requests_jitter = max(0, int(max_requests_jitter))
+        self.graceful_timeout = graceful_timeout
+        self.post_fork = post_fork
+        self.pre_exit = pre_exit
+        self.app = None
+        self.socket: Optional[socket.socket] = None
+        self._children: Dict[int, int] = {}  # pid -> worker number
+        self._stopping = False
+        self._pid = os.getpid()
+        self._server: Optional[PooledWSGIServer] = None
+        self._retiring = False
+        self.spawned = 0
+
+    # -- supervisor ---------------------------------------------------------
+
+    def preload(self):
+        self.app = self.load_app()
+        self.socket = bind_socket(self.host, self.port)
+        self.port = self.socket.getsockname()[1]  # Actual port when binding port 0
+        # Everything loaded so far is long-lived: keep the collector from touching (and thus
+        # un-sharing) those pages in the workers
+        gc.collect()
+        if hasattr(gc, 'freeze'):
+            gc.freeze()
+
+    def run(self):
+        if self.app is None:
+            self.preload()
+        if not hasattr(os, 'fork'):
+            logger.warning("Server: fork() unavailable, serving from a single process")
+            try:
+                self._serve(self.app, self.threads, None)
+            finally:
+                self.socket.close()
+            return
+
+        self._pid = os.getpid()
+        logger.info(f"Server: http://{self.host}:{self.port} - {self.workers} workers x {self.threads} threads"
+                    + (f", recycled after ~{self.max_requests} requests" if self.max_requests else ""))
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        if hasattr(signal, 'SIGHUP'):
+            signal.signal(signal.SIGHUP, self._handle_reload)
+
+        for number in range(self.workers):
+            self._spawn(number)
+        while self._children:
+            try:
+                pid, status = os.wait()
+            except InterruptedError:
+                continue
+            except ChildProcessError:
+                break
+            number = self._children.pop(pid, None)
+            if number is None:
+                continue
+            if not self._stopping:
+                if os.waitstatus_to_exitcode(status) != 0:
+                    logger.warning(f"Server: worker {pid} exited with status {os.waitstatus_to_exitcode(status)}")
+                    time.sleep(1)  # Do not spin if workers crash at startup
+                self._spawn(number)
+        self.socket.close()
+        logger.info("Server: stopped")
+
+    def _signal_children(self, signum):
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def _handle_stop(self, signum, frame):
+        if os.getpid() != self._pid:
+            # Worker forked an instant ago, its own handlers are not installed yet
+            self._retire()
+            return
+        if not self._stopping:
+            logger.info("Server: stopping workers")
+            self._stopping = True
+        self._signal_children(signal.SIGTERM)
+
+    def _handle_reload(self, signum, frame):
+        if os.getpid() != self._pid:
+            self._retire()
+            return
+        logger.info("Server: recycling workers")
+        self._signal_children(signal.SIGTERM)
+
+    def _spawn(self, number: int):
+        pid = os.fork()
+        if pid:
+            self._children[pid] = number
+            self.spawned += 1
+            return
+        # Worker process
+        code = 0
+        try:
+            signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C is handled by the supervisor
+            signal.signal(signal.SIGTERM, lambda signum, frame: self._retire())
+            if hasattr(signal, 'SIGHUP'):
+                signal.signal(signal.SIGHUP, signal.SIG_DFL)
+            random.seed()
+            share_log_files()
+            if self.post_fork:
+                self.post_fork()
+            limit = self.max_requests
+            if limit and self.max_requests_jitter:
+                limit += random.randint(0, self.max_requests_jitter)
+            self._serve(self.app, self.threads, limit)
+        except Exception:
+            logger.exception(f"Server: worker {os.getpid()} failed")
+            code = 1
+        finally:
+            if self.pre_exit:
+                try:
+                    self.pre_exit()
+                except Exception:
+                    logger.exception(f"Server: worker {os.getpid()} cleanup failed")
+            logging.shutdown()
+            os._exit(code)
+
+    # -- worker -------------------------------------------------------------
+
+    def _retire(self):
+        # shutdown() waits for serve_forever() to return: call it from another thread.
+        # A request made before serve_forever() starts is kept, so the worker exits at once.
+        self._retiring = True
+        if self._server is not None:
+            threading.Thread(target=self._server.shutdown, daemon=True).start()
+
+    def _serve(self, app, threads: int, max_requests: Optional[int]):
+        if max_requests:
+            app = RequestCounter(app, max_requests, self._retire)
+        self._server = PooledWSGIServer(self.host, self.port, app, threads=threads, fd=self.socket.fileno())
+        if self._retiring:
+            self._retire()
+        self._server.serve_forever()
+        if not self._server.wait_idle(self.graceful_timeout):
+            logger.warning(f"Server: worker {os.getpid()} exiting with requests still running")
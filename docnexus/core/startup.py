@@ -0,0 +1,150 @@
+"""
+Startup cost: deferred imports and the startup profile (`docnexus --startup-profile`).
+
+Heavy libraries (BeautifulSoup, the Markdown extensions, mammoth, PIL, pypdf, requests)
+are imported where they are first used rather than at module import, so starting the
+server, the CLI or a worker process only pays for what it actually runs. Optional ones
+go through optional_import() (imported on first call, None when not installed);
+module_available() tells whether one is installed without importing it.
+
+PROFILE records how long each create_app() phase takes and, once trace_imports() is
+called, every import that loaded new modules, nested under the import that triggered it.
+"""
+import builtins
+import importlib
+import importlib.util
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_IMPORT_MS = 5.0  # Imports faster than this are left out of the report
+
+
+@lru_cache(maxsize=None)
+def optional_import(name: str):
+    """Import `name` on first use; None (logged once) when it is not installed."""
+    try:
+        return importlib.import_module(name)
+    except ImportError as e:
+        logger.debug(f"Optional module {name} unavailable: {e}")
+        return None
+
+
+def module_available(name: str) -> bool:
+    """Whether `name` can be imported, without importing it (parent packages aside)."""
+    if name in sys.modules:
+        return sys.modules[name] is not None
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class PhaseRecord(NamedTuple):
+    name: str
+    start: float     # Seconds since the profile origin
+    duration: float
+
+
+class ImportRecord(NamedTuple):
+    name: str
+    start: float
+    duration: float  # Inclusive of nested imports
+    depth: int
+    modules: int     # Modules added to sys.modules
+
+
+class StartupProfile:
+    """Phase timings (always recorded, it is cheap) and an optional import trace."""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.phases: List[PhaseRecord] = []
+        self.imports: List[ImportRecord] = []
+        self._original_import = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self.phases.append(PhaseRecord(name, start - self.origin, end - start))
+
+    @property
+    def tracing(self) -> bool:
+        return self._original_import is not None
+
+    def trace_imports(self):
+        """Record every import from now on (wraps builtins.__import__)."""
+        if self.tracing:
+            return
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._traced_import
+
+    def stop_tracing(self):
+        if self.tracing:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _traced_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        original = self._original_import or builtins.__import__
+        depth = getattr(self._local, 'depth', 0)
+        self._local.depth = depth + 1
+        before = len(sys.modules)
+        # "from package import module": report the submodule rather than the package
+        new_submodules = [f"{name}.{item}" for item in (fromlist or ()) if isinstance(item, str)
+                          and f"{name}.{item}" not in sys.modules] if not level else []
+        start = time.perf_counter()
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            end = time.perf_counter()
+            self._local.depth = depth
+            loaded = len(sys.modules) - before
+            if loaded > 0:
+                loaded_submodules = [n for n in new_submodules if n in sys.modules]
+                if loaded_submodules:
+                    name = ', '.join(loaded_submodules)
+                elif level and globals:
+                    try:
+                        name = importlib.util.resolve_name('.' * level + name, globals.get('__package__'))
+                    except (ImportError, ValueError):
+                        pass
+                with self._lock:
+                    self.imports.append(ImportRecord(name, start - self.origin, end - start, depth, loaded))
+
+    def report(self, min_import_ms: float = DEFAULT_MIN_IMPORT_MS, title: Optional[str] = None) -> str:
+        """Phase and import timeline, offsets and durations in milliseconds."""
+        lines = [title or "Startup profile", "", "Phases:"]
+        for record in sorted(self.phases, key=lambda r: r.start):
+            lines.append(f"  {record.start * 1000:9.1f} ms  +{record.duration * 1000:8.1f} ms  {record.name}")
+
+        if self.imports:
+            shown = sorted((r for r in self.imports if r.duration * 1000 >= min_import_ms),
+                           key=lambda r: (r.start, r.depth))
+            total_modules = sum(r.modules for r in self.imports if r.depth == 0)
+            total_time = sum(r.duration for r in self.imports if r.depth == 0)
+            lines += ["", f"Imports (>= {min_import_ms:g} ms, nested under their importer):"]
+            for record in shown:
+                lines.append(f"  {record.start * 1000:9.1f} ms  +{record.duration * 1000:8.1f} ms  "
+                             f"{'  ' * record.depth}{record.name} (+{record.modules} modules)")
+            lines += ["", f"Imported {total_modules} modules in {total_time * 1000:.1f} ms "
+                          f"({len(self.imports) - len(shown)} faster imports not shown)"]
+
+        end = max([r.start + r.duration for r in self.phases] + [0.0])
+        lines += [f"Total: {end * 1000:.1f} ms"]
+        return '\n'.join(lines)
+
+
+PROFILE = StartupProfile()
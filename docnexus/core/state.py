@@ -1,9 +1,10 @@
 
-import json
 import logging
 from pathlib import Path
 import sys
 
+from docnexus.core.json_store import JsonFileStore
+
 logger = logging.getLogger(__name__)
 
 class PluginState:
@@ -15,7 +16,9 @@ class PluginState:
              self.config_path = Path(sys.executable).parent / "plugins.json"
         else:
              self.config_path = Path("plugins.json").resolve()
-             
+
+        # Kept in memory, re-read only when the file changes (see core.json_store)
+        self._store = JsonFileStore(self.config_path, default=lambda: {"installed": []}, indent=4)
         self._ensure_config()
         PluginState._instance = self # Set the instance after successful initialization
 
@@ -32,46 +35,54 @@ class PluginState:
         """Create empty config if missing."""
         if not self.config_path.exists():
             try:
-                with open(self.config_path, 'w') as f:
-                    json.dump({"installed": []}, f)
+                self._store.write({"installed": []})
             except Exception as e:
                 logger.error(f"Failed to init plugins.json: {e}")
 
     def get_installed_plugins(self):
         """Return list of installed plugin IDs."""
+        return list(self._installed())
+
+    def _installed(self):
+        # The cached list itself: callers get copies
         try:
-            if not self.config_path.exists():
-                return []
-            with open(self.config_path, 'r') as f:
-                data = json.load(f)
-                return data.get("installed", [])
+            data = self._store.read()
+            installed = data.get("installed", []) if isinstance(data, dict) else []
+            return installed if isinstance(installed, list) else []
         except Exception as e:
             logger.error(f"Error reading plugin state: {e}")
             return []
 
     def is_plugin_installed(self, plugin_id):
-        return plugin_id in self.get_installed_plugins()
+        return plugin_id in self._installed()
 
     def is_plugin_in_registry(self, plugin_id):
         # In current design, registry tracking (persistence) IS the installed list
         # We don't track "known but uninstalled" in this simple JSON.
         # But loader uses this to decide whether to peek metadata or skip.
         # If it's in the list, we treat it as "known and installed".
-        return plugin_id in self.get_installed_plugins()
+        return plugin_id in self._installed()
+
+    def batch(self):
+        """
+        Group several set_plugin_installed() calls into one write of plugins.json:
+        `with state.batch(): ...`
+        """
+        return self._store.batch()
     
     def set_plugin_installed(self, plugin_id, installed):
         """Update installation status."""
         try:
-            current = list(self.get_installed_plugins())
-            if installed:
-                if plugin_id not in current:
-                    current.append(plugin_id)
-            else:
-                if plugin_id in current:
-                    current.remove(plugin_id)
-            
-            with open(self.config_path, 'w') as f:
-                json.dump({"installed": current}, f, indent=4)
+            with self._store.batch() as data:
+                if not isinstance(data.get("installed"), list):
+                    data["installed"] = []
+                current = data["installed"]
+                if installed:
+                    if plugin_id not in current:
+                        current.append(plugin_id)
+                else:
+                    if plugin_id in current:
+                        current.remove(plugin_id)
             return True
         except Exception as e:
             logger.error(f"Error saving plugin state: {e}")
@@ -0,0 +1,486 @@
+"""
+Static site build (`docnexus build`): the workspace rendered to plain HTML files.
+
+Pages go through the same pipeline and templates as the server (`view_file` / `index`),
+then every server URL is rewritten to a relative file URL (document links, folder
+listings, /static assets), so the output can be served by any web server - or opened
+from disk - without Python:
+
+    <out>/<folder>/<document stem>.html    one page per document
+    <out>/<folder>/index.html              folder listings (index.html template)
+    <out>/static/                          copy of the app's static assets
+    <out>/search-index.json                precomputed search index used by the listings
+
+Documents are rendered in parallel worker processes, each importing the app once.
+<out>/.docnexus-build.json is the dependency manifest: for every page the source digest,
+the snippet files it includes (`--8<--`) with their digests and how each of its document
+links resolved. A rebuild only re-renders documents whose source or includes changed,
+documents whose links now resolve differently (target added, removed or renamed) and
+documents linking to a changed document. A different DocNexus version, pipeline or set
+of templates rebuilds everything.
+"""
+import hashlib
+import json
+import logging
+import os
+import posixpath
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from html import unescape
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from docnexus.core.render_cache import snippet_includes
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = '.docnexus-build.json'
+MANIFEST_VERSION = 1
+SEARCH_INDEX_NAME = 'search-index.json'
+STATIC_DIR_NAME = 'static'
+
+# Templates whose changes invalidate every page
+TEMPLATE_FILES = ('view.html', 'index.html', 'components/header_brand.html', 'components/settings_menu.html')
+
+_URL_ATTR_RE = re.compile(r'\b(href|src)="(/[^"]*)"')
+_ANCHOR_RE = re.compile(r'<a\b[^>]*>', re.IGNORECASE)
+_ATTR_RE = re.compile(r'([\w-]+)="([^"]*)"')
+_TAG_RE = re.compile(r'<script\b.*?</script>|<style\b.*?</style>|<[^>]+>', re.DOTALL | re.IGNORECASE)
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+_H1_RE = re.compile(r'<h1\b[^>]*>(.*?)</h1>', re.DOTALL | re.IGNORECASE)
+
+
+# -------------------------------------------------------------------------
+# Site map: documents, pages and link resolution
+# -------------------------------------------------------------------------
+
+def page_for(document: str) -> str:
+    """Output page (relative to the site root) of a workspace document."""
+    return posixpath.splitext(document)[0] + '.html'
+
+
+def build_page_map(documents: Iterable[str]) -> Dict[str, str]:
+    """document -> page; documents differing only by extension get '<name><ext>.html'."""
+    pages, used = {}, set()
+    for document in sorted(documents, key=lambda d: (not d.lower().endswith('.md'), d)):
+        page = page_for(document)
+        if page in used:
+            page = document + '.html'
+        pages[document] = page
+        used.add(page)
+    return pages
+
+
+class SiteMap:
+    """Resolves server document URLs (/file/<target>) like app.resolve_document_path()."""
+
+    def __init__(self, pages: Dict[str, str]):
+        self.pages = pages
+        self._by_name: Dict[str, str] = {}
+        for document in sorted(pages):
+            name = posixpath.basename(document)
+            self._by_name.setdefault(name, document)
+            self._by_name.setdefault(posixpath.splitext(name)[0], document)
+
+    def resolve(self, target: str) -> Optional[str]:
+        target = unquote(target).strip('/')
+        if target in self.pages:
+            return target
+        if f"{target}.md" in self.pages:
+            return f"{target}.md"
+        return self._by_name.get(target)
+
+
+def relative_url(from_page: str, to_path: str) -> str:
+    return posixpath.relpath(to_path, posixpath.dirname(from_page) or '.')
+
+
+def rewrite_urls(html: str, page: str, site: SiteMap) -> str:
+    """Server-absolute URLs in `html` (for `page`) -> relative URLs inside the static site."""
+
+    def replace(match):
+        attr, url = match.group(1), unescape(match.group(2))
+        parts = urlsplit(url)
+        fragment = f"#{parts.fragment}" if parts.fragment else ''
+        if parts.path.startswith(f'/{STATIC_DIR_NAME}/'):
+            new_url = relative_url(page, parts.path.lstrip('/'))
+        elif parts.path.startswith('/file/'):
+            document = site.resolve(parts.path[len('/file/'):])
+            if document is None:
+                return match.group(0)
+            new_url = relative_url(page, site.pages[document]) + fragment
+        elif parts.path == '/':
+            folder = parse_qs(parts.query).get('folder', [''])[0].strip('/')
+            new_url = relative_url(page, posixpath.join(folder, 'index.html') if folder else 'index.html')
+        else:
+            return match.group(0)
+        return f'{attr}="{new_url}"'
+
+    return _URL_ATTR_RE.sub(replace, html)
+
+
+def extract_links(content_html: str, document: str, site: SiteMap) -> Dict[str, Optional[str]]:
+    """
+    Document links of a rendered page: {target: resolved document or None}.
+    Targets are /file/ URLs (wiki links, resolved relative links) and, for relative links
+    the renderer marked broken, the workspace path they point to.
+    """
+    links = {}
+    folder = posixpath.dirname(document)
+    for tag in _ANCHOR_RE.findall(content_html):
+        attrs = dict(_ATTR_RE.findall(tag))
+        href = unescape(attrs.get('href', ''))
+        if href.startswith('/file/'):
+            target = urlsplit(href).path[len('/file/'):]
+            links[target] = site.resolve(target)
+        elif 'broken-link' in attrs.get('class', '') and href and not href.startswith(('#', '/')) \
+                and '://' not in href:
+            target = posixpath.normpath(posixpath.join(folder, urlsplit(href).path))
+            links[target] = site.resolve(target)
+    return links
+
+
+def search_entry(document: str, page: str, content_html: str) -> dict:
+    """Search index entry: title and the distinct lowercase words of the rendered text."""
+    title_match = _H1_RE.search(content_html)
+    title = unescape(_TAG_RE.sub('', title_match.group(1))).strip() if title_match else ''
+    text = unescape(_TAG_RE.sub(' ', content_html)).lower()
+    terms = sorted(set(_WORD_RE.findall(text)))
+    return {
+        'path': document,
+        'url': page,
+        'title': title or posixpath.splitext(posixpath.basename(document))[0],
+        'terms': ' '.join(terms),
+    }
+
+
+def file_digest(path: Path) -> Optional[str]:
+    try:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    except OSError:
+        return None
+
+
+def write_atomic(path: Path, data: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+# -------------------------------------------------------------------------
+# Page rendering (runs in the worker processes)
+# -------------------------------------------------------------------------
+
+_worker = {}
+
+
+def _init_worker(workspace: str, output_dir: str, pages: Dict[str, str], enable_experimental: bool):
+    from docnexus import app as app_module
+    from docnexus.core.render_cache import RenderCache
+
+    app_module.create_app()
+
+    # Every document is rendered once per build: no point caching renders
+    app_module.MD_FOLDER = Path(workspace)
+    app_module.RENDER_CACHE = RenderCache(0)
+    _worker.update(app=app_module, workspace=Path(workspace), output_dir=Path(output_dir),
+                   site=SiteMap(pages), enable_experimental=enable_experimental)
+
+
+def render_document_page(document: str) -> dict:
+    """Render one document page to disk. Returns its manifest/search data."""
+    app_module, site = _worker['app'], _worker['site']
+    page = site.pages[document]
+    source_path = _worker['workspace'] / document
+
+    html_content, toc_content = app_module.render_document_from_file(
+        source_path, enable_experimental=_worker['enable_experimental'])
+    stat = source_path.stat()
+    file_info = {
+        'name': source_path.stem,
+        'filename': source_path.name,
+        'relative_path': document,
+        'content': html_content,
+        'toc': toc_content,
+        'modified': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(stat.st_mtime)),
+        'size': f"{stat.st_size / 1024:.2f} KB"
+    }
+    with app_module.app.test_request_context(f'/file/{document}'):
+        html = app_module.render_template('view.html', file=file_info, version=app_module.VERSION,
+                                          static_site=True, site_root=relative_url(page, '.') + '/')
+    write_atomic(_worker['output_dir'] / page, rewrite_urls(html, page, site))
+
+    includes = []
+    if source_path.suffix.lower() != '.docx':
+        source = source_path.read_text(encoding='utf-8', errors='ignore')
+        # pymdownx.snippets resolves includes against the working directory
+        includes = [str(Path(name).resolve()) for name in snippet_includes(source)]
+    return {
+        'document': document,
+        'links': extract_links(html_content, document, site),
+        'includes': includes,
+        'search': search_entry(document, page, html_content),
+    }
+
+
+# -------------------------------------------------------------------------
+# Build driver (runs in the CLI process)
+# -------------------------------------------------------------------------
+
+class BuildResult:
+    def __init__(self):
+        self.rendered: List[str] = []
+        self.unchanged: List[str] = []
+        self.removed: List[str] = []
+        self.failed: Dict[str, str] = {}
+        self.timings: Dict[str, float] = {}
+        self.elapsed = 0.0
+
+
+def build_generation(app_module, enable_experimental: bool) -> str:
+    """Identity of the rendering setup: version, pipeline steps and template contents."""
+    pipeline = app_module.FEATURES.build_pipeline(enable_experimental=enable_experimental)
+    steps = ",".join(getattr(step, '__qualname__', str(step)) for step in pipeline)
+    digest = hashlib.sha256()
+    template_dir = Path(app_module.app.template_folder)
+    if not template_dir.is_absolute():
+        template_dir = Path(app_module.app.root_path) / template_dir
+    for name in TEMPLATE_FILES:
+        digest.update((file_digest(template_dir / name) or '-').encode('ascii'))
+    return f"{app_module.VERSION}|{int(enable_experimental)}|{steps}|{digest.hexdigest()[:16]}"
+
+
+def sync_tree(source: Path, dest: Path):
+    """Copy files that are missing or differ (size/mtime) from `source` into `dest`."""
+    for path in source.rglob('*'):
+        if not path.is_file():
+            continue
+        target = dest / path.relative_to(source)
+        stat = path.stat()
+        try:
+            current = target.stat()
+            if current.st_size == stat.st_size and int(current.st_mtime) == int(stat.st_mtime):
+                continue
+        except OSError:
+            pass
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(path, target)
+
+
+class SiteBuilder:
+    """Incremental static build of `workspace` into `output_dir`."""
+
+    def __init__(self, app_module, workspace: Path, output_dir: Path, workers: int = 0,
+                 force: bool = False, enable_experimental: bool = False, on_page=None):
+        self.app = app_module
+        self.workspace = Path(workspace).resolve()
+        self.output_dir = Path(output_dir).resolve()
+        self.workers = workers or os.cpu_count() or 1
+        self.force = force
+        self.enable_experimental = enable_experimental
+        self.on_page = on_page
+        self.manifest_path = self.output_dir / MANIFEST_NAME
+
+    def _load_json(self, path: Path, version_key='version', expected=MANIFEST_VERSION) -> dict:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if data.get(version_key) == expected else {}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Static build: ignoring unreadable {path}: {e}")
+            return {}
+
+    def collect_documents(self) -> List[str]:
+        from docnexus.core.batch_export import collect_documents
+        return collect_documents(self.workspace, [], self.app.ALLOWED_EXTENSIONS, exclude=self.output_dir)
+
+    def plan(self, documents: List[str], site: SiteMap, previous: dict, generation: str) -> Dict[str, str]:
+        """Documents to render -> reason."""
+        old_docs = previous.get('documents', {}) if previous.get('generation') == generation else {}
+        digests = {document: file_digest(self.workspace / document) for document in documents}
+        todo = {}
+        for document in documents:
+            entry = old_docs.get(document)
+            if self.force:
+                todo[document] = 'forced'
+            elif not entry:
+                todo[document] = 'new'
+            elif entry.get('source') != digests[document]:
+                todo[document] = 'source changed'
+            elif entry.get('page') != site.pages[document] or not (self.output_dir / site.pages[document]).is_file():
+                todo[document] = 'page missing'
+            elif any(file_digest(Path(path)) != digest for path, digest in entry.get('includes', {}).items()):
+                todo[document] = 'include changed'
+            elif any(site.resolve(target) != resolved for target, resolved in entry.get('links', {}).items()):
+                todo[document] = 'link target added/removed'
+
+        # Documents linking to a changed document are re-rendered too
+        changed = {document for document, reason in todo.items() if reason in ('new', 'source changed')}
+        changed.update(set(old_docs) - set(documents))
+        if changed:
+            for document in documents:
+                entry = old_docs.get(document)
+                if document not in todo and entry and changed.intersection(
+                        resolved for resolved in entry.get('links', {}).values() if resolved):
+                    todo[document] = 'linked document changed'
+        self._digests = digests
+        return todo
+
+    def build(self) -> BuildResult:
+        started = time.perf_counter()
+        result = BuildResult()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        documents = self.collect_documents()
+        pages = build_page_map(documents)
+        site = SiteMap(pages)
+        generation = build_generation(self.app, self.enable_experimental)
+        previous = self._load_json(self.manifest_path)
+        todo = self.plan(documents, site, previous, generation)
+
+        old_docs = previous.get('documents', {}) if previous.get('generation') == generation else {}
+        manifest_docs = {document: entry for document, entry in old_docs.items() if document in pages}
+        search = {entry['path']: entry for entry in self._load_json(
+            self.output_dir / SEARCH_INDEX_NAME).get('documents', []) if entry.get('path') in pages}
+        result.unchanged = [document for document in documents if document not in todo]
+
+        for document, data, seconds, error in self._render_all(list(todo), pages):
+            if error:
+                result.failed[document] = error
+                manifest_docs.pop(document, None)
+            else:
+                result.rendered.append(document)
+                result.timings[document] = seconds
+                manifest_docs[document] = {
+                    'source': self._digests[document],
+                    'page': pages[document],
+                    'includes': {path: file_digest(Path(path)) for path in data['includes']},
+                    'links': data['links'],
+                }
+                search[document] = data['search']
+            if self.on_page:
+                self.on_page(document, error)
+
+        # Pages of deleted (or renamed) documents
+        for document, entry in previous.get('documents', {}).items():
+            page = entry.get('page')
+            if page and page not in pages.values():
+                try:
+                    (self.output_dir / page).unlink()
+                    result.removed.append(document)
+                except OSError:
+                    pass
+
+        self._write_listings(pages)
+        sync_tree(Path(self.app.app.static_folder), self.output_dir / STATIC_DIR_NAME)
+        write_atomic(self.output_dir / SEARCH_INDEX_NAME, json.dumps(
+            {'version': MANIFEST_VERSION, 'documents': [search[d] for d in sorted(search)]},
+            separators=(',', ':')))
+        write_atomic(self.manifest_path, json.dumps(
+            {'version': MANIFEST_VERSION, 'generation': generation, 'documents': manifest_docs},
+            indent=1, sort_keys=True))
+
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    def _render_all(self, documents: List[str], pages: Dict[str, str]):
+        """Yield (document, data, seconds, error), rendering in worker processes when possible."""
+        if not documents:
+            return
+        initargs = (str(self.workspace), str(self.output_dir), pages, self.enable_experimental)
+        done: Set[str] = set()
+        if self.workers > 1 and len(documents) > 1:
+            try:
+                import multiprocessing
+                context = multiprocessing.get_context('spawn')
+                with ProcessPoolExecutor(max_workers=min(self.workers, len(documents)), mp_context=context,
+                                         initializer=_init_worker, initargs=initargs) as pool:
+                    submitted = {pool.submit(_timed_render, document): document for document in documents}
+                    for future in as_completed(submitted):
+                        document = submitted[future]
+                        try:
+                            outcome = (document, *future.result())
+                        except BrokenProcessPool:
+                            raise
+                        except Exception as e:
+                            outcome = (document, None, 0.0, str(e))
+                        done.add(document)
+                        yield outcome
+                return
+            except (OSError, BrokenProcessPool) as e:
+                # Pool unavailable (sandbox, frozen build without freeze_support) or crashed
+                logger.warning(f"Static build: worker processes failed ({e}), rendering in-process")
+
+        _init_worker(*initargs)
+        for document in documents:
+            if document in done:
+                continue
+            try:
+                yield (document, *_timed_render(document))
+            except Exception as e:
+                logger.error(f"Static build: {document} failed: {e}", exc_info=True)
+                yield document, None, 0.0, str(e)
+
+    def _write_listings(self, pages: Dict[str, str]):
+        """Folder listings (index.html template) for the site root and every folder."""
+        folders = {''}
+        for document in pages:
+            parts = document.split('/')[:-1]
+            folders.update('/'.join(parts[:i + 1]) for i in range(len(parts)))
+        self.app.MD_FOLDER = self.workspace
+        output_rel = None
+        try:
+            output_rel = self.output_dir.relative_to(self.workspace).as_posix()
+        except ValueError:
+            pass
+
+        for folder in sorted(folders):
+            items = [item for item in self.app.get_markdown_files(subdir=folder, recursive=False)
+                     if not (output_rel and item['relative_path'] == output_rel)
+                     and (item['type'] != 'dir' or item['relative_path'] in folders)
+                     and (item['type'] == 'dir' or item['relative_path'] in pages)]
+            page = posixpath.join(folder, 'index.html') if folder else 'index.html'
+            with self.app.app.test_request_context('/'):
+                html = self.app.render_template('index.html', files=items, md_folder=str(self.workspace),
+                                                current_folder=folder, version=self.app.VERSION,
+                                                static_site=True, site_root=relative_url(page, '.') + '/')
+            write_atomic(self.output_dir / page, rewrite_urls(html, page, SiteMap(pages)))
+
+
+def _timed_render(document: str):
+    started = time.perf_counter()
+    data = render_document_page(document)
+    return data, time.perf_counter() - started, None
+
+
+def format_build_report(result: BuildResult) -> str:
+    lines = []
+    if result.timings:
+        lines.append("Rendered:")
+        width = max(len(document) for document in result.timings)
+        for document in sorted(result.timings):
+            lines.append(f"  {document:<{width}}  {result.timings[document]:6.2f}s")
+    if result.removed:
+        lines.append("")
+        lines.append(f"Removed ({len(result.removed)}): {', '.join(sorted(result.removed))}")
+    if result.failed:
+        lines.append("")
+        lines.append(f"Failures ({len(result.failed)}):")
+        for document, error in sorted(result.failed.items()):
+            lines.append(f"  {document}: {error}")
+    lines.append("")
+    lines.append(f"{len(result.rendered)} rendered, {len(result.unchanged)} unchanged, "
+                 f"{len(result.removed)} removed, {len(result.failed)} failed in {result.elapsed:.1f}s")
+    return "\n".join(lines)
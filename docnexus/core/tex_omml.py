@@ -0,0 +1,526 @@
+"""
+LaTeX to Office MathML (OMML) conversion.
+
+Word export used to turn every display formula into a CodeCogs PNG: one network
+round-trip per formula, a 300 DPI raster to download, flatten and scale, and a picture
+in the document that cannot be edited. Word understands equations natively as OMML
+(<m:oMath> inside a paragraph), so the common LaTeX subset produced by Markdown math
+(fractions, scripts, roots, big operators, delimiters, accents, matrices, cases,
+aligned environments, font commands and symbols) is converted locally instead.
+
+tex_to_omml() returns the serialized OMML, memoized by TeX string, or raises
+TexConversionError for anything outside the supported subset so callers can fall back.
+"""
+import re
+from functools import lru_cache
+from typing import List, Optional
+
+from lxml import etree
+
+M_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/math'
+XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+
+
+class TexConversionError(ValueError):
+    """The TeX uses something the converter does not support."""
+
+
+# -------------------------------------------------------------------------
+# Symbol tables
+# -------------------------------------------------------------------------
+SYMBOLS = {
+    # Greek
+    'alpha': 'α', 'beta': 'β', 'gamma': 'γ', 'delta': 'δ', 'epsilon': 'ϵ', 'varepsilon': 'ε',
+    'zeta': 'ζ', 'eta': 'η', 'theta': 'θ', 'vartheta': 'ϑ', 'iota': 'ι', 'kappa': 'κ',
+    'lambda': 'λ', 'mu': 'μ', 'nu': 'ν', 'xi': 'ξ', 'omicron': 'ο', 'pi': 'π', 'varpi': 'ϖ',
+    'rho': 'ρ', 'varrho': 'ϱ', 'sigma': 'σ', 'varsigma': 'ς', 'tau': 'τ', 'upsilon': 'υ',
+    'phi': 'ϕ', 'varphi': 'φ', 'chi': 'χ', 'psi': 'ψ', 'omega': 'ω',
+    'Gamma': 'Γ', 'Delta': 'Δ', 'Theta': 'Θ', 'Lambda': 'Λ', 'Xi': 'Ξ', 'Pi': 'Π',
+    'Sigma': 'Σ', 'Upsilon': 'Υ', 'Phi': 'Φ', 'Psi': 'Ψ', 'Omega': 'Ω',
+    # Operators and relations
+    'pm': '±', 'mp': '∓', 'times': '×', 'div': '÷', 'cdot': '⋅', 'ast': '∗', 'star': '⋆',
+    'circ': '∘', 'bullet': '∙', 'oplus': '⊕', 'ominus': '⊖', 'otimes': '⊗', 'odot': '⊙',
+    'setminus': '∖', 'cup': '∪', 'cap': '∩', 'wedge': '∧', 'vee': '∨', 'land': '∧', 'lor': '∨',
+    'neg': '¬', 'lnot': '¬', 'leq': '≤', 'le': '≤', 'geq': '≥', 'ge': '≥', 'neq': '≠', 'ne': '≠',
+    'll': '≪', 'gg': '≫', 'approx': '≈', 'equiv': '≡', 'sim': '∼', 'simeq': '≃', 'cong': '≅',
+    'propto': '∝', 'in': '∈', 'notin': '∉', 'ni': '∋', 'subset': '⊂', 'subseteq': '⊆',
+    'supset': '⊃', 'supseteq': '⊇', 'perp': '⊥', 'parallel': '∥', 'mid': '∣',
+    'to': '→', 'rightarrow': '→', 'leftarrow': '←', 'gets': '←', 'leftrightarrow': '↔',
+    'Rightarrow': '⇒', 'Leftarrow': '⇐', 'Leftrightarrow': '⇔', 'implies': '⟹', 'iff': '⟺',
+    'mapsto': '↦', 'uparrow': '↑', 'downarrow': '↓', 'longrightarrow': '⟶', 'longleftarrow': '⟵',
+    # Misc
+    'infty': '∞', 'partial': '∂', 'nabla': '∇', 'forall': '∀', 'exists': '∃', 'nexists': '∄',
+    'emptyset': '∅', 'varnothing': '∅', 'angle': '∠', 'triangle': '△', 'prime': '′',
+    'hbar': 'ℏ', 'ell': 'ℓ', 'Re': 'ℜ', 'Im': 'ℑ', 'aleph': 'ℵ', 'wp': '℘', 'degree': '°',
+    'ldots': '…', 'dots': '…', 'cdots': '⋯', 'vdots': '⋮', 'ddots': '⋱',
+    'langle': '⟨', 'rangle': '⟩', 'lfloor': '⌊', 'rfloor': '⌋', 'lceil': '⌈', 'rceil': '⌉',
+    'lvert': '|', 'rvert': '|', 'vert': '|', 'lVert': '‖', 'rVert': '‖', 'Vert': '‖', '|': '‖',
+    'lbrace': '{', 'rbrace': '}', 'backslash': '\\', 'colon': ':',
+    # Escaped characters
+    '{': '{', '}': '}', '%': '%', '$': '$', '#': '#', '_': '_', '&': '&',
+}
+
+SPACES = {',': ' ', ':': ' ', ';': ' ', '!': '', ' ': ' ', 'quad': ' ', 'qquad': '  '}
+
+# Big operators: (character, limit location)
+NARY = {
+    'sum': ('∑', 'undOvr'), 'prod': ('∏', 'undOvr'), 'coprod': ('∐', 'undOvr'),
+    'bigcup': ('⋃', 'undOvr'), 'bigcap': ('⋂', 'undOvr'), 'bigoplus': ('⨁', 'undOvr'),
+    'bigotimes': ('⨂', 'undOvr'), 'bigvee': ('⋁', 'undOvr'), 'bigwedge': ('⋀', 'undOvr'),
+    'int': ('∫', 'subSup'), 'iint': ('∬', 'subSup'), 'iiint': ('∭', 'subSup'), 'oint': ('∮', 'subSup'),
+}
+
+FUNCTIONS = {
+    'sin', 'cos', 'tan', 'cot', 'sec', 'csc', 'arcsin', 'arccos', 'arctan', 'sinh', 'cosh',
+    'tanh', 'coth', 'log', 'ln', 'lg', 'exp', 'det', 'dim', 'ker', 'deg', 'gcd', 'hom', 'arg', 'Pr',
+}
+# Functions whose subscript goes underneath
+LIMIT_FUNCTIONS = {'lim', 'max', 'min', 'sup', 'inf', 'limsup', 'liminf'}
+
+ACCENTS = {
+    'hat': '̂', 'widehat': '̂', 'bar': '̅', 'vec': '⃗', 'dot': '̇',
+    'ddot': '̈', 'tilde': '̃', 'widetilde': '̃', 'check': '̌',
+    'breve': '̆', 'acute': '́', 'grave': '̀',
+}
+
+# Font commands: (m:sty, m:scr)
+FONTS = {
+    'mathrm': ('p', None), 'textrm': ('p', None), 'text': ('p', None), 'textnormal': ('p', None),
+    'operatorname': ('p', None), 'mathbf': ('b', None), 'textbf': ('b', None), 'boldsymbol': ('bi', None),
+    'mathit': ('i', None), 'textit': ('i', None), 'mathbb': ('p', 'double-struck'),
+    'mathcal': ('p', 'script'), 'mathscr': ('p', 'script'), 'mathfrak': ('p', 'fraktur'),
+    'mathsf': ('p', 'sans-serif'), 'mathtt': ('p', 'monospace'),
+}
+TEXT_COMMANDS = {'text', 'textrm', 'textnormal', 'textbf', 'textit', 'operatorname'}
+
+# Ignored (layout only) commands
+IGNORED = {'displaystyle', 'textstyle', 'scriptstyle', 'limits', 'nolimits', 'left.', 'right.',
+           'big', 'Big', 'bigg', 'Bigg', 'bigl', 'bigr', 'Bigl', 'Bigr', 'biggl', 'biggr', 'Biggl', 'Biggr'}
+
+MATRIX_DELIMITERS = {
+    'matrix': None, 'smallmatrix': None, 'array': None, 'pmatrix': ('(', ')'), 'bmatrix': ('[', ']'),
+    'Bmatrix': ('{', '}'), 'vmatrix': ('|', '|'), 'Vmatrix': ('‖', '‖'),
+}
+STACKED_ENVIRONMENTS = {'aligned', 'align', 'align*', 'gathered', 'gather', 'gather*', 'split',
+                        'eqnarray', 'eqnarray*', 'cases', 'dcases'}
+
+_TOKEN = re.compile(r'\\([a-zA-Z]+)|\\(.)|(\s+)|(.)', re.S)
+_SPACE_TOKEN = ' '
+
+
+def _tokenize(tex: str) -> List[str]:
+    tokens = []
+    for command, symbol, space, char in _TOKEN.findall(tex):
+        if command:
+            tokens.append('\\' + command)
+        elif symbol:
+            tokens.append('\\' + symbol)
+        elif space:
+            tokens.append(_SPACE_TOKEN)
+        else:
+            tokens.append(char)
+    return tokens
+
+
+# -------------------------------------------------------------------------
+# OMML builders
+# -------------------------------------------------------------------------
+def _el(tag: str, *children, **attrs):
+    element = etree.Element(f'{{{M_NS}}}{tag}', nsmap={'m': M_NS})
+    for key, value in attrs.items():
+        element.set(f'{{{M_NS}}}{key}', value)
+    for child in children:
+        if child is not None:
+            element.append(child)
+    return element
+
+
+def _prop(tag: str, value: str):
+    return _el(tag, val=value)
+
+
+def _container(tag: str, items):
+    element = _el(tag)
+    for item in items:
+        element.append(item)
+    return element
+
+
+def _run(text: str, sty: Optional[str] = None, scr: Optional[str] = None):
+    run = _el('r')
+    if sty or scr:
+        rpr = _el('rPr')
+        if scr:
+            rpr.append(_prop('scr', scr))
+        if sty:
+            rpr.append(_prop('sty', sty))
+        run.append(rpr)
+    t = _el('t')
+    t.text = text
+    if text != text.strip():
+        t.set(XML_SPACE, 'preserve')
+    run.append(t)
+    return run
+
+
+def _is_run(element) -> bool:
+    return element.tag == f'{{{M_NS}}}r'
+
+
+def _run_style(run) -> bytes:
+    rpr = run.find(f'{{{M_NS}}}rPr')
+    return etree.tostring(rpr) if rpr is not None else b''
+
+
+def _merge_runs(items):
+    """Adjacent runs with the same formatting become one run (smaller, easier to edit)."""
+    merged = []
+    for item in items:
+        if merged and _is_run(item) and _is_run(merged[-1]) and _run_style(item) == _run_style(merged[-1]):
+            t_prev = merged[-1].find(f'{{{M_NS}}}t')
+            t_prev.text += item.find(f'{{{M_NS}}}t').text
+            if t_prev.text != t_prev.text.strip():
+                t_prev.set(XML_SPACE, 'preserve')
+            continue
+        merged.append(item)
+    return merged
+
+
+def _restyle(items, sty: Optional[str], scr: Optional[str]):
+    for item in items:
+        runs = [item] if _is_run(item) else item.iter(f'{{{M_NS}}}r')
+        for run in runs:
+            old = run.find(f'{{{M_NS}}}rPr')
+            if old is not None:
+                run.remove(old)
+            rpr = _el('rPr')
+            if scr:
+                rpr.append(_prop('scr', scr))
+            if sty:
+                rpr.append(_prop('sty', sty))
+            run.insert(0, rpr)
+    return items
+
+
+def _delimited(items, begin: str, end: str):
+    return _el('d', _el('dPr', _prop('begChr', begin), _prop('endChr', end)), _container('e', items))
+
+
+# -------------------------------------------------------------------------
+# Parser
+# -------------------------------------------------------------------------
+# Nested groups/commands (parse_sequence and parse_atom calls on the stack). Real
+# formulas stay far below; pathological input would otherwise hit Python's recursion limit.
+MAX_NESTING = 100
+
+
+class _Parser:
+    def __init__(self, tex: str):
+        self.tokens = _tokenize(tex)
+        self.pos = 0
+        self.depth = 0
+
+    def _enter(self):
+        self.depth += 1
+        if self.depth > MAX_NESTING:
+            raise TexConversionError(f"Formula nested more than {MAX_NESTING} levels deep")
+
+    # Token access (whitespace is insignificant in math mode)
+    def _skip_space(self):
+        while self.pos < len(self.tokens) and self.tokens[self.pos] == _SPACE_TOKEN:
+            self.pos += 1
+
+    def peek(self) -> Optional[str]:
+        self._skip_space()
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def next(self) -> str:
+        token = self.peek()
+        if token is None:
+            raise TexConversionError("Unexpected end of formula")
+        self.pos += 1
+        return token
+
+    def expect(self, token: str):
+        found = self.next()
+        if found != token:
+            raise TexConversionError(f"Expected '{token}', found '{found}'")
+
+    def raw_group(self) -> str:
+        """Text of a {...} group, whitespace preserved (\\text, environment names)."""
+        self.expect('{')
+        depth, out = 1, []
+        while self.pos < len(self.tokens):
+            token = self.tokens[self.pos]
+            self.pos += 1
+            if token == '{':
+                depth += 1
+            elif token == '}':
+                depth -= 1
+                if depth == 0:
+                    return "".join(out)
+            if token.startswith('\\') and len(token) > 1:
+                name = token[1:]
+                out.append(SYMBOLS.get(name, SPACES.get(name, name if len(name) == 1 else '')))
+            elif token not in ('{', '}'):
+                out.append(token)
+        raise TexConversionError("Unbalanced braces")
+
+    # Grammar
+    def parse_sequence(self, stop=()) -> List:
+        self._enter()
+        try:
+            return self._parse_sequence(stop)
+        finally:
+            self.depth -= 1
+
+    def _parse_sequence(self, stop) -> List:
+        atoms: List[List] = []  # Scripts bind to the whole preceding atom ({ab}^2)
+        while True:
+            token = self.peek()
+            if token is None or token in stop:
+                return _merge_runs([element for atom in atoms for element in atom])
+            if token == '}':
+                raise TexConversionError("Unbalanced braces")
+            if token in ('^', '_'):
+                base = atoms.pop() if atoms else []
+                atoms.append([self._scripts(base)])
+                continue
+            atoms.append(self.parse_atom())
+
+    def parse_argument(self) -> List:
+        if self.peek() == '{':
+            self.next()
+            items = self.parse_sequence(stop=('}',))
+            self.expect('}')
+            return items
+        return self.parse_atom()
+
+    def parse_term(self) -> List:
+        atom = self.parse_atom()
+        if self.peek() in ('^', '_'):
+            return [self._scripts(atom)]
+        return atom
+
+    def _collect_scripts(self):
+        # x^2_1 and x_1^2 are the same thing
+        sub = sup = None
+        while self.peek() in ('^', '_'):
+            op = self.next()
+            argument = self.parse_argument()
+            if op == '_':
+                sub = argument
+            else:
+                sup = argument
+        return sub, sup
+
+    def _scripts(self, base: List):
+        sub, sup = self._collect_scripts()
+        e = _container('e', base)
+        if sub is not None and sup is not None:
+            return _el('sSubSup', e, _container('sub', sub), _container('sup', sup))
+        if sub is not None:
+            return _el('sSub', e, _container('sub', sub))
+        return _el('sSup', e, _container('sup', sup))
+
+    def parse_atom(self) -> List:
+        self._enter()
+        try:
+            return self._parse_atom()
+        finally:
+            self.depth -= 1
+
+    def _parse_atom(self) -> List:
+        token = self.next()
+        if token == '{':
+            items = self.parse_sequence(stop=('}',))
+            self.expect('}')
+            return items
+        if token == "'":
+            return [_run('′')]
+        if token == '-':
+            return [_run('−')]
+        if token == '~':
+            return [_run(' ')]
+        if token in ('&', '\\\\', ']'):
+            raise TexConversionError(f"Unexpected '{token}'")
+        if not token.startswith('\\'):
+            return [_run(token)]
+        return self._command(token[1:])
+
+    def _command(self, name: str) -> List:
+        if name in SYMBOLS:
+            return [_run(SYMBOLS[name])]
+        if name in SPACES:
+            return [_run(SPACES[name])] if SPACES[name] else []
+        if name in IGNORED:
+            return []
+        if name in ('frac', 'dfrac', 'tfrac', 'cfrac'):
+            num, den = self.parse_argument(), self.parse_argument()
+            return [_el('f', _container('num', num), _container('den', den))]
+        if name in ('binom', 'dbinom', 'tbinom'):
+            top, bottom = self.parse_argument(), self.parse_argument()
+            fraction = _el('f', _el('fPr', _prop('type', 'noBar')), _container('num', top), _container('den', bottom))
+            return [_delimited([fraction], '(', ')')]
+        if name == 'sqrt':
+            degree = None
+            if self.peek() == '[':
+                self.next()
+                degree = self.parse_sequence(stop=(']',))
+                self.expect(']')
+            body = self.parse_argument()
+            if degree:
+                return [_el('rad', _container('deg', degree), _container('e', body))]
+            return [_el('rad', _el('radPr', _prop('degHide', '1')), _el('deg'), _container('e', body))]
+        if name in NARY:
+            char, location = NARY[name]
+            while self.peek() in ('\\limits', '\\nolimits'):
+                self.next()
+            sub, sup = self._collect_scripts()
+            body = self.parse_term() if self.peek() not in (None, '}', '&', '\\\\', '\\right', '\\end') else []
+            props = [_prop('chr', char), _prop('limLoc', location)]
+            if sub is None:
+                props.append(_prop('subHide', '1'))
+            if sup is None:
+                props.append(_prop('supHide', '1'))
+            return [_el('nary', _el('naryPr', *props), _container('sub', sub or []),
+                        _container('sup', sup or []), _container('e', body))]
+        if name in LIMIT_FUNCTIONS:
+            base = _run(name, sty='p')
+            if self.peek() == '_':
+                self.next()
+                return [_el('limLow', _container('e', [base]), _container('lim', self.parse_argument()))]
+            return [base]
+        if name in FUNCTIONS:
+            return [_run(name, sty='p')]
+        if name in FONTS:
+            if name == 'operatorname' and self.peek() == '*':
+                self.next()
+            sty, scr = FONTS[name]
+            if name in TEXT_COMMANDS:
+                return [_run(self.raw_group(), sty=sty, scr=scr)]
+            return _restyle(self.parse_argument(), sty, scr)
+        if name in ACCENTS:
+            body = self.parse_argument()
+            return [_el('acc', _el('accPr', _prop('chr', ACCENTS[name])), _container('e', body))]
+        if name in ('overline', 'underline'):
+            body = self.parse_argument()
+            return [_el('bar', _el('barPr', _prop('pos', 'top' if name == 'overline' else 'bot')), _container('e', body))]
+        if name in ('overbrace', 'underbrace'):
+            top = name == 'overbrace'
+            body = self.parse_argument()
+            group = _el('groupChr', _el('groupChrPr', _prop('chr', '⏞' if top else '⏟'), _prop('pos', 'top' if top else 'bot'),
+                                        _prop('vertJc', 'bot' if top else 'top')), _container('e', body))
+            return [group]
+        if name == 'boxed':
+            return [_container('borderBox', [_container('e', self.parse_argument())])]
+        if name in ('color', 'textcolor'):
+            self.raw_group()  # Colors are not carried over
+            return self.parse_argument() if name == 'textcolor' else []
+        if name == 'tag':
+            return [_run(f" ({self.raw_group()})", sty='p')]
+        if name == 'left':
+            begin = self._delimiter()
+            body = self.parse_sequence(stop=('\\right',))
+            self.expect('\\right')
+            end = self._delimiter()
+            return [_delimited(body, begin, end)]
+        if name == 'middle':
+            return [_run(self._delimiter())]
+        if name == 'begin':
+            return self._environment(self.raw_group().strip())
+        raise TexConversionError(f"Unsupported command \\{name}")
+
+    def _delimiter(self) -> str:
+        token = self.next()
+        if token == '.':
+            return ''
+        if token.startswith('\\'):
+            name = token[1:]
+            if name in SYMBOLS:
+                return SYMBOLS[name]
+            raise TexConversionError(f"Unsupported delimiter {token}")
+        return token
+
+    def _rows(self, environment: str):
+        rows, cells = [], []
+        while True:
+            cells.append(self.parse_sequence(stop=('&', '\\\\', '\\end')))
+            token = self.next()
+            if token == '&':
+                continue
+            rows.append(cells)
+            cells = []
+            if token == '\\\\':
+                # Optional spacing: \\[2pt]
+                if self.peek() == '[':
+                    while self.next() != ']':
+                        pass
+                if self.peek() == '\\end':
+                    self.next()
+                    break
+                continue
+            break  # \end
+        if self.raw_group().strip() != environment:
+            raise TexConversionError(f"Mismatched \\end for {environment}")
+        return rows
+
+    def _environment(self, environment: str) -> List:
+        if environment == 'array' and self.peek() == '{':
+            self.raw_group()  # Column spec
+        if environment in MATRIX_DELIMITERS:
+            rows = self._rows(environment)
+            columns = max(len(row) for row in rows)
+            matrix = _el('m', _el('mPr', _el('mcs', _el('mc', _el('mcPr', _prop('count', str(columns)),
+                                                                    _prop('mcJc', 'center'))))))
+            for row in rows:
+                mr = _el('mr')
+                for index in range(columns):
+                    mr.append(_container('e', row[index] if index < len(row) else []))
+                matrix.append(mr)
+            delimiters = MATRIX_DELIMITERS[environment]
+            return [_delimited([matrix], *delimiters)] if delimiters else [matrix]
+        if environment in STACKED_ENVIRONMENTS:
+            rows = self._rows(environment)
+            gap = [_run(' ')] if environment in ('cases', 'dcases') else []
+            array = _el('eqArr')
+            for row in rows:
+                items = []
+                for index, cell in enumerate(row):
+                    if index:
+                        items.extend(gap)
+                    items.extend(cell)
+                array.append(_container('e', _merge_runs(items)))
+            if environment in ('cases', 'dcases'):
+                return [_delimited([array], '{', '')]
+            return [array]
+        raise TexConversionError(f"Unsupported environment {environment}")
+
+    def parse(self) -> List:
+        """Top level; bare \\\\ line breaks become an equation array."""
+        rows = [self.parse_sequence(stop=('\\\\',))]
+        while self.peek() == '\\\\':
+            self.next()
+            rows.append(self.parse_sequence(stop=('\\\\',)))
+        rows = [row for row in rows if row]
+        if len(rows) > 1:
+            return [_el('eqArr', *[_container('e', row) for row in rows])]
+        return rows[0] if rows else []
+
+
+@lru_cache(maxsize=2048)
+def tex_to_omml(tex: str, display: bool = False) -> str:
+    """
+    Serialized <m:oMath> (inline) or <m:oMathPara> (display) for `tex`.
+    Raises TexConversionError when the TeX is outside the supported subset.
+    """
+    try:
+        items = _Parser(tex).parse()
+    except RecursionError:
+        # Below MAX_NESTING, but called from an already deep stack
+        raise TexConversionError("Formula nested too deeply")
+    if not items:
+        raise TexConversionError("Empty formula")
+    math = _container('oMath', items)
+    root = _el('oMathPara', math) if display else math
+    return etree.tostring(root, encoding='unicode')
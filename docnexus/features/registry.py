@@ -1,6 +1,7 @@
 from enum import Enum, auto
 from typing import Callable, List, Optional, Any, Dict
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
@@ -51,6 +52,14 @@ class Pipeline:
         """Support len() for logging."""
         return len(self._steps)
 
+def _plugin_id(item: Any) -> Optional[str]:
+    """Plugin that registered a feature (injected by the loader), None for core items."""
+    return getattr(item, 'meta', {}).get('plugin_id')
+
+def _is_feature(item: Any) -> bool:
+    # Duck typing check instead of strict isinstance to survive import/reload cycles
+    return hasattr(item, 'name') and hasattr(item, 'type') and hasattr(item, 'handler')
+
 class PluginRegistry:
     """
     Singleton Registry to hold all discovered plugin modules/features.
@@ -68,23 +77,82 @@ class PluginRegistry:
             cls._instance._plugins = []
             cls._instance._custom_slots = {}
             cls._instance._blueprints = []
+            cls._instance._activations = {}
+            cls._instance._activation_lock = threading.Lock()
+            cls._instance._blueprint_plugins = {}
+            cls._instance._disabled_plugins = set()
+            # Lists and dicts are replaced, never changed in place (readers take no lock);
+            # writers are serialized so concurrent registrations are not lost.
+            cls._instance._write_lock = threading.RLock()
         return cls._instance
 
     def register(self, plugin_or_feature: Any):
         """Register a plugin module or feature."""
         # Avoid duplicate registration
-        if plugin_or_feature not in self._plugins:
-            self._plugins.append(plugin_or_feature)
-            logger.info(f"PluginRegistry: Registered {plugin_or_feature}")
+        with self._write_lock:
+            if plugin_or_feature in self._plugins:
+                return
+            # Copy-on-write: a caller iterating get_all_plugins() keeps a stable list
+            self._plugins = self._plugins + [plugin_or_feature]
+        logger.info(f"PluginRegistry: Registered {plugin_or_feature}")
+
+    def unregister(self, plugin_or_feature: Any):
+        """Remove a registered item (activation stubs once their plugin is loaded)."""
+        with self._write_lock:
+            if plugin_or_feature in self._plugins:
+                self._plugins = [p for p in self._plugins if p is not plugin_or_feature]
+
+    def unregister_plugin(self, plugin_id: str) -> List[Any]:
+        """
+        Remove the features and pending activations a plugin registered (before reloading
+        it). Returns the removed features; its blueprints are replaced when it registers
+        them again.
+        """
+        with self._write_lock:
+            removed = [p for p in self._plugins if _plugin_id(p) == plugin_id]
+            if removed:
+                self._plugins = [p for p in self._plugins if _plugin_id(p) != plugin_id]
+        with self._activation_lock:
+            for event, callbacks in list(self._activations.items()):
+                remaining = [c for c in callbacks if c[0] != plugin_id]
+                if remaining:
+                    self._activations[event] = remaining
+                else:
+                    del self._activations[event]
+        return removed
+
+    def register_activation(self, event: str, callback: Callable[[], bool], plugin_id: Optional[str] = None):
+        """Call `callback` when `event` first fires (see core.activation)."""
+        with self._activation_lock:
+            self._activations.setdefault(event, []).append((plugin_id, callback))
+
+    def pending_activations(self, kind: Optional[str] = None) -> List[str]:
+        """Events that have not fired yet, optionally only of one kind ('onRoute', ...)."""
+        with self._activation_lock:
+            return [e for e in self._activations if kind is None or e.startswith(f"{kind}:")]
+
+    def activate(self, event: str) -> List[Optional[str]]:
+        """Fire `event` once. Returns the ids of the plugins it loaded."""
+        with self._activation_lock:
+            callbacks = self._activations.pop(event, [])
+        activated = []
+        for plugin_id, callback in callbacks:
+            try:
+                if callback():
+                    activated.append(plugin_id)
+            except Exception as e:
+                logger.error(f"PluginRegistry: activation of {event} failed: {e}", exc_info=True)
+        return activated
 
     def register_slot(self, slot_name: str, content: str) -> None:
         """
         Register content for a specific UI slot.
         Appends the content to the list for that slot.
         """
-        if slot_name not in self._custom_slots:
-            self._custom_slots[slot_name] = []
-        self._custom_slots[slot_name].append(content)
+        with self._write_lock:
+            slots = dict(self._custom_slots)
+            slots[slot_name] = slots.get(slot_name, []) + [content]
+            self._custom_slots = slots
         logger.debug(f"Registered content for slot: {slot_name}")
 
     def get_slots(self, slot_name: str) -> List[str]:
@@ -97,20 +165,121 @@ class PluginRegistry:
     def get_all_plugins(self) -> List[Any]:
         return self._plugins
 
-    def register_blueprint(self, bp: Any):
-        """Register a Flask Blueprint."""
-        if bp not in self._blueprints:
-            self._blueprints.append(bp)
-            logger.info(f"PluginRegistry: Registered blueprint {bp.name}")
+    def register_blueprint(self, bp: Any, plugin_id: Optional[str] = None):
+        """Register a Flask Blueprint (a reloaded plugin's replaces its previous one)."""
+        with self._write_lock:
+            for i, existing in enumerate(self._blueprints):
+                if existing.name == bp.name:
+                    if existing is not bp:
+                        self._blueprints = self._blueprints[:i] + [bp] + self._blueprints[i + 1:]
+                        logger.info(f"PluginRegistry: Replaced blueprint {bp.name}")
+                    break
+            else:
+                self._blueprints = self._blueprints + [bp]
+                logger.info(f"PluginRegistry: Registered blueprint {bp.name}")
+            if plugin_id:
+                self._blueprint_plugins = dict(self._blueprint_plugins, **{bp.name: plugin_id})
 
-    def register_blueprints(self, app):
-        """Register all collected blueprints with the Flask app."""
+    def register_blueprints(self, app, running: bool = False):
+        """
+        Register the collected blueprints the Flask app does not have yet. With `running`
+        (the app may be serving requests), they are added through a new URL map, see
+        _add_to_running_app().
+        """
+        added = []
         for bp in self._blueprints:
+            current = app.blueprints.get(bp.name)
+            if current is bp:
+                continue
             try:
-                app.register_blueprint(bp)
-                logger.info(f"Registered blueprint: {bp.name}")
+                if current is not None:
+                    self._swap_blueprint_views(app, bp)
+                    logger.info(f"Reloaded blueprint: {bp.name}")
+                elif running:
+                    added.append(bp)
+                else:
+                    app.register_blueprint(bp)
+                    logger.info(f"Registered blueprint: {bp.name}")
             except Exception as e:
                 logger.error(f"Failed to register blueprint {bp.name}: {e}")
+        if added:
+            try:
+                self._add_to_running_app(app, added)
+                logger.info(f"Registered blueprints: {', '.join(bp.name for bp in added)}")
+            except Exception as e:
+                logger.error(f"Failed to register blueprints {[bp.name for bp in added]}: {e}")
+
+    @staticmethod
+    def _add_to_running_app(app, blueprints):
+        """
+        Add blueprints to an app that may be serving requests. Flask refuses setup calls
+        after the first request, and request threads match URLs against app.url_map
+        without a lock. The blueprints are therefore registered on a scratch app. Their
+        views and request hooks are copied over first. Their rules go into a copy of the
+        URL map, which then replaces the current one, so a request binds either the old
+        map or the complete new one.
+        """
+        from flask import Flask
+        scratch = Flask(app.import_name)
+        for bp in blueprints:
+            scratch.register_blueprint(bp)
+        names = {bp.name for bp in blueprints}
+
+        def owned(key):
+            # Endpoints and hook scopes of a blueprint (and its nested ones) start with its name
+            return key is not None and key.split('.')[0] in names
+
+        for endpoint, view in scratch.view_functions.items():
+            if owned(endpoint):
+                app.view_functions[endpoint] = view
+        for attr in ('before_request_funcs', 'after_request_funcs', 'teardown_request_funcs',
+                     'url_value_preprocessors', 'url_default_functions', 'template_context_processors',
+                     'error_handler_spec'):
+            target = getattr(app, attr)
+            for scope, value in getattr(scratch, attr).items():
+                if owned(scope):
+                    target[scope] = value
+
+        current = app.url_map
+        url_map = type(current)(
+            default_subdomain=current.default_subdomain, strict_slashes=current.strict_slashes,
+            merge_slashes=current.merge_slashes, redirect_defaults=current.redirect_defaults,
+            converters=current.converters, sort_parameters=current.sort_parameters,
+            sort_key=current.sort_key, host_matching=current.host_matching)
+        for rule in current.iter_rules():
+            url_map.add(rule.empty())
+        for rule in scratch.url_map.iter_rules():
+            if owned(rule.endpoint):
+                url_map.add(rule.empty())
+        app.blueprints.update((name, bp) for name, bp in scratch.blueprints.items())
+        app.url_map = url_map
+
+    @staticmethod
+    def _swap_blueprint_views(app, bp):
+        """
+        Point a running app's endpoints of a reloaded blueprint at its new view functions.
+        Flask cannot remove a blueprint's URL rules, so routes the new version adds only
+        appear after a restart.
+        """
+        from flask import Flask
+        scratch = Flask(app.import_name)
+        scratch.register_blueprint(bp)
+        prefix = f"{bp.name}."
+        for endpoint, view in scratch.view_functions.items():
+            if endpoint.startswith(prefix) and endpoint in app.view_functions:
+                app.view_functions[endpoint] = view
+        app.blueprints[bp.name] = bp
+
+    def set_plugin_enabled(self, plugin_id: str, enabled: bool):
+        """Uninstalled plugins keep their loaded blueprints, but their routes answer 404."""
+        with self._write_lock:
+            if enabled:
+                self._disabled_plugins = self._disabled_plugins - {plugin_id}
+            else:
+                self._disabled_plugins = self._disabled_plugins | {plugin_id}
+
+    def is_blueprint_enabled(self, name: str) -> bool:
+        return self._blueprint_plugins.get(name) not in self._disabled_plugins
     
     def initialize_all(self):
         """
@@ -130,89 +299,195 @@ class PluginRegistry:
 class FeatureManager:
     """
     Facade that aggregates features from the PluginRegistry and manages Pipelines.
+
+    The feature table (`_features`, one feature per name) is indexed by name and never
+    modified in place: updates build a new list and swap it in, so a request that is
+    iterating the table or running a pipeline built from it keeps a consistent snapshot.
+    A single plugin's changes are applied with sync_plugin() / set_plugin_installed() /
+    set_priority(), which only re-resolve the names involved; refresh() rebuilds it all.
     """
     def __init__(self, registry: Optional[Any] = None):
         self._features: List[Feature] = []
+        self._positions: Dict[str, int] = {}            # Feature name -> index in _features
+        self._candidates: Dict[str, List[Feature]] = {}  # Feature name -> registry features, in registration order
         self._registry = registry
+        self._priority_list = None
+        self._lock = threading.RLock()  # Serializes table updates; reads take no lock
 
     def register(self, feature: Feature):
         """Register a feature manually (Core features)."""
-        self._features.append(feature)
+        with self._lock:
+            self._positions = dict(self._positions, **{feature.name: len(self._features)})
+            self._features = self._features + [feature]
 
-    def refresh(self, priority_list=None):
-        """
-        Re-scan registry and rebuild features list.
-        """
-        logger.info(f"FeatureManager: Refreshing features... (Priority: {priority_list})")
-        self._features = [] # Clear existing features
-        if not self._registry:
-            logger.warning("FeatureManager: No registry attached, skipping refresh.")
-            return
-        
-        plugins = self._registry.get_all_plugins()
-        
-        # --- PRIORTY SORTING ---
-        if priority_list:
-             # Sort: items in priority list come LAST so they overwrite previous ones in the loop below
-            def get_sort_key(p):
-                # Try multiple attributes for name, robustly
-                p_name = getattr(p, 'plugin_id', getattr(p, 'name', '')) 
-                if p_name in priority_list:
-                    return priority_list.index(p_name) + 1000
-                return 0
-            
-            plugins.sort(key=get_sort_key)
-            logger.debug(f"FeatureManager: Plugins sorted by priority: {[getattr(p, 'name', '?') for p in plugins]}")
+    def get_feature(self, name: str) -> Optional[Feature]:
+        """The feature called `name`, if any."""
+        features, index = self._features, self._positions.get(name)
+        if index is not None and index < len(features) and features[index].name == name:
+            return features[index]
+        # The table was swapped between the two reads above
+        return next((f for f in self._features if f.name == name), None)
+
+    def _priority_rank(self, feature: Feature) -> int:
+        # Plugins in the priority list win name clashes, the later in the list the stronger
+        priority_list = self._priority_list or []
+        for key in (_plugin_id(feature), feature.name):
+            if key and key in priority_list:
+                return priority_list.index(key) + 1
+        return 0
 
+    def _winner(self, candidates: List[Feature]) -> Feature:
+        # Highest priority; among equals the last registered (it overwrote the others)
+        return max(reversed(candidates), key=self._priority_rank)
+
+    @staticmethod
+    def _plugin_state():
         # Get State to sync installed status
         try:
             from docnexus.core.state import PluginState
-            state = PluginState.get_instance()
+            return PluginState.get_instance()
         except ImportError:
-            state = None
             logger.warning("FeatureManager: Could not import PluginState. Features will default to installed.")
+            return None
+
+    @staticmethod
+    def _sync_installed(plugin: Feature, state) -> None:
+        """Set a plugin feature's 'installed' meta flag from the plugin state."""
+        # Use injected plugin_id if available (added in Loader)
+        plugin_id = _plugin_id(plugin)
+        is_preinstalled = getattr(plugin, 'meta', {}).get('preinstalled', False)
+
+        if plugin_id and state and not is_preinstalled:
+            # Check actual user preference
+            # PluginState.is_plugin_installed checks the set.
+            try:
+                if not state.is_plugin_installed(plugin_id):
+                    logger.debug(f"FeatureManager: Plugin {plugin_id} is UNINSTALLED. Disabling feature {plugin.name}.")
+                    plugin.meta['installed'] = False
+                else:
+                    # Ensure it's true if previously set to False (re-enabled)
+                    plugin.meta['installed'] = True
+            except Exception as state_err:
+                logger.warning(f"FeatureManager: State check failed for {plugin_id}: {state_err}")
+
+    def refresh(self, priority_list=None):
+        """
+        Re-scan registry and rebuild features list.
+        """
+        logger.info(f"FeatureManager: Refreshing features... (Priority: {priority_list})")
+        with self._lock:
+            self._priority_list = priority_list
+            if not self._registry:
+                self._candidates, self._positions, self._features = {}, {}, []
+                logger.warning("FeatureManager: No registry attached, skipping refresh.")
+                return
+
+            state = self._plugin_state()
+            candidates: Dict[str, List[Feature]] = {}
+            for plugin in self._registry.get_all_plugins():
+                if _is_feature(plugin):
+                    self._sync_installed(plugin, state)
+                    candidates.setdefault(plugin.name, []).append(plugin)
+
+            # Positions follow the registry order with priority plugins last (a sorted copy:
+            # the registry's own list is left alone); each name holds its winning feature.
+            features, positions = [], {}
+            for plugin in sorted((p for c in candidates.values() for p in c), key=self._priority_rank):
+                if plugin.name not in positions:
+                    positions[plugin.name] = len(features)
+                    features.append(self._winner(candidates[plugin.name]))
+            for name, named in candidates.items():
+                if len(named) > 1:
+                    logger.warning(f"FeatureManager: {len(named)} features named '{name}', using the one from "
+                                   f"{_plugin_id(features[positions[name]]) or 'core'}")
 
-        count = 0
-        for plugin in plugins:
-            # Duck typing check instead of strict isinstance to survive import/reload cycles
-            if hasattr(plugin, 'name') and hasattr(plugin, 'type') and hasattr(plugin, 'handler'):
-                 
-                 # --- STATE CHECK ---
-                 # Use injected plugin_id if available (added in Loader)
-                 plugin_id = getattr(plugin, 'meta', {}).get('plugin_id')
-                 is_preinstalled = getattr(plugin, 'meta', {}).get('preinstalled', False)
-                 
-                 if plugin_id and state and not is_preinstalled:
-                     # Check actual user preference
-                     # Note: is_plugin_installed defaults to False if not in state, 
-                     # but here we only check if EXPLICITLY disabled or missing from enabled set?
-                     # PluginState.is_plugin_installed checks the set.
-                     try:
-                        if not state.is_plugin_installed(plugin_id):
-                            logger.debug(f"FeatureManager: Plugin {plugin_id} is UNINSTALLED. Disabling feature {plugin.name}.")
-                            plugin.meta['installed'] = False
-                        else:
-                            # Ensure it's true if previously set to False (re-enabled)
-                            plugin.meta['installed'] = True
-                     except Exception as state_err:
-                         logger.warning(f"FeatureManager: State check failed for {plugin_id}: {state_err}")
-
-                 # Check for existing feature by name
-                 existing_idx = next((i for i, f in enumerate(self._features) if f.name == plugin.name), -1)
-                 
-                 if existing_idx >= 0:
-                     # Update/Replace existing feature
-                     self._features[existing_idx] = plugin
-                     logger.warning(f"FeatureManager: Overwrote existing feature '{plugin.name}' (State: {plugin.state})")
-                 else:
-                    self._features.append(plugin)
-                    count += 1
-                    logger.debug(f"Registered plugin feature (duck-typed): {plugin.name}")
-            elif hasattr(plugin, 'get_features'):
-                 # Legacy path (should be unused now)
-                 pass
-
-        logger.info(f"FeatureManager: Loaded/Updated features. Total: {len(self._features)}")
+            self._candidates, self._positions, self._features = candidates, positions, features
+        logger.info(f"FeatureManager: Loaded/Updated features. Total: {len(features)}")
+
+    def _resolve(self, names) -> None:
+        """Publish a new table in which each of `names` holds its current winner (if any)."""
+        features, positions = list(self._features), dict(self._positions)
+        dropped = False
+        for name in names:
+            named = self._candidates.get(name)
+            winner = self._winner(named) if named else None
+            index = positions.get(name)
+            if winner is None:
+                if index is not None:
+                    features[index] = None
+                    dropped = True
+            elif index is None:
+                positions[name] = len(features)
+                features.append(winner)
+            else:
+                features[index] = winner
+        if dropped:
+            features = [f for f in features if f is not None]
+            positions = {f.name: i for i, f in enumerate(features)}
+        self._positions, self._features = positions, features
+
+    def sync_plugin(self, plugin_id: str) -> None:
+        """
+        Apply one plugin's registry changes (loaded, reloaded, activated or unregistered)
+        to the feature table, re-resolving only the feature names it has or had.
+        """
+        with self._lock:
+            if not self._registry:
+                return
+            candidates = dict(self._candidates)
+            names = set()
+            for name, named in self._candidates.items():
+                if any(_plugin_id(f) == plugin_id for f in named):
+                    names.add(name)
+                    candidates[name] = [f for f in named if _plugin_id(f) != plugin_id]
+
+            state = self._plugin_state()
+            for plugin in self._registry.get_all_plugins():
+                if _is_feature(plugin) and _plugin_id(plugin) == plugin_id:
+                    self._sync_installed(plugin, state)
+                    candidates[plugin.name] = candidates.get(plugin.name, []) + [plugin]
+                    names.add(plugin.name)
+
+            self._candidates = {name: named for name, named in candidates.items() if named}
+            self._resolve(names)
+        logger.info(f"FeatureManager: Synced plugin {plugin_id} ({len(names)} features). Total: {len(self._features)}")
+
+    def set_plugin_installed(self, plugin_id: str, installed: bool) -> None:
+        """Enable or disable a loaded plugin's features (and its blueprint routes) in place."""
+        with self._lock:
+            for named in self._candidates.values():
+                for feature in named:
+                    if _plugin_id(feature) == plugin_id and not feature.meta.get('preinstalled', False):
+                        feature.meta['installed'] = installed
+            # A new table: snapshots built from the previous one (core.runtime) are rebuilt
+            self._features = list(self._features)
+            if self._registry and hasattr(self._registry, 'set_plugin_enabled'):
+                self._registry.set_plugin_enabled(plugin_id, installed)
+
+    def set_priority(self, priority_list) -> None:
+        """Apply a new plugin priority list: only names several plugins provide can change hands."""
+        with self._lock:
+            self._priority_list = priority_list
+            self._resolve([name for name, named in self._candidates.items() if len(named) > 1])
+
+    def activate(self, event: str) -> bool:
+        """
+        Fire a plugin activation event (e.g. 'onExport:pdf'); the plugins it loaded are
+        synced into the feature table. True if a plugin was loaded.
+        """
+        if not self._registry or not hasattr(self._registry, 'activate'):
+            return False
+        # Serialized: a concurrent caller returns once the features include the plugin
+        with self._lock:
+            loaded = self._registry.activate(event)
+            if not loaded:
+                return False
+            for plugin_id in loaded:
+                if plugin_id is None:
+                    self.refresh(priority_list=self._priority_list)
+                else:
+                    self.sync_plugin(plugin_id)
+            return True
 
     def is_feature_installed(self, feature: Feature) -> bool:
         """
@@ -237,9 +512,18 @@ class FeatureManager:
         """
         Retrieve a registered export handler for a specific format extension.
         """
+        feature = self.get_export_feature(format_ext)
+        return feature.handler if feature else None
+
+    def get_export_feature(self, format_ext: str) -> Optional[Feature]:
+        """
+        Retrieve the installed export Feature for a format extension.
+        Callers that need the handler's meta (e.g. its input contract) use this.
+        """
         logger.debug(f"FeatureManager: Looking for export handler for '{format_ext}'...")
         
-        for feature in self._features:
+        features = self._features  # Snapshot: updates swap in a new list
+        for feature in features:
             # Flexible type checking
             ft_type = str(feature.type) # e.g. "FeatureType.EXPORT_HANDLER"
             
@@ -253,10 +537,19 @@ class FeatureManager:
                    match = True
                    
                 if match:
+                    # Activation stub: load the plugin, then resolve its real handler
+                    activation_event = feature.meta.get('activation_event')
+                    if activation_event and self.is_feature_installed(feature):
+                        self.activate(activation_event)
+                        if feature in self._features:
+                            logger.warning(f"FeatureManager: Plugin for {format_ext} failed to activate.")
+                            return None
+                        return self.get_export_feature(format_ext)
+
                     # Enforce Centralized Control
                     if self.is_feature_installed(feature):
                         logger.info(f"FeatureManager: Found and Verified handler for {format_ext} ({feature.name})")
-                        return feature.handler
+                        return feature
                     else:
                         logger.warning(f"FeatureManager: Found handler for {format_ext} ({feature.name}) but it is NOT INSTALLED.")
                         # Continue searching? Or return None immediately to block?
@@ -265,19 +558,25 @@ class FeatureManager:
                         # returning None triggers the 404 MISSING_PLUGIN workflow.
                         return None
         
-        logger.warning(f"FeatureManager: No handler found for {format_ext}. Available: {[f.name for f in self._features]}")
+        logger.warning(f"FeatureManager: No handler found for {format_ext}. Available: {[f.name for f in features]}")
         return None
 
-    def build_pipeline(self, enable_experimental: bool) -> Pipeline:
+    def get_export_features(self) -> List[Feature]:
+        """All installed export Features (one per format extension)."""
+        return [f for f in self._features
+                if "EXPORT_HANDLER" in str(f.type) and self.is_feature_installed(f)]
+
+    def build_pipeline(self, enable_experimental: bool, features: Optional[List[Feature]] = None) -> Pipeline:
         """
-        Build the standard processing pipeline.
+        Build the standard processing pipeline (from `features`, a table snapshot, if given).
         Returns a Pipeline object.
         """
         pipeline = Pipeline("StandardPipeline")
         
         # Sort or prioritize? 
         # Currently we rely on insertion order: Core features first (registered in app.py), then Plugins.
-        for f in self._features:
+        # Iterates one snapshot of the table, so a concurrent plugin update cannot split a pipeline.
+        for f in (features if features is not None else self._features):
             if f.type != FeatureType.ALGORITHM:
                 continue
 
@@ -13,8 +13,8 @@ logger = logging.getLogger(__name__)
 
 def get_config():
     """Deferred import to avoid circular dependency/init issues."""
-    from docnexus.app import MD_FOLDER, ALLOWED_EXTENSIONS
-    return MD_FOLDER, ALLOWED_EXTENSIONS
+    from docnexus.app import ALLOWED_EXTENSIONS, current_runtime
+    return current_runtime().md_folder, ALLOWED_EXTENSIONS
 
 @editor_bp.route('/api/get-source/<path:filename>')
 def get_source(filename):
@@ -4,17 +4,28 @@ import logging
 import traceback
 import re
 from pathlib import Path
+from typing import Optional
 from bs4 import BeautifulSoup, Tag
 
 PLUGIN_DIR = Path(__file__).parent
 ENABLED_FILE = PLUGIN_DIR / "ENABLED"
 DEPENDENCIES = ["xhtml2pdf"]
 
+# Long documents are split at top-level sections and rendered in parallel (needs pypdf)
+CHUNKED_PDF_THRESHOLD = 2 * 1024 * 1024   # Source HTML size that enables chunking
+CHUNKED_PDF_CHUNK_SIZE = 512 * 1024       # Target serialized HTML per chunk
+CHUNKED_PDF_MAX_WORKERS = 4
+
 import io
 import urllib.parse
-import requests
 import base64
 
+from docnexus.core.export_dom import ExportDocument
+from docnexus.core.export_code import (
+    DEFAULT_CODE_MODE, DEFAULT_MAX_SPANS, simplify_code_blocks, token_styles
+)
+from docnexus.core import pdf_chunks
+
 logger = logging.getLogger(__name__)
 
 # -------------------------------------------------------------------------
@@ -899,6 +910,7 @@ def transform_html_for_pdf(soup: BeautifulSoup):
                 headers = {
                     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
                 }
+                import requests  # Deferred: only needed for remote images and math
                 response = requests.get(url, headers=headers, timeout=10)
                 
                 if response.status_code == 200:
@@ -974,6 +986,7 @@ def transform_html_for_pdf(soup: BeautifulSoup):
                 print(f"DEBUG: Fetching Math Render: {tex[:20]}...")
                 
                 # Fetch image
+                import requests
                 response = requests.get(url, timeout=5)
                 
                 if response.status_code == 200:
@@ -1197,10 +1210,37 @@ def transform_html_for_pdf(soup: BeautifulSoup):
 # -------------------------------------------------------------------------
 # Main Export Function
 # -------------------------------------------------------------------------
-def export_pdf(content_html: str) -> bytes:
+def strip_unsafe_styles(page):
+    """
+    Remove <link rel="stylesheet">, <style> blocks and style="..." attributes in place.
+    xhtml2pdf crashes on modern CSS (var(), calc()), so only our internal stylesheet is used.
+    """
+    for link in page.find_all('link'):
+        if 'stylesheet' in (link.get('rel') or []):
+            link.decompose()
+    for style in page.find_all('style'):
+        style.decompose()
+    for tag in page.find_all(style=True):
+        del tag['style']
+
+
+_STYLESHEET_LINK_RE = re.compile(r'<link[^>]+rel=["\']stylesheet["\'][^>]*>', re.IGNORECASE)
+_STYLE_BLOCK_RE = re.compile(r'<style\b[^>]*>.*?</style>', re.IGNORECASE | re.DOTALL)
+_STYLE_ATTR_RE = re.compile(r'\sstyle=["\'][^"\']*["\']', re.IGNORECASE)
+
+
+def strip_unsafe_styles_text(html: str) -> str:
+    """strip_unsafe_styles() on serialized markup, for when it cannot be parsed (last resort)."""
+    html = _STYLESHEET_LINK_RE.sub('', html)
+    html = _STYLE_BLOCK_RE.sub('', html)
+    return _STYLE_ATTR_RE.sub('', html)
+
+
+def export_pdf(content_html, sink=None) -> Optional[bytes]:
     """
     Export content to PDF using xhtml2pdf.
-    Returns bytes.
+    Accepts raw HTML or an ExportDocument (parsed once by the core).
+    Writes into `sink` when given (streaming contract), otherwise returns bytes.
     """
     import logging
     logger = logging.getLogger(__name__)
@@ -1224,49 +1264,26 @@ def export_pdf(content_html: str) -> bytes:
                 text = text.replace(k, v)
             return css_var_pattern.sub('#888888', text)
 
-        # 0. Clean & Restructure HTML using BeautifulSoup
+        # 0. Clean & Restructure HTML
+        # Parsing, screen-only cleanup and math normalization happen once in ExportDocument.
+        content_root = None
+        source_size = 0
+        export_options = {}
         try:
-            soup = BeautifulSoup(content_html, 'html.parser')
-
-            # Identify Content Container - Try Multiple Selectors
-            main_container = soup.find(id='documentContent')
-            if not main_container:
-                main_container = soup.find(class_='markdown-content')
-            if not main_container:
-                # Fallback: Try identifying by content-area (Word export style)
-                main_container = soup.find(class_='content-area')
+            document = ExportDocument.coerce(content_html)
+            main_container = document.container
 
             if main_container:
                 # Apply Transformations
                 transform_html_for_pdf(main_container)
 
-                # Create a fresh clean DOM with HEAD
-                new_soup = BeautifulSoup('<html><head><meta charset="utf-8"></head><body></body></html>', 'html.parser')
+                # Move the container into a fresh clean DOM (no serialize/re-parse round-trip)
+                new_soup = document.isolate([main_container])
                 body = new_soup.body
-                head = new_soup.head
-
-                # Inject Emoji CSS (Critical for Visibility)
-                style_tag = new_soup.new_tag('style')
-                style_tag.string = """
-                    .emoji-img {
-                        width: 12px;
-                        height: 12px;
-                        vertical-align: bottom;
-                        margin: 0 1px;
-                        display: inline-block; /* Ensure it takes up space */
-                    }
-                """
-                head.append(style_tag)
-                
-                # Append the main container
-                body.append(main_container)
 
                 # Check for MERMAID Diagrams (Server-Side Render via Mermaid.ink)
                 # Since xhtml2pdf handles images well but JS not at all.
                 try:
-                    import requests
-                    import base64
-                    
                     mermaids = body.find_all(class_='mermaid')
                     if mermaids:
                          print(f"DEBUG: Found {len(mermaids)} Mermaid diagrams to render.")
@@ -1291,6 +1308,7 @@ def export_pdf(content_html: str) -> bytes:
                             
                             print(f"DEBUG: Fetching Mermaid Render: {url[:50]}...")
                             # Fetch with timeout
+                            import requests
                             response = requests.get(url, timeout=5)
                             
                             if response.status_code == 200:
@@ -1315,63 +1333,41 @@ def export_pdf(content_html: str) -> bytes:
                 except Exception as e:
                     print(f"DEBUG: Mermaid setup failed: {e}")
 
-                
-                # Remove any screen-only elements: Nav, Sidebar, Buttons
-                # Extended list based on view.html
-                screen_only_selectors = [
-                    'script', 'button', 'nav', 
-                    '.top-nav', '.toc-sidebar', '.edit-actions', 
-                    '.btn', '.no-print'
-                ]
-                for selector in screen_only_selectors:
-                    # Handle tag names vs classes
-                    if selector.startswith('.'):
-                        for el in body.find_all(class_=selector[1:]):
-                            el.decompose()
-                    else:
-                        for el in body.find_all(selector):
-                            el.decompose()
+                # Math scripts left over after transformation are not printable
+                for el in body.find_all('script'):
+                    el.decompose()
 
-                # Update content to be just this clean structure
-                content_html = str(new_soup)
+                page = new_soup
             else:
                  logger.warning("PDFExport: Could not find content container (#documentContent, .markdown-content, or .content-area)")
-                 # Even if extracting container fails, we should try to strip sidebar/nav from the FULL soup
-                 # Fallback cleanup on the original soup
-                 for selector in ['.top-nav', '.toc-sidebar', '.edit-actions', 'nav', 'script', 'button']:
-                     if selector.startswith('.'):
-                         for el in soup.find_all(class_=selector[1:]):
-                             el.decompose()
-                     else:
-                         for el in soup.find_all(selector):
-                             el.decompose()
-                 content_html = str(soup)
+                 # Screen-only elements were already stripped from the full document
+                 page = document.soup
+
+            # "SAFE MODE": Strip all external stylesheets to prevent xhtml2pdf crash on modern CSS
+            # We replace them with a robust internal stylesheet optimized for print.
+            # Done on the tree instead of regexes over the serialized markup.
+            strip_unsafe_styles(page)
+
+            content_root = page.body or page
+            source_size = document.source_size
+            export_options = document.options
 
         except Exception as e:
             logger.error(f"PDFExport: preprocessing failed: {e}")
             logger.error(traceback.format_exc())
-            pass
-
+            if not isinstance(content_html, str):
+                raise
+            # Safe mode still applies to the raw page: a minimal parse, else the regex strip
+            source_size = len(content_html)
+            try:
+                page = BeautifulSoup(content_html, 'html.parser')
+                strip_unsafe_styles(page)
+                content_root = page.body or page
+            except Exception as fallback_error:
+                logger.error(f"PDFExport: fallback parse failed, stripping styles from the markup: {fallback_error}")
+                content_root = None
+                content_html = strip_unsafe_styles_text(content_html)
 
-        # "SAFE MODE": Strip all external stylesheets to prevent xhtml2pdf crash on modern CSS
-        # We replace them with a robust internal stylesheet optimized for print.
-        
-        # 1. Remove all <link rel="stylesheet"> tags
-        link_pattern = re.compile(r'<link[^>]+rel=["\']stylesheet["\'][^>]*>', re.IGNORECASE)
-        full_html = link_pattern.sub('', content_html)
-        
-        # 2. Remove all <style>...</style> blocks (Nuclear option)
-        # Use DOTALL to match newlines inside style tags
-        style_block_pattern = re.compile(r'<style\b[^>]*>.*?</style>', re.IGNORECASE | re.DOTALL)
-        full_html = style_block_pattern.sub('', full_html)
-        
-        # 3. Remove all style="..." attributes (Nuclear option)
-        # This removes inline styles that might contain vars
-        # We match style=" anything except quote "
-        # Hacky regex but sufficient for standard HTML
-        style_attr_pattern = re.compile(r'\sstyle=["\'][^"\']*["\']', re.IGNORECASE)
-        full_html = style_attr_pattern.sub('', full_html)
-        
         # 4. Add Safe Internal Stylesheet
         # This provides a clean, professional look without relying on the web UI's complex CSS
             
@@ -1733,7 +1729,21 @@ def export_pdf(content_html: str) -> bytes:
         """
 
 
-        full_html = """
+        # Print-simplify highlighted code: xhtml2pdf lays out every token span separately.
+        # Config: export_options.code_blocks (auto/segments/plain/full), code_max_spans.
+        if content_root is not None:
+            code_stats = simplify_code_blocks(
+                content_root,
+                token_styles(pdf_css),
+                mode=export_options.get('code_blocks', DEFAULT_CODE_MODE),
+                max_spans=int(export_options.get('code_max_spans', DEFAULT_MAX_SPANS))
+            )
+            if code_stats['blocks']:
+                logger.info(f"PDFExport: Code blocks {code_stats['blocks']} ({code_stats['plain_blocks']} plain), "
+                            f"spans {code_stats['spans_before']} -> {code_stats['spans_after']}")
+            content_html = content_root.decode_contents()
+
+        pdf_template = """
         <html>
         <head>
             <style>
@@ -1746,12 +1756,32 @@ def export_pdf(content_html: str) -> bytes:
             </div>
         </body>
         </html>
-        """.format(pdf_css, content_html)
+        """
+
+        def wrap(body_html):
+            return pdf_template.format(pdf_css, body_html)
+
+        # Long documents: render top-level sections in worker processes and merge.
+        # Peak memory is bounded by the largest chunk instead of the whole document.
+        if content_root is not None and source_size >= CHUNKED_PDF_THRESHOLD and pdf_chunks.is_available():
+            merged = io.BytesIO() if sink is None else sink
+            start = merged.tell()
+            try:
+                if pdf_chunks.render_chunked(content_root, wrap, CHUNKED_PDF_CHUNK_SIZE, CHUNKED_PDF_MAX_WORKERS, merged):
+                    logger.info(f"PDFExport: Generated {merged.tell() - start} bytes (chunked).")
+                    return merged.getvalue() if sink is None else None
+            except Exception as e:
+                logger.error(f"PDFExport: Chunked rendering failed, falling back to single pass: {e}")
+                merged.seek(start)
+                merged.truncate()
+
+        full_html = wrap(content_html)
         
         # 5. Convert to PDF using Safe Methods
         
-        # Convert to PDF in memory
-        result = io.BytesIO()
+        # Convert to PDF (in memory, or straight into the caller's sink)
+        result = io.BytesIO() if sink is None else sink
+        start = result.tell()
         
         pisa_status = pisa.CreatePDF(
             full_html,              # the HTML to convert
@@ -1761,11 +1791,10 @@ def export_pdf(content_html: str) -> bytes:
         if pisa_status.err:
             raise RuntimeError(f"PDF generation error: {pisa_status.err}")
             
-        logger.info(f"PDFExport: Generated {result.getbuffer().nbytes} bytes.")
-        return result.getvalue()
+        logger.info(f"PDFExport: Generated {result.tell() - start} bytes.")
+        return result.getvalue() if sink is None else None
         
     except ImportError as ie:
-        import traceback
         import sys
         
         # Capture full context
@@ -1778,7 +1807,7 @@ def export_pdf(content_html: str) -> bytes:
         
         raise RuntimeError(f"xhtml2pdf library is missing/broken. Detail: {ie}")
     except Exception as e:
-        import traceback
+        # The module-level traceback: a local import here would shadow it in the whole function
         traceback.print_exc()
         raise RuntimeError(f"PDF Export Failed: {e}")
 
@@ -1800,6 +1829,8 @@ def get_features():
             state=FeatureState.EXPERIMENTAL,
             meta={
                 "extension": "pdf",
+                "input": "document",
+                "output": "stream",
                 "label": "PDF Document (.pdf)",
                 "installed": is_enabled,
                 "description": "Generates professional PDF documents from your markdown.",
@@ -1816,7 +1847,9 @@ PLUGIN_METADATA = {
     'description': 'Converts documentation to professional PDF format with Table of Contents, cover page, and optimized print layout.',
     'category': 'export',
     'icon': 'fa-file-pdf',
-    'preinstalled': False
+    'preinstalled': False,
+    # Imported on the first pdf export (see docnexus/core/activation.py)
+    'activation_events': ['onExport:pdf']
 }
 
 
@@ -1,9 +1,12 @@
 import logging
 import io
-import shutil
 from pathlib import Path
 import re
+import threading
 import urllib.parse
+from copy import deepcopy
+from functools import lru_cache
+from types import MappingProxyType
 
 # Note: Feature, FeatureType, FeatureState, PluginRegistry are INJECTED by the loader.
 # Do not import them directly to avoid split-brain issues.
@@ -13,11 +16,31 @@ try:
 except ImportError:
     BeautifulSoup = None
 
+from docnexus.core.export_dom import ExportDocument
+from docnexus.core.export_images import ImageStore, ResolvedImage, resolve_images
+from docnexus.core.tex_omml import M_NS, TexConversionError, tex_to_omml
+
 logger = logging.getLogger(__name__)
 
 # Constants
 MAX_EXPORT_HTML_SIZE = 50 * 1024 * 1024  # 50 MB
 
+# Optional custom base document (page setup, fonts, heading styles...). The DocNexus
+# styles below are added to it if missing.
+WORD_TEMPLATE_FILE = Path(__file__).parent / "template.docx"
+TABLE_STYLE = "DocNexus Table"    # Table Grid + shaded header row
+FIGURE_STYLE = "DocNexus Figure"  # Centered image paragraphs
+TABLE_HEADER_FILL = "6366f1"
+
+# Markers: private-use text placed in the HTML survives htmldocx as run text and tells
+# the post-processing pass what to fix where.
+# - Formulas: "\ue000<index>\ue001", swapped for the native equation (OMML)
+# - Structure: "\ue002<kind>:<arg>\ue003" for alert cells, heading bookmarks, page breaks
+EQUATION_MARKER = "\ue000{}\ue001"
+FIX_MARKER = "\ue002{}:{}\ue003"
+MARKER_RE = re.compile("\ue000(\\d+)\ue001|\ue002(\\w+):([^\ue003]*)\ue003")
+ALERT_ICONS = ["ℹ", "💡", "📣", "⚠️", "🛑", "⚡"]
+
 def add_bookmark(paragraph, bookmark_name):
     """Add a bookmark to a paragraph in a Word document."""
     from docx.oxml import OxmlElement
@@ -41,75 +64,235 @@ def add_bookmark(paragraph, bookmark_name):
 # Imports for SafeHtmlToDocx and export_to_word
 try:
     from htmldocx import HtmlToDocx
+    from htmldocx.h2d import INDENT as HTMLDOCX_INDENT, MAX_INDENT as HTMLDOCX_MAX_INDENT
     from docx import Document
+    from docx.document import Document as DocxDocument
     from docx.shared import RGBColor, Pt, Inches
-    from docx.oxml import OxmlElement
+    from docx.oxml import OxmlElement, parse_xml
     from docx.oxml.ns import qn
     from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_COLOR
+    from docx.enum.style import WD_STYLE_TYPE
+    from docx.shape import InlineShape
+    from docx.text.parfmt import ParagraphFormat
+    from docx.text.paragraph import Paragraph
+    from docx.text.run import Run
     # re is imported globally
 except ImportError as e:
     # Defer error handling to export_to_word if these are not available
     # This allows the module to load even if docx dependencies are missing
     HtmlToDocx = None
     Document = None
+    DocxDocument = None
     RGBColor = None
     Pt = None
     OxmlElement = None
+    parse_xml = None
     qn = None
     WD_ALIGN_PARAGRAPH = None
     WD_COLOR = None
+    WD_STYLE_TYPE = None
+    InlineShape = None
+    ParagraphFormat = None
+    Paragraph = None
+    Run = None
     re = None
     _word_export_import_error = e
 
+# -------------------------------------------------------------------------
+# Memoized inline style resolution
+# -------------------------------------------------------------------------
+# htmldocx re-parses the style attribute (and every color / font list inside it) for
+# each run. Exports repeat a handful of style strings thousands of times (code blocks,
+# tables, emoji spans), so each distinct style is resolved once into a recipe of
+# python-docx values and the recipe is applied per run.
+STYLE_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=STYLE_CACHE_SIZE)
+def parse_inline_style(string, separator=';'):
+    """Same result as HtmlToDocx.parse_dict_string, cached and read-only."""
+    parts = string.replace(" ", '').split(separator)
+    return MappingProxyType(dict(x.split(':', 1) for x in parts if ':' in x))
+
+
+def _parse_rgb(value):
+    """RGBColor from '#rgb', '#rrggbb' or 'rgb(r, g, b)'; None if it cannot be parsed."""
+    try:
+        if 'rgb' in value:
+            parts = [x.strip() for x in re.sub(r'[a-z()]+', '', value).split(',') if x.strip()]
+            if len(parts) >= 3:
+                return RGBColor(*[int(p) for p in parts[:3]])
+        elif '#' in value:
+            color = value.strip().lstrip('#')
+            if len(color) == 3: color = ''.join([c*2 for c in color])
+            if len(color) >= 6:
+                return RGBColor(*(int(color[i:i+2], 16) for i in (0, 2, 4)))
+    except Exception:
+        pass
+    return None
+
+
+class RunStyleRecipe:
+    """Precomputed character formatting for one inline style."""
+    __slots__ = ('color', 'highlight', 'strike', 'underline', 'font_name')
+
+    def __init__(self, style):
+        self.color = _parse_rgb(style['color']) if 'color' in style else None
+
+        # CriticMarkup Mapping
+        self.highlight = None
+        bg = style.get('background-color', '').lower()
+        if '#ffff00' in bg: self.highlight = WD_COLOR.YELLOW
+        elif '#008000' in bg: self.highlight = WD_COLOR.BRIGHT_GREEN
+        elif '#ff0000' in bg: self.highlight = WD_COLOR.RED
+
+        # Text Decoration (Strike/Underline) from styles
+        decoration = style.get('text-decoration', '')
+        self.strike = 'line-through' in decoration
+        self.underline = 'underline' in decoration
+
+        # Font Family Support (For Emojis)
+        self.font_name = None
+        fonts = style.get('font-family', '').split(',')
+        if fonts and fonts[0]:
+            self.font_name = fonts[0].strip().replace("'", "").replace('"', "") or None
+
+    def apply(self, run):
+        font = run.font
+        if self.color is not None:
+            font.color.rgb = self.color
+        if self.highlight is not None:
+            font.highlight_color = self.highlight
+        if self.strike:
+            font.strike = True
+        if self.underline:
+            font.underline = True
+        if self.font_name:
+            font.name = self.font_name
+
+
+class ParagraphStyleRecipe:
+    """Precomputed paragraph formatting (alignment, indent, shading) for one inline style."""
+    __slots__ = ('alignment', 'left_indent', 'shading')
+
+    ALIGNMENTS = {'center': 'CENTER', 'right': 'RIGHT', 'justify': 'JUSTIFY'}
+
+    def __init__(self, style):
+        align = self.ALIGNMENTS.get(style.get('text-align'))
+        self.alignment = getattr(WD_ALIGN_PARAGRAPH, align) if align else None
+
+        # Same rules as htmldocx (px only)
+        self.left_indent = None
+        if 'margin-left' in style:
+            margin = style['margin-left']
+            units = re.sub(r'[0-9]+', '', margin)
+            margin = int(float(re.sub(r'[a-z]+', '', margin)))
+            if units == 'px':
+                self.left_indent = Inches(min(margin // 10 * HTMLDOCX_INDENT, HTMLDOCX_MAX_INDENT))
+
+        self.shading = None
+        if 'background-color' in style:
+            color = style['background-color'].strip().lstrip('#')
+            if len(color) == 3: color = ''.join([c*2 for c in color])
+            if len(color) >= 6:
+                self.shading = color
+
+    def apply(self, paragraph):
+        if self.alignment is not None:
+            paragraph.paragraph_format.alignment = self.alignment
+        if self.left_indent is not None:
+            paragraph.paragraph_format.left_indent = self.left_indent
+        if self.shading:
+            try:
+                pPr = paragraph._p.get_or_add_pPr()
+                shd = OxmlElement('w:shd')
+                shd.set(qn('w:val'), 'clear')
+                shd.set(qn('w:fill'), self.shading)
+
+                # Schema Order for pPr: ... pBdr, shd, tabs, spacing, ind, jc, rPr ...
+                successors = ['w:tabs', 'w:spacing', 'w:ind', 'w:jc', 'w:rPr']
+                target = None
+                for s in successors:
+                    target = pPr.find(qn(s))
+                    if target is not None:
+                        break
+
+                if target is not None:
+                    target.addprevious(shd)
+                else:
+                    pPr.append(shd)
+            except Exception as e:
+                logger.error(f"Error injecting shading: {e}")
+
+
+@lru_cache(maxsize=STYLE_CACHE_SIZE)
+def run_style_recipe(items):
+    return RunStyleRecipe(dict(items))
+
+
+@lru_cache(maxsize=STYLE_CACHE_SIZE)
+def paragraph_style_recipe(items):
+    return ParagraphStyleRecipe(dict(items))
+
+
 class SafeHtmlToDocx(HtmlToDocx):
     """
     Subclass of HtmlToDocx to fix fragile color parsing that crashes on invalid hex/rgb strings.
-    Overrides add_styles_to_run to add try/except blocks.
+    Inline styles are resolved once per distinct style string into memoized recipes
+    (see RunStyleRecipe / ParagraphStyleRecipe) that are then applied per run/paragraph.
+    Images resolved by the export pipeline are read from an in-memory ImageStore.
     """
-    def add_styles_to_run(self, style):
-        if 'color' in style:
-            try:
-                if 'rgb' in style['color']:
-                    color = re.sub(r'[a-z()]+', '', style['color'])
-                    parts = [x.strip() for x in color.split(',') if x.strip()]
-                    if len(parts) >= 3:
-                        colors = [int(p) for p in parts[:3]]
-                        self.run.font.color.rgb = RGBColor(*colors)
-                elif '#' in style['color']:
-                    color = style['color'].strip().lstrip('#')
-                    if len(color) == 3: color = ''.join([c*2 for c in color])
-                    if len(color) >= 6:
-                        colors = tuple(int(color[i:i+2], 16) for i in (0, 2, 4))
-                        self.run.font.color.rgb = RGBColor(*colors)
-            except Exception: pass
-            
-        if 'background-color' in style:
-            try:
-                bg = style['background-color'].lower()
-                # CriticMarkup Mapping
-                if '#ffff00' in bg: self.run.font.highlight_color = WD_COLOR.YELLOW
-                elif '#008000' in bg: self.run.font.highlight_color = WD_COLOR.BRIGHT_GREEN
-                elif '#ff0000' in bg: self.run.font.highlight_color = WD_COLOR.RED
-                else: pass
-            except Exception: pass
-            
-        # Text Decoration (Strike/Underline) from styles
-        if 'text-decoration' in style:
-            if 'line-through' in style['text-decoration']:
-                self.run.font.strike = True
-            if 'underline' in style['text-decoration']:
-                self.run.font.underline = True
+    def __init__(self, image_store=None):
+        super().__init__()
+        self.image_store = image_store
 
-        # Font Family Support (For Emojis)
-        if 'font-family' in style:
+    def copy_settings_from(self, other):
+        super().copy_settings_from(other)
+        self.image_store = getattr(other, 'image_store', None)
+
+    def handle_img(self, current_attrs):
+        stream = self.image_store.open(current_attrs.get('src')) if self.image_store is not None else None
+        if stream is None or not self.include_images:
+            return super().handle_img(current_attrs)
+        if isinstance(self.doc, DocxDocument):
+            self.doc.add_picture(stream)
+        else:
+            self.add_image_to_cell(self.doc, stream)
+
+    def handle_table(self):
+        # Same as htmldocx, but cells are parsed by this class (upstream hardcodes
+        # HtmlToDocx), so images and safe styles also work inside tables.
+        table_soup = self.tables[self.table_no]
+        rows, cols = self.get_table_dimensions(table_soup)
+        self.table = self.doc.add_table(rows, cols)
+
+        if self.table_style:
             try:
-                # Log font found
-                # logger.info(f"Font Family Found: {style['font-family']}")
-                fonts = style['font-family'].split(',')
-                if fonts:
-                    primary_font = fonts[0].strip().replace("'", "").replace('"', "")
-                    self.run.font.name = primary_font
-            except Exception: pass
+                self.table.style = self.table_style
+            except KeyError as e:
+                raise ValueError(f"Unable to apply style {self.table_style}.") from e
+
+        for cell_row, row in enumerate(self.get_table_rows(table_soup)):
+            for cell_col, col in enumerate(self.get_table_columns(row)):
+                cell_html = self.get_cell_html(col)
+                if col.name == 'th':
+                    cell_html = "<b>%s</b>" % cell_html
+                child_parser = self.__class__()
+                child_parser.copy_settings_from(self)
+                child_parser.add_html_to_cell(cell_html, self.table.cell(cell_row, cell_col))
+
+        # skip all tags until corresponding closing tag
+        self.instances_to_skip = len(table_soup.find_all('table'))
+        self.skip_tag = 'table'
+        self.skip = True
+        self.table = None
+
+    def parse_dict_string(self, string, separator=';'):
+        # Code blocks and tables repeat the same inline styles thousands of times
+        return parse_inline_style(string, separator)
+
+    def add_styles_to_run(self, style):
+        run_style_recipe(tuple(style.items())).apply(self.run)
 
     def handle_starttag(self, tag, attrs):
         # Override to intercept Named Anchors for Bookmarks
@@ -128,35 +311,329 @@ class SafeHtmlToDocx(HtmlToDocx):
         super().handle_starttag(tag, attrs)
 
     def add_styles_to_paragraph(self, style):
-        # Override to support background-color (Shading) for Math Blocks
-        super().add_styles_to_paragraph(style)
-        
-        if 'background-color' in style:
+        # Alignment/indent as upstream, plus background-color (Shading) for Math Blocks
+        paragraph_style_recipe(tuple(style.items())).apply(self.paragraph)
+
+
+# -------------------------------------------------------------------------
+# Base document template
+# -------------------------------------------------------------------------
+# Every export used to start from an empty Document() (unzipping python-docx's default
+# template from disk) and then format each header cell, heading and figure directly.
+# The base template carries named styles for those instead; it is built once, kept as
+# bytes and cloned in memory per export.
+_template_lock = threading.Lock()
+_template_cache = None  # (template file mtime or None, bytes)
+
+
+def _grid_table_properties():
+    """<w:tblPr> with the borders and cell margins of Word's built-in "Table Grid" style."""
+    tblPr = OxmlElement('w:tblPr')
+    borders = OxmlElement('w:tblBorders')
+    for edge in ('top', 'left', 'bottom', 'right', 'insideH', 'insideV'):
+        border = OxmlElement(f'w:{edge}')
+        border.set(qn('w:val'), 'single')
+        border.set(qn('w:sz'), '4')
+        border.set(qn('w:space'), '0')
+        border.set(qn('w:color'), 'auto')
+        borders.append(border)
+    tblPr.append(borders)
+    margins = OxmlElement('w:tblCellMar')
+    for side, width in (('top', '0'), ('left', '108'), ('bottom', '0'), ('right', '108')):
+        margin = OxmlElement(f'w:{side}')
+        margin.set(qn('w:w'), width)
+        margin.set(qn('w:type'), 'dxa')
+        margins.append(margin)
+    tblPr.append(margins)
+    return tblPr
+
+
+def _add_template_styles(doc):
+    """Add the DocNexus styles to `doc` (no-op for styles a custom template already defines)."""
+    styles = doc.styles
+    names = {style.name for style in styles}
+
+    if TABLE_STYLE not in names:
+        table_style = styles.add_style(TABLE_STYLE, WD_STYLE_TYPE.TABLE)
+        if 'Table Grid' in names:
+            table_style.base_style = styles['Table Grid']
+        else:
+            # Custom templates do not always carry it: same grid, defined on our style
+            table_style.element.append(_grid_table_properties())
+        header = OxmlElement('w:tblStylePr')
+        header.set(qn('w:type'), 'firstRow')
+        tcPr = OxmlElement('w:tcPr')
+        shd = OxmlElement('w:shd')
+        shd.set(qn('w:val'), 'clear')
+        shd.set(qn('w:color'), 'auto')
+        shd.set(qn('w:fill'), TABLE_HEADER_FILL)
+        tcPr.append(shd)
+        header.append(tcPr)
+        table_style.element.append(header)
+
+    if FIGURE_STYLE not in names:
+        figure_style = styles.add_style(FIGURE_STYLE, WD_STYLE_TYPE.PARAGRAPH)
+        if 'Normal' in names:
+            figure_style.base_style = styles['Normal']
+        figure_style.paragraph_format.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    # Smart Page Breaks: headings always stay with the next paragraph
+    for level in range(1, 7):
+        name = f'Heading {level}'
+        if name in names:
+            styles[name].paragraph_format.keep_with_next = True
+
+
+def _slim_default_template(doc):
+    """
+    python-docx's default template ships ~100 table styles, a 430 KB stylesWithEffects
+    part and a thumbnail. None of them are used by exports, but every export paid for
+    parsing and re-zipping them (36 KB -> 12 KB empty document, ~5x faster to open).
+    """
+    for style in list(doc.styles):
+        if style.type == WD_STYLE_TYPE.TABLE and style.name not in ('Normal Table', 'Table Grid'):
+            style.element.getparent().remove(style.element)
+    for rId, rel in list(doc.part.rels.items()):
+        if rel.reltype.endswith('/stylesWithEffects'):
+            doc.part.rels.pop(rId)
+    for rId, rel in list(doc.part.package.rels.items()):
+        if rel.reltype.endswith('/thumbnail'):
+            doc.part.package.rels.pop(rId)
+
+
+def build_base_template():
+    """Serialized base document: WORD_TEMPLATE_FILE if present, python-docx's default otherwise."""
+    if WORD_TEMPLATE_FILE.exists():
+        doc = Document(str(WORD_TEMPLATE_FILE))
+        # Keep page setup and styles, drop any sample content
+        body = doc.element.body
+        for child in list(body):
+            if not child.tag.endswith('}sectPr'):
+                body.remove(child)
+    else:
+        doc = Document()
+        _slim_default_template(doc)
+    _add_template_styles(doc)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def new_document():
+    """Fresh Document cloned from the cached base template (rebuilt if the template file changes)."""
+    global _template_cache
+    try:
+        mtime = WORD_TEMPLATE_FILE.stat().st_mtime_ns
+    except OSError:
+        mtime = None
+    with _template_lock:
+        if _template_cache is None or _template_cache[0] != mtime:
+            _template_cache = (mtime, build_base_template())
+        data = _template_cache[1]
+    return Document(io.BytesIO(data))
+
+
+def _shade_cell(tc, fill):
+    tcPr = tc.get_or_add_tcPr()
+
+    # Remove existing shd if any
+    existing_shd = tcPr.find(qn('w:shd'))
+    if existing_shd is not None:
+        tcPr.remove(existing_shd)
+
+    shd = OxmlElement('w:shd')
+    shd.set(qn('w:val'), 'clear')
+    shd.set(qn('w:fill'), fill)
+
+    # Insert in correct schema order (after tcBorders, before noWrap/tcMar/vAlign etc)
+    # Failure to respect this causes Word to ignore the shading silently.
+    for successor in ('w:noWrap', 'w:tcMar', 'w:textDirection', 'w:tcFitText', 'w:vAlign', 'w:hideMark'):
+        target = tcPr.find(qn(successor))
+        if target is not None:
+            target.addprevious(shd)
+            return
+    tcPr.append(shd)
+
+
+def _fit_drawing(drawing, max_width, max_height):
+    """Scale an inline image down to the writable area, keeping its aspect ratio."""
+    inline = drawing.find(qn('wp:inline'))
+    if inline is None:
+        return
+    shape = InlineShape(inline)
+    if shape.width == 0:
+        return
+    aspect_ratio = shape.height / shape.width
+
+    # 1. Width Constraint
+    if shape.width > max_width:
+        shape.width = max_width
+        shape.height = int(max_width * aspect_ratio)
+
+    # 2. Height Constraint (Applied after width to ensure final fit)
+    if shape.height > max_height:
+        shape.height = max_height
+        shape.width = int(max_height / aspect_ratio)
+
+
+def _fix_hyperlink(hyperlink, rels):
+    """htmldocx creates external links for #anchors; turn them into internal w:anchor links."""
+    rid = hyperlink.get(qn('r:id'))
+    if not rid or rid not in rels:
+        return False
+    rel = rels[rid]
+    if not (rel.target_ref and rel.target_ref.startswith('#')):
+        return False
+    # Bookmarks are named after the heading/footnote id, so href="#id" finds bookmark "id"
+    hyperlink.set(qn('w:anchor'), rel.target_ref[1:])
+    del hyperlink.attrib[qn('r:id')]
+    hyperlink.set(qn('w:history'), '1')
+    return True
+
+
+def _apply_markers(t, equations, context):
+    """Strip the markers from one w:t and apply what they ask for."""
+    run = t.getparent()
+    paragraph = next(run.iterancestors(qn('w:p')), None)
+    pieces, last = [], 0
+    for match in MARKER_RE.finditer(t.text):
+        pieces.append(t.text[last:match.start()])
+        last = match.end()
+        if match.group(1) is not None:
+            omml, justification = equations[int(match.group(1))]
+            element = parse_xml(omml)
+            if justification:
+                element.insert(0, parse_xml(
+                    f'<m:oMathParaPr xmlns:m="{M_NS}"><m:jc m:val="{justification}"/></m:oMathParaPr>'))
+            pieces.append(element)
+            context['stats']['equations'] += 1
+            continue
+
+        kind, arg = match.group(2), match.group(3)
+        if kind == 'alert':
+            tc = next(run.iterancestors(qn('w:tc')), None)
+            if tc is None:
+                continue
+            _shade_cell(tc, arg)
+            context['alert_tables'].append(next(tc.iterancestors(qn('w:tbl'))))
+            # Fix Icon Font (Segoe UI Emoji) on the runs carrying the icon
+            for r in paragraph.iter(qn('w:r')):
+                icon_run = Run(r, None)
+                if any(icon_char in icon_run.text for icon_char in ALERT_ICONS):
+                    icon_run.font.name = 'Segoe UI Emoji'
+            context['stats']['alerts'] += 1
+        elif kind == 'bookmark':
+            add_bookmark(Paragraph(paragraph, None), arg)
+            context['stats']['bookmarks'] += 1
+        elif kind == 'pagebreak':
+            context['page_breaks'].append(paragraph)
+    pieces.append(t.text[last:])
+
+    if all(isinstance(piece, str) for piece in pieces):
+        text = "".join(pieces)
+        if text or len(run) > 2 or (len(run) == 2 and run[0].tag != qn('w:rPr')):
+            t.text = text
+        else:
+            # Nothing but the marker: drop the run
+            run.getparent().remove(run)
+        return
+
+    anchor = run
+    for piece in pieces:
+        if isinstance(piece, str):
+            if not piece:
+                continue
+            # Text around the formula keeps the run's formatting
+            element = deepcopy(run)
+            element.find(qn('w:t')).text = piece
+            element.find(qn('w:t')).set(qn('xml:space'), 'preserve')
+        else:
+            element = piece
+        anchor.addnext(element)
+        anchor = element
+    run.getparent().remove(run)
+
+
+def postprocess_document(doc, equations=()):
+    """
+    Apply the fidelity fixes htmldocx cannot express, in one iteration over the body XML:
+    markers (equations, alert shading and icon font, heading bookmarks, page breaks),
+    grid style for the other tables, keep-together for code/quote paragraphs, image
+    sizing and centering, internal hyperlinks. Returns counters of the applied fixes.
+    """
+    body = doc.element.body
+    w_t, w_p, w_tbl, w_drawing, w_hyperlink = (qn(tag) for tag in ('w:t', 'w:p', 'w:tbl', 'w:drawing', 'w:hyperlink'))
+    stats = dict.fromkeys(('equations', 'alerts', 'bookmarks', 'page_breaks', 'tables', 'images', 'links'), 0)
+
+    # Smart Page Breaks: try to keep code blocks / quotes together on one page
+    keep_together = {style.style_id for style in doc.styles
+                     if style.type == WD_STYLE_TYPE.PARAGRAPH and any(s in style.name for s in ('Code', 'Quote', 'Macro'))}
+    section = doc.sections[0]
+    max_width = section.page_width - section.left_margin - section.right_margin
+    max_height = section.page_height - section.top_margin - section.bottom_margin
+    rels = doc.part.rels
+
+    marked, tables, figures = [], [], []
+    for element in body.iter(w_t, w_p, w_tbl, w_drawing, w_hyperlink):
+        tag = element.tag
+        if tag == w_t:
+            if element.text and ('\ue000' in element.text or '\ue002' in element.text):
+                marked.append(element)
+        elif tag == w_p:
+            if element.style in keep_together:
+                ParagraphFormat(element).keep_together = True
+        elif tag == w_tbl:
+            tables.append(element)
+        elif tag == w_drawing:
             try:
-                color = style['background-color'].strip().lstrip('#')
-                if len(color) == 3: color = ''.join([c*2 for c in color])
-                if len(color) >= 6:
-                    # Log finding color
-                    # logger.info(f"Injecting Paragraph Shading: {color}")
-                    pPr = self.paragraph._p.get_or_add_pPr()
-                    shd = OxmlElement('w:shd')
-                    shd.set(qn('w:val'), 'clear')
-                    shd.set(qn('w:fill'), color)
-                    
-                    # Schema Order for pPr: ... pBdr, shd, tabs, spacing, ind, jc, rPr ...
-                    successors = ['w:tabs', 'w:spacing', 'w:ind', 'w:jc', 'w:rPr']
-                    target = None
-                    for s in successors:
-                        target = pPr.find(qn(s))
-                        if target is not None:
-                            break
-                    
-                    if target is not None:
-                        pPr.insert_element_before(shd, target.tag)
-                    else:
-                        pPr.append(shd)
+                _fit_drawing(element, max_width, max_height)
+                stats['images'] += 1
             except Exception as e:
-                logger.error(f"Error injecting shading: {e}")
+                logger.warning(f"WordExport: Failed to resize image: {e}")
+            paragraph = next(element.iterancestors(w_p), None)
+            if paragraph is not None and paragraph.getparent() is body:
+                figures.append(paragraph)
+        elif _fix_hyperlink(element, rels):
+            stats['links'] += 1
+
+    # Markers change the tree, so they are applied after the walk
+    context = {'alert_tables': [], 'page_breaks': [], 'stats': stats}
+    for t in marked:
+        try:
+            _apply_markers(t, equations, context)
+        except Exception as e:
+            logger.warning(f"WordExport: Failed to apply marker: {e}")
+
+    # Hard page breaks: the marker paragraph becomes a native WD_BREAK_PAGE
+    for paragraph in context['page_breaks']:
+        for child in list(paragraph):
+            if child.tag != qn('w:pPr'):
+                paragraph.remove(child)
+        if paragraph.pPr is not None:
+            paragraph.pPr.style = None  # Normal
+        paragraph.add_r().add_br().set(qn('w:type'), 'page')
+        stats['page_breaks'] += 1
+
+    # Grid borders and the shaded header row come from the template style
+    # (explicit cell shading still wins over the style); alerts keep their own look
+    alert_tables = set(context['alert_tables'])
+    table_style = doc.styles[TABLE_STYLE].style_id
+    for tbl in tables:
+        if tbl not in alert_tables:
+            tbl.tblPr.style = table_style
+            stats['tables'] += 1
+
+    # Image paragraphs: almost no text means a diagram block
+    figure_style = doc.styles[FIGURE_STYLE].style_id
+    for paragraph in dict.fromkeys(figures):
+        if len(Paragraph(paragraph, None).text.strip()) >= 5:
+            continue
+        if paragraph.style in (None, 'Normal'):
+            paragraph.get_or_add_pPr().style = figure_style
+        else:
+            # Keep list/quote styles, center directly
+            ParagraphFormat(paragraph).alignment = WD_ALIGN_PARAGRAPH.CENTER
+    return stats
 
 
 def transform_html_for_word(soup: BeautifulSoup):
@@ -261,6 +738,7 @@ def transform_html_for_word(soup: BeautifulSoup):
             title_text = title.get_text(strip=True) or alert_type
             # User reported extra spaces. Removing explicit space.
             title_span.string = f"{icon}\u00A0{title_text}" # Using non-breaking space for consistent small gap
+            title_span.insert(0, FIX_MARKER.format('alert', bg_color.lstrip('#')))
             
             # Force Emoji Font for color rendering (applied to span, as b tag styles might be ignored)
             # Simplify font string to avoid parsing issues with quotes/commas
@@ -285,6 +763,11 @@ def transform_html_for_word(soup: BeautifulSoup):
             content_div.append(child)
             
         td.append(content_div)
+        if not title:
+            # Untitled alert: the marker rides on the first text of the body
+            first_text = content_div.find(string=True)
+            if first_text is not None:
+                first_text.replace_with(FIX_MARKER.format('alert', bg_color.lstrip('#')) + first_text)
         tr.append(td)
         table.append(tr)
         admonition.replace_with(table)
@@ -488,40 +971,35 @@ def transform_html_for_word(soup: BeautifulSoup):
 
 
 
-def export_to_word(html_content: str) -> bytes:
+def export_to_word(html_content, sink=None):
     """
     Exports HTML content to a Word (.docx) file byte stream.
+    Accepts raw HTML or an ExportDocument (parsed once by the core).
+    Writes into `sink` when given (streaming contract), otherwise returns bytes.
     """
     if HtmlToDocx is None:
         logger.error(f"Failed to import Word export dependencies: {_word_export_import_error}")
         raise RuntimeError("Word export dependencies (htmldocx, python-docx) not installed.")
 
-    # Size Check
-    html_size = len(html_content.encode('utf-8'))
+    # Size Check (before parsing anything)
+    if isinstance(html_content, str):
+        html_size = len(html_content.encode('utf-8'))
+    else:
+        html_size = html_content.source_size
     if html_size > MAX_EXPORT_HTML_SIZE:
         raise ValueError(f"Content too large ({html_size/1024/1024:.2f} MB). Max {MAX_EXPORT_HTML_SIZE/1024/1024} MB.")
 
     logger.info(f"WordExport: Generating document from {html_size} bytes of HTML...")
 
-    # Pre-process HTML with BeautifulSoup
-    try:
-        soup = BeautifulSoup(html_content, 'lxml')
-    except:
-        soup = BeautifulSoup(html_content, 'html.parser')
-    
-    # Cleaning (Scripts, Styles, Nav)
-    # Cleaning (Scripts, Styles, Nav)
-    # CRITICAL: Do NOT delete math scripts yet, we need them for extraction!
-    for tag in soup.find_all(['script', 'style', 'nav']):
-        if tag.name == 'script' and tag.get('type') and 'math/tex' in tag.get('type'):
-            continue
+    # Parse once (lxml). Scripts (except math), nav and screen-only elements are already
+    # stripped and math is normalized to <script type="math/tex"> by ExportDocument.
+    document = ExportDocument.coerce(html_content)
+    soup = document.soup
+
+    # Styles are never useful to htmldocx
+    for tag in soup.find_all('style'):
         tag.decompose()
-        
-    # LOGGING: Inspect HTML Structure entering Word Transform (CRITICAL DEBUG)
-    logger.info(f"WordExport: HTML Head Snippet: {soup.prettify()[:2000]}")
-    
-    # No more debug search
-            
+
     # Transform Complex HTML for Word Compatibility
     # (Tabs, Alerts, Details, Math, etc.)
     transform_html_for_word(soup)
@@ -529,14 +1007,12 @@ def export_to_word(html_content: str) -> bytes:
     # Main Content Extraction
     # We want to include the Table of Contents (.toc-container) AND the Markdown Content (.markdown-content)
     # The frontend wraps both in #documentContent div (Line 729 view.html)
-    # But usually sending full <html>.
-    
-    container = soup.find(id='documentContent')
     selected_content = []
-    
-    if container:
+    md_content = None
+
+    if document.container is not None:
         # Extract TOC if present
-        toc = container.find(class_='toc-container')
+        toc = document.toc
         if toc:
              # Style TOC for Word
             toc_header = toc.find(class_='toc-header')
@@ -549,17 +1025,12 @@ def export_to_word(html_content: str) -> bytes:
             # Robust Page Break: Inject a unique marker we can find and replace with a REAL Word Break later
             # CSS page-break-after is unreliable in htmldocx
             pb_marker = soup.new_tag('p')
-            pb_marker.string = "<<<DOCNEXUS_PAGE_BREAK>>>"
+            pb_marker.string = FIX_MARKER.format('pagebreak', '')
             selected_content.append(pb_marker)
             
         # Extract Markdown Content
-        md_content = container.find(class_='markdown-content')
-        if md_content:
-             selected_content.append(md_content)
-    else:
-        # Fallback to old behavior if ID not found
-        md_content = soup.find(class_='markdown-content')
-        if md_content:
+        md_content = document.content
+        if md_content is not None and md_content is not toc:
              selected_content.append(md_content)
 
     if selected_content:
@@ -581,7 +1052,6 @@ def export_to_word(html_content: str) -> bytes:
                     continue
                 
                 # Standard Table Styling
-                # logger.debug(f"WordExport: Applying Global Style to Standard Table. Classes={class_list}")
                 table['style'] = 'border-collapse: collapse; width: 100%; border: 2px solid #6366f1; margin-bottom: 20px;'
                 table['border'] = '1'
                 
@@ -603,27 +1073,20 @@ def export_to_word(html_content: str) -> bytes:
                 for td in table.find_all('td'):
                     td['style'] = 'padding: 8px; border: 1px solid #e5e7eb;'
 
-        # Combine content
-        combined_html = "".join([str(tag) for tag in selected_content])
-        clean_html = f'<html><head><meta charset="utf-8"></head><body>{combined_html}</body></html>'
+        # Move the selected parts into a clean page (same tree, no re-parse)
+        soup = document.isolate(selected_content)
         
-        # Capture main_content for booking logic later (use md_content reference)
-        main_content = md_content if 'md_content' in locals() and md_content else None
+        # Capture main_content for booking logic later
+        main_content = md_content
     else:
         logger.warning("WordExport: No 'selected_content' found to style! using absolute fallback.")
-        # Absolute fallback
-        clean_html = f'<html><body>{soup.body.decode_contents() if soup.body else str(soup)}</body></html>'
+        # Absolute fallback: the whole (already cleaned) body
+        soup = document.isolate(list(soup.body.children) if soup.body else [])
         main_content = None
 
     # Pre-process HTML to resolve/fetch images (crucial for stability)
     # This prevents htmldocx from crashing on network errors or missing files.
-    soup = BeautifulSoup(clean_html, 'html.parser')
     
-    # We need a temp dir for downloaded images that persists during conversion
-    import tempfile
-    import urllib.request
-    from urllib.parse import urlparse
-    import shutil
     import re # Ensure re is available
     
     def parse_tex_to_html(soup_factory, tex_str):
@@ -738,10 +1201,56 @@ def export_to_word(html_content: str) -> bytes:
                 
         return container
     
-    # Create a temporary directory for this export session
-    with tempfile.TemporaryDirectory() as temp_img_dir:
-        # 4. Transform Math (KaTeX/MathJax) -> Image (CodeCogs)
+    # Images of this export session live in memory (released on exit, even on failure)
+    with ImageStore() as image_store:
+        # 4. Transform Math (KaTeX/MathJax) -> Native equations (OMML)
         # Target: .katex-mathml annotation[encoding="application/x-tex"] or <script type="math/tex">
+        # Formulas outside the supported TeX subset fall back to an image (CodeCogs) for
+        # display math and to native text + sub/sup for inline math.
+        equations = []  # (omml, justification) per EQUATION_MARKER index
+
+        def math_replacement(tex, is_display, node):
+            try:
+                omml = tex_to_omml(tex, display=is_display)
+            except TexConversionError as e:
+                logger.debug(f"WordExport: No native equation for '{tex[:40]}': {e}")
+                omml = None
+
+            if not is_display:
+                if omml is None:
+                    # INLINE MATH: Use Native Text + Sub/Sup for seamless flow
+                    replacement = parse_tex_to_html(soup, tex)
+                else:
+                    replacement = soup.new_tag('span')
+                    replacement.string = EQUATION_MARKER.format(len(equations))
+                    equations.append((omml, None))
+                replacement['class'] = 'math-inline-text'
+                return replacement
+
+            div_wrapper = soup.new_tag('p')
+            # ALIGNMENT FIX: Check if inside list
+            is_inside_list = node.find_parent('li') is not None
+            if is_inside_list:
+                div_wrapper['style'] = "text-align: left; margin: 0;"
+            else:
+                div_wrapper['style'] = "text-align: center; margin: 12px 0;"
+
+            if omml is not None:
+                div_wrapper['class'] = 'docnexus-math-omml'
+                div_wrapper.string = EQUATION_MARKER.format(len(equations))
+                equations.append((omml, 'left' if is_inside_list else None))
+                return div_wrapper
+
+            # BLOCK MATH fallback: Use Image (CodeCogs)
+            base_url = "https://latex.codecogs.com/png.image"
+            params = f"\\dpi{{300}} {tex}"
+            img_tag = soup.new_tag('img')
+            img_tag['src'] = f"{base_url}?{urllib.parse.quote(params)}"
+            img_tag['alt'] = tex
+            img_tag['class'] = 'docnexus-math-img'
+            img_tag['style'] = "max-width: 100%;"
+            div_wrapper.append(img_tag)
+            return div_wrapper
         
         # Imports needed locally for this logic if not present
         # (re and urllib.parse are now imported globally)
@@ -795,38 +1304,7 @@ def export_to_word(html_content: str) -> bytes:
                 tex = tex.strip()
                 processed_math_ids.add(id(target_node))
                 
-                if is_display:
-                    # BLOCK MATH: Use Image (CodeCogs) for full fidelity
-                    base_url = "https://latex.codecogs.com/png.image"
-                    params = f"\\dpi{{300}} {tex}"
-                    safe_params = urllib.parse.quote(params)
-                    img_url = f"{base_url}?{safe_params}"
-                    
-                    img_tag = soup.new_tag('img')
-                    img_tag['src'] = img_url
-                    img_tag['alt'] = tex
-                    img_tag['class'] = 'docnexus-math-img' 
-                    
-                    div_wrapper = soup.new_tag('p')
-                    
-                    # ALIGNMENT FIX: Check if inside list
-                    is_inside_list = target_node.find_parent('li') is not None
-                    
-                    if is_inside_list:
-                         div_wrapper['style'] = "text-align: left; margin: 0;"
-                    else:
-                         div_wrapper['style'] = "text-align: center; margin: 12px 0;"
-                         
-                    img_tag['style'] = "max-width: 100%;"
-                    div_wrapper.append(img_tag)
-                    replacement = div_wrapper
-                else:
-                    # INLINE MATH: Use Native Text + Sub/Sup for seamless flow
-                    # Call our helper
-                    replacement = parse_tex_to_html(soup, tex)
-                    # Add a class for potential styling?
-                    replacement['class'] = 'math-inline-text'
-                
+                replacement = math_replacement(tex, is_display, target_node)
                 target_node.replace_with(replacement)
             else:
                 # If we targeted a specific node but found no TeX, decompose to be safe
@@ -840,8 +1318,8 @@ def export_to_word(html_content: str) -> bytes:
         logger.info(f"WordExport: Analyzing {len(generic_candidates)} generic .arithmatex containers.")
         
         for node in generic_candidates:
-            # 1. Cleanup: If it contains our processed items (img or math-inline-text), Unwrap wrapper.
-            if node.find('img', class_='docnexus-math-img') or node.find(class_='math-inline-text'):
+            # 1. Cleanup: If it contains our processed items (equation, img or math-inline-text), Unwrap wrapper.
+            if node.find('img', class_='docnexus-math-img') or node.find(class_=['math-inline-text', 'docnexus-math-omml']):
                 node.unwrap()
                 continue
                 
@@ -869,35 +1347,7 @@ def export_to_word(html_content: str) -> bytes:
             if tex and tex.strip():
                  logger.info(f"WordExport: Extracted TeX from Generic Arithmatex: {tex[:20]}...")
                  
-                 if is_display:
-                     base_url = "https://latex.codecogs.com/png.image"
-                     params = f"\\dpi{{300}} {tex}"
-                     safe_params = urllib.parse.quote(params)
-                     img_url = f"{base_url}?{safe_params}"
-                     
-                     img_tag = soup.new_tag('img')
-                     img_tag['src'] = img_url
-                     img_tag['alt'] = tex
-                     img_tag['class'] = 'docnexus-math-img'
-                     
-                     div_wrapper = soup.new_tag('p')
-                     
-                     # ALIGNMENT FIX: Check if inside list
-                     is_inside_list = node.find_parent('li') is not None
-                     
-                     if is_inside_list:
-                          div_wrapper['style'] = "text-align: left; margin: 0;"
-                     else:
-                          div_wrapper['style'] = "text-align: center; margin: 12px 0;"
-                          
-                     img_tag['style'] = "max-width: 100%;"
-                     div_wrapper.append(img_tag)
-                     replacement = div_wrapper
-                 else:
-                    # Inline Text Fallback
-                    replacement = parse_tex_to_html(soup, tex)
-                    replacement['class'] = 'math-inline-text'
-                 
+                 replacement = math_replacement(tex, is_display, node)
                  node.replace_with(replacement)
             else:
                  # It's an empty or garbage arithmatex container? 
@@ -916,146 +1366,32 @@ def export_to_word(html_content: str) -> bytes:
                 junk.decompose()
                 count_cleaned += 1
         logger.info(f"WordExport: Final cleanup removed {count_cleaned} remaining garbage nodes.")
-        temp_dir_path = Path(temp_img_dir)
-        
-        for img in soup.find_all('img'):
-            src = img.get('src')
-            if not src:
-                continue
-                
-            is_external = src.startswith(('http://', 'https://'))
-            new_src = None
-            
-            try:
-                if is_external:
-                    # Check for SVG in URL before downloading to save time
-                    path_obj = Path(urlparse(src).path)
-                    if path_obj.suffix.lower() == '.svg':
-                         raise ValueError("SVG format is not supported by Word.")
-
-                    # Attempt to download external image using standard library
-                    req = urllib.request.Request(src, headers={'User-Agent': 'Mozilla/5.0'})
-                    with urllib.request.urlopen(req, timeout=3.0) as response:
-                        # Check Content-Type for SVG
-                        ctype = response.info().get_content_type().lower()
-                        if 'svg' in ctype:
-                             raise ValueError("SVG format is not supported by Word.")
-
-                        # Determine filename
-                        # CRITICAL FIX: CodeCogs URLs have identical paths (/png.image) but different queries.
-                        # We MUST hash the full URL to ensure unique filenames for different formulas.
-                        import hashlib
-                        url_hash = hashlib.md5(src.encode('utf-8')).hexdigest()[:10]
-                        original_name = path_obj.name or "image"
-                        # Append hash to filename to guarantee uniqueness
-                        filename = f"{path_obj.stem}_{url_hash}{path_obj.suffix or '.png'}"
-                        if filename.startswith('.'): filename = f"img_{url_hash}{filename}"
-                        local_path = temp_dir_path / filename
-                        
-                        with open(local_path, 'wb') as f:
-                            shutil.copyfileobj(response, f)
-                    
-                    new_src = str(local_path)
-                    
-                elif src.startswith('data:image/'):
-                    # Handle Data URIs (e.g. Mermaid Exports)
-                    import base64
-                    try:
-                        from PIL import Image
-                    except ImportError:
-                        Image = None
-                    
-                    if ';base64,' in src:
-                        header, data = src.split(';base64,')
-                        ctype = header.split(':')[1]
-                        
-                        if 'svg' in ctype:
-                             raise ValueError("SVG data URIs are not supported.")
-                        
-                        img_data = base64.b64decode(data)
-                        
-                        # Process Image (Flatten Transparency)
-                        if Image:
-                            try:
-                                with Image.open(io.BytesIO(img_data)) as im:
-                                   # Convert to RGBA if strictly RGB to ensure consistent handling (though usually PNG is RGBA)
-                                   if im.mode in ('RGBA', 'LA') or (im.mode == 'P' and 'transparency' in im.info):
-                                       # Create white background
-                                       bg = Image.new('RGB', im.size, (255, 255, 255))
-                                       # Paste image on top using alpha channel
-                                       if im.mode != 'RGBA':
-                                           im = im.convert('RGBA')
-                                       bg.paste(im, mask=im.split()[3]) # 3 is the alpha channel
-                                       
-                                        # Save flattened image
-                                       output = io.BytesIO()
-                                       bg.save(output, format='PNG')
-                                       img_data = output.getvalue()
-                                       ext = '.png'
-                                       
-                                       # MATH SCALING FIX:
-                                       # CodeCogs 300 DPI images are huge. We need to scale them down to match text size.
-                                       # 12pt text is ~16px. 300 DPI "x" might be 50px.
-                                       # Scale factor: 96 / 300 = 0.32. Let's try 0.3 to be safe.
-                                       if 'docnexus-math-img' in (img.get('class') or []):
-                                            current_w, current_h = im.size
-                                            scale_factor = 0.3
-                                            new_w = int(current_w * scale_factor)
-                                            new_h = int(current_h * scale_factor)
-                                            # Set attributes for htmldocx
-                                            img['width'] = new_w
-                                            img['height'] = new_h
-                                            # Update style to enforce it as well
-                                            base_style = "vertical-align: middle;"
-                                            if img.has_attr('style'):
-                                                 base_style = img['style'] + ";"
-                                            img['style'] = f"{base_style} width: {new_w}px; height: {new_h}px;"
-                                            
-                                   else:
-                                        ext = '.png' if 'png' in ctype else '.jpg'
-                            except Exception as iconv_err:
-                                logger.warning(f"PIL Conversion failed, using original data: {iconv_err}")
-                                ext = '.png' if 'png' in ctype else '.jpg'
-                        else:
-                            ext = '.png' if 'png' in ctype else '.jpg'
-
-                        filename = f"embedded_image_{hash(data)}{ext}"
-                        local_path = temp_dir_path / filename
-                        
-                        with open(local_path, 'wb') as f:
-                            f.write(img_data)
-                            
-                        # Update src used for Docx
-                        # Windows path separator fix? No, local_path is Path object.
-                        # htmldocx needs a string path.
-                        new_src = str(local_path)
-                    else:
-                        raise ValueError("Unsupported Data URI format")
-
-                elif not src.startswith('data:'):
-                     # Resolve local path
-                     # Try relative to CWD first
-                    potential_path = Path(src).resolve()
-                    if not potential_path.exists():
-                        # Try relative to server root if CWD failed
-                        potential_path = (Path(os.getcwd()) / src.lstrip('/\\')).resolve()
-                    
-                    if potential_path.exists():
-                        if potential_path.suffix.lower() == '.svg':
-                             raise ValueError("SVG format is not supported.")
-                        new_src = str(potential_path)
-                    else:
-                        logger.warning(f"Word Export: Local image not found: {src}")
 
-                # Update src if valid path found
-                if new_src:
-                    img['src'] = new_src
-                else:
-                    raise ValueError("Could not resolve image source.")
+        # Resolve all distinct sources concurrently (downloads, data URI decoding, PIL
+        # flattening); results are cached by source hash across exports.
+        images = [img for img in soup.find_all('img') if img.get('src')]
+        resolved = resolve_images(
+            (img['src'], 'docnexus-math-img' in (img.get('class') or [])) for img in images
+        )
 
-            except Exception as e:
-                # logger.warning(f"Word Export: Skipping image '{src}': {e}")
-                # Fallback to alt text
+        for img in images:
+            result = resolved.get((img['src'], 'docnexus-math-img' in (img.get('class') or [])))
+
+            if isinstance(result, ResolvedImage):
+                if result.width:
+                    # MATH SCALING FIX: CodeCogs 300 DPI images are scaled down to text size.
+                    # Set attributes for htmldocx and enforce via style as well.
+                    img['width'] = result.width
+                    img['height'] = result.height
+                    base_style = "vertical-align: middle;"
+                    if img.has_attr('style'):
+                        base_style = img['style'] + ";"
+                    img['style'] = f"{base_style} width: {result.width}px; height: {result.height}px;"
+
+                # Read from memory by SafeHtmlToDocx.handle_img (no temp files)
+                img['src'] = image_store.add(result)
+            else:
+                logger.debug(f"Word Export: Skipping image '{img['src'][:80]}': {result}")
                 # Fallback to alt text
                 alt_text = img.get('alt', '')
                 replacement = soup.new_tag('span')
@@ -1129,90 +1465,20 @@ def export_to_word(html_content: str) -> bytes:
 
 
 
+        # Heading bookmarks (targets of TOC and internal links)
+        if main_content:
+            for heading in main_content.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'], id=True):
+                heading.insert(0, FIX_MARKER.format('bookmark', heading['id']))
+
         clean_html = str(soup)
 
         # Generate Word Doc
-        doc = Document()
-        new_parser = SafeHtmlToDocx()
+        doc = new_document()
+        new_parser = SafeHtmlToDocx(image_store=image_store)
         
         try:
             # Now safe to convert
             new_parser.add_html_to_document(clean_html, doc)
-            
-            # -------------------------------------------------------------------------
-            # POST-PROCESSING: Apply Fidelity Styling directly to DOCX objects
-            # This bypasses htmldocx limitations by acting on the final structure.
-            # -------------------------------------------------------------------------
-            
-            # 1. Apply Alert Backgrounds (Table Shading)
-            for table in doc.tables:
-                try:
-                    # heuristic: check first cell text for Alert Icons/Text
-                    # Use 'in' logic instead of 'startswith' to handle variability in Icon unicode (VS16 etc)
-                    if not table.rows or not table.columns: continue
-                    
-                    first_cell = table.cell(0, 0)
-                    text = first_cell.text.strip()
-                    
-                    bg_color = None
-                    if "Note" in text and ("ℹ" in text or "i" in text): # Handle ℹ️
-                        bg_color = "e6f6ff" 
-                    elif "Tip" in text and "💡" in text:
-                        bg_color = "dafbe1"
-                    elif "Important" in text and "📣" in text:
-                        bg_color = "f3e6ff"
-                    elif "Warning" in text and "⚠" in text: # Handle ⚠️ (U+26A0)
-                        bg_color = "fff8c5"
-                    elif ("Caution" in text or "Danger" in text) and ("🛑" in text or "⚡" in text):
-                         bg_color = "ffebe9"
-                         
-                    if bg_color:
-                        # Apply shading to the cell
-                        tcPr = first_cell._tc.get_or_add_tcPr()
-                        
-                        # Remove existing shd if any
-                        existing_shd = tcPr.find(qn('w:shd'))
-                        if existing_shd is not None:
-                            tcPr.remove(existing_shd)
-                            
-                        shd = OxmlElement('w:shd')
-                        shd.set(qn('w:val'), 'clear')
-                        shd.set(qn('w:fill'), bg_color)
-                        
-                        # Insert in correct schema order (after tcBorders, before noWrap/tcMar/vAlign etc)
-                        # Failure to respect this causes Word to ignore the shading silently.
-                        # Successors: noWrap, tcMar, textDirection, tcFitText, vAlign, hideMark
-                        successors = ['w:noWrap', 'w:tcMar', 'w:textDirection', 'w:tcFitText', 'w:vAlign', 'w:hideMark']
-                        target = None
-                        for s in successors:
-                            target = tcPr.find(qn(s))
-                            if target is not None:
-                                break
-                                
-                        if target is not None:
-                            tcPr.insert_element_before(shd, target.tag)
-                        else:
-                            tcPr.append(shd)
-                            
-                        # Fix Icon Font (Segoe UI Emoji)
-                        # Iterate runs in the first paragraph to find the icon
-                        if first_cell.paragraphs:
-                            for run in first_cell.paragraphs[0].runs:
-                                # Heuristic: If run contains the icon character
-                                if any(icon_char in run.text for icon_char in ["ℹ", "💡", "📣", "⚠️", "🛑", "⚡"]):
-                                    run.font.name = 'Segoe UI Emoji'
-                            
-                        # Also fix borders if needed? 
-                        # htmldocx usually handles borders if HTML had them.
-                        
-                except Exception as e:
-                    logger.warning(f"WordExport: Failed to style table: {e}")
-
-            # 2. Apply Math Styling (Paragraph Shading)
-            # We identified Math blocks as code blocks. 
-            # If they didn't get styled by add_styles_to_paragraph, we can catch them here.
-            # But add_styles_to_paragraph IS strictly supported by SafeHtmlToDocx if called correctly.
-            # We'll leave Math for now as the Post-Process Table fix is the big one.
 
         except Exception as e:
             import traceback
@@ -1227,165 +1493,19 @@ def export_to_word(html_content: str) -> bytes:
             run.font.size = Pt(8)
             run.font.color.rgb = RGBColor(128, 128, 128)
 
-        # Post-processing (Bookmarks)
-        heading_ids = {}
-        if main_content:
-            for heading in main_content.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
-                 if heading.get('id'):
-                     heading_ids[heading.get_text(strip=True)] = heading.get('id')
-        
-        for paragraph in doc.paragraphs:
-            if paragraph.style.name.startswith('Heading') and paragraph.text.strip() in heading_ids:
-                add_bookmark(paragraph, heading_ids[paragraph.text.strip()])
-
-        # Post-processing (Hard Page Break Injection)
-        # Search for our unique marker and replace with a native WD_BREAK_PAGE
-        from docx.enum.text import WD_BREAK
-        
-        for i, p in enumerate(doc.paragraphs):
-            if "<<<DOCNEXUS_PAGE_BREAK>>>" in p.text:
-                # Clear the marker text
-                p.clear()
-                # Insert the Page Break
-                run = p.add_run()
-                run.add_break(WD_BREAK.PAGE)
-                # Ensure no weird spacing/styles on this empty line
-                p.style = doc.styles['Normal']
-                continue
-
-            # Smart Page Breaks (Keep with Next & Keep Together)
-            # 1. Headings: Always keep with next paragraph
-            if p.style.name.startswith('Heading'):
-                p.paragraph_format.keep_with_next = True
-            
-            # 2. Code Blocks / Quotes: Try to keep them together on one page
-            # htmldocx maps <pre> to 'No Spacing' or paragraphs with specific fonts usually?
-            # It's inconsistent, but we can try to detect if it LOOKS like code (Courier New, Consolas, or shaded background)
-            # A safer generic heuristic: If it has a border or shading (which we applied to tables/code earlier?), keep it together.
-            # But paragraphs don't easily expose borders in python-docx API without diving into XML.
-            
-            # Simple fallback: If style involves 'Code', 'Quote', 'Intense Quote'
-            if any(s in p.style.name for s in ['Code', 'Quote', 'Macro']):
-                p.paragraph_format.keep_together = True
-
-        # Post-processing (Image Sizing & Centering)
-        # Fixes oversized diagrams in Word export
-        try:
-            # Calculate writable limits
-            section = doc.sections[0]
-            page_width = section.page_width
-            page_height = section.page_height
-            margin_x = section.left_margin + section.right_margin
-            margin_y = section.top_margin + section.bottom_margin
-            
-            writable_width = page_width - margin_x
-            writable_height = page_height - margin_y
-            
-            from docx.shared import Emu
-
-            for shape in doc.inline_shapes:
-                # Calculate aspect ratio
-                if shape.width == 0: continue
-                aspect_ratio = shape.height / shape.width
-                
-                # 1. Width Constraint
-                if shape.width > writable_width:
-                    shape.width = writable_width
-                    shape.height = int(writable_width * aspect_ratio)
-                
-                # 2. Height Constraint (Applied after width to ensure final fit)
-                if shape.height > writable_height:
-                    shape.height = writable_height
-                    shape.width = int(writable_height / aspect_ratio)
-                
-                # Force Center Alignment for paragraphs containing images
-                # This works because htmldocx usually puts block images in their own p (or we forced it)
-                # We check if the paragraph is mostly just this image to avoid centering mixed content
-                # For now, simplistic approach: if paragraph has an inline shape, center it.
-                # Accessing the parent paragraph of a shape isn't direct in python-docx public API,
-                # but we can try iterating paragraphs and finding runs with drawings.
-                pass 
-            
-            # Robust Centering Loop
-            # Iterate paragraphs, find those with images, force center
-            for p in doc.paragraphs:
-                # Check for blip/drawing
-                if 'Graphic' in p._element.xml or 'drawing' in p._element.xml:
-                    # Heuristic: mostly image content?
-                    if len(p.text.strip()) < 5:  # Almost no text, valid assumption for a diagram block
-                        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                        
-        except Exception as e:
-            logger.warning(f"Failed to resize images: {e}")
-
-        # Post-processing (Style Table Grid)
-        for table in doc.tables:
-            # Skip Alerts (Heuristic)
-            if table.rows and table.columns:
-                 first_text = table.cell(0,0).text.strip()
-                 # Reuse the robust matching logic or just check for our specific markers
-                 if ("Note" in first_text and ("ℹ" in first_text or "i" in first_text)) or \
-                    ("Tip" in first_text and "💡" in first_text) or \
-                    ("Important" in first_text and "📣" in first_text) or \
-                    ("Warning" in first_text and "⚠" in first_text) or \
-                    (("Caution" in first_text or "Danger" in first_text) and ("🛑" in first_text or "⚡" in first_text)):
-                     continue
-
-            table.style = 'Table Grid'
-            if len(table.rows) > 0:
-                for cell in table.rows[0].cells:
-                    # Check if cell has explicit shading already (from our Alert logic or otherwise)
-                    # Use existing tcPr to check for w:shd
-                    tcPr = cell._element.get_or_add_tcPr()
-                    if tcPr.find(qn('w:shd')) is not None:
-                        continue
-                        
-                    shading_elm = OxmlElement('w:shd')
-                    shading_elm.set(qn('w:fill'), '6366f1')
-                    tcPr.append(shading_elm)
-
-        # Post-processing (Fix Internal Hyperlinks for TOC)
-        # htmldocx creates external links for #anchors. We need to convert them to w:anchor.
-        try:
-            part = doc.part
-            rels = part.rels
-            
-            # Iterate all paragraphs to find hyperlinks
-            for p in doc.paragraphs:
-                for child in p._element:
-                    if child.tag.endswith('hyperlink'):
-                        rid = child.get(qn('r:id'))
-                        if rid and rid in rels:
-                            rel = rels[rid]
-                            if rel.target_ref and rel.target_ref.startswith('#'):
-                                # Found internal link candidate
-                                anchor_name = rel.target_ref[1:] # strip #
-                                
-                                # Convert to internal anchor
-                                # Note: We assume the bookmark name matches the ID (which we ensured in our bookmarking logic? 
-                                # Actually our bookmark logic uses get_text()??
-                                # NO. 
-                                # Line 233: heading_ids[heading.get_text()] = heading.get('id')
-                                # Line 237: add_bookmark(..., heading_ids[...]) -> creates bookmark with NAME = ID.
-                                # So if href="#id", and bookmark name="id", it works.
-                                
-                                child.set(qn('w:anchor'), anchor_name)
-                                # Remove r:id (external reference)
-                                try:
-                                    del child.attrib[qn('r:id')]
-                                except:
-                                    pass
-                                child.set(qn('w:history'), '1')
-        except Exception as e:
-            logger.warning(f"Failed to fix internal hyperlinks: {e}")
+        # Post-processing: fidelity fixes in a single pass over the document XML
+        stats = postprocess_document(doc, equations)
+        logger.info(f"WordExport: Post-processing applied {stats}.")
 
-        # Save to Buffer
-        buffer = io.BytesIO()
+        # Save to Buffer (or straight into the caller's sink)
+        buffer = io.BytesIO() if sink is None else sink
         doc.save(buffer)
-        buffer.seek(0)
         
     # Context exits, temp dir deleted.
     # Context exits, temp dir deleted.
+    if sink is not None:
+        logger.info("WordExport: Complete. Written to sink.")
+        return None
     logger.info("WordExport: Complete. Returning bytes.")
     return buffer.getvalue()
 
@@ -1406,7 +1526,13 @@ def get_features():
             name="docx",
             handler=export_to_word,
             feature_type=_FeatureType.EXPORT_HANDLER,
-            state=_FeatureState.STANDARD
+            state=_FeatureState.STANDARD,
+            meta={
+                "extension": "docx",
+                "input": "document",
+                "output": "stream",
+                "version": "1.0.0"
+            }
         )
     ]
 
@@ -1416,5 +1542,7 @@ PLUGIN_METADATA = {
     'description': 'Exports documentation to Microsoft Word (.docx) with TOC and styles.',
     'category': 'export',
     'icon': 'fa-file-word',
-    'preinstalled': True
+    'preinstalled': True,
+    # Imported on the first docx export (see docnexus/core/activation.py)
+    'activation_events': ['onExport:docx']
 }
@@ -0,0 +1,38 @@
+/**
+ * DocNexus Request Compression
+ * Gzips large request bodies (exports, previews) before upload.
+ * The server decodes `Content-Encoding: gzip` bodies transparently (core/request_encoding.py).
+ */
+
+window.DocNexus = window.DocNexus || {};
+
+// Bodies below this are sent as-is: compressing them costs more than it saves
+window.DocNexus.COMPRESS_THRESHOLD = 256 * 1024;
+
+/**
+ * Build fetch() options for a POST body, gzipped when it is large and the browser
+ * supports CompressionStream. Resolves to { method, headers, body }.
+ * @param {string|Blob|FormData} body - Request body.
+ * @param {string} [contentType] - Content-Type for string/Blob bodies (FormData sets its own).
+ */
+window.DocNexus.compressedPost = async function (body, contentType) {
+    const headers = {};
+    let blob;
+    if (body instanceof FormData) {
+        // Serialize the multipart body to keep its boundary in the Content-Type
+        const encoded = new Response(body);
+        headers['Content-Type'] = encoded.headers.get('Content-Type');
+        blob = await encoded.blob();
+    } else {
+        if (contentType) headers['Content-Type'] = contentType;
+        blob = body instanceof Blob ? body : new Blob([body]);
+    }
+
+    if (typeof CompressionStream === 'undefined' || blob.size < window.DocNexus.COMPRESS_THRESHOLD) {
+        return { method: 'POST', headers: headers, body: blob };
+    }
+
+    const compressed = await new Response(blob.stream().pipeThrough(new CompressionStream('gzip'))).blob();
+    headers['Content-Encoding'] = 'gzip';
+    return { method: 'POST', headers: headers, body: compressed };
+};
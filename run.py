@@ -12,9 +12,12 @@ from pathlib import Path
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
-from docnexus.app import app, VERSION
-
 if __name__ == '__main__':
+    # Imported here, not at module level: export worker processes (spawn) re-import this
+    # script and must not bring up a second copy of the app
+    from docnexus.app import VERSION, create_app, start_export_workers
+    app = create_app()
+
     # Debug mode ON by default (development)
     # Set PRODUCTION=true environment variable for production/release mode
     debug_mode = os.getenv('PRODUCTION', 'False').lower() != 'true'
@@ -31,4 +34,8 @@ if __name__ == '__main__':
     print("="*60 + "\n")
     print()
     
+    # With the debug reloader the app runs in a child process (WERKZEUG_RUN_MAIN set there)
+    if not debug_mode or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_export_workers()
+
     app.run(debug=debug_mode, host='localhost', port=8000)
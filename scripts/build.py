@@ -214,6 +214,13 @@ def build(build_type="Dev"):
         "docnexus.version_info",
         "docnexus.features", "docnexus.features.smart_convert",
         "docnexus.features.registry", "docnexus.features.standard",
+        # Core helpers used only by (data-file) plugins
+        "docnexus.core.export_dom", "docnexus.core.pdf_chunks", "docnexus.core.export_code",
+        "docnexus.core.export_images", "docnexus.core.tex_omml",
+        "docnexus.core.render_cache",
+        "docnexus.core.request_encoding", "docnexus.core.export_jobs", "docnexus.core.batch_export",
+        "docnexus.core.server", "docnexus.core.startup", "docnexus.core.manifest", "docnexus.core.activation",
+        "docnexus.core.json_store", "docnexus.core.runtime", "docnexus.core.static_site",
         "engineio.async_drivers.threading",
         "pymdownx", "pymdownx.betterem", "pymdownx.superfences",
         "pymdownx.tabbed", "pymdownx.details", "pymdownx.magiclink",
@@ -224,13 +231,15 @@ def build(build_type="Dev"):
         # "pymdownx.smarty", # Removed
         "pymdownx.critic",
         "markdown.extensions.meta", "markdown.extensions.wikilinks", "markdown.extensions.smarty",
+        # Imported on first use (docnexus.core.startup.optional_import)
+        "PIL.Image", "mammoth",
         # Core Plugins
         "docnexus.plugins.editor",
         "docnexus.plugins.editor.routes",
     ]
     
     # Dynamic collection for complex packages
-    for pkg in ["xhtml2pdf", "reportlab", "html5lib", "lxml", "docx", "bs4", "htmldocx", "pymdownx", "markdown"]:
+    for pkg in ["xhtml2pdf", "reportlab", "html5lib", "lxml", "docx", "bs4", "htmldocx", "pymdownx", "markdown", "pypdf"]:
         hidden_imports.extend(get_hidden_imports_from_venv(pkg))
 
     for imp in hidden_imports:
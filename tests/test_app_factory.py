@@ -0,0 +1,79 @@
+import json
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+# Imports the app module in a fresh interpreter and reports what the import set up
+IMPORT_ONLY = '''
+import json, logging, sys
+sys.path.insert(0, {root!r})
+from docnexus import app as app_module
+from docnexus.features.registry import PluginRegistry
+
+print(json.dumps({{
+    "config": app_module.CONFIG,
+    "md_folder": app_module.MD_FOLDER,
+    "export_jobs": app_module.EXPORT_JOBS is not None,
+    "plugins": len(PluginRegistry().get_all_plugins()),
+    "features_wired": app_module.FEATURES._registry is not None,
+    "blueprints": sorted(app_module.app.blueprints),
+    "root_handlers": len(logging.getLogger().handlers),
+}}))
+'''
+
+
+class TestImportIsSideEffectFree(unittest.TestCase):
+    def test_import_only_defines_the_app(self):
+        output = subprocess.run([sys.executable, '-c', IMPORT_ONLY.format(root=str(PROJECT_ROOT))],
+                                capture_output=True, text=True, check=True, timeout=120).stdout
+        state = json.loads(output.strip().splitlines()[-1])
+        self.assertEqual(state, {
+            "config": {}, "md_folder": None, "export_jobs": False, "plugins": 0,
+            "features_wired": False, "blueprints": [], "root_handlers": 0,
+        })
+
+
+class TestCreateApp(unittest.TestCase):
+    def test_phases_run_once(self):
+        from docnexus import app as app_module
+
+        app = app_module.create_app()
+        self.assertIs(app, app_module.app)
+        self.assertIsNotNone(app_module.MD_FOLDER)
+        self.assertIsNotNone(app_module.FEATURES._registry)
+
+        # Later calls (CLI, workers, other tests) reuse the initialized state
+        jobs = app_module.EXPORT_JOBS
+        with patch.object(app_module.FEATURES, 'refresh') as refresh, \
+                patch.object(app_module, 'load_plugins') as load_plugins:
+            self.assertIs(app_module.create_app(), app)
+        refresh.assert_not_called()
+        load_plugins.assert_not_called()
+        self.assertIs(app_module.EXPORT_JOBS, jobs)
+        self.assertEqual(app.test_client().get('/api/version').status_code, 200)
+
+    def test_failed_phase_runs_again(self):
+        from docnexus import app as app_module
+        calls = []
+
+        @app_module._phase
+        def _flaky_phase():
+            calls.append(len(calls))
+            if len(calls) == 1:
+                raise ValueError("Broken config.json")
+
+        self.addCleanup(app_module._PHASES_DONE.discard, '_flaky_phase')
+        with self.assertRaises(ValueError):
+            _flaky_phase()
+        _flaky_phase()  # Retried, then done
+        _flaky_phase()
+        self.assertEqual(calls, [0, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
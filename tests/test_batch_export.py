@@ -0,0 +1,140 @@
+import json
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from docnexus.core.batch_export import (
+    MANIFEST_NAME, STATUS_EXPORTED, STATUS_FAILED, STATUS_SKIPPED, WORK_DIR_NAME,
+    BatchExporter, ExportTarget, collect_documents, format_report, output_stems
+)
+from docnexus.core.export_jobs import ExportJobService
+
+PLUGIN_SOURCE = '''
+def export_txt(document, sink):
+    text = document.content.get_text(" ", strip=True)
+    if "broken" in text:
+        raise RuntimeError("cannot export this")
+    sink.write(text.encode("utf-8"))
+
+def get_features():
+    return [Feature("txt_export", export_txt, FeatureState.STANDARD,
+                    feature_type=FeatureType.EXPORT_HANDLER,
+                    meta={"extension": "txt", "input": "document", "output": "stream"})]
+'''
+
+
+def render(path):
+    return f"<p>{path.read_text(encoding='utf-8')}</p>", ""
+
+
+class TestBatchExport(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.plugin_dir = Path(tempfile.mkdtemp())
+        plugin_path = cls.plugin_dir / 'plugin.py'
+        plugin_path.write_text(PLUGIN_SOURCE, encoding='utf-8')
+        cls.spec = ('txt', 'txt_export', str(plugin_path))
+        cls.service = ExportJobService(cls.plugin_dir / 'jobs', workers=2, warm=False)
+        cls.service.start([cls.spec])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.service.shutdown()
+        shutil.rmtree(cls.plugin_dir, ignore_errors=True)
+
+    def setUp(self):
+        self.workspace = Path(tempfile.mkdtemp())
+        (self.workspace / 'guides').mkdir()
+        (self.workspace / 'guides' / 'setup.md').write_text("Setup guide", encoding='utf-8')
+        (self.workspace / 'guides' / 'usage.md').write_text("Usage guide", encoding='utf-8')
+        (self.workspace / 'notes.txt').write_text("Notes", encoding='utf-8')
+        (self.workspace / '.hidden').mkdir()
+        (self.workspace / '.hidden' / 'draft.md').write_text("Draft", encoding='utf-8')
+        self.output = self.workspace / 'out'
+        # Job results are moved into the output, so the work dir must live there
+        self.service.result_dir = self.output / WORK_DIR_NAME
+
+    def tearDown(self):
+        shutil.rmtree(self.workspace, ignore_errors=True)
+
+    def export(self, generation="gen-1", **kwargs):
+        documents = collect_documents(self.workspace, kwargs.pop('patterns', []), {'.md', '.txt'},
+                                      exclude=self.output)
+        exporter = BatchExporter(self.workspace, self.output, {'txt': ExportTarget(self.spec, generation)},
+                                 render, self.service, **kwargs)
+        return {r.path: r for r in exporter.run(documents)}
+
+    def test_collect_documents(self):
+        (self.output).mkdir()
+        (self.output / 'old.md').write_text("Exported copy", encoding='utf-8')
+        self.assertEqual(collect_documents(self.workspace, [], {'.md', '.txt'}, exclude=self.output),
+                         ['guides/setup.md', 'guides/usage.md', 'notes.txt'])
+        self.assertEqual(collect_documents(self.workspace, ['guides/*'], {'.md'}),
+                         ['guides/setup.md', 'guides/usage.md'])
+
+    def test_incremental_rebuild(self):
+        first = self.export()
+        self.assertEqual({r.status for r in first.values()}, {STATUS_EXPORTED})
+        self.assertEqual((self.output / 'guides' / 'setup.txt').read_text(encoding='utf-8'), "Setup guide")
+        manifest = json.loads((self.output / MANIFEST_NAME).read_text(encoding='utf-8'))
+        self.assertEqual(manifest['documents']['notes.txt']['txt']['output'], 'notes.txt')
+
+        # Nothing changed: nothing is exported again
+        second = self.export()
+        self.assertEqual({r.status for r in second.values()}, {STATUS_SKIPPED})
+
+        # Edited source, deleted output: only those documents
+        (self.workspace / 'guides' / 'usage.md').write_text("Usage guide v2", encoding='utf-8')
+        (self.output / 'notes.txt').unlink()
+        third = self.export()
+        self.assertEqual(third['guides/usage.md'].status, STATUS_EXPORTED)
+        self.assertEqual(third['notes.txt'].status, STATUS_EXPORTED)
+        self.assertEqual(third['guides/setup.md'].status, STATUS_SKIPPED)
+        self.assertEqual((self.output / 'guides' / 'usage.txt').read_text(encoding='utf-8'), "Usage guide v2")
+
+        # New pipeline generation (plugin update, export options...): everything
+        fourth = self.export(generation="gen-2")
+        self.assertEqual({r.status for r in fourth.values()}, {STATUS_EXPORTED})
+
+    def test_documents_differing_by_extension_get_distinct_outputs(self):
+        self.assertEqual(output_stems(['notes.txt', 'notes.md', 'guides/notes.md']),
+                         {'notes.md': 'notes', 'notes.txt': 'notes.txt', 'guides/notes.md': 'guides/notes'})
+
+        (self.workspace / 'notes.md').write_text("Markdown notes", encoding='utf-8')
+        results = self.export()
+        self.assertEqual({results['notes.md'].status, results['notes.txt'].status}, {STATUS_EXPORTED})
+        self.assertEqual((self.output / 'notes.txt').read_text(encoding='utf-8'), "Markdown notes")
+        self.assertEqual((self.output / 'notes.txt.txt').read_text(encoding='utf-8'), "Notes")
+        manifest = json.loads((self.output / MANIFEST_NAME).read_text(encoding='utf-8'))
+        self.assertEqual(manifest['documents']['notes.txt']['txt']['output'], 'notes.txt.txt')
+
+        # notes.txt was exported to notes.txt before notes.md existed: the new name is
+        # not current yet (the manifest records the output it was written to)
+        (self.workspace / 'notes.md').unlink()
+        self.assertEqual(self.export()['notes.txt'].status, STATUS_EXPORTED)
+        (self.workspace / 'notes.md').write_text("Markdown notes", encoding='utf-8')
+        self.assertEqual(self.export()['notes.txt'].status, STATUS_EXPORTED)
+        self.assertEqual((self.output / 'notes.txt.txt').read_text(encoding='utf-8'), "Notes")
+
+    def test_failures_are_reported_and_retried(self):
+        (self.workspace / 'notes.txt').write_text("broken notes", encoding='utf-8')
+        results = self.export()
+        self.assertEqual(results['notes.txt'].status, STATUS_FAILED)
+        self.assertIn("cannot export this", results['notes.txt'].error)
+        self.assertEqual(results['guides/setup.md'].status, STATUS_EXPORTED)
+
+        report = format_report(list(results.values()), 1.0)
+        self.assertIn("Failures (1):", report)
+        self.assertIn("2 exported, 0 unchanged, 1 failed", report)
+
+        # Failed documents are not recorded, the next run tries again
+        self.assertEqual(self.export()['notes.txt'].status, STATUS_FAILED)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import os
+import sys
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from docnexus.core.export_cache import ExportCache, normalize_html
+
+
+class TestExportCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_key_depends_on_html_format_and_version(self):
+        base = ExportCache.make_key("<p>a</p>", "pdf", "1.0")
+        self.assertEqual(base, ExportCache.make_key("<p>a</p>", "pdf", "1.0"))
+        self.assertNotEqual(base, ExportCache.make_key("<p>b</p>", "pdf", "1.0"))
+        self.assertNotEqual(base, ExportCache.make_key("<p>a</p>", "docx", "1.0"))
+        self.assertNotEqual(base, ExportCache.make_key("<p>a</p>", "pdf", "1.1"))
+
+    def test_normalize_keeps_significant_whitespace(self):
+        self.assertEqual(normalize_html("\n<p>a</p>\r\n<p>b</p>\n"), normalize_html("<p>a</p>\n<p>b</p>"))
+        # Code indentation and the space between inline tags show in the export
+        self.assertNotEqual(normalize_html("<pre><code>if x:\n    y</code></pre>"),
+                            normalize_html("<pre><code>if x:\n y</code></pre>"))
+        self.assertNotEqual(normalize_html("<p><b>a</b> <i>b</i></p>"), normalize_html("<p><b>a</b><i>b</i></p>"))
+
+    def test_hit_miss_and_persistence(self):
+        cache = ExportCache(self.cache_dir, max_bytes=1024)
+        key = ExportCache.make_key("<p>a</p>", "pdf", "1.0")
+        self.assertIsNone(cache.get(key))
+        cache.put(key, b"%PDF-data")
+        self.assertEqual(cache.get(key), b"%PDF-data")
+
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["stores"]), (1, 1, 1))
+        self.assertEqual(stats["bytes"], len(b"%PDF-data"))
+
+        # A new instance (server restart) sees the existing entries
+        reopened = ExportCache(self.cache_dir, max_bytes=1024)
+        self.assertEqual(reopened.stats()["entries"], 1)
+        self.assertEqual(reopened.get(key), b"%PDF-data")
+
+    def test_lru_eviction_keeps_size_bounded(self):
+        cache = ExportCache(self.cache_dir, max_bytes=250)
+        cache.put("a", b"x" * 100)
+        cache.put("b", b"x" * 100)
+        # Make "a" the most recently used entry
+        past = time.time() - 60
+        os.utime(cache._path("b"), (past, past))
+        os.utime(cache._path("a"), (past - 60, past - 60))
+        cache.get("a")
+
+        cache.put("c", b"x" * 100)
+        stats = cache.stats()
+        self.assertLessEqual(stats["bytes"], 250)
+        self.assertEqual(stats["evictions"], 1)
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+
+    def test_disabled_cache(self):
+        cache = ExportCache(self.cache_dir, max_bytes=0)
+        cache.put("a", b"data")
+        self.assertIsNone(cache.get("a"))
+        self.assertFalse(cache.stats()["enabled"])
+        self.assertEqual(list(self.cache_dir.iterdir()), [])
+
+
+class TestExportRouteCache(unittest.TestCase):
+    def setUp(self):
+        from docnexus import app as app_module
+        from docnexus.features.registry import Feature, FeatureType, FeatureState
+        app_module.create_app()
+
+        self.app_module = app_module
+        self.cache_dir = Path(tempfile.mkdtemp())
+        self.calls = []
+
+        def fake_export(content):
+            self.calls.append(content)
+            return b"exported"
+
+        self.feature = Feature(
+            "fake_export", fake_export, FeatureState.STANDARD,
+            feature_type=FeatureType.EXPORT_HANDLER, meta={"extension": "fake", "version": "1.0.0"}
+        )
+        self.patches = [
+            patch.object(app_module, 'EXPORT_CACHE', ExportCache(self.cache_dir, max_bytes=1024 * 1024)),
+            patch.object(app_module.FEATURES, 'get_export_feature', lambda fmt: self.feature if fmt == 'fake' else None),
+        ]
+        for p in self.patches:
+            p.start()
+        self.client = app_module.app.test_client()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_second_identical_export_is_served_from_cache(self):
+        for html in ("<p>Hello</p>", "<p>Hello</p>\n", "<p>Other</p>"):
+            response = self.client.post('/api/export/fake', json={"html": html})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data, b"exported")
+
+        self.assertEqual(len(self.calls), 2)
+        stats = self.client.get('/api/debug/features').get_json()["export_cache"]
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["stores"], 2)
+
+    def test_cache_hit_does_not_parse_the_document(self):
+        from docnexus.core.export_dom import ExportDocument
+        self.feature.meta["input"] = "document"
+        page = '<div id="documentContent"><div class="markdown-content"><p>Hello</p></div></div>'
+        self.assertEqual(self.client.post('/api/export/fake', json={"html": page}).status_code, 200)
+        self.assertIsInstance(self.calls[0], ExportDocument)
+
+        with patch.object(ExportDocument, 'from_html', side_effect=AssertionError('parsed on a hit')):
+            response = self.client.post('/api/export/fake', json={"html": page})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, b"exported")
+        self.assertEqual(len(self.calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
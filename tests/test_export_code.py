@@ -0,0 +1,65 @@
+import pytest
+from bs4 import BeautifulSoup
+
+from docnexus.core.export_code import simplify_code_blocks, token_styles
+
+CSS = """
+.highlight .k { color: #d73a49 } /* Keyword */
+.highlight .o { color: #d73a49 } /* Operator */
+.highlight .n { color: #24292e } /* Name */
+.highlight .p { color: #24292e } /* Punctuation */
+.highlight .gh { color: #005cc5; font-weight: bold } /* Generic.Heading */
+.highlight .m { color: #005cc5 } /* Literal.Number */
+"""
+
+BLOCK = ('<div class="highlight"><pre><span></span><code>'
+         '<span class="k">return</span><span class="w"> </span><span class="n">x</span>'
+         '<span class="p">(</span><span class="n">y</span><span class="p">)</span> '
+         '<span class="o">+</span> <span class="m">1</span>\n</code></pre></div>')
+
+
+def make_page(blocks=1):
+    return BeautifulSoup(f'<html><body>{BLOCK * blocks}<p><span class="n">keep</span></p></body></html>', 'lxml')
+
+
+def test_token_styles_groups_identical_declarations():
+    styles = token_styles(CSS)
+    assert styles['o'] == styles['k'] == 'k'
+    assert styles['p'] == 'n'
+    # Same color but also bold: not interchangeable
+    assert styles['gh'] != styles['m']
+    assert 'w' not in styles
+
+
+def test_segments_merge_runs_and_keep_text():
+    page = make_page()
+    text = page.get_text()
+    stats = simplify_code_blocks(page.body, token_styles(CSS), mode='segments')
+
+    assert page.get_text() == text
+    code = page.find('code')
+    assert [(s['class'], s.get_text()) for s in code.find_all('span')] == [
+        (['k'], 'return '), (['n'], 'x(y) '), (['k'], '+ '), (['m'], '1\n')
+    ]
+    assert stats == {'blocks': 1, 'plain_blocks': 0, 'spans_before': 9, 'spans_after': 4}
+    # Spans outside code blocks are left alone
+    assert page.p.span is not None
+
+
+@pytest.mark.parametrize("mode, max_spans", [("plain", 4000), ("auto", 5)])
+def test_plain_text_fallback(mode, max_spans):
+    page = make_page(blocks=2)
+    text = page.get_text()
+    stats = simplify_code_blocks(page.body, token_styles(CSS), mode=mode, max_spans=max_spans)
+
+    assert stats['plain_blocks'] == 2
+    assert page.get_text() == text
+    assert all(pre.find('span') is None for pre in page.find_all('pre'))
+    assert page.find('pre').code is not None
+
+
+def test_full_mode_is_a_no_op():
+    page = make_page()
+    before = str(page)
+    assert simplify_code_blocks(page.body, token_styles(CSS), mode='full')['blocks'] == 0
+    assert str(page) == before
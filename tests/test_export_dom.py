@@ -0,0 +1,72 @@
+from docnexus.core.export_dom import ExportDocument
+
+
+PAGE = """
+<html><head><script src="app.js"></script><style>body{}</style></head>
+<body>
+  <nav class="top-nav"><a href="/">Home</a></nav>
+  <div class="toc-sidebar">Sidebar</div>
+  <div id="documentContent">
+    <div class="toc-container"><div class="toc-header">Contents</div></div>
+    <div class="markdown-content">
+      <h1 id="title">Title <button class="btn">Copy</button></h1>
+      <p>Inline <span class="arithmatex">\\(x^2\\)</span> math.</p>
+      <div class="arithmatex">\\[ \\sum_i i \\]</div>
+      <p><span class="arithmatex"><span class="MathJax_Preview">x</span><script type="math/tex">y_1</script></span></p>
+      <span class="katex"><span class="katex-mathml"><math><semantics><annotation encoding="application/x-tex">a+b</annotation></semantics></math></span><span class="katex-html">a+b</span></span>
+      <p class="no-print">Screen only</p>
+    </div>
+  </div>
+</body></html>
+"""
+
+
+def test_screen_only_elements_are_stripped():
+    doc = ExportDocument.from_html(PAGE)
+    html = str(doc.soup)
+    assert 'app.js' not in html
+    assert 'top-nav' not in html
+    assert 'Sidebar' not in html
+    assert 'Copy' not in html
+    assert 'Screen only' not in html
+
+
+def test_content_selection():
+    doc = ExportDocument.from_html(PAGE)
+    assert doc.container.get('id') == 'documentContent'
+    assert 'toc-container' in doc.toc.get('class')
+    assert 'markdown-content' in doc.content.get('class')
+
+
+def test_math_is_normalized_to_scripts():
+    doc = ExportDocument.from_html(PAGE)
+    formulas = {f.tex: f.display for f in doc.formulas}
+    assert formulas == {'y_1': False, 'a+b': False, 'x^2': False, '\\sum_i i': True}
+
+    for formula in doc.formulas:
+        script = formula.node.find('script')
+        assert 'arithmatex' in formula.node.get('class')
+        assert script.get_text() == formula.tex
+        assert ('mode=display' in script['type']) == formula.display
+
+    # Renderer junk is gone, math scripts survived the script cleanup
+    assert not doc.soup.find(class_=['MathJax_Preview', 'katex-html'])
+
+
+def test_coerce_and_isolate():
+    doc = ExportDocument.from_html(PAGE)
+    assert ExportDocument.coerce(doc) is doc
+    assert doc.source_size == len(PAGE.encode('utf-8'))
+
+    page = doc.isolate([doc.toc, doc.content])
+    assert page.head.find('meta') is not None
+    assert [el.get('class') for el in page.body.find_all(recursive=False)] == [
+        ['toc-container'], ['markdown-content']
+    ]
+
+
+def test_fallback_without_container():
+    doc = ExportDocument.from_html("<p>Just text</p><script>alert(1)</script>")
+    assert doc.container is None
+    assert doc.content is None
+    assert not doc.soup.find('script')
@@ -0,0 +1,123 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from docnexus.core.export_cache import ExportCache
+from docnexus.core.render_cache import RenderCache
+from docnexus.features.registry import Feature, FeatureType, FeatureState
+
+DOCUMENT = "# Guide\n\n## Setup\n\nInstall it.\n\n| a | b |\n|---|---|\n| 1 | 2 |\n"
+
+
+class TestExportFromPath(unittest.TestCase):
+    def setUp(self):
+        from docnexus import app as app_module
+        app_module.create_app()
+
+        self.workspace = Path(tempfile.mkdtemp())
+        (self.workspace / 'guides').mkdir()
+        (self.workspace / 'guides' / 'guide.md').write_text(DOCUMENT, encoding='utf-8')
+        self.cache_dir = Path(tempfile.mkdtemp())
+        self.received = []
+
+        def document_export(document):
+            self.received.append(document)
+            return document.content.get_text().encode('utf-8')
+
+        self.features = {
+            "doc": Feature("doc", document_export, FeatureState.STANDARD,
+                           feature_type=FeatureType.EXPORT_HANDLER,
+                           meta={"extension": "doc", "input": "document"}),
+            "html": Feature("html", lambda html: html.encode('utf-8'), FeatureState.STANDARD,
+                            feature_type=FeatureType.EXPORT_HANDLER, meta={"extension": "html"}),
+        }
+        self.render_cache = RenderCache()
+        self.patches = [
+            patch.object(app_module, 'MD_FOLDER', self.workspace),
+            patch.object(app_module, 'RENDER_CACHE', self.render_cache),
+            patch.object(app_module, 'EXPORT_CACHE', ExportCache(self.cache_dir, max_bytes=0)),
+            patch.object(app_module.FEATURES, 'get_export_feature', lambda fmt: self.features.get(fmt)),
+        ]
+        for p in self.patches:
+            p.start()
+        self.client = app_module.app.test_client()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        shutil.rmtree(self.workspace, ignore_errors=True)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_document_handler_gets_rendered_source(self):
+        response = self.client.get('/api/export/doc/file/guides/guide.md')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment; filename=guide.doc', response.headers['Content-Disposition'])
+
+        document = self.received[0]
+        self.assertIsNotNone(document.toc)
+        self.assertIsNotNone(document.content.find('table'))
+        self.assertIn('Install it.', response.data.decode('utf-8'))
+
+    def test_legacy_handler_gets_page_html(self):
+        response = self.client.get('/api/export/html/file/guides/guide')
+        self.assertEqual(response.status_code, 200)
+        html = response.data.decode('utf-8')
+        self.assertIn('id="documentContent"', html)
+        self.assertIn('class="markdown-content"', html)
+
+    def test_render_is_shared_with_the_viewer(self):
+        self.assertEqual(self.client.get('/file/guides/guide.md').status_code, 200)
+        self.client.get('/api/export/doc/file/guides/guide.md')
+        self.assertEqual(self.render_cache.stats()['hits'], 1)
+
+        # Editing the file invalidates the rendered entry
+        (self.workspace / 'guides' / 'guide.md').write_text(DOCUMENT + "\nMore text.\n", encoding='utf-8')
+        response = self.client.get('/api/export/doc/file/guides/guide.md')
+        self.assertIn('More text.', response.data.decode('utf-8'))
+
+    def test_render_follows_includes_and_link_targets(self):
+        # pymdownx.snippets resolves includes against the working directory
+        cwd = os.getcwd()
+        os.chdir(self.workspace)
+        self.addCleanup(os.chdir, cwd)
+        (self.workspace / 'guides' / 'footer.md').write_text("Footer v1\n", encoding='utf-8')
+        (self.workspace / 'guides' / 'a.md').write_text(
+            '[Next](b.md)\n\n--8<-- "guides/footer.md"\n', encoding='utf-8')
+
+        html = self.client.get('/file/guides/a.md').data.decode('utf-8')
+        self.assertIn('broken-link', html)
+        self.assertIn('Footer v1', html)
+
+        # The link target appears: the cached rendering is stale
+        (self.workspace / 'guides' / 'b.md').write_text("# B\n", encoding='utf-8')
+        html = self.client.get('/file/guides/a.md').data.decode('utf-8')
+        self.assertNotIn('broken-link', html)
+        self.assertIn('href="/file/guides/b.md"', html)
+
+        # The included file changes
+        (self.workspace / 'guides' / 'footer.md').write_text("Footer v2, longer\n", encoding='utf-8')
+        html = self.client.get('/file/guides/a.md').data.decode('utf-8')
+        self.assertIn('Footer v2', html)
+        self.assertEqual(self.render_cache.stats()['invalidations'], 2)
+
+        # Unchanged: served from the cache
+        self.client.get('/file/guides/a.md')
+        self.assertEqual(self.render_cache.stats()['hits'], 1)
+
+    def test_missing_documents_and_plugins(self):
+        self.assertEqual(self.client.get('/api/export/doc/file/nope.md').status_code, 404)
+        self.assertEqual(self.client.get('/api/export/doc/file/../outside.md').status_code, 404)
+        response = self.client.get('/api/export/xyz/file/guides/guide.md')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.get_json()['code'], 'MISSING_PLUGIN')
+
+
+if __name__ == '__main__':
+    unittest.main()
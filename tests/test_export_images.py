@@ -0,0 +1,121 @@
+import base64
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from PIL import Image
+
+from docnexus.core import export_images
+from docnexus.core.export_images import ImageCache, ImageStore, ResolvedImage, resolve_image, resolve_images
+
+
+def png_data_uri(mode='RGBA', size=(100, 40)):
+    buffer = io.BytesIO()
+    Image.new(mode, size, (255, 0, 0, 128) if mode == 'RGBA' else (255, 0, 0)).save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+class TestResolveImage(unittest.TestCase):
+    def setUp(self):
+        self.cache = ImageCache(max_bytes=1024 * 1024)
+
+    def test_data_uri_is_flattened_and_math_scaled(self):
+        image = resolve_image(png_data_uri(), is_math=True, cache=self.cache)
+        self.assertEqual(image.ext, '.png')
+        self.assertEqual((image.width, image.height), (30, 12))
+        with Image.open(io.BytesIO(image.data)) as im:
+            self.assertEqual(im.mode, 'RGB')
+
+        # Opaque images are passed through untouched and never scaled
+        opaque = resolve_image(png_data_uri(mode='RGB'), is_math=True, cache=self.cache)
+        self.assertIsNone(opaque.width)
+
+    def test_results_are_cached_by_source(self):
+        uri = png_data_uri()
+        first = resolve_image(uri, cache=self.cache)
+        with patch.object(export_images, '_decode_data_uri', side_effect=AssertionError("decoded twice")):
+            self.assertIs(resolve_image(uri, cache=self.cache), first)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def test_local_file_changes_invalidate_the_cache(self):
+        folder = Path(tempfile.mkdtemp())
+        try:
+            path = folder / 'pic.png'
+            path.write_bytes(b'one')
+            self.assertEqual(resolve_image(str(path), cache=self.cache).data, b'one')
+            path.write_bytes(b'two!')
+            os.utime(path, ns=(0, 10 ** 9))
+            self.assertEqual(resolve_image(str(path), cache=self.cache).data, b'two!')
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+
+    def test_unsupported_sources_raise(self):
+        for src in ('data:image/svg+xml;base64,PHN2Zz4=', 'data:text/plain,hello',
+                    'https://example.com/diagram.svg', 'does/not/exist.png'):
+            with self.assertRaises(ValueError):
+                resolve_image(src, cache=self.cache)
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+    def test_lru_eviction(self):
+        cache = ImageCache(max_bytes=10)
+        cache.put('a', ResolvedImage(b'x' * 6, '.png'))
+        cache.put('b', ResolvedImage(b'y' * 6, '.png'))
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('b'))
+
+
+class TestResolveImages(unittest.TestCase):
+    def test_downloads_run_concurrently_and_errors_are_returned(self):
+        urls = [f'https://example.com/{i}.png' for i in range(4)]
+        barrier = threading.Barrier(len(urls), timeout=5)
+
+        def fake_download(src, timeout):
+            barrier.wait()  # Only passes if all downloads are in flight at once
+            if src.endswith('3.png'):
+                raise OSError("boom")
+            return ResolvedImage(src.encode('utf-8'), '.png')
+
+        with patch.object(export_images, '_download', side_effect=fake_download):
+            results = resolve_images([(url, False) for url in urls + urls], max_workers=4, cache=ImageCache())
+
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results[(urls[0], False)].data, urls[0].encode('utf-8'))
+        self.assertIsInstance(results[(urls[3], False)], OSError)
+
+
+class TestImageStore(unittest.TestCase):
+    def test_store_serves_file_objects_until_closed(self):
+        image = ResolvedImage(b'png-bytes', '.png')
+        with ImageStore() as store:
+            src = store.add(image)
+            self.assertEqual(store.open(src).read(), b'png-bytes')
+            self.assertIsNone(store.open('/tmp/other.png'))
+        self.assertEqual(len(store), 0)
+        self.assertIsNone(store.open(src))
+
+    def test_word_export_embeds_images_without_temp_files(self):
+        from docx import Document
+        from docnexus.plugins.word_export.plugin import export_to_word
+
+        uri = png_data_uri()
+        html = (f'<div class="markdown-content"><h1>T</h1><p><img src="{uri}" alt="a"></p>'
+                f'<table><tr><th>H</th></tr><tr><td><img src="{uri}" alt="b"></td></tr></table></div>')
+        with patch('tempfile.mkdtemp', side_effect=AssertionError("temp dir created")), \
+                patch('tempfile.mkstemp', side_effect=AssertionError("temp file created")):
+            output = export_to_word(html)
+
+        # One picture in the body, one inside the table cell
+        self.assertEqual(len(Document(io.BytesIO(output)).inline_shapes), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
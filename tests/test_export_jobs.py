@@ -0,0 +1,183 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from docnexus.core.export_cache import ExportCache
+from docnexus.core.export_jobs import ExportJobService, JOB_DONE, JOB_FAILED, JOB_QUEUED
+from docnexus.core.loader import import_plugin_module
+from docnexus.features.registry import PluginRegistry
+
+# Minimal export plugin: worker processes load handlers from plugin files
+PLUGIN_SOURCE = '''
+import os
+import time
+
+def export_txt(document, sink):
+    text = document.content.get_text(" ", strip=True)
+    if "slow" in text:
+        time.sleep(1.0)
+    if "broken" in text:
+        raise RuntimeError("cannot export this")
+    sink.write(f"{os.getpid()}:{text}".encode("utf-8"))
+
+def get_features():
+    return [Feature("txt_export", export_txt, FeatureState.STANDARD,
+                    feature_type=FeatureType.EXPORT_HANDLER,
+                    meta={"extension": "txt", "input": "document", "output": "stream"})]
+'''
+
+DOCUMENT = "# Guide\n\nInstall it.\n"
+
+
+def page(text):
+    return f'<div id="documentContent"><div class="markdown-content"><p>{text}</p></div></div>'
+
+
+class ExportJobTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        plugin_dir = self.tmp / 'txt_export'
+        plugin_dir.mkdir()
+        self.plugin_path = plugin_dir / 'plugin.py'
+        self.plugin_path.write_text(PLUGIN_SOURCE, encoding='utf-8')
+        self.spec = ('txt', 'txt_export', str(self.plugin_path))
+        self.cache = ExportCache(self.tmp / 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def wait(self, service, job, timeout=60):
+        deadline = time.time() + timeout
+        while not job.is_finished and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertTrue(job.is_finished, service.stats())
+        return job
+
+
+class TestExportJobService(ExportJobTestCase):
+    def setUp(self):
+        super().setUp()
+        self.service = ExportJobService(self.tmp / 'jobs', workers=2, format_limits={'txt': 1},
+                                        result_cache=self.cache, warm=True)
+        self.service.start([self.spec])
+
+    def tearDown(self):
+        self.service.shutdown()
+        super().tearDown()
+
+    def submit(self, text, key=None):
+        return self.service.submit('txt', self.spec, {'html': page(text), 'toc': None},
+                                   key or text, 'export.txt')
+
+    def test_job_runs_in_worker_process(self):
+        job, created = self.submit("hello")
+        self.assertTrue(created)
+        self.wait(self.service, job)
+
+        self.assertEqual(job.state, JOB_DONE, job.error)
+        self.assertEqual(job.progress, 100)
+        pid, text = self.service.result_path(job).read_text(encoding='utf-8').split(':', 1)
+        self.assertEqual(text, "hello")
+        self.assertNotEqual(int(pid), os.getpid())
+        # Result moved into the export cache under the job key
+        self.assertEqual(self.cache.lookup("hello"), self.service.result_path(job))
+
+    def test_identical_submissions_share_a_job(self):
+        first, _ = self.submit("slow document")
+        second, created = self.submit("slow document")
+        self.assertIs(first, second)
+        self.assertFalse(created)
+
+        self.wait(self.service, first)
+        # Finished results are reused too, without running the export again
+        third, created = self.submit("slow document")
+        self.assertIs(third, first)
+        self.assertEqual(self.service.stats()['deduplicated'], 2)
+
+    def test_concurrency_is_capped_per_format(self):
+        first, _ = self.submit("slow one")
+        second, _ = self.submit("slow two")
+        self.assertEqual(second.state, JOB_QUEUED)
+        self.assertEqual(self.service.queue_position(second), 1)
+        self.assertEqual(self.service.stats()['running'], {'txt': 1})
+
+        self.wait(self.service, second)
+        self.assertEqual(first.state, JOB_DONE)
+        self.assertEqual(second.state, JOB_DONE)
+        self.assertGreaterEqual(second.started, first.finished)
+
+    def test_failed_job_reports_error(self):
+        job, _ = self.submit("broken document")
+        self.wait(self.service, job)
+        self.assertEqual(job.state, JOB_FAILED)
+        self.assertIn("cannot export this", job.error)
+        self.assertIsNone(self.service.result_path(job))
+
+
+class TestExportJobRoutes(ExportJobTestCase):
+    def setUp(self):
+        super().setUp()
+        from docnexus import app as app_module
+        app_module.create_app()
+
+        self.workspace = self.tmp / 'workspace'
+        self.workspace.mkdir()
+        (self.workspace / 'guide.md').write_text(DOCUMENT, encoding='utf-8')
+
+        module = import_plugin_module('txt_export', self.plugin_path, PluginRegistry())
+        feature = module.get_features()[0]
+        feature.meta['plugin_id'] = 'txt_export'
+        self.service = ExportJobService(self.tmp / 'jobs', workers=1, result_cache=self.cache, warm=False)
+
+        self.patches = [
+            patch.object(app_module, 'MD_FOLDER', self.workspace),
+            patch.object(app_module, 'EXPORT_CACHE', self.cache),
+            patch.object(app_module, 'EXPORT_JOBS', self.service),
+            patch.object(app_module.FEATURES, 'get_export_feature',
+                         lambda fmt: feature if fmt == 'txt' else None),
+        ]
+        for p in self.patches:
+            p.start()
+        self.client = app_module.app.test_client()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.service.shutdown()
+        super().tearDown()
+
+    def test_submit_poll_download(self):
+        response = self.client.post('/api/export/jobs', json={"format": "txt", "path": "guide.md"})
+        self.assertEqual(response.status_code, 202)
+        status_url = response.headers['Location']
+
+        deadline = time.time() + 60
+        status = response.get_json()
+        while status['state'] not in ('done', 'failed') and time.time() < deadline:
+            time.sleep(0.05)
+            status = self.client.get(status_url).get_json()
+        self.assertEqual(status['state'], 'done', status)
+
+        download = self.client.get(status['download_url'])
+        self.assertEqual(download.status_code, 200)
+        self.assertIn('filename=guide.txt', download.headers['Content-Disposition'])
+        self.assertIn('Install it.', download.data.decode('utf-8'))
+
+    def test_errors(self):
+        response = self.client.post('/api/export/jobs', json={"format": "xyz", "html": "<p>x</p>"})
+        self.assertEqual(response.get_json()['code'], 'MISSING_PLUGIN')
+        response = self.client.post('/api/export/jobs', json={"format": "txt", "path": "../outside.md"})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.get('/api/export/jobs/unknown').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
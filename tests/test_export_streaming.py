@@ -0,0 +1,90 @@
+import io
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from docnexus.core.export_cache import ExportCache
+from docnexus.features.registry import Feature, FeatureType, FeatureState
+
+PAYLOAD = bytes(range(256)) * 64  # 16 KB
+
+
+def streaming_export(content, sink):
+    for i in range(0, len(PAYLOAD), 4096):
+        sink.write(PAYLOAD[i:i + 4096])
+
+
+def legacy_export(content):
+    return PAYLOAD
+
+
+class TestStreamingExport(unittest.TestCase):
+    def setUp(self):
+        from docnexus import app as app_module
+        app_module.create_app()
+
+        self.cache_dir = Path(tempfile.mkdtemp())
+        self.features = {
+            "stream": Feature("stream", streaming_export, FeatureState.STANDARD,
+                              feature_type=FeatureType.EXPORT_HANDLER,
+                              meta={"extension": "stream", "output": "stream"}),
+            "legacy": Feature("legacy", legacy_export, FeatureState.STANDARD,
+                              feature_type=FeatureType.EXPORT_HANDLER, meta={"extension": "legacy"}),
+        }
+        self.patches = [
+            patch.object(app_module, 'EXPORT_CACHE', ExportCache(self.cache_dir, max_bytes=1024 * 1024)),
+            patch.object(app_module, 'EXPORT_SPOOL_MEMORY', 1024),  # Force the spool onto disk
+            patch.object(app_module.FEATURES, 'get_export_feature', lambda fmt: self.features.get(fmt)),
+        ]
+        for p in self.patches:
+            p.start()
+        self.client = app_module.app.test_client()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_streaming_handler_sets_content_length(self):
+        response = self.client.post('/api/export/stream', json={"html": "<p>a</p>"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Length'], str(len(PAYLOAD)))
+        self.assertEqual(response.data, PAYLOAD)
+
+    def test_legacy_bytes_handler_still_works(self):
+        response = self.client.post('/api/export/legacy', json={"html": "<p>a</p>"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, PAYLOAD)
+        self.assertIn('attachment; filename=export.legacy', response.headers['Content-Disposition'])
+
+    def test_range_requests_on_result_download(self):
+        response = self.client.post('/api/export/stream', json={"html": "<p>range</p>"})
+        key = response.headers['X-Export-Key']
+
+        response = self.client.get(f'/api/export/result/{key}.stream', headers={"Range": "bytes=100-199"})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.data, PAYLOAD[100:200])
+        self.assertEqual(response.headers['Content-Range'], f"bytes 100-199/{len(PAYLOAD)}")
+
+        self.assertEqual(self.client.get(f'/api/export/result/{"0" * 64}.stream').status_code, 404)
+        self.assertEqual(self.client.get('/api/export/result/..%2Fsecret.stream').status_code, 404)
+
+
+class TestWordExportSink(unittest.TestCase):
+    def test_export_to_word_writes_into_sink(self):
+        from docnexus.plugins.word_export.plugin import export_to_word
+
+        sink = io.BytesIO()
+        result = export_to_word('<div class="markdown-content"><h1>Title</h1><p>Body</p></div>', sink)
+        self.assertIsNone(result)
+        self.assertTrue(sink.getvalue().startswith(b'PK'))
+
+
+if __name__ == '__main__':
+    unittest.main()
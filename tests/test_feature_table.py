@@ -0,0 +1,143 @@
+import sys
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from flask import Blueprint, Flask, request
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from docnexus.features.registry import Feature, FeatureManager, FeatureState, FeatureType, PluginRegistry
+
+
+def plugin_feature(plugin_id, name, handler=None, feature_type=FeatureType.ALGORITHM, **meta):
+    return Feature(name, handler or (lambda text, tag=plugin_id: f"{text}+{tag}"), FeatureState.STANDARD,
+                   feature_type=feature_type, meta=dict(meta, plugin_id=plugin_id))
+
+
+class TestIncrementalFeatureTable(unittest.TestCase):
+    def setUp(self):
+        # A registry of its own: PluginRegistry is a process-wide singleton
+        self._saved_registry = PluginRegistry._instance
+        PluginRegistry._instance = None
+        self.registry = PluginRegistry()
+        self.state = MagicMock()
+        self.state.is_plugin_installed.return_value = True
+        patcher = patch('docnexus.core.state.PluginState.get_instance', return_value=self.state)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.registry.register(plugin_feature('alpha', 'clean'))
+        self.registry.register(plugin_feature('alpha', 'pdf', feature_type=FeatureType.EXPORT_HANDLER, extension='pdf'))
+        self.registry.register(plugin_feature('beta', 'clean'))
+        self.features = FeatureManager(self.registry)
+        self.features.refresh()
+
+    def tearDown(self):
+        PluginRegistry._instance = self._saved_registry
+
+    def names(self):
+        return [(f.name, f.meta['plugin_id']) for f in self.features._features]
+
+    def test_refresh_resolves_name_clashes(self):
+        # The last registered wins; the priority list overrides it
+        self.assertEqual(self.names(), [('clean', 'beta'), ('pdf', 'alpha')])
+        self.features.refresh(priority_list=['alpha'])
+        self.assertEqual(self.features.get_feature('clean').meta['plugin_id'], 'alpha')
+
+    def test_sync_plugin_updates_only_that_plugin(self):
+        snapshot = self.features._features
+        pipeline = self.features.build_pipeline(enable_experimental=False)
+
+        self.registry.register(plugin_feature('gamma', 'toc'))
+        self.registry.register(plugin_feature('gamma', 'clean'))
+        with patch.object(self.features, 'refresh', side_effect=AssertionError('full refresh')):
+            self.features.sync_plugin('gamma')
+        self.assertEqual(self.names(), [('clean', 'gamma'), ('pdf', 'alpha'), ('toc', 'gamma')])
+        self.state.is_plugin_installed.assert_called_with('gamma')
+
+        # Readers holding the previous table (or a pipeline built from it) are unaffected
+        self.assertEqual([(f.name, f.meta['plugin_id']) for f in snapshot], [('clean', 'beta'), ('pdf', 'alpha')])
+        self.assertEqual(pipeline.run('x'), 'x+beta')
+        self.assertEqual(self.features.build_pipeline(enable_experimental=False).run('x'), 'x+gamma+gamma')
+
+        # Unregistered again: the shadowed feature comes back
+        self.registry.unregister_plugin('gamma')
+        self.features.sync_plugin('gamma')
+        self.assertEqual(self.names(), [('clean', 'beta'), ('pdf', 'alpha')])
+        self.assertEqual(self.features.get_feature('pdf').meta['plugin_id'], 'alpha')
+
+    def test_uninstall_and_priority_are_applied_in_place(self):
+        self.features.set_plugin_installed('alpha', False)
+        self.assertIsNone(self.features.get_export_feature('pdf'))
+        self.features.set_plugin_installed('alpha', True)
+        self.assertEqual(self.features.get_export_feature('pdf').name, 'pdf')
+
+        self.features.set_priority(['alpha'])
+        self.assertEqual(self.names(), [('clean', 'alpha'), ('pdf', 'alpha')])
+        self.features.set_priority([])
+        self.assertEqual(self.names(), [('clean', 'beta'), ('pdf', 'alpha')])
+
+
+class TestBlueprintReload(unittest.TestCase):
+    def setUp(self):
+        self._saved_registry = PluginRegistry._instance
+        PluginRegistry._instance = None
+        self.registry = PluginRegistry()
+
+    def tearDown(self):
+        PluginRegistry._instance = self._saved_registry
+
+    @staticmethod
+    def blueprint(answer):
+        bp = Blueprint('sample', __name__)
+        bp.add_url_rule('/api/sample', 'hello', lambda: answer)
+        return bp
+
+    def test_reloaded_blueprint_serves_new_views(self):
+        app = Flask(__name__)
+        # As docnexus.app's block_uninstalled_plugin_routes
+        app.before_request(lambda: None if self.registry.is_blueprint_enabled(request.blueprint) else 'blocked')
+        self.registry.register_blueprint(self.blueprint('v1'), plugin_id='sample')
+        self.registry.register_blueprints(app)
+        client = app.test_client()
+        self.assertEqual(client.get('/api/sample').data, b'v1')
+
+        self.registry.register_blueprint(self.blueprint('v2'), plugin_id='sample')
+        self.assertEqual(len(self.registry._blueprints), 1)
+        self.registry.register_blueprints(app)
+        self.assertEqual(client.get('/api/sample').data, b'v2')
+
+        self.registry.set_plugin_enabled('sample', False)
+        self.assertEqual(client.get('/api/sample').data, b'blocked')
+
+    def test_blueprint_added_while_serving_gets_a_new_url_map(self):
+        app = Flask(__name__)
+        app.add_url_rule('/core', 'core', lambda: 'core')
+        client = app.test_client()
+        self.assertEqual(client.get('/core').data, b'core')  # Serving: setup calls are refused
+
+        bp = Blueprint('lazy', __name__)
+        bp.add_url_rule('/api/lazy/<int:item>', 'item', lambda item: f'item {item}')
+        bp.before_request(lambda: 'hooked' if request.args.get('hook') else None)
+        self.registry.register_blueprint(bp, plugin_id='lazy')
+        previous = app.url_map
+        rules = len(list(previous.iter_rules()))
+
+        self.registry.register_blueprints(app, running=True)
+        self.assertIsNot(app.url_map, previous)
+        self.assertEqual(len(list(previous.iter_rules())), rules)  # Requests bound to it are unaffected
+        self.assertIs(app.blueprints['lazy'], bp)
+        self.assertEqual(client.get('/api/lazy/7').data, b'item 7')
+        self.assertEqual(client.get('/api/lazy/7?hook=1').data, b'hooked')
+        self.assertEqual(client.get('/core').data, b'core')
+
+        # Nothing new: the map is kept
+        current = app.url_map
+        self.registry.register_blueprints(app, running=True)
+        self.assertIs(app.url_map, current)
+
+
+if __name__ == '__main__':
+    unittest.main()
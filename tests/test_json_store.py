@@ -0,0 +1,109 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from docnexus.core.json_store import JsonFileStore
+from docnexus.core.state import PluginState
+
+
+class TestJsonFileStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.path = self.tmp / 'state.json'
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_reads_are_served_from_memory_until_the_file_changes(self):
+        self.path.write_text(json.dumps({'installed': ['a']}), encoding='utf-8')
+        store = JsonFileStore(self.path)
+        for _ in range(50):
+            self.assertEqual(store.read(), {'installed': ['a']})
+        self.assertEqual(store.loads, 1)
+
+        # Changed by another writer (a new file is swapped in, as JsonFileStore does)
+        other = self.tmp / 'other.json'
+        other.write_text(json.dumps({'installed': ['a', 'b']}), encoding='utf-8')
+        os.replace(other, self.path)
+        self.assertEqual(store.read(), {'installed': ['a', 'b']})
+        self.assertEqual(store.loads, 2)
+
+    def test_missing_or_broken_file_reads_as_default(self):
+        store = JsonFileStore(self.path, default=lambda: {'installed': []})
+        self.assertEqual(store.read(), {'installed': []})
+        self.path.write_text('{broken', encoding='utf-8')
+        self.assertEqual(store.read(), {'installed': []})
+
+    def test_batch_writes_once_and_only_on_success(self):
+        store = JsonFileStore(self.path)
+        with patch('docnexus.core.json_store.os.replace', wraps=os.replace) as replace:
+            with store.batch() as data:
+                data['a'] = 1
+                with store.batch() as inner:
+                    inner['b'] = 2
+                store.update(lambda d: d.update(c=3))
+            self.assertEqual(replace.call_count, 1)
+        self.assertEqual(json.loads(self.path.read_text(encoding='utf-8')), {'a': 1, 'b': 2, 'c': 3})
+        self.assertEqual(store.loads, 1)  # Its own write does not need reading back
+
+        with self.assertRaises(RuntimeError):
+            with store.batch() as data:
+                data['a'] = 'lost'
+                raise RuntimeError()
+        self.assertEqual(store.read()['a'], 1)
+        self.assertEqual(list(self.tmp.glob('*.tmp')), [])
+
+    def test_concurrent_updates_are_not_lost(self):
+        store = JsonFileStore(self.path, default=lambda: {'count': 0})
+
+        def increment():
+            for _ in range(25):
+                store.update(lambda d: d.update(count=d['count'] + 1))
+
+        threads = [threading.Thread(target=increment) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(JsonFileStore(self.path).read(), {'count': 100})
+
+
+class TestPluginStateStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self._saved_instance = PluginState._instance
+        self._cwd = os.getcwd()
+        os.chdir(self.tmp)
+        self.state = PluginState()
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        PluginState._instance = self._saved_instance
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_state_reads_do_not_reparse_plugins_json(self):
+        self.assertTrue(self.state.set_plugin_installed('pdf_export', True))
+        with patch('docnexus.core.json_store.json.load', side_effect=AssertionError('re-parsed')):
+            for _ in range(20):
+                self.assertTrue(self.state.is_plugin_installed('pdf_export'))
+                self.assertFalse(self.state.is_plugin_in_registry('word_export'))
+
+        with self.state.batch():
+            self.state.set_plugin_installed('word_export', True)
+            self.state.set_plugin_installed('pdf_export', False)
+        on_disk = json.loads((self.tmp / 'plugins.json').read_text(encoding='utf-8'))
+        self.assertEqual(on_disk, {'installed': ['word_export']})
+        self.assertEqual(self.state.get_installed_plugins(), ['word_export'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import io
+
+import pytest
+from bs4 import BeautifulSoup
+
+from docnexus.core import pdf_chunks
+
+pypdf = pytest.importorskip("pypdf")
+
+
+def make_page(sections=4):
+    body = ['<div class="toc-container"><a href="#section-4">Last</a></div>',
+            '<div class="markdown-content"><h1 id="manual">Manual</h1>']
+    for i in range(1, sections + 1):
+        body.append(f'<h2 id="section-{i}">Section {i}</h2><p>{"text " * 50}</p>'
+                    f'<h3 id="sub-{i}">Sub {i}</h3><p><a href="#manual">Top</a></p>')
+    body.append('</div>')
+    html = f'<html><body><div id="documentContent">{"".join(body)}</div></body></html>'
+    return BeautifulSoup(html, 'lxml')
+
+
+def test_split_at_top_level_sections():
+    page = make_page()
+    groups = pdf_chunks.split_into_chunks(page.body, chunk_bytes=200)
+
+    # Title, then one chunk per section
+    assert len(groups) == 5
+    # First chunk keeps everything outside the sections (TOC, title)
+    assert groups[0][0] is page.body
+    assert page.body.find(class_='toc-container') is not None
+    # Later chunks are wrapped in copies of the ancestors, without duplicate ids
+    later = groups[2][0]
+    assert later.get('id') is None
+    assert later.find(class_='markdown-content') is not None
+    assert [h.get_text() for h in later.find_all('h2')] == ['Section 2']
+
+
+def test_small_document_is_not_split():
+    page = make_page()
+    assert len(pdf_chunks.split_into_chunks(page.body, chunk_bytes=10 ** 9)) == 1
+
+
+def test_cross_chunk_links_are_rewritten():
+    page = make_page()
+    chunks = pdf_chunks.prepare_chunks(pdf_chunks.split_into_chunks(page.body, chunk_bytes=200))
+
+    assert pdf_chunks.CROSS_CHUNK_PREFIX + 'section-4' in chunks[0].html
+    assert pdf_chunks.CROSS_CHUNK_PREFIX + 'manual' in chunks[4].html
+    assert [h[0] for h in chunks[2].headings] == [2, 3]
+
+
+def test_render_chunked_merges_pages_bookmarks_and_links():
+    page = make_page()
+    output = io.BytesIO()
+    assert pdf_chunks.render_chunked(
+        page.body, lambda body: f"<html><body>{body}</body></html>", chunk_bytes=200, max_workers=1, dest=output
+    )
+    reader = pypdf.PdfReader(output)
+    assert len(reader.pages) == 5
+
+    # One outline tree: Manual > Section N > Sub N, pointing to the right pages
+    top = reader.outline
+    assert top[0].title == 'Manual'
+    sections = [item for item in top[1] if not isinstance(item, list)]
+    assert [s.title for s in sections] == ['Section 1', 'Section 2', 'Section 3', 'Section 4']
+    assert [reader.get_destination_page_number(s) for s in sections] == [1, 2, 3, 4]
+
+    # The TOC link on page 1 jumps to the last chunk
+    dests = [annot.get_object()['/Dest'] for annot in reader.pages[0]['/Annots'] if '/Dest' in annot.get_object()]
+    assert 4 in [reader.get_page_number(dest[0].get_object()) for dest in dests]
+
+
+def test_render_pool_is_spawned_once_and_shared(monkeypatch):
+    monkeypatch.setattr(pdf_chunks.os, 'cpu_count', lambda: 2)
+    documents = [f"<html><body><p>Page {i}</p></body></html>" for i in range(2)]
+    try:
+        first = pdf_chunks.render_all(documents, max_workers=2)
+        pool = pdf_chunks._pool
+        if pool is None:
+            pytest.skip("Process pool unavailable here")
+        assert pool._mp_context.get_start_method() == 'spawn'
+        second = pdf_chunks.render_all(documents, max_workers=2)
+        assert pdf_chunks._pool is pool
+        assert [len(pypdf.PdfReader(io.BytesIO(data)).pages) for data in first + second] == [1, 1, 1, 1]
+    finally:
+        pdf_chunks.shutdown_pool()
+    assert pdf_chunks._pool is None
@@ -76,3 +76,40 @@ def test_strip_style_attributes():
     cleaned = strip_styles(html)
     assert 'style=' not in cleaned
     assert '<div>Content</div>' == cleaned
+
+
+UNSAFE_PAGE = ('<html><head><link rel="stylesheet" href="/static/main.css">'
+               '<style>body { color: var(--x); }</style></head>'
+               '<body><div style="width: calc(100% - 1px)">Content</div></body></html>')
+
+
+def export_after_preprocessing_failure(parser=None):
+    from unittest.mock import patch
+    from xhtml2pdf import pisa
+    from docnexus.plugins.pdf_export import plugin
+
+    seen = []
+    real_create_pdf = pisa.CreatePDF
+
+    def create_pdf(html, dest):
+        seen.append(html)
+        return real_create_pdf("<p>ok</p>", dest=dest)
+
+    with patch.object(plugin.ExportDocument, 'coerce', side_effect=RuntimeError("preprocessing")), \
+            patch.object(pisa, 'CreatePDF', create_pdf):
+        with patch.object(plugin, 'BeautifulSoup', parser or plugin.BeautifulSoup):
+            assert plugin.export_pdf(UNSAFE_PAGE).startswith(b'%PDF')
+    # Only the plugin's own print stylesheet is left
+    body = seen[0].split('</style>', 1)[1]
+    assert 'main.css' not in body and 'var(--x)' not in body and 'calc(' not in body
+    assert 'Content' in body
+
+
+def test_safe_mode_survives_preprocessing_failure():
+    export_after_preprocessing_failure()
+
+
+def test_safe_mode_regex_strip_as_last_resort():
+    def unparsable(*args, **kwargs):
+        raise ValueError("parser unavailable")
+    export_after_preprocessing_failure(parser=unparsable)
@@ -0,0 +1,115 @@
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from docnexus.core import loader
+from docnexus.core.activation import RouteActivationMiddleware, parse_activation_events
+from docnexus.core.manifest import ManifestIndex
+from docnexus.features.registry import FeatureManager, PluginRegistry
+
+PLUGIN_SOURCE = '''
+import builtins
+builtins.ACTIVATION_TEST_IMPORTS = getattr(builtins, 'ACTIVATION_TEST_IMPORTS', 0) + 1
+
+def export_sample(content, output_path=None):
+    return b"sample:" + content.encode()
+
+def get_features():
+    return [Feature("sample", export_sample, FeatureState.STANDARD,
+                    feature_type=FeatureType.EXPORT_HANDLER, meta={"extension": "smp"})]
+
+PLUGIN_METADATA = {
+    'name': 'Sample',
+    'preinstalled': True,
+    'activation_events': %r,
+}
+'''
+
+
+class TestPluginActivation(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.plugin_file = self.tmp / 'sample' / 'plugin.py'
+        self.plugin_file.parent.mkdir()
+        # A registry of its own: PluginRegistry is a process-wide singleton
+        self._saved_registry = PluginRegistry._instance
+        PluginRegistry._instance = None
+        self.registry = PluginRegistry()
+        import builtins
+        builtins.ACTIVATION_TEST_IMPORTS = 0
+        # Enabled by default (preinstalled); features are checked against it on refresh too
+        state = MagicMock()
+        state.is_plugin_in_registry.return_value = False
+        state.is_plugin_installed.return_value = True
+        state_patch = patch('docnexus.core.state.PluginState.get_instance', return_value=state)
+        state_patch.start()
+        self.addCleanup(state_patch.stop)
+
+    def tearDown(self):
+        PluginRegistry._instance = self._saved_registry
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def load(self, events):
+        self.plugin_file.write_text(PLUGIN_SOURCE % (events,), encoding='utf-8')
+        with patch.object(loader, 'get_manifest_index', return_value=ManifestIndex()):
+            loader.load_single_plugin('sample', self.plugin_file, self.registry)
+        features = FeatureManager(self.registry)
+        features.refresh()
+        return features
+
+    def imports(self):
+        import builtins
+        return builtins.ACTIVATION_TEST_IMPORTS
+
+    def test_export_stub_loads_plugin_on_first_export(self):
+        features = self.load(['onExport:smp'])
+        self.assertEqual(self.imports(), 0)
+        # Listed (with its plugin file, for export workers) before the plugin is imported
+        [stub] = features.get_export_features()
+        self.assertEqual(stub.meta['plugin_file'], str(self.plugin_file))
+
+        feature = features.get_export_feature('smp')
+        self.assertEqual(self.imports(), 1)
+        self.assertEqual(feature.name, 'sample')
+        self.assertEqual(feature.meta['plugin_file'], str(self.plugin_file))
+        self.assertEqual(feature.handler('x'), b'sample:x')
+        self.assertEqual([f.name for f in features.get_export_features()], ['sample'])
+
+        features.get_export_feature('smp')
+        self.assertEqual(self.imports(), 1)
+
+    def test_plugins_without_events_load_at_startup(self):
+        features = self.load(['*'])
+        self.assertEqual(self.imports(), 1)
+        self.assertEqual(features.get_export_feature('smp').name, 'sample')
+        self.assertEqual(self.registry.pending_activations(), [])
+
+    def test_route_event_fires_before_request(self):
+        self.load(['onRoute:/api/sample'])
+        fired = []
+        inner = MagicMock(return_value=[b''])
+        middleware = RouteActivationMiddleware(inner, self.registry,
+                                               lambda event: fired.append(self.registry.activate(event)))
+        middleware({'PATH_INFO': '/api/samples'}, None)
+        self.assertEqual(fired, [])
+        middleware({'PATH_INFO': '/api/sample/1'}, None)
+        middleware({'PATH_INFO': '/api/sample'}, None)
+        self.assertEqual(fired, [['sample']])
+        self.assertEqual(self.imports(), 1)
+        self.assertEqual(inner.call_count, 3)
+
+    def test_parse_activation_events(self):
+        self.assertEqual(parse_activation_events(None), [])
+        self.assertEqual(parse_activation_events(['onExport:pdf', '*']), [])
+        self.assertEqual(parse_activation_events(['onExport:PDF', 'onRoute:/API/x', 'onFileType:.DOCX', 'onBoot']),
+                         ['onExport:pdf', 'onRoute:/API/x', 'onFileType:.docx'])
+
+
+if __name__ == '__main__':
+    unittest.main()
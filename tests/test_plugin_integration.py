@@ -11,7 +11,8 @@ PROJECT_ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
 # Import app components
-from docnexus.app import app
+from docnexus.app import create_app
+app = create_app()
 from docnexus.core.loader import load_plugins_from_path
 from docnexus.features.registry import PluginRegistry
 from docnexus.features.registry import FeatureManager, FeatureType
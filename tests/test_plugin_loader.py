@@ -0,0 +1,80 @@
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from docnexus.core import loader
+from docnexus.core.manifest import ManifestIndex
+from docnexus.features.registry import PluginRegistry
+
+# Slow to import; the first plugins sleep longest so they finish importing last
+PLUGIN_SOURCE = '''
+import time
+time.sleep(%r)
+
+def get_features():
+    return [Feature(%r, lambda content: content, FeatureState.STANDARD,
+                    feature_type=FeatureType.EXPORT_HANDLER, meta={"extension": %r})]
+
+PLUGIN_METADATA = {'name': %r, 'preinstalled': True}
+'''
+DELAYS = {'alpha': 0.3, 'beta': 0.2, 'gamma': 0.1, 'delta': 0.3}
+
+
+class TestParallelPluginLoading(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        for name, delay in DELAYS.items():
+            (self.tmp / name).mkdir()
+            (self.tmp / name / 'plugin.py').write_text(PLUGIN_SOURCE % (delay, name, name, name), encoding='utf-8')
+
+        self._saved_registry = PluginRegistry._instance
+        PluginRegistry._instance = None
+        self.registry = PluginRegistry()
+        state = MagicMock()
+        state.is_plugin_in_registry.return_value = False
+        for patcher in (patch('docnexus.core.state.PluginState.get_instance', return_value=state),
+                        patch.object(loader, 'get_manifest_index', return_value=ManifestIndex())):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        PluginRegistry._instance = self._saved_registry
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_imports_run_concurrently_and_register_in_name_order(self):
+        start = time.perf_counter()
+        loader.load_plugins_from_path(self.tmp, self.registry, max_workers=4, budget_ms=None)
+        elapsed = time.perf_counter() - start
+
+        self.assertLess(elapsed, sum(DELAYS.values()) * 0.8)
+        self.assertEqual([f.name for f in self.registry.get_all_plugins()], sorted(DELAYS))
+
+        timings = {t.name: t for t in loader.get_plugin_timings()}
+        for name, delay in DELAYS.items():
+            self.assertGreaterEqual(timings[name].import_ms, delay * 1000 * 0.9)
+            self.assertIsNone(timings[name].error)
+
+    def test_slow_plugins_are_reported(self):
+        with self.assertLogs('docnexus.core.loader', 'WARNING') as logs:
+            loader.load_plugins_from_path(self.tmp, self.registry, max_workers=4, budget_ms=250)
+        slow = sorted(name for name, delay in DELAYS.items() if delay * 1000 > 250)
+        reported = sorted(name for name in DELAYS if any(f"plugin '{name}' took" in line for line in logs.output))
+        self.assertEqual(reported, slow)
+
+    def test_broken_plugin_does_not_stop_the_others(self):
+        (self.tmp / 'beta' / 'plugin.py').write_text("PLUGIN_METADATA = {'preinstalled': True}\nraise ValueError('broken')\n",
+                                                     encoding='utf-8')
+        loader.load_plugins_from_path(self.tmp, self.registry, max_workers=4, budget_ms=None)
+        self.assertEqual([f.name for f in self.registry.get_all_plugins()], ['alpha', 'delta', 'gamma'])
+        self.assertIn('broken', {t.name: t for t in loader.get_plugin_timings()}['beta'].error)
+
+
+if __name__ == '__main__':
+    unittest.main()
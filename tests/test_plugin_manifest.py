@@ -0,0 +1,84 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from docnexus.core import loader
+from docnexus.core.manifest import ManifestIndex, parse_plugin_metadata
+
+# Executing this plugin would fail: its metadata must be read without running it
+PLUGIN_SOURCE = '''
+raise RuntimeError("plugin code executed")
+
+PLUGIN_METADATA = {
+    'name': 'Sample',
+    'category': 'export',
+    'preinstalled': %s,
+}
+'''
+
+
+class TestManifestIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.plugins = self.tmp / 'plugins'
+        self.plugin_dir = self.plugins / 'sample'
+        self.plugin_dir.mkdir(parents=True)
+        self.plugin_file = self.plugin_dir / 'plugin.py'
+        self.plugin_file.write_text(PLUGIN_SOURCE % 'False', encoding='utf-8')
+        self.index_path = self.tmp / 'cache' / 'plugin_index.json'
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_parse_metadata(self):
+        self.assertEqual(parse_plugin_metadata(PLUGIN_SOURCE % 'True')['preinstalled'], True)
+        self.assertEqual(parse_plugin_metadata("X = 1\n"), {})
+        with self.assertRaises(ValueError):
+            parse_plugin_metadata("PLUGIN_METADATA = {'name': compute()}\n")
+
+    def test_index_is_cached_on_disk_and_revalidated(self):
+        index = ManifestIndex(self.index_path)
+        self.assertEqual(index.discover([self.plugins])[0].metadata['name'], 'Sample')
+        self.assertEqual(index.parsed, 1)
+
+        # A new process reads the stored index: nothing is parsed
+        second = ManifestIndex(self.index_path)
+        self.assertEqual(second.get(self.plugin_dir)['category'], 'export')
+        self.assertEqual(second.parsed, 0)
+
+        # Touched but identical: the hash matches, no parse
+        stat = self.plugin_file.stat()
+        os.utime(self.plugin_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        second.get(self.plugin_dir)
+        self.assertEqual(second.parsed, 0)
+
+        # Edited: parsed again
+        self.plugin_file.write_text(PLUGIN_SOURCE % 'True', encoding='utf-8')
+        self.assertTrue(second.get(self.plugin_dir)['preinstalled'])
+        self.assertEqual(second.parsed, 1)
+
+    def test_manifest_json_takes_precedence(self):
+        (self.plugin_dir / 'manifest.json').write_text(json.dumps({'name': 'From manifest'}), encoding='utf-8')
+        self.assertEqual(ManifestIndex().get(self.plugin_dir), {'name': 'From manifest'})
+
+    def test_loader_does_not_execute_disabled_plugins(self):
+        state = MagicMock()
+        state.is_plugin_in_registry.return_value = False
+        with patch('docnexus.core.state.PluginState.get_instance', return_value=state), \
+                patch.object(loader, 'get_manifest_index', return_value=ManifestIndex(self.index_path)), \
+                patch.object(loader, 'import_plugin_module') as import_module:
+            loader.load_single_plugin('sample', self.plugin_file, MagicMock())
+        import_module.assert_not_called()
+        state.set_plugin_installed.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import gzip
+import io
+import sys
+import unittest
+from pathlib import Path
+from urllib.parse import urlencode
+
+from flask import Flask, jsonify, request
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from docnexus.core.request_encoding import BROTLI_BOUNDED, RequestDecompressionMiddleware, _iter_brotli, brotli
+
+
+class TestRequestDecompression(unittest.TestCase):
+    def setUp(self):
+        app = Flask(__name__)
+
+        @app.route('/json', methods=['POST'])
+        def echo_json():
+            return jsonify({"length": len(request.json['html'])})
+
+        @app.route('/form', methods=['POST'])
+        def echo_form():
+            return jsonify({"content": request.form['content']})
+
+        app.wsgi_app = RequestDecompressionMiddleware(app.wsgi_app, max_size=1024 * 1024, spool_memory=1024)
+        self.client = app.test_client()
+
+    def post(self, path, body, encoding='gzip', content_type='application/json'):
+        return self.client.post(path, data=body, content_type=content_type,
+                                headers={'Content-Encoding': encoding})
+
+    def test_gzip_json_body(self):
+        html = "<p>" + "x" * 200000 + "</p>"
+        body = gzip.compress(('{"html": "%s"}' % html).encode('utf-8'))
+        response = self.post('/json', body)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['length'], len(html))
+
+    def test_gzip_form_body(self):
+        body = gzip.compress(urlencode({"content": "# Title\n\nText"}).encode('utf-8'))
+        response = self.post('/form', body, content_type='application/x-www-form-urlencoded')
+        self.assertEqual(response.json['content'], "# Title\n\nText")
+
+    def test_uncompressed_body_untouched(self):
+        response = self.client.post('/json', json={"html": "abc"})
+        self.assertEqual(response.json['length'], 3)
+
+    def test_decompressed_size_ceiling(self):
+        # 8 MB of zeros compress to a few KB, decoding must stop at the 1 MB ceiling
+        body = gzip.compress(b'0' * (8 * 1024 * 1024))
+        self.assertLess(len(body), 64 * 1024)
+        response = self.post('/json', body)
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.json['error'], "Request Too Large")
+
+    def test_corrupt_and_truncated_bodies(self):
+        self.assertEqual(self.post('/json', b'not gzip at all').status_code, 400)
+        truncated = gzip.compress(b'{"html": "abc"}')[:-10]
+        self.assertEqual(self.post('/json', truncated).status_code, 400)
+
+    def test_unsupported_encoding(self):
+        response = self.post('/json', b'{}', encoding='compress')
+        self.assertEqual(response.status_code, 415)
+
+    @unittest.skipIf(not BROTLI_BOUNDED, "brotli >= 1.2 not installed")
+    def test_brotli_body(self):
+        response = self.post('/json', brotli.compress(b'{"html": "abcdef"}'), encoding='br')
+        self.assertEqual(response.json['length'], 6)
+
+    @unittest.skipIf(not BROTLI_BOUNDED, "brotli >= 1.2 not installed")
+    def test_brotli_size_ceiling(self):
+        # A few bytes of input expand to megabytes: every decode step stays bounded
+        body = brotli.compress(b'0' * (8 * 1024 * 1024))
+        steps = [len(data) for data in _iter_brotli(io.BytesIO(body), 4096)]
+        self.assertEqual(sum(steps), 8 * 1024 * 1024)
+        self.assertLess(max(steps), 64 * 1024)  # The limit plus at most one decoder block
+        self.assertEqual(self.post('/json', body, encoding='br').status_code, 413)
+
+    @unittest.skipIf(brotli is None or BROTLI_BOUNDED, "needs brotli < 1.2")
+    def test_unbounded_brotli_is_not_accepted(self):
+        self.assertEqual(self.post('/json', brotli.compress(b'{}'), encoding='br').status_code, 415)
+
+
+class TestCompressedPreview(unittest.TestCase):
+    def test_preview_form_fallback_accepts_gzip(self):
+        from docnexus.app import create_app
+        app = create_app()
+
+        body = gzip.compress(urlencode({"content": "# Compressed Preview\n\nBody text.",
+                                        "filename": "notes.md"}).encode('utf-8'))
+        response = app.test_client().post('/preview', data=body,
+                                          content_type='application/x-www-form-urlencoded',
+                                          headers={'Content-Encoding': 'gzip'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Compressed Preview', response.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import sys
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from docnexus.core.runtime import RuntimeState
+from docnexus.features.registry import Feature, FeatureManager, FeatureState, FeatureType, PluginRegistry
+
+
+def plugin_feature(plugin_id, name):
+    return Feature(name, lambda text, tag=plugin_id: f"{text}+{tag}", FeatureState.STANDARD,
+                   feature_type=FeatureType.ALGORITHM, meta={'plugin_id': plugin_id})
+
+
+class TestRuntimeSnapshot(unittest.TestCase):
+    def setUp(self):
+        # A registry of its own: PluginRegistry is a process-wide singleton
+        self._saved_registry = PluginRegistry._instance
+        PluginRegistry._instance = None
+        self.registry = PluginRegistry()
+        state = MagicMock()
+        state.is_plugin_installed.return_value = True
+        patcher = patch('docnexus.core.state.PluginState.get_instance', return_value=state)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.registry.register(plugin_feature('alpha', 'clean'))
+        self.features = FeatureManager(self.registry)
+        self.features.refresh()
+        self.md_folder = Path('/docs/one')
+        self.config = {'active_workspace': '/docs/one'}
+        self.runtime = RuntimeState(lambda: (self.md_folder, self.config, self.features))
+
+    def tearDown(self):
+        PluginRegistry._instance = self._saved_registry
+
+    def test_snapshot_is_stable_while_sources_change(self):
+        snapshot = self.runtime.get()
+        self.assertEqual(snapshot.pipeline(False).run('x'), 'x+alpha')
+
+        # As set_active_workspace and the plugin APIs: objects replaced, not changed in place
+        self.md_folder = Path('/docs/two')
+        self.config = dict(self.config, active_workspace='/docs/two')
+        self.registry.register(plugin_feature('beta', 'clean'))
+        self.features.sync_plugin('beta')
+
+        self.assertEqual(snapshot.md_folder, Path('/docs/one'))
+        self.assertEqual(snapshot.config['active_workspace'], '/docs/one')
+        self.assertEqual(snapshot.pipeline(False).run('x'), 'x+alpha')
+        with self.assertRaises(TypeError):
+            snapshot.config['active_workspace'] = '/elsewhere'
+
+        latest = self.runtime.get()
+        self.assertGreater(latest.generation, snapshot.generation)
+        self.assertEqual(latest.md_folder, Path('/docs/two'))
+        self.assertEqual(latest.pipeline(False).run('x'), 'x+beta')
+
+    def test_reads_reuse_the_snapshot_until_a_source_is_replaced(self):
+        first = self.runtime.get()
+        with patch.object(self.features, 'build_pipeline', side_effect=AssertionError('rebuilt')):
+            for _ in range(20):
+                self.assertIs(self.runtime.get(), first)
+
+        self.features.set_plugin_installed('alpha', False)
+        second = self.runtime.get()
+        self.assertIsNot(second, first)
+        self.assertEqual(first.pipeline(True).run('x'), 'x+alpha')
+        self.assertEqual(second.pipeline(True).run('x'), 'x')  # Flagged uninstalled, left out
+
+    def test_concurrent_registration_loses_nothing(self):
+        def register(plugin_id):
+            for i in range(50):
+                self.registry.register(plugin_feature(plugin_id, f"{plugin_id}-{i}"))
+
+        threads = [threading.Thread(target=register, args=(f"p{n}",)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.features.refresh()
+        self.assertEqual(len(self.runtime.get().features), 1 + 4 * 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
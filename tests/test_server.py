@@ -0,0 +1,122 @@
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import urllib.request
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from docnexus.core.export_cache import ExportCache
+from docnexus.core.export_jobs import JOB_DONE, ExportJobService
+from docnexus.core.server import PooledWSGIServer, RequestCounter, bind_socket
+
+# Supervisor with a tiny app answering its worker pid, run as a separate process
+SUPERVISOR = '''
+import os, sys
+sys.path.insert(0, {root!r})
+from docnexus.core.server import PreforkServer
+
+def app(environ, start_response):
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [str(os.getpid()).encode()]
+
+server = PreforkServer(lambda: app, "127.0.0.1", 0, workers=2, threads=2, max_requests=3)
+server.preload()
+print(server.port, flush=True)
+server.run()
+'''
+
+
+def get(url):
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return response.read().decode()
+
+
+class TestPooledServer(unittest.TestCase):
+    def test_serves_and_retires_after_max_requests(self):
+        sock = bind_socket('127.0.0.1', 0)
+        port = sock.getsockname()[1]
+
+        def app(environ, start_response):
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return [threading.current_thread().name.encode()]
+
+        retired = threading.Event()
+        server = PooledWSGIServer('127.0.0.1', port, RequestCounter(app, 3, retired.set), threads=2,
+                                  fd=sock.fileno())
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            for _ in range(3):
+                get(f'http://127.0.0.1:{port}/')
+            self.assertTrue(retired.wait(5))
+        finally:
+            server.shutdown()
+            thread.join(5)
+            sock.close()
+        self.assertTrue(server.wait_idle(5))
+
+
+@unittest.skipUnless(hasattr(os, 'fork'), "pre-fork mode needs fork()")
+class TestPreforkServer(unittest.TestCase):
+    def test_workers_are_recycled_and_stop_gracefully(self):
+        process = subprocess.Popen([sys.executable, '-c', SUPERVISOR.format(root=str(PROJECT_ROOT))],
+                                   stdout=subprocess.PIPE, text=True)
+        try:
+            port = int(process.stdout.readline())
+            pids = set()
+            deadline = time.time() + 30
+            while len(pids) < 3 and time.time() < deadline:
+                try:
+                    pids.add(int(get(f'http://127.0.0.1:{port}/')))
+                except OSError:
+                    time.sleep(0.05)  # A worker between retiring and its replacement
+            # 2 workers retiring every 3 requests: replacements answer too
+            self.assertGreaterEqual(len(pids), 3)
+            self.assertNotIn(process.pid, pids)
+
+            process.send_signal(signal.SIGTERM)
+            self.assertEqual(process.wait(15), 0)
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+
+
+class TestSharedJobState(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.cache = ExportCache(self.tmp / 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_job_is_visible_from_other_processes(self):
+        # Two services sharing a result directory stand for two server worker processes
+        first = ExportJobService(self.tmp / 'jobs', result_cache=self.cache, warm=False, share_state=True)
+        second = ExportJobService(self.tmp / 'jobs', result_cache=self.cache, warm=False, share_state=True)
+        self.cache.put('key-1', b'exported')
+
+        job, _ = first.submit('txt', ('txt', 'txt_export', 'plugin.py'), {'html': '', 'toc': None},
+                              'key-1', 'guide.txt')
+        other = second.get(job.id)
+        self.assertIsNot(other, job)
+        self.assertEqual((other.state, other.download_name), (JOB_DONE, 'guide.txt'))
+        self.assertEqual(second.result_path(other).read_bytes(), b'exported')
+
+        self.assertIsNone(second.get('0' * 32))
+        self.assertIsNone(second.get('../../etc/passwd'))
+        unshared = ExportJobService(self.tmp / 'jobs', result_cache=self.cache, warm=False)
+        self.assertIsNone(unshared.get(job.id))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from docnexus.core.startup import StartupProfile, module_available, optional_import
+
+# Startup budget for import + create_app() (typically well under half of it). Raise it
+# only together with a note on what the extra startup time buys.
+STARTUP_BUDGET_SECONDS = 2.0
+
+# Imported on first use: none of these may be loaded by starting the app
+DEFERRED_MODULES = ('mammoth', 'PIL', 'pypdf', 'requests', 'markdown', 'pymdownx', 'pygments')
+
+STARTUP = '''
+import json, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+from docnexus import app as app_module
+imported = sorted(name for name in sys.modules if name.split(".")[0] in {deferred!r} + ("bs4",))
+app_module.create_app({{"active_workspace": {workspace!r}}})
+elapsed = time.perf_counter() - start
+started = sorted(name for name in sys.modules if name.split(".")[0] in {deferred!r})
+print(json.dumps({{"elapsed": elapsed, "imported": imported, "started": started}}))
+'''
+
+
+def measure_startup(workspace):
+    code = STARTUP.format(root=str(PROJECT_ROOT), deferred=DEFERRED_MODULES, workspace=str(workspace))
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            timeout=120, cwd=str(PROJECT_ROOT)).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+class TestStartupBudget(unittest.TestCase):
+    def test_startup_defers_heavy_imports_and_stays_in_budget(self):
+        with tempfile.TemporaryDirectory() as workspace:
+            runs = [measure_startup(workspace) for _ in range(3)]
+        # Importing the app loads none of them; starting it none of the deferred ones
+        self.assertEqual(runs[0]['imported'], [])
+        self.assertEqual(runs[0]['started'], [])
+        best = min(run['elapsed'] for run in runs)
+        self.assertLess(best, STARTUP_BUDGET_SECONDS,
+                        f"Startup took {best:.2f}s (budget {STARTUP_BUDGET_SECONDS}s): "
+                        f"run `docnexus --startup-profile` to see where the time goes")
+
+
+class TestStartupHelpers(unittest.TestCase):
+    def test_optional_imports(self):
+        self.assertIs(optional_import('json'), json)
+        self.assertIsNone(optional_import('docnexus_missing_module'))
+        self.assertTrue(module_available('json'))
+        self.assertFalse(module_available('docnexus_missing_module'))
+        self.assertFalse(module_available('docnexus_missing_package.module'))
+
+    def test_profile_records_phases_and_imports(self):
+        profile = StartupProfile()
+        sys.modules.pop('colorsys', None)
+        profile.trace_imports()
+        try:
+            with profile.phase('load'):
+                import colorsys  # noqa: F401
+        finally:
+            profile.stop_tracing()
+        self.assertFalse(profile.tracing)
+        self.assertEqual([p.name for p in profile.phases], ['load'])
+        self.assertIn('colorsys', [r.name for r in profile.imports])
+
+        report = profile.report(min_import_ms=0)
+        self.assertIn('load', report)
+        self.assertIn('colorsys (+1 modules)', report)
+
+    def test_cli_prints_startup_profile(self):
+        env = dict(os.environ, PYTHONPATH=str(PROJECT_ROOT))
+        result = subprocess.run([sys.executable, '-m', 'docnexus.cli', '--startup-profile'],
+                                capture_output=True, text=True, timeout=120, cwd=str(PROJECT_ROOT), env=env)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        for phase in ('import docnexus.app', 'create_app: discover_plugins', 'first render'):
+            self.assertIn(phase, result.stdout)
+        self.assertIn('Imports (>=', result.stdout)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import json
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from docnexus.core.static_site import (
+    MANIFEST_NAME, SEARCH_INDEX_NAME, SiteBuilder, SiteMap, build_page_map, rewrite_urls, snippet_includes
+)
+
+
+class TestSiteMap(unittest.TestCase):
+    def setUp(self):
+        self.site = SiteMap(build_page_map(['home.md', 'guides/setup.md', 'guides/setup.txt', 'notes.txt']))
+
+    def test_pages_and_resolution(self):
+        self.assertEqual(self.site.pages['guides/setup.md'], 'guides/setup.html')
+        # Same stem, different extension: no collision
+        self.assertEqual(self.site.pages['guides/setup.txt'], 'guides/setup.txt.html')
+        self.assertEqual(self.site.resolve('guides/setup'), 'guides/setup.md')
+        self.assertEqual(self.site.resolve('notes'), 'notes.txt')  # wiki link by name
+        self.assertIsNone(self.site.resolve('missing'))
+
+    def test_rewrite_urls(self):
+        html = ('<a href="/file/home.md#intro">h</a><a href="/">hub</a><a href="/?folder=guides">g</a>'
+                '<img src="/static/logo.png"><a href="/file/missing">m</a><a href="https://x.org/">x</a>')
+        rewritten = rewrite_urls(html, 'guides/setup.html', self.site)
+        self.assertIn('href="../home.html#intro"', rewritten)
+        self.assertIn('href="../index.html"', rewritten)
+        self.assertIn('href="index.html"', rewritten)
+        self.assertIn('src="../static/logo.png"', rewritten)
+        self.assertIn('href="/file/missing"', rewritten)
+        self.assertIn('href="https://x.org/"', rewritten)
+
+    def test_snippet_includes(self):
+        source = '# Doc\n\n--8<-- "shared/footer.md"\n\n-8<-\nintro.md\n; skipped.md\n-8<-\n'
+        self.assertEqual(snippet_includes(source), ['shared/footer.md', 'intro.md'])
+
+
+class TestSiteBuilder(unittest.TestCase):
+    def setUp(self):
+        from docnexus import app as app_module
+        app_module.create_app()
+        self.app_module = app_module
+        self.tmp = Path(tempfile.mkdtemp())
+        self.workspace = self.tmp / 'workspace'
+        (self.workspace / 'guides').mkdir(parents=True)
+        (self.workspace / 'home.md').write_text(
+            "# Home\n\nSee [setup](guides/setup.md) and [later](guides/later.md).\n", encoding='utf-8')
+        (self.workspace / 'guides' / 'setup.md').write_text("# Setup\n\nInstall steps.\n", encoding='utf-8')
+        (self.workspace / 'guides' / 'usage.md').write_text("# Usage\n\nRun it.\n", encoding='utf-8')
+        self.output = self.tmp / 'site'
+        # The builder points the app at the workspace; restore it for the other tests
+        self.patches = [patch.object(app_module, 'MD_FOLDER', app_module.MD_FOLDER),
+                        patch.object(app_module, 'RENDER_CACHE', app_module.RENDER_CACHE)]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def build(self, **kwargs):
+        return SiteBuilder(self.app_module, self.workspace, self.output, workers=1, **kwargs).build()
+
+    def test_build_writes_static_pages(self):
+        result = self.build()
+        self.assertEqual(sorted(result.rendered), ['guides/setup.md', 'guides/usage.md', 'home.md'])
+        self.assertFalse(result.failed)
+
+        home = (self.output / 'home.html').read_text(encoding='utf-8')
+        self.assertIn('href="guides/setup.html"', home)
+        self.assertIn('href="static/theme.css"', home)
+        self.assertNotIn('id="exportBtn"', home)
+        self.assertNotIn('href="/file/', home)
+        self.assertTrue((self.output / 'static' / 'theme.css').is_file())
+
+        listing = (self.output / 'guides' / 'index.html').read_text(encoding='utf-8')
+        self.assertIn('href="usage.html"', listing)
+        self.assertIn('"../search-index.json"', listing)
+
+        index = json.loads((self.output / SEARCH_INDEX_NAME).read_text(encoding='utf-8'))
+        entry = next(doc for doc in index['documents'] if doc['path'] == 'guides/setup.md')
+        self.assertEqual((entry['url'], entry['title']), ('guides/setup.html', 'Setup'))
+        self.assertIn('install', entry['terms'].split())
+
+    def test_incremental_rebuild(self):
+        self.build()
+        self.assertEqual(self.build().rendered, [])
+
+        # Changed document: itself and the pages linking to it
+        (self.workspace / 'guides' / 'setup.md').write_text("# Setup\n\nNew steps.\n", encoding='utf-8')
+        self.assertEqual(sorted(self.build().rendered), ['guides/setup.md', 'home.md'])
+
+        # A broken link target appearing re-renders the page linking to it
+        (self.workspace / 'guides' / 'later.md').write_text("# Later\n", encoding='utf-8')
+        self.assertEqual(sorted(self.build().rendered), ['guides/later.md', 'home.md'])
+        self.assertIn('href="guides/later.html"', (self.output / 'home.html').read_text(encoding='utf-8'))
+
+        # Deleted documents lose their page and search entry
+        (self.workspace / 'guides' / 'usage.md').unlink()
+        result = self.build()
+        self.assertEqual(result.removed, ['guides/usage.md'])
+        self.assertFalse((self.output / 'guides' / 'usage.html').exists())
+        index = json.loads((self.output / SEARCH_INDEX_NAME).read_text(encoding='utf-8'))
+        self.assertNotIn('guides/usage.md', [doc['path'] for doc in index['documents']])
+
+        manifest = json.loads((self.output / MANIFEST_NAME).read_text(encoding='utf-8'))
+        self.assertEqual(manifest['documents']['home.md']['links']['guides/later.md'], 'guides/later.md')
+        self.assertEqual(len(self.build(force=True).rendered), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import io
+import zipfile
+from unittest.mock import patch
+
+import pytest
+from lxml import etree
+
+from docnexus.core.tex_omml import M_NS, TexConversionError, tex_to_omml
+
+NS = {'m': M_NS}
+
+
+def omml(tex, display=False):
+    return etree.fromstring(tex_to_omml(tex, display))
+
+
+def text(element):
+    return "".join(element.itertext())
+
+
+def test_scripts_bind_to_last_atom():
+    root = omml(r'E = mc^2')
+    assert root.tag == f'{{{M_NS}}}oMath'
+    sup = root.find('m:sSup', NS)
+    assert text(sup.find('m:e', NS)) == 'c'
+    assert text(sup.find('m:sup', NS)) == '2'
+    # Groups are a single base
+    assert text(omml(r'{ab}^2').find('m:sSup/m:e', NS)) == 'ab'
+    assert omml(r'x_i^2').find('m:sSubSup', NS) is not None
+
+
+def test_structures():
+    root = omml(r'\sum_{i=1}^{n} \frac{\sqrt[3]{x}}{\alpha}', display=True)
+    assert root.tag == f'{{{M_NS}}}oMathPara'
+    nary = root.find('.//m:nary', NS)
+    assert nary.find('m:naryPr/m:chr', NS).get(f'{{{M_NS}}}val') == '∑'
+    assert text(nary.find('m:sub', NS)) == 'i=1'
+    # The operand goes into the operator's body
+    fraction = nary.find('m:e/m:f', NS)
+    assert text(fraction.find('m:num/m:rad/m:deg', NS)) == '3'
+    assert text(fraction.find('m:den', NS)) == 'α'
+
+
+def test_delimiters_environments_and_fonts():
+    root = omml(r'\left[ x \right) + \begin{pmatrix} 1 & 2 \\ 3 & 4 \end{pmatrix}')
+    delimiters = root.findall('m:d', NS)
+    assert delimiters[0].find('m:dPr/m:begChr', NS).get(f'{{{M_NS}}}val') == '['
+    assert len(delimiters[1].findall('.//m:mr', NS)) == 2
+
+    root = omml(r'f(x) = \begin{cases} 1 & x > 0 \\ 0 & \text{otherwise} \end{cases}')
+    assert len(root.findall('.//m:eqArr/m:e', NS)) == 2
+    assert 'otherwise' in text(root)
+
+    run = omml(r'\mathbb{R}').find('m:r', NS)
+    assert run.find('m:rPr/m:scr', NS).get(f'{{{M_NS}}}val') == 'double-struck'
+
+
+@pytest.mark.parametrize('tex', [r'\unknowncommand{x}', r'\frac{a}', r'x^{', r'\begin{tikzpicture}\end{tikzpicture}',
+                                 'x^{' * 300 + 'y' + '}' * 300, '\\sqrt' * 1000 + ' x'])
+def test_unsupported_tex_raises(tex):
+    with pytest.raises(TexConversionError):
+        tex_to_omml(tex)
+
+
+def test_word_export_uses_native_equations_without_network():
+    from docnexus.plugins.word_export.plugin import export_to_word
+
+    html = ('<div class="markdown-content"><p>Inline <script type="math/tex">a^2+b^2</script> text.</p>'
+            '<script type="math/tex; mode=display">\\int_0^1 x\\,dx = \\frac{1}{2}</script></div>')
+    with patch('urllib.request.urlopen') as urlopen:
+        data = export_to_word(html)
+    urlopen.assert_not_called()
+
+    xml = zipfile.ZipFile(io.BytesIO(data)).read('word/document.xml').decode('utf-8')
+    assert xml.count('<m:oMathPara') == 1
+    assert xml.count('<m:sSup>') == 2
+    assert 'Inline' in xml and 'text.' in xml
+    assert '\ue000' not in xml
@@ -0,0 +1,43 @@
+import io
+import zipfile
+
+from docx import Document
+from docx.oxml.ns import qn
+
+from docnexus.plugins.word_export.plugin import TABLE_STYLE, export_to_word
+
+HTML = ('<div id="documentContent"><div class="toc-container"><ul><li><a href="#intro">Intro</a></li></ul></div>'
+        '<div class="markdown-content"><h2 id="intro">Intro</h2>'
+        '<div class="admonition warning"><p class="admonition-title">Warning</p><p>Careful.</p></div>'
+        '<table><tr><th>Note</th><th>i</th></tr><tr><td>1</td><td>2</td></tr></table>'
+        '<p>Back to <a href="#intro">the intro</a>.</p></div></div>')
+
+
+def export(html=HTML):
+    output = export_to_word(html)
+    return Document(io.BytesIO(output)), zipfile.ZipFile(io.BytesIO(output)).read('word/document.xml').decode('utf-8')
+
+
+def test_markers_are_applied_and_removed():
+    doc, xml = export()
+    assert '\ue000' not in xml and '\ue002' not in xml
+
+    # Page break after the TOC
+    assert '<w:br w:type="page"/>' in xml
+    # Heading bookmark, and internal links pointing at it
+    heading = next(p for p in doc.paragraphs if p.style.name.startswith('Heading'))
+    assert heading.text == 'Intro'
+    assert heading._p.find(qn('w:bookmarkStart')).get(qn('w:name')) == 'intro'
+    assert xml.count('w:anchor="intro"') == 2
+
+
+def test_alert_tables_are_marked_not_guessed():
+    doc, _ = export()
+    alert, table = doc.tables
+    shd = alert.cell(0, 0)._tc.tcPr.find(qn('w:shd'))
+    assert shd.get(qn('w:fill')) == 'fff8c5'
+    assert any(run.font.name == 'Segoe UI Emoji' for run in alert.cell(0, 0).paragraphs[0].runs if '⚠' in run.text)
+    assert alert.style.name != TABLE_STYLE
+    # A regular table whose header happens to read "Note" / "i" is not an alert
+    assert table.style.name == TABLE_STYLE
+    assert table.cell(0, 0)._tc.tcPr is None or table.cell(0, 0)._tc.tcPr.find(qn('w:shd')) is None
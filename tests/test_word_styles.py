@@ -0,0 +1,41 @@
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_COLOR
+from docx.shared import RGBColor
+
+from docnexus.plugins.word_export.plugin import (
+    SafeHtmlToDocx, paragraph_style_recipe, parse_inline_style, run_style_recipe
+)
+
+
+def test_inline_styles_are_parsed_once():
+    style = parse_inline_style("color: #d73a49; font-family: 'Segoe UI Emoji', sans-serif")
+    assert parse_inline_style("color: #d73a49; font-family: 'Segoe UI Emoji', sans-serif") is style
+    assert dict(style) == {'color': '#d73a49', 'font-family': "'SegoeUIEmoji',sans-serif"}
+    assert run_style_recipe(tuple(style.items())) is run_style_recipe(tuple(style.items()))
+    # Values containing ':' no longer break parsing
+    assert parse_inline_style("background: url(data:x)")['background'] == 'url(data:x)'
+
+
+def test_recipes_apply_run_and_paragraph_formatting():
+    paragraph = Document().add_paragraph()
+    run = paragraph.add_run("x")
+    run_style_recipe((('color', '#abc'), ('background-color', '#ffff00'),
+                      ('text-decoration', 'line-through'), ('font-family', 'Consolas,monospace'))).apply(run)
+    assert run.font.color.rgb == RGBColor(0xaa, 0xbb, 0xcc)
+    assert run.font.highlight_color == WD_COLOR.YELLOW
+    assert run.font.strike and run.font.name == 'Consolas'
+
+    # Invalid colors are ignored instead of crashing the export
+    run_style_recipe((('color', 'rgb(1,2)'),)).apply(paragraph.add_run("y"))
+
+    paragraph_style_recipe((('text-align', 'center'), ('background-color', '#f6f8fa'))).apply(paragraph)
+    assert paragraph.paragraph_format.alignment == WD_ALIGN_PARAGRAPH.CENTER
+    assert 'w:fill="f6f8fa"' in paragraph._p.xml
+
+
+def test_styles_reach_table_cells():
+    doc = Document()
+    SafeHtmlToDocx().add_html_to_document(
+        '<table><tr><td><span style="color: #22863a">cell</span></td></tr></table>', doc
+    )
+    assert doc.tables[0].cell(0, 0).paragraphs[0].runs[0].font.color.rgb == RGBColor(0x22, 0x86, 0x3a)
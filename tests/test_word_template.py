@@ -0,0 +1,75 @@
+import io
+import shutil
+import tempfile
+import zipfile
+from pathlib import Path
+from unittest.mock import patch
+
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml.ns import qn
+
+from docnexus.plugins.word_export import plugin
+from docnexus.plugins.word_export.plugin import FIGURE_STYLE, TABLE_STYLE, export_to_word, new_document
+
+HTML = ('<div class="markdown-content"><h1 id="t">Title</h1>'
+        '<table><tr><th>A</th><th>B</th></tr><tr><td>1</td><td>2</td></tr></table></div>')
+
+
+def test_base_template_has_docnexus_styles_and_is_slim():
+    doc = new_document()
+    names = {style.name for style in doc.styles}
+    assert {TABLE_STYLE, FIGURE_STYLE, 'Table Grid', 'List Bullet'} <= names
+    assert 'Light Shading Accent 1' not in names
+    assert doc.styles['Heading 2'].paragraph_format.keep_with_next
+    assert doc.styles[FIGURE_STYLE].paragraph_format.alignment == WD_ALIGN_PARAGRAPH.CENTER
+    # Each export gets its own copy
+    assert new_document() is not doc
+
+
+def test_tables_reference_the_template_style():
+    output = export_to_word(HTML)
+    doc = Document(io.BytesIO(output))
+    table = doc.tables[0]
+    assert table.style.name == TABLE_STYLE
+    # Header shading comes from the style, not from per-cell formatting
+    assert table.cell(0, 0)._tc.get_or_add_tcPr().find(qn('w:shd')) is None
+    assert 'stylesWithEffects' not in ''.join(zipfile.ZipFile(io.BytesIO(output)).namelist())
+
+
+def test_custom_template_file_is_used():
+    folder = Path(tempfile.mkdtemp())
+    try:
+        custom = Document()
+        custom.add_paragraph("Sample content that must not leak into exports")
+        custom.styles['Normal'].font.name = 'Georgia'
+        custom.save(str(folder / 'template.docx'))
+
+        with patch.object(plugin, 'WORD_TEMPLATE_FILE', folder / 'template.docx'):
+            doc = Document(io.BytesIO(export_to_word(HTML)))
+        assert doc.styles['Normal'].font.name == 'Georgia'
+        assert TABLE_STYLE in {style.name for style in doc.styles}
+        assert "Sample content" not in "\n".join(p.text for p in doc.paragraphs)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+        plugin._template_cache = None
+
+
+def test_custom_template_without_table_grid():
+    folder = Path(tempfile.mkdtemp())
+    try:
+        custom = Document()
+        custom.styles['Table Grid'].element.getparent().remove(custom.styles['Table Grid'].element)
+        custom.save(str(folder / 'template.docx'))
+
+        with patch.object(plugin, 'WORD_TEMPLATE_FILE', folder / 'template.docx'):
+            doc = Document(io.BytesIO(export_to_word(HTML)))
+        assert 'Table Grid' not in {style.name for style in doc.styles}
+        table_style = doc.styles[TABLE_STYLE]
+        assert table_style.base_style is None
+        borders = table_style.element.find(qn('w:tblPr')).find(qn('w:tblBorders'))
+        assert [el.get(qn('w:val')) for el in borders] == ['single'] * 6
+        assert doc.tables[0].style.name == TABLE_STYLE
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+        plugin._template_cache = None
@@ -0,0 +1,50 @@
+"""
+Benchmark PDF export of code-heavy documents per code block mode.
+
+Usage: python tools/bench_code_blocks.py [blocks] [lines_per_block]
+"""
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from docnexus.core.renderer import render_baseline
+from docnexus.core.export_dom import ExportDocument
+from docnexus.core.export_code import CODE_MODES
+from docnexus.plugins.pdf_export.plugin import export_pdf
+
+SNIPPET = '''def handler_{i}(request, retries=3):
+    """Process request {i}."""
+    for attempt in range(retries):
+        value = request.get("key_{i}", 0) * 2 + {i}  # scale
+        if value > 100 and attempt != 0:
+            return {{"status": "ok", "value": value}}
+    raise ValueError(f"failed after {{retries}} attempts")
+'''
+
+
+def build_document(blocks, lines_per_block):
+    parts = ["# Code benchmark\n"]
+    for b in range(blocks):
+        code = "".join(SNIPPET.format(i=b * 100 + i) for i in range(max(1, lines_per_block // 7)))
+        parts.append(f"## Listing {b}\n\n```python\n{code}```\n")
+    html, _ = render_baseline("\n".join(parts))
+    return f'<html><body><div id="documentContent"><div class="markdown-content">{html}</div></div></body></html>'
+
+
+def run():
+    blocks = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    lines = int(sys.argv[2]) if len(sys.argv) > 2 else 140
+    html = build_document(blocks, lines)
+    print(f"Document: {blocks} blocks x ~{lines} lines, {len(html) // 1024} KB HTML")
+    print(f"{'mode':<10} {'seconds':>8} {'pdf KB':>8}")
+    for mode in CODE_MODES:
+        document = ExportDocument.from_html(html, options={'code_blocks': mode})
+        start = time.perf_counter()
+        pdf = export_pdf(document)
+        print(f"{mode:<10} {time.perf_counter() - start:>8.2f} {len(pdf) // 1024:>8}")
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,70 @@
+"""
+Benchmark the Word export post-processing phase on a table-heavy document.
+
+Post-processing is the time between htmldocx finishing the document and the save
+(alert shading, table styles, bookmarks, page breaks, images, links, equations).
+
+Usage: python tools/bench_word_postprocess.py [tables] [runs]
+"""
+import os
+import sys
+import time
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from docx.document import Document as DocxDocument
+from docnexus.plugins.word_export import plugin
+
+ALERTS = ['note', 'tip', 'important', 'warning', 'caution']
+
+
+def build_document(tables):
+    parts = []
+    for i in range(tables):
+        if i % 10 == 0:
+            parts.append(f'<h2 id="section-{i}">Section {i}</h2><p>See <a href="#section-0">the start</a>.</p>')
+        if i % 5 == 4:
+            kind = ALERTS[i % len(ALERTS)]
+            parts.append(f'<div class="admonition {kind}"><p class="admonition-title">{kind.title()}</p>'
+                         f'<p>Alert {i} body text.</p></div>')
+        else:
+            rows = "".join(f"<tr><td>r{r}c1</td><td>r{r}c2</td><td>{i * r}</td></tr>" for r in range(4))
+            parts.append(f"<table><thead><tr><th>Name</th><th>Value</th><th>Total</th></tr></thead>"
+                         f"<tbody>{rows}</tbody></table><p>Paragraph after table {i}.</p>")
+    return ('<html><body><div id="documentContent"><div class="toc-container"><ul><li>'
+            '<a href="#section-0">Section 0</a></li></ul></div>'
+            f'<div class="markdown-content">{"".join(parts)}</div></div></body></html>')
+
+
+def run():
+    tables = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    html = build_document(tables)
+
+    marks = {}
+    convert = plugin.SafeHtmlToDocx.add_html_to_document
+    save = DocxDocument.save
+
+    def timed_convert(self, *args, **kwargs):
+        result = convert(self, *args, **kwargs)
+        marks['converted'] = time.perf_counter()
+        return result
+
+    def timed_save(self, *args, **kwargs):
+        marks['save'] = time.perf_counter()
+        return save(self, *args, **kwargs)
+
+    print(f"Document: {tables} tables, {len(html) // 1024} KB HTML")
+    print(f"{'run':<5} {'total s':>8} {'post s':>8}")
+    with patch.object(plugin.SafeHtmlToDocx, 'add_html_to_document', timed_convert), \
+            patch.object(DocxDocument, 'save', timed_save):
+        for i in range(runs):
+            start = time.perf_counter()
+            plugin.export_to_word(html)
+            total = time.perf_counter() - start
+            print(f"{i:<5} {total:>8.2f} {marks['save'] - marks['converted']:>8.3f}")
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,66 @@
+"""
+Benchmark inline style resolution in Word export on a table-heavy document.
+
+Compares memoized style recipes with re-parsing every style for every run.
+Usage: python tools/bench_word_styles.py [tables] [rows]
+"""
+import os
+import sys
+import time
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from docx import Document
+from docnexus.plugins.word_export import plugin
+from docnexus.plugins.word_export.plugin import SafeHtmlToDocx
+
+STYLES = [
+    "color: #d73a49; font-family: Consolas, monospace",
+    "color: #6f42c1; font-family: Consolas, monospace",
+    "color: #032f62; font-family: Consolas, monospace",
+    "color: rgb(106, 115, 125); font-style: italic",
+    "font-family: 'Segoe UI Emoji', sans-serif",
+]
+
+
+def build_html(tables, rows):
+    parts = []
+    for t in range(tables):
+        parts.append(f"<h2>Table {t}</h2><table><tr><th>Key</th><th>Value</th><th>Notes</th></tr>")
+        for r in range(rows):
+            cells = "".join(
+                f'<td><span style="{STYLES[(r + c) % len(STYLES)]}">cell {t}.{r}.{c}</span> '
+                f'<span style="{STYLES[(r + c + 1) % len(STYLES)]}">more</span></td>'
+                for c in range(3)
+            )
+            parts.append(f"<tr>{cells}</tr>")
+        parts.append("</table>")
+    return "".join(parts)
+
+
+def convert(html):
+    start = time.perf_counter()
+    SafeHtmlToDocx().add_html_to_document(html, Document())
+    return time.perf_counter() - start
+
+
+def run():
+    tables = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    html = build_html(tables, rows)
+    print(f"Document: {tables} tables x {rows} rows, {tables * rows * 6} styled runs")
+
+    with patch.object(plugin, 'parse_inline_style', plugin.parse_inline_style.__wrapped__), \
+            patch.object(plugin, 'run_style_recipe', plugin.run_style_recipe.__wrapped__), \
+            patch.object(plugin, 'paragraph_style_recipe', plugin.paragraph_style_recipe.__wrapped__):
+        uncached = convert(html)
+    cached = convert(html)
+
+    print(f"{'per-run parsing':<18} {uncached:>8.2f}s")
+    print(f"{'memoized recipes':<18} {cached:>8.2f}s")
+    print(f"recipe cache: {plugin.run_style_recipe.cache_info()}")
+
+
+if __name__ == '__main__':
+    run()